@@ -2,6 +2,9 @@
 
 # Classes
 from la.deflarry import larry
+from la.flabel import Typedlabel
+from la.defwindow import Movingwindow
+from la.defgroupby import Groupby
 
 try:
     from la.io import (IO, save, load, repack, is_archived_larry,
@@ -13,8 +16,11 @@ except:
 from numpy import nan, inf
 
 from la.flarry import (union, intersection, stack, panel, cov, rand, randn,
-                       align, align_raw, binaryop, add, subtract, multiply,
+                       align, align_raw, align_many, align_many_raw,
+                       reduce_many, binaryop, add, subtract, multiply,
                        divide, unique)
+from la.deflazy import lazy, evaluate
+from la.util.threads import set_num_threads, get_num_threads
 from la.util.report import info                     
 from la.version import __version__
 from la.util import testing
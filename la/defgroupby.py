@@ -0,0 +1,80 @@
+"Group statistics of a larry along an axis, given a larry of group labels."
+
+from la.farray import _group_plan, _group_agg
+
+
+class Groupby(object):
+    """
+    Groups of the elements of a larry along an axis.
+
+    The group labels are aligned with the larry and converted to integer
+    codes once, and the members of the groups are sorted once so that each
+    group is a contiguous segment; `agg` then computes the statistics of all
+    the groups in one pass instead of one masked pass per group. A Groupby
+    is made by larry.groupby and can be used for several statistics.
+
+    Parameters
+    ----------
+    lar : larry
+        The data.
+    group : larry
+        A 1d larry of the group of each label element along `axis` of
+        `lar`; its label must include the label of `lar` along `axis`.
+        Elements whose group is None or NaN belong to no group.
+    axis : int, optional
+        The axis along which the groups are formed. The default is axis 0.
+
+    Examples
+    --------
+    >>> lar = la.larry([1.0, 2.0, 3.0, 6.0])
+    >>> group = la.larry(['a', 'b', 'a', 'b'])
+    >>> g = lar.groupby(group)
+    >>> g.groups
+    ['a', 'b']
+    >>> g.agg('mean')
+    label_0
+        0
+        1
+        2
+        3
+    x
+    array([ 2.,  4.,  2.,  4.])
+
+    """
+
+    def __init__(self, lar, group, axis=0):
+        if axis < 0:
+            axis += lar.ndim
+        self.lar = lar
+        self.axis = axis
+        plan = _group_plan(lar._group_align(group, axis=axis))
+        self.plan = plan
+        self.groups = plan[1]
+
+    def agg(self, func, **kwargs):
+        """
+        Statistic of each group given to each member of the group.
+
+        Parameters
+        ----------
+        func : {'mean', 'median', 'std', 'rank', function}
+            The statistic, ignoring NaNs: the group mean, median, standard
+            deviation (keyword argument `ddof`, default 0), or the ranking
+            within the group (keyword arguments `norm` and `ties` as in
+            larry.ranking). A function func(arr, axis) is called on the
+            members of each group in turn (along `axis` of `arr`); it
+            returns the statistic of each slice along `axis`, or an array
+            of the shape of `arr`.
+        **kwargs
+            Keyword arguments of the statistic.
+
+        Returns
+        -------
+        y : larry
+            A float64 larry with the label of the data where each element
+            is replaced by the statistic of its group. Elements that belong
+            to no group are NaN.
+
+        """
+        x = _group_agg(self.lar.x, self.plan, func, self.axis, **kwargs)
+        return self.lar._samelabel(x)
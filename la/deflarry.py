@@ -1,22 +1,33 @@
 "Labeled array class"
 
 import csv
+import datetime
 
 import numpy as np
 
 from la.missing import ismissing, missing_marker  
-from la.flabel import listmap, listmap_fill, flattenlabel
-from la.farray import nanmean, nanmedian, nanstd
+from la.flabel import (flattenlabel, listjoin, asofjoin, takeaxis,
+                       Labelindex, Typedlabel, labelcopy, labeltake, isunique,
+                       windowstart)
+from la.farray import (nansum, nanmean, nanvar, nanstd, nanmin, nanmax,
+                       nandescribe, nanmedian, nanquantile)
 from la.util.misc import isscalar, fromlists
-from la.farray import (group_ranking, group_mean, group_median, shuffle,
-                       push, quantile, ranking, lastrank, movingsum_forward,
-                       movingrank, mov_sum, geometric_mean, demean,
-                       demedian, zscore)
+from la.util.threads import threadpool, elementwise
+from la.defgroupby import Groupby
+from la.farray import (shuffle, push, quantile, ranking, lastrank,
+                       movingsum_forward, movingrank, mov_sum, mov_mean,
+                       mov_std, mov_min, mov_max, mov_median, mov_zscore,
+                       geometric_mean, demean, demedian, zscore, ewma,
+                       ewmstd, ewmcorr)
 
 
 class larry(object):
     "Labeled array"
 
+    # larrys are created on every arithmetic operation, reduction, and index
+    # so they carry no per-instance __dict__
+    __slots__ = ('x', '_label', '_shared', '_exposed', '_lindex', '_xshared')
+
     def __init__(self, x, label=None, dtype=None, integrity=True):
         """
         Meet larry, he's a labeled array.
@@ -31,7 +42,8 @@ class larry(object):
             for the row labels and one for the column labels. If x is 1d label
             should be a list that contain one list of names. If label is None
             (default) integers will be used to label the the row, columns,
-            etc.
+            etc. The label along any axis can also be a la.Typedlabel, a
+            list-like label stored as a typed Numpy array.
         dtype : data-type, optional
             The desired data type of the larry.         
         integrity : bool, optional
@@ -54,7 +66,10 @@ class larry(object):
         larry does not copy the data array if it is a Numpy array or if
         np.asarray() does not make a copy such as when the data array is a
         Numpy matrix. However, if you change the dtype of the data array, a
-        copy is made. Similarly the label is not copied.            
+        copy is made. Similarly the label is not copied. But the first larry
+        computed from the larry gives it a private copy of the label, so
+        change the label through the label attribute of the larry, not
+        through the lists that were passed to larry().
             
         Examples
         --------
@@ -103,6 +118,7 @@ class larry(object):
                 raise ValueError, "x must be array_like."
         elif dtype != None:
             x = x.astype(dtype)            
+        exposed = label is not None
         if label is None:
             label = [range(z) for z in x.shape]
         if integrity: 
@@ -119,21 +135,123 @@ class larry(object):
                 if x.shape[i] != nlabel:
                     msg = 'Length mismatch in label and x along axis %d'
                     raise ValueError, msg % i
-                if len(frozenset(l)) != nlabel:
-                    # We have duplicates in the label, give an example
-                    count = {}
-                    for li in l:
-                        count[li] = count.get(li, 0) + 1
-                    for key, value in count.iteritems():
-                        if value > 1:
-                            break 
-                    msg = "Elements of label not unique along axis %d. "
-                    msg += "There are %d labels named `%s`."          
-                    raise ValueError, msg % (i, value, key)
-                if type(l) is not list:
+                if type(l) is not list and type(l) is not Typedlabel:
                     raise ValueError, 'label must be a list of lists'          
+                _checkunique(l, i)
         self.x = x
-        self.label = label
+        self._label = label
+        self._shared = False
+        self._exposed = exposed
+        self._lindex = None
+        self._xshared = False
+
+    @classmethod
+    def _trusted(cls, x, label, shared=False, exposed=False):
+        """
+        Create a larry without checking or converting the input.
+        
+        Internal constructor for the results of larry methods and la
+        functions; it is several times faster than __init__ even with
+        integrity=False.
+        
+        Parameters
+        ----------
+        x : Numpy array
+            Data. Must be a Numpy array (not array_like, not a matrix).
+        label : list
+            One label list (or la.Typedlabel) per axis of `x`, each of the
+            same length as that axis and with unique elements. The list is
+            used as is, it is not copied.
+        shared : bool, optional
+            True if the label lists may be referenced by another larry, in
+            which case they are copied before being handed out through the
+            label attribute. Default is False.
+        exposed : bool, optional
+            True if the caller keeps references to the label lists. Default
+            is False.
+            
+        Returns
+        -------
+        out : larry
+        
+        """
+        y = object.__new__(cls)
+        y.x = x
+        y._label = label
+        y._shared = shared
+        y._exposed = exposed
+        y._lindex = None
+        y._xshared = False
+        return y
+
+    # Label storage ----------------------------------------------------------
+    
+    # The label lists are shared, copy-on-write, between a larry and the
+    # larrys computed from it (log, x + 1, y[1:], etc). Two flags keep track:
+    # _shared is True when another larry may hold references to the label
+    # lists, and _exposed is True when the caller may hold references to
+    # them (the label was passed to __init__ or read through the label
+    # attribute). Internal code reads self._label; the label attribute makes
+    # private copies of shared lists before handing them out, and the first
+    # larry computed from an exposed larry makes private copies for it, so
+    # that each exposure costs one copy of the label however many larrys
+    # are computed from it. Label lists of a larry that is not exposed are
+    # never changed in place (_ownlabel copies them), so label joins can be
+    # cached by the identity of the lists (listjoin(..., frozen=True)).
+
+    @property
+    def label(self):
+        "A list of labels, one list (or la.Typedlabel) per axis."
+        if self._shared:
+            self._label = [labelcopy(z) for z in self._label]
+            self._shared = False
+        self._exposed = True
+        # The caller may write new elements into the lists
+        self._lindex = None
+        return self._label
+
+    @label.setter
+    def label(self, label):
+        self._label = label
+        self._shared = False
+        self._exposed = True
+
+    def _frozenlabel(self):
+        "Label lists of self that are not changed in place."
+        if self._exposed:
+            # The caller may change the lists it holds; stop using them
+            self._label = [labelcopy(z) for z in self._label]
+            self._exposed = False
+        return self._label
+
+    def _sharelabel(self):
+        "Label (new outer list) whose label lists are shared with self."
+        label = list(self._frozenlabel())
+        self._shared = True
+        return label
+
+    def _ownlabel(self):
+        "Label lists of self that can be changed in place."
+        if self._shared or not self._exposed:
+            # The lists may be shared or keys of the join cache
+            self._label = [labelcopy(z) for z in self._label]
+            self._shared = False
+        return self._label
+
+    def __getstate__(self):
+        return {'x': self.x, 'label': self._sharelabel()}
+
+    def __setstate__(self, state):
+        self.x = state['x']
+        self._label = state['label']
+        self._shared = True
+        self._exposed = False
+        self._lindex = None
+        self._xshared = False
+
+    def _samelabel(self, x):
+        "larry with data `x` and the same (shared) label as self."
+        return _cow(x, self._sharelabel())
 
     # Unary functions --------------------------------------------------------  
 
@@ -159,9 +277,8 @@ class larry(object):
         >>>
         
         """
-        x = np.log(self.x)
-        label = self.copylabel()
-        return larry(x, label, integrity=False) 
+        x = elementwise(np.log, self.x)
+        return self._samelabel(x)
 
     def exp(self):
         """
@@ -184,9 +301,8 @@ class larry(object):
         array([  2.71828183,   7.3890561 ,  20.08553692])            
                 
         """
-        x = np.exp(self.x)
-        label = self.copylabel()
-        return larry(x, label, integrity=False)
+        x = elementwise(np.exp, self.x)
+        return self._samelabel(x)
         
     def sqrt(self):
         """
@@ -209,9 +325,8 @@ class larry(object):
         array([ 1.,  2.,  3.])
                 
         """
-        x = np.sqrt(self.x)
-        label = self.copylabel()
-        return larry(x, label, integrity=False)
+        x = elementwise(np.sqrt, self.x)
+        return self._samelabel(x)
 
     def sign(self):
         """
@@ -238,8 +353,7 @@ class larry(object):
                 
         """
         x = np.sign(self.x)
-        label = self.copylabel()
-        return larry(x, label, integrity=False)
+        return self._samelabel(x)
         
     def power(self, q):               
         """
@@ -268,8 +382,7 @@ class larry(object):
                 
         """
         x = np.power(self.x, q)
-        label = self.copylabel()
-        return larry(x, label, integrity=False)
+        return self._samelabel(x)
         
     def __pow__(self, q):
         """
@@ -345,13 +458,31 @@ class larry(object):
         """
         if axis == None:
             raise ValueError, 'axis cannot be None'
-        y = self.copy()
-        idx = np.isnan(y.x)
-        y[idx] = 0
-        y.x.cumsum(axis, out=y.x)
-        if idx.any():
-            y.x[idx] = np.nan
-        return y        
+        x = self.x.copy()
+        # The cumsums along `axis` are independent, so split another axis
+        # into blocks, one per thread
+        ndim = x.ndim
+        if axis < 0:
+            axis += ndim
+        split = 1 if axis == 0 else 0
+        if ndim < 2:
+            blocks = [(0, 0)]
+        else:
+            blocks = threadpool.blocks(x.shape[split], x.size)
+        def cumsum(start, stop):
+            if ndim < 2:
+                xb = x
+            else:
+                index = [slice(None)] * ndim
+                index[split] = slice(start, stop)
+                xb = x[tuple(index)]
+            idx = np.isnan(xb)
+            xb[idx] = 0
+            xb.cumsum(axis, out=xb)
+            if idx.any():
+                xb[idx] = np.nan
+        threadpool.map(cumsum, blocks)
+        return self._samelabel(x)
 
     def cumprod(self, axis): 
         """
@@ -455,9 +586,8 @@ class larry(object):
         """
         if lo > hi:
             raise ValueError, 'lo should be less than or equal to hi'
-        y = self.copy()
-        y.x.clip(lo, hi, y.x)
-        return y
+        x = elementwise(np.clip, self.x, lo, hi)
+        return self._samelabel(x)
         
     def __neg__(self):
         "Return a copy with each element multiplied by minus 1."
@@ -530,9 +660,8 @@ class larry(object):
         array([False, False,  True, False], dtype=bool)
 
         """
-        label = self.copylabel()
         x = np.isnan(self.x)
-        return larry(x, label, integrity=False)                             
+        return self._samelabel(x)
 
     def isfinite(self):
         """
@@ -557,9 +686,8 @@ class larry(object):
         array([False,  True, False, False], dtype=bool)
         
         """    
-        label = self.copylabel()
         x = np.isfinite(self.x)
-        return larry(x, label, integrity=False)
+        return self._samelabel(x)
         
     def isinf(self):
         """
@@ -584,9 +712,8 @@ class larry(object):
         array([ True, False, False,  True], dtype=bool)
         
         """    
-        label = self.copylabel()
         x = np.isinf(self.x)
-        return larry(x, label, integrity=False) 
+        return self._samelabel(x)
         
     def __invert__(self):
         """
@@ -632,7 +759,7 @@ class larry(object):
         """
         if self.dtype != bool:
             raise TypeError, 'Only larrys with bool dtype can be inverted.'
-        return larry(~self.x, self.copylabel(), integrity=False)
+        return self._samelabel(~self.x)
         
     # Binary Functions ------------------------------------------------------- 
     
@@ -671,18 +798,18 @@ class larry(object):
         
         """
         if isinstance(other, larry):
-            if self.label == other.label:
+            if self._label == other._label:
                 x = self.x + other.x
-                label = self.copylabel()
-                return larry(x, label, integrity=False)                        
+                return self._samelabel(x)
             else:       
                 x, y, label = self.__align(other)
                 x = x + y
-                return larry(x, label, integrity=False)
+                return _cow(x, label)
         if np.isscalar(other) or isinstance(other, np.ndarray):
             x = self.x + other
-            label = self.copylabel()
-            return larry(x, label, integrity=False)                 
+            return self._samelabel(x)
+        if _islazy(other):
+            return NotImplemented
         raise TypeError, 'Input must be scalar, array, or larry.' 
     
     __radd__ = __add__
@@ -716,18 +843,18 @@ class larry(object):
         array([1])        
         """   
         if isinstance(other, larry):
-            if self.label == other.label:
+            if self._label == other._label:
                 x = self.x - other.x
-                label = self.copylabel()
-                return larry(x, label, integrity=False)                          
+                return self._samelabel(x)
             else:          
                 x, y, label = self.__align(other)        
                 x = x - y
-                return larry(x, label, integrity=False)
+                return _cow(x, label)
         if np.isscalar(other) or isinstance(other, np.ndarray):
             x = self.x - other
-            label = self.copylabel()
-            return larry(x, label, integrity=False)       
+            return self._samelabel(x)
+        if _islazy(other):
+            return NotImplemented
         raise TypeError, 'Input must be scalar, array, or larry.'
         
     def __rsub__(self, other):
@@ -765,18 +892,18 @@ class larry(object):
                
         """    
         if isinstance(other, larry):
-            if self.label == other.label:
+            if self._label == other._label:
                 x = self.x / other.x
-                label = self.copylabel()
-                return larry(x, label, integrity=False)                          
+                return self._samelabel(x)
             else:          
                 x, y, label = self.__align(other)        
                 x = x / y
-                return larry(x, label, integrity=False)
+                return _cow(x, label)
         if np.isscalar(other) or isinstance(other, np.ndarray):
             x = self.x / other
-            label = self.copylabel()
-            return larry(x, label, integrity=False)        
+            return self._samelabel(x)
+        if _islazy(other):
+            return NotImplemented
         raise TypeError, 'Input must be scalar, array, or larry.'
         
     def __rdiv__(self, other):
@@ -821,18 +948,18 @@ class larry(object):
                 
         """      
         if isinstance(other, larry):
-            if self.label == other.label:
+            if self._label == other._label:
                 x = self.x * other.x
-                label = self.copylabel()
-                return larry(x, label, integrity=False)                          
+                return self._samelabel(x)
             else:           
                 x, y, label = self.__align(other)
                 x = x * y
-                return larry(x, label, integrity=False)
+                return _cow(x, label)
         if np.isscalar(other) or isinstance(other, np.ndarray):
             x = self.x * other
-            label = self.copylabel()
-            return larry(x, label, integrity=False)   
+            return self._samelabel(x)
+        if _islazy(other):
+            return NotImplemented
         raise TypeError, 'Input must be scalar, array, or larry.'
 
     __rmul__ = __mul__
@@ -865,18 +992,18 @@ class larry(object):
         
         """    
         if isinstance(other, larry):
-            if self.label == other.label:
+            if self._label == other._label:
                 x = np.logical_and(self.x, other.x)
-                label = self.copylabel()
-                return larry(x, label, integrity=False)                      
+                return self._samelabel(x)
             else:          
                 x, y, label = self.__align(other)
                 x = np.logical_and(x, y)
-                return larry(x, label, integrity=False)
+                return _cow(x, label)
         if np.isscalar(other) or isinstance(other, np.ndarray):            
             x = np.logical_and(self.x, other)
-            label = self.copylabel()
-            return larry(x, label, integrity=False)
+            return self._samelabel(x)
+        if _islazy(other):
+            return NotImplemented
         raise TypeError, 'Input must be scalar, array, or larry.'
 
     __rand__ = __and__
@@ -909,29 +1036,183 @@ class larry(object):
                         
         """     
         if isinstance(other, larry):
-            if self.label == other.label:
+            if self._label == other._label:
                 x = np.logical_or(self.x, other.x)
-                label = self.copylabel()
-                return larry(x, label, integrity=False)                      
+                return self._samelabel(x)
             else:          
                 x, y, label = self.__align(other)
                 x = np.logical_or(x, y)
-                return larry(x, label, integrity=False)
+                return _cow(x, label)
         if np.isscalar(other) or isinstance(other, np.ndarray):            
             x = np.logical_or(self.x, other)
-            label = self.copylabel()
-            return larry(x, label, integrity=False)
+            return self._samelabel(x)
+        if _islazy(other):
+            return NotImplemented
         raise TypeError, 'Input must be scalar, array, or larry.'
 
     __ror__ = __or__
+    
+    # In-place binary functions ----------------------------------------------
+    
+    def __iadd__(self, other):
+        """
+        In-place sum of a larry with another larry, Numpy array, or scalar.
+        
+        The sum is written to the data array of the larry; the label of the
+        larry is not changed. If `other` is a larry with a different label,
+        then `other` is aligned to the label of the larry (a left join):
+        elements of `other` that are not in the larry are ignored and
+        elements of the larry that are not in `other` become NaN, as with
+        la.add(lar, other, join='left').
+        
+        The data array is only replaced by a new array if the sum cannot be
+        stored in it (for example, adding a float to an int larry or a left
+        join that adds NaNs to an int larry) or if the larry shares it with
+        another larry (one of them was made from the other by indexing, lix,
+        pull, or squeeze), so that the other larry is not changed. Otherwise
+        the sum is written in place, and Numpy arrays that reference the
+        data array, such as an array (or a view of an array) passed to
+        larry() or returned by getx(copy=False), see the change.
+        
+        See Also
+        --------
+        la.add: Sum of two larrys using given join and fill methods.
+        
+        Examples
+        --------
+        >>> y1 = larry([1.0, 2.0, 3.0], [['a', 'b', 'c']])
+        >>> y2 = larry([10.0, 20.0], [['c', 'a']])
+        >>> y1 += y2
+        >>> y1
+        label_0
+            a
+            b
+            c
+        x
+        array([ 21.,  NaN,  13.])
+        
+        """
+        return self.__inplace(np.add, other)
+        
+    def __isub__(self, other):
+        """
+        In-place subtraction of another larry, Numpy array, or scalar.
+        
+        The label of the larry is not changed; a larry `other` with a
+        different label is aligned to it with a left join. See
+        larry.__iadd__ for details.
+        
+        See Also
+        --------
+        la.subtract: Difference of two larrys using given join and fill
+                     methods.
+        
+        """
+        return self.__inplace(np.subtract, other)
+        
+    def __imul__(self, other):
+        """
+        In-place multiplication by another larry, Numpy array, or scalar.
+        
+        The label of the larry is not changed; a larry `other` with a
+        different label is aligned to it with a left join. See
+        larry.__iadd__ for details.
+        
+        See Also
+        --------
+        la.multiply: Multiply two larrys element-wise using given join method.
+        
+        """
+        return self.__inplace(np.multiply, other)
+        
+    def __idiv__(self, other):
+        """
+        In-place division by another larry, Numpy array, or scalar.
+        
+        The label of the larry is not changed; a larry `other` with a
+        different label is aligned to it with a left join. See
+        larry.__iadd__ for details.
+        
+        See Also
+        --------
+        la.divide: divide two larrys element-wise using given join method.
+        
+        """
+        return self.__inplace(np.divide, other)
+
+    def __itruediv__(self, other):
+        """
+        In-place true division by another larry, Numpy array, or scalar.
+        
+        Used instead of __idiv__ under `from __future__ import division`.
+        The label of the larry is not changed; a larry `other` with a
+        different label is aligned to it with a left join. See
+        larry.__iadd__ for details.
+        
+        See Also
+        --------
+        la.divide: divide two larrys element-wise using given join method.
+        
+        """
+        return self.__inplace(np.true_divide, other)
+        
+    def __inplace(self, func, other):
+        "In-place binary operation that keeps the label of self (left join)."
+        if isinstance(other, larry):
+            if self._label == other._label:
+                y = other.x
+            else:
+                y = self.__leftalign(other)
+        elif np.isscalar(other) or isinstance(other, np.ndarray):
+            y = other
+        elif _islazy(other):
+            return NotImplemented
+        else:
+            raise TypeError, 'Input must be scalar, array, or larry.'
+        x = self.x
+        if self._xshared or not x.flags.writeable:
+            # Do not change the data of the larrys that x is shared with
+            self.x = func(x, y)
+            self._xshared = False
+            return self
+        try:
+            func(x, y, out=x)
+        except TypeError:
+            # The result cannot be cast to the dtype of x (float to int)
+            self.x = func(x, y)
+        return self
+        
+    def __leftalign(self, other):
+        "Data of `other` aligned to the label of self (a left join)."
+        if self.ndim != other.ndim:
+            msg = 'Binary operation on two larrys with different dimension'
+            raise IndexError, msg
+        y = other.x
+        label1 = self._frozenlabel()
+        label2 = other._frozenlabel()
+        for ax in xrange(self.ndim):
+            ign, ign, ign, idx, idx_miss = listjoin(label1[ax], label2[ax],
+                                                    'left', frozen=True)
+            y, isview = takeaxis(y, idx, ax)
+            if len(idx_miss) > 0:
+                if isview:
+                    y = y.copy()
+                miss = missing_marker(y)
+                if miss == NotImplemented:
+                    y = y.astype(float)
+                    miss = missing_marker(y)
+                index = [slice(None)] * self.ndim
+                index[ax] = idx_miss
+                y[index] = miss
+        return y
 
     def __align(self, other):
         "Align larrys for binary operations."
-        if self.label == other.label:
+        if self._label == other._label:
             # Labels are already aligned
             x = self.x
             y = other.x
-            label = self.copylabel()
+            label = self._sharelabel()
         else:  
             # Labels are not aligned.  
             if self.ndim != other.ndim:
@@ -940,18 +1221,13 @@ class larry(object):
             label = []
             x = self.x
             y = other.x 
-            ax = -1           
-            for ls, lo in zip(self.copylabel(), other.label):
-                ax += 1
-                if ls == lo:
-                    lab = ls
-                else:
-                    lab = list(frozenset(ls) & frozenset(lo))
-                    lab.sort()
-                    ids = listmap(ls, lab)
-                    ido = listmap(lo, lab)
-                    x = x.take(ids, ax)
-                    y = y.take(ido, ax)    
+            label1 = self._frozenlabel()
+            label2 = other._frozenlabel()
+            for ax in xrange(self.ndim):
+                lab, ids, ign, ido, ign = listjoin(label1[ax], label2[ax],
+                                                   'inner', frozen=True)
+                x, ign = takeaxis(x, ids, ax)
+                y, ign = takeaxis(y, ido, ax)
                 label.append(lab)
         return x, y, label
                   
@@ -991,7 +1267,7 @@ class larry(object):
         array([ 3.,  6.])
                     
         """   
-        return self.__reduce(np.nansum, axis=axis)    
+        return self.__reduce(nansum, axis=axis)    
 
     def prod(self, axis=None):
         """
@@ -1159,6 +1435,50 @@ class larry(object):
                     
         """
         return self.__reduce(nanmedian, axis=axis) 
+
+    def nanquantile(self, q, axis=None):
+        """
+        Quantile of values along axis, ignoring NaNs.
+        
+        The quantile is linearly interpolated between the two nearest
+        non-NaN values (the same as the default method of np.percentile).
+        Not to be confused with larry.quantile, which bins the values.
+
+        Parameters
+        ----------
+        q : float
+            The quantile, between 0 and 1. For example, 0.5 is the median.
+        axis : {None, integer}, optional
+            Axis to find the quantile along (integer) or the global quantile
+            (None, default).
+
+        Returns
+        -------
+        d : {larry, scalar}
+            When axis is an integer a larry is returned. When axis is None
+            (default) a scalar is returned (assuming larry contains scalars).
+            
+        Raises
+        ------
+        ValueError
+            If axis is not an integer or None, or if `q` is not between 0
+            and 1.
+
+        Examples
+        --------
+        >>> from la import nan
+        >>> y = larry([[nan, 2], [3,  4], [5, 6]])
+        >>> y.nanquantile(0.25)
+        3.0
+        >>> y.nanquantile(0.25, axis=0)
+        label_0
+            0
+            1
+        x
+        array([ 3.5,  3. ])
+                    
+        """
+        return self.__reduce(nanquantile, q=q, axis=axis)
             
     def std(self, axis=None):
         """
@@ -1232,12 +1552,7 @@ class larry(object):
         array([ 0.,  1.])
                     
         """         
-        y = self.__reduce(nanstd, axis=axis)
-        if np.isscalar(y):
-            y *= y 
-        else:       
-            np.multiply(y.x, y.x, y.x)
-        return y                 
+        return self.__reduce(nanvar, axis=axis)
                             
     def max(self, axis=None):
         """
@@ -1274,7 +1589,7 @@ class larry(object):
         array([ 3.,  4.])
                     
         """            
-        return self.__reduce(np.nanmax, axis=axis)             
+        return self.__reduce(nanmax, axis=axis)             
            
     def min(self, axis=None):
         """
@@ -1311,7 +1626,68 @@ class larry(object):
         array([ 3.,  2.])
                     
         """
-        return self.__reduce(np.nanmin, axis=axis)  
+        return self.__reduce(nanmin, axis=axis)  
+
+    def describe(self, axis=None):
+        """
+        Count, mean, std, min, max and fraction missing along axis.
+        
+        All six statistics are computed in a single pass over the data.
+
+        Parameters
+        ----------
+        axis : {None, integer}, optional
+            Axis to describe along (integer) or describe the flattened larry
+            (None, default).
+
+        Returns
+        -------
+        d : larry
+            A float64 larry in which `axis` is replaced by a 'stat' axis with
+            label ['count', 'mean', 'std', 'min', 'max', 'missing']. The
+            standard deviation is normalized by the number of non-NaN
+            elements; 'missing' is the fraction of elements that are NaN. If
+            `axis` is None, a 1d larry is returned.
+            
+        Raises
+        ------
+        ValueError
+            If axis is not an integer or None.
+
+        Examples
+        -------- 
+        >>> from la import nan
+        >>> y = larry([[nan, 2], [3,  4]])
+        >>> y.describe(axis=0)
+        label_0
+            count
+            mean
+            std
+            min
+            max
+            missing
+        label_1
+            0
+            1
+        x
+        array([[ 1. ,  2. ],
+               [ 3. ,  3. ],
+               [ 0. ,  1. ],
+               [ 3. ,  2. ],
+               [ 3. ,  4. ],
+               [ 0.5,  0. ]])
+                    
+        """
+        stats = ['count', 'mean', 'std', 'min', 'max', 'missing']
+        if axis is None:
+            return _cow(nandescribe(self.x), [stats])
+        elif np.isscalar(axis):
+            x = nandescribe(self.x, axis=axis)
+            label = self._sharelabel()
+            label[axis] = stats
+            return _cow(x, label)
+        else:
+            raise ValueError, 'axis should be an integer or None'
 
     def __reduce(self, op, default=np.nan, **kwargs):
         axis = kwargs['axis']
@@ -1326,17 +1702,17 @@ class larry(object):
             if (x.ndim == 0) and (x.size == 1):
                 return default
             else:
-                label = self.copylabel()
+                label = self._sharelabel()
                 label.pop(axis)
-                return larry(x, label, integrity=False)
+                return _cow(x, label)
         if np.isscalar(axis):
             x = op(self.x, **kwargs)
             if np.isscalar(x):
                 return x
             else:    
-                label = self.copylabel()
+                label = self._sharelabel()
                 label.pop(axis)
-                return larry(x, label, integrity=False)      
+                return _cow(x, label)      
         elif axis is None:
             return op(self.x, **kwargs)
         else:
@@ -1568,7 +1944,9 @@ class larry(object):
                 x = x >= y                              
             else:
                 raise ValueError, 'Unknown comparison operator'              
-            return larry(x, label, integrity=False)
+            return _cow(x, label)
+        elif _islazy(other):
+            return NotImplemented
         else:
             raise TypeError, 'Input must be scalar, numpy array, or larry.'
 
@@ -1600,13 +1978,15 @@ class larry(object):
         
         """
         typidx = type(index)
+        integrity = False
         if isscalar(index):
             index = int(index)                
             if index >= self.shape[0]:
                 raise IndexError, 'index out of range'
-            label = self.label[1:]
+            label = self._sharelabel()[1:]
             x = self.x[index]                                       
         elif typidx is tuple:
+            share = self._sharelabel()
             label = []
             for ax in xrange(self.ndim):
                 if ax < len(index):
@@ -1617,8 +1997,9 @@ class larry(object):
                             raise IndexError, 'index out of range'
                         lab = None
                     elif typ is list or typ is tuple:
+                        integrity = True
                         try:
-                            lab = [self.label[ax][z] for z in idx]
+                            lab = labeltake(self._label[ax], idx)
                         except IndexError:
                             raise IndexError, 'index out of range'                           
                     elif typ is np.ndarray:
@@ -1626,52 +2007,42 @@ class larry(object):
                             msg = 'You can use a Numpy array for indexing, '
                             msg += 'but it must be 1d.'
                             raise IndexError, msg
-                        if idx.dtype.type == np.bool_:
-                            try:
-                                lab = [self.label[ax][j] for j, z in
-                                                          enumerate(idx) if z]
-                            except IndexError:
-                                raise IndexError, 'index out of range'
-                        else:
-                            try:
-                                lab = [self.label[ax][z] for z in idx]
-                            except IndexError:
-                                raise IndexError, 'index out of range'                       
+                        integrity = True
+                        try:
+                            lab = labeltake(self._label[ax], idx)
+                        except IndexError:
+                            raise IndexError, 'index out of range'
                     elif typ is slice:
-                        lab = self.label[ax][idx] 
+                        lab = self._label[ax][idx]
                     else:
                         msg = 'I do not recognize the way you are indexing'
                         raise IndexError, msg                       
                 else:
-                    lab = self.label[ax]
+                    lab = share[ax]
                 if lab:     
                     label.append(lab)              
             x = self.x[index]
         elif typidx is slice:       
-            label = list(self.label)
-            label[0] = label[0][index]
+            label = self._sharelabel()
+            label[0] = self._label[0][index]
             x = self.x[index]
         elif typidx is list:
-            label = list(self.label)
-            label[0] = [label[0][int(i)] for i in index]
+            label = self._sharelabel()
+            label[0] = labeltake(self._label[0], map(int, index))
+            _checkunique(label[0], 0)
             x = self.x.take(index, axis=0) 
         elif typidx is np.ndarray:    
             if index.ndim != 1:
                 msg = 'You can use a Numpy array for indexing, '
                 msg += 'but it must be 1d.'
                 raise IndexError, msg
-            if index.dtype.type == np.bool_:
-                try:
-                    lab = [self.label[0][j] for j, z in
-                                                enumerate(index) if z]
-                except IndexError:
-                    raise IndexError, 'index out of range'
-            else:
-                try:
-                    lab = [self.label[0][z] for z in index]
-                except IndexError:
-                    raise IndexError, 'index out of range' 
-            label = self.copylabel()
+            try:
+                lab = labeltake(self._label[0], index)
+            except IndexError:
+                raise IndexError, 'index out of range' 
+            if index.dtype.type != np.bool_:
+                _checkunique(lab, 0)
+            label = self._sharelabel()
             label[0] = lab        
             x = self.x[index]                                 
         else:        
@@ -1680,7 +2051,7 @@ class larry(object):
             raise IndexError, msg        
         if np.isscalar(x):
             return x                                
-        return larry(x, label)
+        return _dataview(self, _cow(x, label, integrity))
 
     def take(self, indices, axis):
         """
@@ -1745,11 +2116,11 @@ class larry(object):
                [ 0.75024392,  0.92896999]])
        
         """
-        label = self.copylabel()
-        labelaxis = label[axis]
-        label[axis] = [labelaxis[idx] for idx in indices]
+        label = self._sharelabel()
+        label[axis] = labeltake(label[axis], indices)
+        _checkunique(label[axis], axis)
         x = self.x.take(indices, axis)
-        return larry(x, label)
+        return _cow(x, label)
 
     @property    
     def lix(self):
@@ -1898,7 +2269,7 @@ class larry(object):
         
         """
         if isinstance(index, larry):
-            if self.label == index.label:
+            if self._label == index._label:
                 self.x[index.x] = value
             else:
                 # Could use morph to do this, if every row and column of self
@@ -1910,7 +2281,7 @@ class larry(object):
                 # TODO The line below (self[index].label) is slow. Need a
                 # function that indexes into labels without indexing into x.
                 # Then use that function in getitem
-                if self[index].label == value.label:
+                if self[index]._label == value._label:
                     self.x[index] = value.x
                 else:    
                     raise IndexError, 'larrys are not aligned.'    
@@ -2091,10 +2462,9 @@ class larry(object):
         """
         if axis >= self.ndim:
             raise IndexError, 'axis out of range'
-        label = self.label[axis]    
         if copy:
-            label =  list(label)
-        return label            
+            return labelcopy(self._label[axis])
+        return self.label[axis]            
             
     def pull(self, name, axis):
         """
@@ -2149,7 +2519,7 @@ class larry(object):
         """
         if axis is None:
             raise ValueError, 'axis cannot be None'        
-        label = list(self.label)
+        label = self._sharelabel()
         label.pop(axis)  
         idx = self.labelindex(name, axis)
         index = [slice(None)] * self.ndim 
@@ -2157,7 +2527,7 @@ class larry(object):
         x = self.x[index]
         if x.shape == (1,):
             return x[0]
-        return larry(x, label)            
+        return _dataview(self, _cow(x, label, integrity=True))
         
     def fill(self, fill_value):
         """
@@ -2239,14 +2609,19 @@ class larry(object):
         if axis >= self.ndim:
             raise IndexError, 'axis is out of range' 
         y = self.copy()      
-        cmd = '[(idx, z) for idx, z in enumerate(y.label[axis]) if z '
+        if type(y._label[axis]) is Typedlabel:
+            idx = y._label[axis].mask(op, value).nonzero()[0]
+            if len(idx) == 0:
+                return larry([])
+            return y.take(idx, axis)
+        cmd = '[(idx, z) for idx, z in enumerate(y._label[axis]) if z '
         cmd = cmd + op + ' value]'  
         idxlabel = eval(cmd)
         if len(idxlabel) == 0:
             return larry([])
         else:
             idx, label = zip(*idxlabel)
-            y.label[axis] = list(label)
+            y._label[axis] = list(label)
             index = [slice(None, None, None)] * self.ndim
             index[axis] = list(idx)
             y.x = y.x[index]
@@ -2332,9 +2707,9 @@ class larry(object):
         
         """
         if axis is None:
-            return max([max(z) for z in self.label])
+            return max([max(z) for z in self._label])
         else:
-            return max([z for z in self.label[axis]])
+            return max([z for z in self._label[axis]])
 
     def minlabel(self, axis=None):
         """
@@ -2362,9 +2737,9 @@ class larry(object):
         
         """
         if axis is None:
-            return min([min(z) for z in self.label])
+            return min([min(z) for z in self._label])
         else:
-            return min([z for z in self.label[axis]])
+            return min([z for z in self._label[axis]])
         
     def labelindex(self, name, axis, exact=True):
         """
@@ -2381,7 +2756,8 @@ class larry(object):
             raised if an exact match cannot be found. If exact match is False
             and if a perfect match is not found then the index of the nearest
             label is returned. Nearest is defined as the closest that is equal
-            or smaller.
+            or smaller. The nearest label is found with a binary search; see
+            la.flabel.asofjoin.
             
         Returns
         -------
@@ -2404,17 +2780,41 @@ class larry(object):
         if axis is None:
             raise ValueError, 'axis cannot be None'            
         try:
-            index = self.label[axis].index(name)
+            index = self._getlindex(axis).index(name)
         except ValueError:
             if exact:
                 raise IndexError, 'name not in label along axis %d' % axis
             else:
-                idx = [i for i, z in enumerate(self.label[axis]) if z <= name]
-                if len(idx) == 0:
+                ign, ign, ign, idx, miss = asofjoin([name], self._label[axis])
+                if len(miss) > 0:
                     raise IndexError, 'name not in label along axis %d' % axis
-                index = max(idx)                        
+                if type(idx) is slice:
+                    index = idx.start
+                else:
+                    index = int(idx[0])
         return index
         
+    def _getlindex(self, axis):
+        """
+        Hashed index (la.flabel.Labelindex) of the label along `axis`.
+        
+        The index is built lazily on first use and cached on the larry. It is
+        rebuilt whenever the label along `axis` is replaced, changes length,
+        or its elements are moved, and it is dropped when the label is read
+        through the label attribute (which may be used to change it).
+        
+        """
+        label = self._label[axis]
+        if axis < 0:
+            axis += len(self._label)
+        if self._lindex is None:
+            self._lindex = {}
+        lindex = self._lindex.get(axis)
+        if lindex is None or not lindex.isvalid(label):
+            lindex = Labelindex(label)
+            self._lindex[axis] = lindex
+        return lindex
+        
     def maplabel(self, func, axis=None, copy=True):
         """
         Apply given function to each element of label along specified axis.
@@ -2467,9 +2867,9 @@ class larry(object):
             y = self    
         if axis is None:
             for ax in range(y.ndim):
-                y.label[ax] = map(func, y.label[ax])
+                y._label[ax] = map(func, y._label[ax])
         else:
-            y.label[axis] = map(func, y.label[axis])
+            y._label[axis] = map(func, y._label[axis])
         return y                    
             
     # Calc -------------------------------------------------------------------
@@ -2502,7 +2902,7 @@ class larry(object):
         array([-1.5, -0.5,  0.5,  1.5])
             
         """
-        return larry(demean(self.x, axis), self.copylabel(), integrity=False)
+        return self._samelabel(demean(self.x, axis))
 
     def demedian(self, axis=None):
         """
@@ -2532,7 +2932,7 @@ class larry(object):
         array([-1.5, -0.5,  0.5,  1.5])
             
         """
-        return larry(demedian(self.x, axis), self.copylabel(), integrity=False)
+        return self._samelabel(demedian(self.x, axis))
         
     def zscore(self, axis=None):
         """
@@ -2561,7 +2961,7 @@ class larry(object):
         array([-1.22474487,  0.        ,  1.22474487])
             
         """
-        return larry(zscore(self.x, axis), self.copylabel(), integrity=False)
+        return self._samelabel(zscore(self.x, axis))
     
     @np.deprecate(new_name='mov_sum')
     def movingsum(self, window, axis=-1, norm=False):
@@ -2573,8 +2973,10 @@ class larry(object):
         
         Parameters
         ----------
-        window : int
-            The number of elements in the moving window.
+        window : {int, datetime.timedelta}
+            The number of elements in the moving window, or the length of
+            time it spans if the labels of `axis` are dates or datetimes
+            (see la.flabel.windowstart).
         axis : int, optional
             The axis over which to perform the moving sum. By default the
             moving sum is taken over the last axis (-1).
@@ -2625,9 +3027,459 @@ class larry(object):
         
         """ 
         y = self.copy()
-        y.x = mov_sum(y.x, window, axis=axis, norm=norm)
+        y.x = mov_sum(y.x, self.__window(window, axis), axis=axis, norm=norm)
         return y 
+
+    def __window(self, window, axis):
+        "Window start of each label of `axis` if `window` is a timedelta."
+        if isinstance(window, (datetime.timedelta, np.timedelta64)):
+            return windowstart(self._label[axis], window)
+        return window
+
+    def mov_mean(self, window, axis=-1, min_count=1):
+        """
+        Moving window mean along axis, ignoring NaNs.
         
+        Parameters
+        ----------
+        window : {int, datetime.timedelta}
+            The number of elements in the moving window, or the length of
+            time it spans if the labels of `axis` are dates or datetimes
+            (see la.flabel.windowstart).
+        axis : int, optional
+            The axis over which the window moves. By default the window
+            moves over the last axis (-1).
+        min_count : int, optional
+            The minimum number of non-NaN elements in a window for the
+            mean to be computed; windows with fewer non-NaN elements
+            give NaN. The default is 1.
+
+        Returns
+        -------
+        y : larry
+            The moving mean along the specified axis. The first
+            `window` - 1 elements along `axis` are NaN.
+            
+        See Also
+        --------
+        la.farray.mov_mean: Moving window mean of a Numpy array.
+
+        Examples
+        --------
+        >>> lar = larry([1, 2, la.nan, 4, 6])
+        >>> lar.mov_mean(2)
+        label_0
+            0
+            1
+            2
+            3
+            4
+        x
+        array([ NaN,  1.5,  2. ,  4. ,  5. ])
+        
+        """
+        window = self.__window(window, axis)
+        return self._samelabel(mov_mean(self.x, window, axis, min_count))
+
+    def mov_std(self, window, axis=-1, min_count=1):
+        """
+        Moving window standard deviation along axis, ignoring NaNs.
+        
+        Parameters
+        ----------
+        window : {int, datetime.timedelta}
+            The number of elements in the moving window, or the length of
+            time it spans if the labels of `axis` are dates or datetimes
+            (see la.flabel.windowstart).
+        axis : int, optional
+            The axis over which the window moves. By default the window
+            moves over the last axis (-1).
+        min_count : int, optional
+            The minimum number of non-NaN elements in a window for the
+            standard deviation to be computed; windows with fewer non-NaN
+            elements give NaN. The default is 1.
+
+        Returns
+        -------
+        y : larry
+            The moving standard deviation along the specified axis. The first
+            `window` - 1 elements along `axis` are NaN.
+            
+        See Also
+        --------
+        la.farray.mov_std: Moving window standard deviation of a Numpy array.
+
+        Examples
+        --------
+        >>> lar = larry([1, 2, la.nan, 4, 6])
+        >>> lar.mov_std(2)
+        label_0
+            0
+            1
+            2
+            3
+            4
+        x
+        array([ NaN,  0.5,  0. ,  0. ,  1. ])
+        
+        """
+        window = self.__window(window, axis)
+        return self._samelabel(mov_std(self.x, window, axis, min_count))
+
+    def mov_min(self, window, axis=-1, min_count=1):
+        """
+        Moving window minimum along axis, ignoring NaNs.
+        
+        Parameters
+        ----------
+        window : {int, datetime.timedelta}
+            The number of elements in the moving window, or the length of
+            time it spans if the labels of `axis` are dates or datetimes
+            (see la.flabel.windowstart).
+        axis : int, optional
+            The axis over which the window moves. By default the window
+            moves over the last axis (-1).
+        min_count : int, optional
+            The minimum number of non-NaN elements in a window for the
+            minimum to be computed; windows with fewer non-NaN elements
+            give NaN. The default is 1.
+
+        Returns
+        -------
+        y : larry
+            The moving minimum along the specified axis. The first
+            `window` - 1 elements along `axis` are NaN.
+            
+        See Also
+        --------
+        la.farray.mov_min: Moving window minimum of a Numpy array.
+
+        Examples
+        --------
+        >>> lar = larry([1, 2, la.nan, 4, 6])
+        >>> lar.mov_min(2)
+        label_0
+            0
+            1
+            2
+            3
+            4
+        x
+        array([ NaN,   1.,   2.,   4.,   4.])
+        
+        """
+        window = self.__window(window, axis)
+        return self._samelabel(mov_min(self.x, window, axis, min_count))
+
+    def mov_max(self, window, axis=-1, min_count=1):
+        """
+        Moving window maximum along axis, ignoring NaNs.
+        
+        Parameters
+        ----------
+        window : {int, datetime.timedelta}
+            The number of elements in the moving window, or the length of
+            time it spans if the labels of `axis` are dates or datetimes
+            (see la.flabel.windowstart).
+        axis : int, optional
+            The axis over which the window moves. By default the window
+            moves over the last axis (-1).
+        min_count : int, optional
+            The minimum number of non-NaN elements in a window for the
+            maximum to be computed; windows with fewer non-NaN elements
+            give NaN. The default is 1.
+
+        Returns
+        -------
+        y : larry
+            The moving maximum along the specified axis. The first
+            `window` - 1 elements along `axis` are NaN.
+            
+        See Also
+        --------
+        la.farray.mov_max: Moving window maximum of a Numpy array.
+
+        Examples
+        --------
+        >>> lar = larry([1, 2, la.nan, 4, 6])
+        >>> lar.mov_max(2)
+        label_0
+            0
+            1
+            2
+            3
+            4
+        x
+        array([ NaN,   2.,   2.,   4.,   6.])
+        
+        """
+        window = self.__window(window, axis)
+        return self._samelabel(mov_max(self.x, window, axis, min_count))
+
+    def mov_median(self, window, axis=-1, min_count=1):
+        """
+        Moving window median along axis, ignoring NaNs.
+        
+        Parameters
+        ----------
+        window : {int, datetime.timedelta}
+            The number of elements in the moving window, or the length of
+            time it spans if the labels of `axis` are dates or datetimes
+            (see la.flabel.windowstart).
+        axis : int, optional
+            The axis over which the window moves. By default the window
+            moves over the last axis (-1).
+        min_count : int, optional
+            The minimum number of non-NaN elements in a window for the
+            median to be computed; windows with fewer non-NaN elements
+            give NaN. The default is 1.
+
+        Returns
+        -------
+        y : larry
+            The moving median along the specified axis. The first
+            `window` - 1 elements along `axis` are NaN.
+            
+        See Also
+        --------
+        la.farray.mov_median: Moving window median of a Numpy array.
+
+        Examples
+        --------
+        >>> lar = larry([1, 2, la.nan, 4, 6])
+        >>> lar.mov_median(2)
+        label_0
+            0
+            1
+            2
+            3
+            4
+        x
+        array([ NaN,  1.5,  2. ,  4. ,  5. ])
+        
+        """
+        window = self.__window(window, axis)
+        return self._samelabel(mov_median(self.x, window, axis, min_count))
+        
+    def mov_zscore(self, window, axis=-1, min_count=1):
+        """
+        Moving window z-score along axis, ignoring NaNs.
+
+        The z-score of each element is its deviation from the mean of the
+        window that ends at it divided by the standard deviation (ddof=0)
+        of the window.
+        
+        Parameters
+        ----------
+        window : {int, datetime.timedelta}
+            The number of elements in the moving window, or the length of
+            time it spans if the labels of `axis` are dates or datetimes
+            (see la.flabel.windowstart).
+        axis : int, optional
+            The axis over which the window moves. By default the window
+            moves over the last axis (-1).
+        min_count : int, optional
+            The minimum number of non-NaN elements in a window; windows
+            with fewer non-NaN elements give NaN. The default is 1.
+
+        Returns
+        -------
+        y : larry
+            The moving z-score along the specified axis. The first
+            `window` - 1 elements along `axis`, NaN elements, and elements
+            whose window has a standard deviation of zero are NaN.
+            
+        See Also
+        --------
+        la.farray.mov_zscore: Moving window z-score of a Numpy array.
+
+        Examples
+        --------
+        >>> lar = larry([1, 2, la.nan, 4, 6])
+        >>> lar.mov_zscore(2).x
+        array([ NaN,   1.,  NaN,  NaN,   1.])
+        
+        """
+        window = self.__window(window, axis)
+        return self._samelabel(mov_zscore(self.x, window, axis, min_count))
+
+    def ewma(self, halflife, axis=-1, state=None, return_state=False):
+        """
+        Exponentially weighted moving average along axis, ignoring NaNs.
+
+        At each step along `axis` the weights of the earlier elements are
+        multiplied by 0.5 ** (1 / `halflife`) and the new element, unless it
+        is NaN, gets a weight of 1. The average is updated recursively, in
+        one pass over the data.
+        
+        Parameters
+        ----------
+        halflife : float
+            The number of steps after which the weight of an element is
+            halved; must be greater than zero.
+        axis : int, optional
+            The axis along which the average moves. By default the last
+            axis (-1).
+        state : {None, larry}, optional
+            The state returned by an earlier call (of ewma, ewmstd, or
+            ewmcorr) with ``return_state=True``. The average continues from
+            the end of the earlier data. The state is aligned to the larry
+            along the other axes; rows that are not in the state start
+            without earlier data. None (default) starts without earlier
+            data.
+        return_state : bool, optional
+            Also return the state at the end of `axis`. The default is
+            False.
+
+        Returns
+        -------
+        y : larry
+            The moving average. Elements before the first non-NaN element
+            along `axis` are NaN.
+        state : larry
+            Only if `return_state` is True. The label of `axis` is
+            ['weight', 'mean', 'mean2', 'var', 'var2', 'cov'].
+            
+        See Also
+        --------
+        la.farray.ewma: Exponentially weighted moving average of a Numpy
+                        array.
+
+        Examples
+        --------
+        >>> lar = larry([1.0, la.nan, 3.0, 4.0])
+        >>> lar.ewma(1)
+        label_0
+            0
+            1
+            2
+            3
+        x
+        array([ 1.        ,  1.        ,  2.6       ,  3.46153846])
+        
+        """
+        return self.__ewm(ewma, (), halflife, axis, state, return_state)
+
+    def ewmstd(self, halflife, axis=-1, state=None, return_state=False):
+        """
+        Exponentially weighted moving standard deviation along axis, ignoring
+        NaNs.
+
+        The elements are weighted as in `ewma`; there is no bias correction.
+        
+        Parameters
+        ----------
+        halflife : float
+            The number of steps after which the weight of an element is
+            halved; must be greater than zero.
+        axis : int, optional
+            The axis along which the window moves. By default the last
+            axis (-1).
+        state : {None, larry}, optional
+            The state returned by an earlier call with ``return_state=True``
+            (see `ewma`). None (default) starts without earlier data.
+        return_state : bool, optional
+            Also return the state at the end of `axis`. The default is
+            False.
+
+        Returns
+        -------
+        y : larry
+            The moving standard deviation. Elements before the first non-NaN
+            element along `axis` are NaN.
+        state : larry
+            Only if `return_state` is True; see `ewma`.
+            
+        See Also
+        --------
+        la.farray.ewmstd: Exponentially weighted moving standard deviation
+                          of a Numpy array.
+
+        Examples
+        --------
+        >>> lar = larry([1.0, la.nan, 3.0, 4.0])
+        >>> lar.ewmstd(1).x
+        array([ 0.        ,  0.        ,  0.8       ,  0.84265009])
+        
+        """
+        return self.__ewm(ewmstd, (), halflife, axis, state, return_state)
+
+    def ewmcorr(self, other, halflife, axis=-1, state=None,
+                return_state=False):
+        """
+        Exponentially weighted moving correlation with another larry along
+        axis, ignoring pairs that contain a NaN.
+
+        The larrys are joined with an inner join. The pairs of elements are
+        weighted as in `ewma`.
+        
+        Parameters
+        ----------
+        other : larry
+            The larry to correlate with.
+        halflife : float
+            The number of steps after which the weight of a pair is halved;
+            must be greater than zero.
+        axis : int, optional
+            The axis along which the window moves. By default the last
+            axis (-1).
+        state : {None, larry}, optional
+            The state returned by an earlier call with ``return_state=True``
+            (see `ewma`). None (default) starts without earlier data.
+        return_state : bool, optional
+            Also return the state at the end of `axis`. The default is
+            False.
+
+        Returns
+        -------
+        y : larry
+            The moving correlation. It is NaN until both larrys have varied.
+        state : larry
+            Only if `return_state` is True; see `ewma`.
+            
+        See Also
+        --------
+        la.farray.ewmcorr: Exponentially weighted moving correlation of two
+                           Numpy arrays.
+
+        Examples
+        --------
+        >>> y1 = larry([1.0, 2.0, 3.0, 4.0])
+        >>> y2 = larry([2.0, 1.0, 4.0, 3.0])
+        >>> y1.ewmcorr(y2, 1).x
+        array([        NaN, -1.        ,  0.78555332,  0.48453608])
+        
+        """
+        if not isinstance(other, larry):
+            raise TypeError, 'other must be a larry.'
+        return self.__ewm(ewmcorr, (other,), halflife, axis, state,
+                          return_state)
+
+    def __ewm(self, func, others, halflife, axis, state, return_state):
+        "Exponentially weighted moving statistic; see larry.ewma."
+        if others:
+            x, y, label = self.__align(others[0])
+            args = (x, y)
+        else:
+            args = (self.x,)
+            label = self._sharelabel()
+        if axis < 0:
+            axis += self.ndim
+        if isinstance(state, larry):
+            for ax in xrange(self.ndim):
+                if ax != axis:
+                    state = state.morph(label[ax], ax)
+            state = state.x.copy()
+            # Rows that are not in the state have no earlier data
+            state[np.isnan(state)] = 0
+        x, state = func(*args + (halflife, axis, state, True))
+        y = _cow(x, label)
+        if return_state:
+            label = list(label)
+            label[axis] = ['weight', 'mean', 'mean2', 'var', 'var2', 'cov']
+            return y, _cow(state, label)
+        return y
+
     def movingsum_forward(self, window, skip=0, axis=-1, norm=False):    
         """Movingsum in the forward direction skipping skip dates"""      
         y = self.copy()
@@ -2679,15 +3531,20 @@ class larry(object):
         y.x = ranking(y.x, axis, norm=norm, ties=ties)
         return y
                             
-    def movingrank(self, window, axis=-1):
+    def movingrank(self, window, axis=-1, decay=0.0):
         """Moving rank (normalized to -1 and 1) of a given window along axis.
 
         Normalized for missing (NaN) data.
         A data point with NaN data is returned as NaN
         If a window is all NaNs except last, this is returned as NaN
+        The rank of each data point is its lastrank, with the given
+        exponential `decay` (default 0, no decay), in the window that ends
+        at it. The `window` is a number of elements, or a datetime.timedelta
+        if the labels of `axis` are dates or datetimes.
         """
         y = self.copy()
-        y.x = movingrank(y.x, window, axis=axis)
+        y.x = movingrank(y.x, self.__window(window, axis), axis=axis,
+                         decay=decay)
         return y
         
     def quantile(self, q, axis=0):
@@ -2732,16 +3589,49 @@ class larry(object):
         
     # Group calc -------------------------------------------------------------  
                  
+    def groupby(self, group, axis=0):
+        """
+        Groups (e.g. sectors) of the elements along an axis.
+
+        Parameters
+        ----------
+        group : larry
+            A 1d larry of the group of each label element along `axis`. The
+            label of the larry along `axis` must be a subset of the label of
+            `group`.
+        axis : int, optional
+            The axis along which the groups are formed. The default is
+            axis 0.
+
+        Returns
+        -------
+        g : la.Groupby
+            The groups; g.agg('mean'), g.agg('median'), g.agg('std'),
+            g.agg('rank'), or g.agg(func) return a larry of the statistic of
+            the group of each element.
+
+        Examples
+        --------
+        >>> lar = larry([1.0, 2.0, 3.0, 6.0])
+        >>> lar.groupby(larry(['a', 'b', 'a', 'b'])).agg('median')
+        label_0
+            0
+            1
+            2
+            3
+        x
+        array([ 2.,  4.,  2.,  4.])
+
+        """
+        return Groupby(self, group, axis)
+
     def group_ranking(self, group, axis=0):
         """Group (e.g. sector) ranking along columns.
         
         The row labels of the object must be a subset of the row labels of the
         group.
         """
-        y = self.copy()
-        aligned_group_list = y._group_align(group, axis=axis)
-        y.x = group_ranking(y.x, aligned_group_list, axis=axis)
-        return y
+        return self.groupby(group, axis).agg('rank')
             
     def group_mean(self, group, axis=0):
         """Group (e.g. sector) mean along columns (zero axis).
@@ -2749,10 +3639,7 @@ class larry(object):
         The row labels of the object must be a subset of the row labels of the
         group.
         """        
-        y = self.copy() 
-        aligned_group_list = y._group_align(group, axis=axis)
-        y.x = group_mean(y.x, aligned_group_list, axis=axis)
-        return y
+        return self.groupby(group, axis).agg('mean')
         
     def group_median(self, group, axis=0):
         """Group (e.g. sector) median along columns (zero axis).
@@ -2760,10 +3647,7 @@ class larry(object):
         The row labels of the object must be a subset of the row labels of the
         group.
         """ 
-        y = self.copy()
-        aligned_group_list = y._group_align(group, axis=axis)   
-        y.x = group_median(y.x, aligned_group_list, axis=axis)
-        return y
+        return self.groupby(group, axis).agg('median')
     
     def _group_align(self, group, axis=0):
         """Return a row aligned group list (e.g. sector list) of values.
@@ -2775,16 +3659,17 @@ class larry(object):
             raise TypeError, 'group must be a larry'
         if group.ndim != 1:
             raise ValueError, 'group must be a 1d larry'
-        if len(frozenset(self.label[axis]) - frozenset(group.label[0])):
+        if len(frozenset(self._label[axis]) - frozenset(group._label[0])):
             raise IndexError, 'label is not a subset of group label'
-        g = group.morph(self.label[axis], 0)
+        g = group.morph(self._label[axis], 0)
         g = g.x.tolist()
         return g 
                                                                  
 
     # Alignment --------------------------------------------------------------     
 
-    def morph(self, label, axis):
+    def morph(self, label, axis, join='right', direction='backward',
+              tolerance=None):
         """
         Reorder the elements along the specified axis.
         
@@ -2800,6 +3685,20 @@ class larry(object):
             Desired ordering of elements along specified axis.
         axis : int
             axis along which to perform the reordering.
+        join : {'right', 'asof'}, optional
+            By default ('right') each element of `label` is matched to the
+            same label element of the larry. With 'asof' each element of
+            `label` is matched to the nearest label element of the larry
+            (see `direction`), which is useful for irregularly spaced labels
+            such as dates.
+        direction : {'backward', 'forward', 'nearest'}, optional
+            Only used if `join` is 'asof'. Each element of `label` is matched
+            to the last label element of the larry that is less than or equal
+            to it ('backward', default), to the first that is greater than or
+            equal to it ('forward'), or to the closest ('nearest').
+        tolerance : {None, scalar, datetime.timedelta}, optional
+            Only used if `join` is 'asof'. The maximum distance between
+            matched label elements. The default (None) is no maximum.
         
         Returns
         -------
@@ -2823,27 +3722,59 @@ class larry(object):
             a
             c
         x
-        array([  2.,  NaN,   1.,   3.])                    
+        array([  2.,  NaN,   1.,   3.])
+        
+        Match each date to the most recent earlier date:
+        
+        >>> from datetime import date
+        >>> y = larry([1, 2], [[date(2010, 1, 1), date(2010, 1, 4)]])
+        >>> y.morph([date(2010, 1, 3), date(2010, 1, 5)], axis=0, join='asof')
+        label_0
+            2010-01-03
+            2010-01-05
+        x
+        array([1, 2])
             
         """
         if axis >= self.ndim:
             raise IndexError, 'axis out of range'
-        if self.label[axis] == label:
+        if self._label[axis] == label:
             return self.copy()
-        else:    
-            idx, idx_miss = listmap_fill(self.label[axis], label)           
-            x = self.x.take(idx, axis)
-            if len(idx_miss) > 0:
-                index = [slice(None)] * self.ndim
-                index[axis] = idx_miss
-                miss = missing_marker(x)
-                if miss == NotImplemented:
-                    x = x.astype(float)
-                    miss = missing_marker(x)      
-                x[index] = miss      
-            lab = self.copylabel()
-            lab[axis] = list(label)
-            return larry(x, lab)
+        elif join == 'right':    
+            lab, idx, idx_miss, ign, ign = listjoin(self._label[axis], label,
+                                                    'right')
+            return self._morph(lab, idx, idx_miss, axis)
+        elif join == 'asof':
+            lab, ign, ign, idx, idx_miss = asofjoin(label, self._label[axis],
+                                                    direction, tolerance)
+            return self._morph(lab, idx, idx_miss, axis)
+        else:
+            raise ValueError, 'join type not recognized'
+            
+    def _morph(self, label, idx, idx_miss, axis, check=True):
+        """
+        Morph given the label and the index maps returned by listjoin.
+        
+        Set `check` to False if the elements of `label` are known to be
+        unique (for example, an outer join of two larry labels).
+        
+        """
+        x, isview = takeaxis(self.x, idx, axis)
+        if isview:
+            x = x.copy()
+        if len(idx_miss) > 0:
+            index = [slice(None)] * self.ndim
+            index[axis] = idx_miss
+            miss = missing_marker(x)
+            if miss == NotImplemented:
+                x = x.astype(float)
+                miss = missing_marker(x)      
+            x[index] = miss      
+        if check:
+            _checkunique(label, axis)
+        lab = self._sharelabel()
+        lab[axis] = label
+        return _cow(x, lab)
         
     def morph_like(self, lar):
         """
@@ -2948,11 +3879,13 @@ class larry(object):
         lar1 = self
         lar2 = other
         for ax in range(ndim):
-            if lar1.label[ax] != lar2.label[ax]:
-                mergelabel = set(lar1.label[ax]) | set(lar2.label[ax])
-                mergelabel = sorted(mergelabel)
-                lar1 = lar1.morph(mergelabel, ax)
-                lar2 = lar2.morph(mergelabel, ax)
+            if lar1._label[ax] != lar2._label[ax]:
+                lab, idx1, miss1, idx2, miss2 = listjoin(lar1._label[ax],
+                                                         lar2._label[ax],
+                                                         'outer')
+                lar1 = lar1._morph(lab, idx1, miss1, ax, check=False)
+                lar2 = lar2._morph(labelcopy(lab), idx2, miss2, ax,
+                                   check=False)
      
         # Mask       
         dtype1 = self.dtype       
@@ -3015,11 +3948,10 @@ class larry(object):
         
         """
         idx = [i for i, z in enumerate(self.shape) if z != 1]
-        label = []
-        for i in idx:
-            label.append(self.label[i])    
+        share = self._sharelabel()
+        label = [share[i] for i in idx]
         x = self.x.squeeze()
-        return larry(x, label, integrity=False)
+        return _dataview(self, _cow(x, label))
 
     def lag(self, nlag, axis=-1):
         """
@@ -3060,7 +3992,7 @@ class larry(object):
         if nlag < 0:
             raise ValueError, 'nlag cannot be negative'
         y = self.copy()
-        y.label[axis] = y.label[axis][nlag:]
+        y._label[axis] = y._label[axis][nlag:]
         index = [slice(None)] * self.ndim
         index[axis] = slice(0, -nlag)            
         y.x = y.x[index]
@@ -3149,7 +4081,8 @@ class larry(object):
         shape = self.shape    
         for ax in axes:
             if shape[ax] > 1:        
-                index = sorted(self.label[ax], reverse=reverse)
+                index = labelcopy(self._label[ax])
+                index.sort(reverse=reverse)
                 y = y.morph(index, ax)        
         return y
         
@@ -3223,7 +4156,7 @@ class larry(object):
             axes = [axis]
         flip = slice(None, None, -1)    
         for ax in axes:                
-            y.label[ax] = y.label[ax][flip]    
+            y._label[ax] = y._label[ax][flip]    
             index = [slice(None)] * y.ndim
             index[ax] = flip
             y.x = y.x[index] 
@@ -3315,9 +4248,9 @@ class larry(object):
         """
         if axis is None:
             for ax in range(self.ndim):
-                np.random.shuffle(self.label[ax]) 
+                _shufflelabel(self._ownlabel()[ax]) 
         else:
-            np.random.shuffle(self.label[axis])
+            _shufflelabel(self._ownlabel()[axis])
             
     # Missing ----------------------------------------------------------------
 
@@ -3378,9 +4311,8 @@ class larry(object):
         array([False, False], dtype=bool)        
         
         """   
-        label = self.copylabel()
         x = ismissing(self)
-        return larry(x, label, integrity=False)
+        return self._samelabel(x)
 
     def cut_missing(self, fraction, axis=None):
         """
@@ -3416,7 +4348,7 @@ class larry(object):
         for ax in range(ndim):
             sl = [None] * ndim
             if ax in axes:
-                labsnew.append(y.label[ax])
+                labsnew.append(y._label[ax])
                 sl[ax] = slice(None)
                 idxsl.append(np.arange(y.shape[ax])[sl])
                 continue
@@ -3429,12 +4361,12 @@ class larry(object):
                 count = count.sum(-1)
     
             xtmp = xtmp > (1.0 - fraction) * count
-            labsnew.append([y.label[ax][ii] for ii in np.nonzero(xtmp)[0]])
+            labsnew.append(labeltake(y._label[ax], np.nonzero(xtmp)[0]))
             sl[ax] = slice(None)
             idxsl.append(np.nonzero(xtmp)[0][sl])
         
         y.x = y.x[idxsl]
-        y.label = labsnew
+        y._label = labsnew
         
         if y.x.size == 0: 
             # Empty larry left over
@@ -3442,13 +4374,60 @@ class larry(object):
         else:
             return y
             
-    def push(self, window, axis=-1):
-        """Fill missing values (NaNs) with most recent non-missing values if
+    def push(self, window, axis=-1, backward=False, gap=False,
+             inplace=False):
+        """
+        Fill missing values (NaNs) with most recent non-missing values if
         recent, where recent is defined by the window. The filling proceeds
         from left to right along each row.
+
+        Parameters
+        ----------
+        window : {int, float}
+            A missing value is filled if the most recent non-missing value
+            is at most `window` elements before it (np.inf: no limit).
+        axis : int, optional
+            The axis along which to fill. The default is the last axis.
+        backward : bool, optional
+            If True, fill with the next non-missing value instead: the
+            filling proceeds from right to left. The default is False.
+        gap : bool, optional
+            If True, fill only runs of at most `window` missing values that
+            have non-missing values on both sides. The default is False.
+        inplace : bool, optional
+            If True, fill the data of the larry in place and return None.
+            The default (False) returns a filled copy.
+
+        Returns
+        -------
+        y : {larry, None}
+            The filled copy of the larry, or None if `inplace` is True.
+
+        Examples
+        --------
+        >>> y = larry([1.0, nan, nan, 4.0, nan])
+        >>> y.push(1)
+        label_0
+            0
+            1
+            2
+            3
+            4
+        x
+        array([  1.,   1.,  NaN,   4.,   4.])
+        >>> y.push(2, gap=True).x
+        array([  1.,   1.,   1.,   4.,  NaN])
+        >>> y.push(1, backward=True).x
+        array([  1.,  NaN,   4.,   4.,  NaN])
+
         """
+        if inplace:
+            push(self.x, window, axis=axis, backward=backward, gap=gap,
+                 inplace=True)
+            return
         y = self.copy()
-        y.x = push(y.x, window, axis=axis)
+        y.x = push(y.x, window, axis=axis, backward=backward, gap=gap,
+                   inplace=True)
         return y
         
     def vacuum(self, axis=None):
@@ -3495,7 +4474,7 @@ class larry(object):
         for ax in range(ndim):
             sl = [None]*ndim
             if ax not in axes:
-                labsnew.append(y.label[ax])
+                labsnew.append(y._label[ax])
                 sl[ax] = slice(None)
                 idxsl.append(np.arange(y.shape[ax])[sl])
                 continue
@@ -3505,12 +4484,12 @@ class larry(object):
             for _ in range(ndim-1):
                 xtmp = xtmp.any(-1)
     
-            labsnew.append([y.label[ax][ii] for ii in np.nonzero(xtmp)[0]])
+            labsnew.append(labeltake(y._label[ax], np.nonzero(xtmp)[0]))
             sl[ax] = slice(None)
             idxsl.append(np.nonzero(xtmp)[0][sl])
         
         y.x = y.x[idxsl]
-        y.label = labsnew
+        y._label = labsnew
         return y        
         
     def nan_replace(self, replace_with=0):
@@ -3678,10 +4657,7 @@ class larry(object):
                [2, 4]])
                
         """
-        y = self.copy()
-        y.x = y.x.T
-        y.label = y.label[::-1]
-        return y 
+        return _cow(self.x.T.copy(), self._sharelabel()[::-1])
         
     def swapaxes(self, axis1, axis2):
         """
@@ -3732,10 +4708,9 @@ class larry(object):
                [1, 3, 5]])
                         
         """
-        y = self.copy()
-        y.label[axis1], y.label[axis2] =  y.label[axis2], y.label[axis1]
-        y.x = np.swapaxes(y.x, axis1, axis2)
-        return y
+        label = self._sharelabel()
+        label[axis1], label[axis2] = label[axis2], label[axis1]
+        return _cow(np.swapaxes(self.x, axis1, axis2).copy(), label)
             
     def flatten(self, order='C'):
         """
@@ -3783,10 +4758,8 @@ class larry(object):
         array([1, 2, 3, 4])
    
         """
-        y = self.copy()
-        y.x = y.x.flatten(order)
-        y.label = flattenlabel(y.label, order)
-        return y
+        label = flattenlabel(self._label, order)
+        return larry._trusted(self.x.flatten(order), label)
         
     def unflatten(self):
         """
@@ -3847,7 +4820,7 @@ class larry(object):
             if not isscalar(self.x.flat[0]):
                 msg = 'Only scalar dtype is currently supported.'
                 raise NotImplementedError, msg 
-            labels = zip(*self.label[0])
+            labels = zip(*self._label[0])
             x, label = fromlists(self.x, labels)     
             return larry(x, label)
                         
@@ -3903,7 +4876,7 @@ class larry(object):
             raise ValueError, "`axis` cannot be None."
         x = self.getx(copy=True)
         x = np.expand_dims(x, axis)
-        lab = self.copylabel()
+        lab = self._sharelabel()
         if int(axis) == -1:
             ax = len(lab)
         elif int(axis) < -1:
@@ -3911,7 +4884,7 @@ class larry(object):
         else:
             ax = axis        
         lab.insert(ax, [label])
-        return larry(x, lab)            
+        return _cow(x, lab)            
         
     # Conversion -------------------------------------------------------------
 
@@ -3935,7 +4908,7 @@ class larry(object):
         
         """
         yf = self.flatten()
-        z = zip(*yf.label[0])
+        z = zip(*yf._label[0])
         z.append(yf.x.tolist())
         return zip(*z)
 
@@ -4345,7 +5318,7 @@ class larry(object):
         if ndim == 1:
 
             for i in range(self.size):
-                line = [str(self.label[0][i]), str(self.x[i]) + '\n']
+                line = [str(self._label[0][i]), str(self.x[i]) + '\n']
                 line = delimiter.join(line)
                 f.write(line)
 
@@ -4355,14 +5328,14 @@ class larry(object):
             f.write(delimiter)
             line = []
             for i in range(self.shape[1]):
-                line.append(str(self.label[1][i]))
+                line.append(str(self._label[1][i]))
             line = delimiter.join(line)
             line += '\n'
             f.write(line)
             
             # Row labels and array data
             for i in range(self.shape[0]):
-                line = [str(self.label[0][i])]
+                line = [str(self._label[0][i])]
                 for j in range(self.shape[1]):
                     line.append(str(self.x[i,j]))
                 line = delimiter.join(line)
@@ -4399,9 +5372,7 @@ class larry(object):
         array([1, 2])
             
         """
-        label = [list(z) for z in self.label]
-        x = self.x.copy()
-        return larry(x, label, integrity=False)
+        return self._samelabel(self.x.copy())
         
     def copylabel(self):
         """
@@ -4415,7 +5386,7 @@ class larry(object):
         [['a', 'b']]
         
         """
-        return [list(z) for z in self.label]
+        return [labelcopy(z) for z in self._label]
         
     def copyx(self):
         """Return a copy of a larry's data as a Numpy array.
@@ -4438,16 +5409,16 @@ class larry(object):
 
         # Labels
         pad = '    '
-        for i, label in enumerate(self.label):
+        for i, label in enumerate(self._label):
             x.append('label_%d\n' % i)
             if len(label) > 10:
-                x.append(pad + str(self.label[i][0]) + '\n')
-                x.append(pad + str(self.label[i][1]) + '\n')
-                x.append(pad + str(self.label[i][2]) + '\n')
+                x.append(pad + str(self._label[i][0]) + '\n')
+                x.append(pad + str(self._label[i][1]) + '\n')
+                x.append(pad + str(self._label[i][2]) + '\n')
                 x.append(pad + '...\n')
-                x.append(pad + str(self.label[i][-3]) + '\n')
-                x.append(pad + str(self.label[i][-2]) + '\n')
-                x.append(pad + str(self.label[i][-1]) + '\n')
+                x.append(pad + str(self._label[i][-3]) + '\n')
+                x.append(pad + str(self._label[i][-2]) + '\n')
+                x.append(pad + str(self._label[i][-1]) + '\n')
             else:
                 for l in label:
                     x.append(pad + str(l) + '\n')       
@@ -4477,7 +5448,7 @@ class Getitemlabel(object):
         typ = type(index)
         if typ == list:
             # Example: lar.lix[['a', 'b', 'c']]
-            index2 = labels2indices(y.label[0], index)
+            index2 = labels2indices(y._getlindex(0), index)
             if len(index) == 1:       
                 index2 = index2[0]
             return y[index2]               
@@ -4497,14 +5468,14 @@ class Getitemlabel(object):
             for ax, idx in enumerate(index3):
                 typ = type(idx)
                 if typ == list:
-                    idx2 = labels2indices(y.label[ax], idx)
+                    idx2 = labels2indices(y._getlindex(ax), idx)
                     if len(idx) > 1:      
                         label.append(idx)
                     index2.append(idx2)
                 elif typ == slice: 
                     s = slicemaker(idx, y.labelindex, ax)
                     slar = range(*s.indices(y.shape[ax]))
-                    lab = y.label[ax][s]
+                    lab = y._label[ax][s]
                     if len(lab) > 1:
                         label.append(lab)        
                     index2.append(slar)
@@ -4550,10 +5521,62 @@ def slicemaker(index, labelindex, axis):
     return slice(start, stop, index.step)        
 
 def labels2indices(label, labels):
-    "Convert list of labels to indices"
+    "Convert list of labels (label list or its Labelindex) to indices"
+    if not isinstance(label, Labelindex):
+        label = Labelindex(label)
     try:
-        indices = map(label.index, labels)
+        indices = label.indices(labels)
     except ValueError:
         raise ValueError, 'Could not map label to index value.'
     return indices  
         
+
+def _checkunique(label, axis):
+    "Raise ValueError if the elements of the label along `axis` repeat."
+    if not isunique(label):
+        # We have duplicates in the label, give an example
+        count = {}
+        for li in label:
+            count[li] = count.get(li, 0) + 1
+        for key, value in count.iteritems():
+            if value > 1:
+                break 
+        msg = "Elements of label not unique along axis %d. "
+        msg += "There are %d labels named `%s`."          
+        raise ValueError, msg % (axis, value, key)
+
+def _dataview(lar, y):
+    """
+    Mark `y` and `lar` if the data of `y` is a view of the data of `lar`.
+
+    The in-place operators (+=, etc) do not write into the data array of a
+    larry that shares it with another larry.
+
+    """
+    if isinstance(lar, larry) and np.may_share_memory(y.x, lar.x):
+        lar._xshared = True
+        y._xshared = True
+    return y
+
+def _cow(x, label, integrity=False):
+    "larry whose label lists are, copy-on-write, shared with other larrys."
+    if integrity:
+        y = larry(x, label)
+        y._shared = True
+        y._exposed = False
+        return y
+    if type(x) is not np.ndarray:
+        x = np.asarray(x)
+    return larry._trusted(x, label, shared=True)
+
+def _islazy(obj):
+    "True if `obj` is a lazy larry expression (see la.lazy)."
+    from la.deflazy import Lazy
+    return isinstance(obj, Lazy)
+
+def _shufflelabel(label):
+    "Shuffle a label list (or the array of a Typedlabel) in place."
+    if type(label) is Typedlabel:
+        np.random.shuffle(label.x)
+    else:
+        np.random.shuffle(label)
@@ -0,0 +1,393 @@
+"Lazy larry expressions: align once and evaluate element-wise ops in chunks."
+
+import numpy as np
+
+from la.deflarry import larry
+from la.flabel import listjoin, takeaxis
+from la.flarry import _joinmany, _rowblocks
+
+
+def lazy(lar):
+    """
+    Start a lazy (deferred) element-wise expression of larrys.
+
+    Arithmetic, comparison, and element-wise methods (log, sqrt, abs, ...)
+    applied to the returned object are recorded instead of being carried
+    out. Call `evaluate` on the result to compute it. The labels of all the
+    larrys in the expression are aligned once (an inner join, as for the
+    larry operators) and the expression is computed in chunks of rows,
+    without temporary larrys and without temporary arrays the size of the
+    output.
+
+    Parameters
+    ----------
+    lar : larry
+        The larry to wrap.
+
+    Returns
+    -------
+    expr : Lazy
+        A lazy expression that evaluates to `lar`.
+
+    See Also
+    --------
+    la.evaluate: Evaluate a lazy larry expression.
+
+    Examples
+    --------
+    >>> a = larry([1.0, 2.0, 3.0])
+    >>> b = larry([2.0, 2.0], [[1, 2]])
+    >>> expr = (la.lazy(a) - b) * 2 + la.lazy(a).log()
+    >>> expr.evaluate()
+    label_0
+        1
+        2
+    x
+    array([ 0.69314718,  3.09861229])
+
+    """
+    if not isinstance(lar, larry):
+        raise TypeError, 'Input must be a larry.'
+    return Lazy(None, (lar,))
+
+def evaluate(expr, chunksize=None):
+    """
+    Evaluate a lazy larry expression.
+
+    Parameters
+    ----------
+    expr : {Lazy, larry}
+        A lazy expression, see la.lazy. A larry is returned as is.
+    chunksize : {int, None}, optional
+        Approximate number of elements of the output that are computed at a
+        time. The expression is evaluated one block of rows (along axis 0) at
+        a time so that the temporary arrays of the intermediate results fit
+        in the processor cache. By default (None) `la.flarry.CHUNKSIZE`
+        elements are used.
+
+    Returns
+    -------
+    out : larry
+        The value of the expression.
+
+    See Also
+    --------
+    la.lazy: Start a lazy (deferred) element-wise expression of larrys.
+
+    Examples
+    --------
+    >>> a = larry([1.0, 4.0])
+    >>> b = larry([1.0, 1.0])
+    >>> la.evaluate(la.lazy(a).sqrt() + b)
+    label_0
+        0
+        1
+    x
+    array([ 2.,  3.])
+
+    """
+    if isinstance(expr, larry):
+        return expr
+    if not isinstance(expr, Lazy):
+        raise TypeError, 'Input must be a lazy expression or a larry.'
+    return expr.evaluate(chunksize)
+
+class Lazy(object):
+    """
+    Lazy (deferred) element-wise expression of larrys; see la.lazy.
+
+    A Lazy is a node of an expression tree. A leaf holds a larry; any other
+    node holds the function to apply and its arguments (Lazy nodes or
+    scalars).
+
+    """
+
+    __slots__ = ('func', 'args')
+
+    # Take precedence over Numpy arrays and larrys on the right-hand side of
+    # binary operators
+    __array_priority__ = 20
+
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+
+    def __repr__(self):
+        if self.func is None:
+            return 'lazy(larry)'
+        args = ', '.join(map(repr, self.args))
+        return '%s(%s)' % (self.func.__name__, args)
+
+    # Evaluate ---------------------------------------------------------------
+
+    def evaluate(self, chunksize=None):
+        """
+        Evaluate the expression; see la.evaluate.
+
+        Parameters
+        ----------
+        chunksize : {int, None}, optional
+            Approximate number of elements of the output that are computed at
+            a time. By default (None) `la.flarry.CHUNKSIZE` elements are
+            used.
+
+        Returns
+        -------
+        out : larry
+            The value of the expression.
+
+        """
+        # Align: one label join per axis over all the larrys
+        larrys = []
+        self._leaves(larrys, set())
+        ndim = larrys[0].ndim
+        for lar in larrys:
+            if lar.ndim != ndim:
+                msg = 'Binary operation on two larrys with different dimension'
+                raise IndexError, msg
+        label = []
+        for ax in xrange(ndim):
+            label.append(_joinmany([lar._label[ax] for lar in larrys],
+                                   'inner'))
+        shape = tuple([len(lab) for lab in label])
+        blocks = _rowblocks(shape, chunksize)
+        plans = []
+        for lar in larrys:
+            idxs = []
+            for ax in xrange(ndim):
+                ign, idx, ign, ign, ign = listjoin(lar._label[ax], label[ax],
+                                                   'right')
+                idxs.append(idx)
+            plans.append((lar, idxs))
+
+        # Output dtype (and errors such as invert of a float larry) from a
+        # dry run on empty arrays
+        dtypes = {}
+        empty = _chunk(plans, 0, 0)
+        self._eval(empty, dtypes)
+        out = np.empty(shape, dtype=dtypes[id(self)])
+
+        # Evaluate in blocks of rows
+        for start, stop in blocks:
+            leaves = _chunk(plans, start, stop)
+            self._eval(leaves, dtypes, out[start:stop])
+        return larry._trusted(out, label)
+
+    def _leaves(self, larrys, seen):
+        "Append the distinct larrys of the expression to `larrys`."
+        if self.func is None:
+            lar = self.args[0]
+            if id(lar) not in seen:
+                seen.add(id(lar))
+                larrys.append(lar)
+        else:
+            for arg in self.args:
+                if isinstance(arg, Lazy):
+                    arg._leaves(larrys, seen)
+
+    def _eval(self, leaves, dtypes, out=None):
+        """
+        Value of the expression on one chunk of the aligned larrys.
+
+        `leaves` maps id(larry) to the chunk of its aligned data. The dtype
+        of each node is recorded in (or, if present, read from) `dtypes`. If
+        `out` is given the value is written to it. Returns the value and
+        whether it is a temporary array that may be overwritten.
+
+        """
+        func = self.func
+        if func is None:
+            x = leaves[id(self.args[0])]
+            dtypes[id(self)] = x.dtype
+            if out is not None:
+                out[...] = x
+            return x, False
+        args = []
+        buf = None
+        for arg in self.args:
+            if isinstance(arg, Lazy):
+                x, istemp = arg._eval(leaves, dtypes)
+                if istemp and buf is None:
+                    buf = x
+                args.append(x)
+            else:
+                args.append(arg)
+        dtype = dtypes.get(id(self))
+        if dtype is None:
+            x = func(*args)
+            dtypes[id(self)] = x.dtype
+            if out is not None:
+                out[...] = x
+            return x, True
+        if type(func) is np.ufunc:
+            if out is None and buf is not None and buf.dtype == dtype:
+                # Reuse the temporary array of an argument
+                out = buf
+            if out is not None:
+                return func(*args, out=out), True
+        x = func(*args)
+        if out is not None:
+            out[...] = x
+            return out, True
+        return x, True
+
+    # Unary functions --------------------------------------------------------
+
+    def _unary(self, func, *args):
+        return Lazy(func, (self,) + args)
+
+    def log(self):
+        "Lazy element by element base e logarithm; see larry.log."
+        return self._unary(np.log)
+
+    def exp(self):
+        "Lazy element by element exponential; see larry.exp."
+        return self._unary(np.exp)
+
+    def sqrt(self):
+        "Lazy element by element square root; see larry.sqrt."
+        return self._unary(np.sqrt)
+
+    def sign(self):
+        "Lazy element by element sign of the element; see larry.sign."
+        return self._unary(np.sign)
+
+    def power(self, q):
+        "Lazy element by element x**q; see larry.power."
+        if not np.isscalar(q):
+            raise TypeError, '`q` must be a scalar.'
+        return self._unary(np.power, q)
+
+    __pow__ = power
+
+    def clip(self, lo, hi):
+        "Lazy clip of the values; see larry.clip."
+        if lo > hi:
+            raise ValueError, 'lo should be less than or equal to hi'
+        return self._unary(np.clip, lo, hi)
+
+    def abs(self):
+        "Lazy absolute value; see larry.abs."
+        return self._unary(np.absolute)
+
+    __abs__ = abs
+
+    def __neg__(self):
+        "Lazy negative of each element."
+        return self._unary(np.negative)
+
+    def __pos__(self):
+        return self
+
+    def isnan(self):
+        "Lazy element by element isnan; see larry.isnan."
+        return self._unary(np.isnan)
+
+    def isfinite(self):
+        "Lazy element by element isfinite; see larry.isfinite."
+        return self._unary(np.isfinite)
+
+    def isinf(self):
+        "Lazy element by element isinf; see larry.isinf."
+        return self._unary(np.isinf)
+
+    def invert(self):
+        "Lazy element by element inverting of a bool expression."
+        return self._unary(_invert)
+
+    __invert__ = invert
+
+    # Binary functions -------------------------------------------------------
+
+    def _binary(self, func, other, reflect=False):
+        if isinstance(other, larry):
+            other = Lazy(None, (other,))
+        elif not (isinstance(other, Lazy) or np.isscalar(other)):
+            msg = 'Input must be scalar, larry, or lazy expression.'
+            raise TypeError, msg
+        if reflect:
+            return Lazy(func, (other, self))
+        return Lazy(func, (self, other))
+
+    def __add__(self, other):
+        return self._binary(np.add, other)
+
+    def __radd__(self, other):
+        return self._binary(np.add, other, True)
+
+    def __sub__(self, other):
+        return self._binary(np.subtract, other)
+
+    def __rsub__(self, other):
+        return self._binary(np.subtract, other, True)
+
+    def __mul__(self, other):
+        return self._binary(np.multiply, other)
+
+    def __rmul__(self, other):
+        return self._binary(np.multiply, other, True)
+
+    def __div__(self, other):
+        return self._binary(np.divide, other)
+
+    def __rdiv__(self, other):
+        return self._binary(np.divide, other, True)
+
+    def __truediv__(self, other):
+        return self._binary(np.true_divide, other)
+
+    def __rtruediv__(self, other):
+        return self._binary(np.true_divide, other, True)
+
+    def __and__(self, other):
+        return self._binary(np.logical_and, other)
+
+    def __rand__(self, other):
+        return self._binary(np.logical_and, other, True)
+
+    def __or__(self, other):
+        return self._binary(np.logical_or, other)
+
+    def __ror__(self, other):
+        return self._binary(np.logical_or, other, True)
+
+    def __eq__(self, other):
+        return self._binary(np.equal, other)
+
+    def __ne__(self, other):
+        return self._binary(np.not_equal, other)
+
+    def __lt__(self, other):
+        return self._binary(np.less, other)
+
+    def __gt__(self, other):
+        return self._binary(np.greater, other)
+
+    def __le__(self, other):
+        return self._binary(np.less_equal, other)
+
+    def __ge__(self, other):
+        return self._binary(np.greater_equal, other)
+
+def _invert(x):
+    "Element by element inverting of a bool array."
+    if x.dtype != bool:
+        raise TypeError, 'Only larrys with bool dtype can be inverted.'
+    return ~x
+
+def _chunk(plans, start, stop):
+    "Rows start:stop of the aligned data of each larry (views if possible)."
+    leaves = {}
+    for lar, idxs in plans:
+        idx = idxs[0]
+        if idx is None:
+            idx = slice(start, stop)
+        elif type(idx) is slice:
+            idx = slice(idx.start + start, idx.start + stop)
+        else:
+            idx = idx[start:stop]
+        x, ign = takeaxis(lar.x, idx, 0)
+        for ax in xrange(1, len(idxs)):
+            x, ign = takeaxis(x, idxs[ax], ax)
+        leaves[id(lar)] = x
+    return leaves
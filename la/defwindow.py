@@ -0,0 +1,120 @@
+"Moving window state that is updated as new data are appended."
+
+import numpy as np
+
+from la.farray import (mov_sum, mov_mean, mov_std, mov_min, mov_max,
+                       mov_median, mov_zscore, movingrank)
+
+
+class Movingwindow(object):
+    """
+    Moving window statistic of data that arrive in blocks along an axis.
+
+    A Movingwindow keeps the last elements along `axis` that the windows of
+    future elements need (window - 1 of them, plus `skip` for mov_sum). Each
+    call of `update` appends new data and returns the moving statistic of
+    the new positions only, by running `func` over the kept elements and the
+    new data. Appending one date to a panel of n series therefore costs
+    O(n * window) instead of O(n * dates) for recomputing the full history.
+    The result is the same as that of `func` applied to all the data that
+    have been appended.
+
+    Parameters
+    ----------
+    func : {function, str}
+        A moving window function of la.farray: mov_sum, mov_mean, mov_std,
+        mov_min, mov_max, mov_median, mov_zscore, or movingrank, or its
+        name. Any function func(arr, window, axis=axis, **kwargs) whose
+        output at each position depends only on the window that ends there
+        (and whose first window - 1 outputs are NaN) can be used.
+    window : int
+        The number of elements in the moving window.
+    axis : int, optional
+        The axis of the updates along which the window moves. The default
+        is the last axis.
+    **kwargs
+        Other arguments of `func`, such as `min_count`, `skip`, `norm` or
+        `decay`.
+
+    Examples
+    --------
+    >>> mw = Movingwindow('mov_mean', 2)
+    >>> mw.update(np.array([[1.0, 2.0], [3.0, 4.0]]))
+    array([[ NaN,  1.5],
+           [ NaN,  3.5]])
+    >>> mw.update(np.array([[6.0], [8.0]]))
+    array([[ 4.],
+           [ 6.]])
+
+    """
+
+    funcs = {'mov_sum': mov_sum, 'mov_mean': mov_mean, 'mov_std': mov_std,
+             'mov_min': mov_min, 'mov_max': mov_max,
+             'mov_median': mov_median, 'mov_zscore': mov_zscore,
+             'movingrank': movingrank}
+
+    def __init__(self, func, window, axis=-1, **kwargs):
+        if isinstance(func, basestring):
+            if func not in self.funcs:
+                raise ValueError, 'Unknown moving window function %r' % func
+            func = self.funcs[func]
+        if window < 1:
+            raise ValueError, 'window must be at least 1'
+        self.func = func
+        self.window = window
+        self.axis = axis
+        self.kwargs = kwargs
+        # Number of earlier elements that the window of an element needs
+        self.lookback = window - 1 + kwargs.get('skip', 0)
+        self.reset()
+
+    def reset(self):
+        "Forget the data appended so far."
+        self.count = 0
+        self.tail = None
+
+    def update(self, arr):
+        """
+        Append `arr` and return the moving statistic of its positions.
+
+        Parameters
+        ----------
+        arr : array_like
+            New data; the shape must be that of the earlier updates except
+            along `axis`, which may have any length.
+
+        Returns
+        -------
+        y : ndarray
+            The moving statistic at the positions of `arr`, which has the
+            shape of `arr`. Positions with fewer than `window` - 1 (plus
+            `skip`) earlier elements in all the updates are NaN.
+
+        """
+        arr = np.asarray(arr)
+        if arr.ndim == 0:
+            raise ValueError, 'arr must be at least 1d'
+        axis = self.axis
+        if axis < 0:
+            axis += arr.ndim
+        a = np.rollaxis(arr, axis, arr.ndim)
+        if self.tail is None:
+            dtype = np.float32 if a.dtype == np.float32 else np.float64
+            self.tail = np.empty(a.shape[:-1] + (0,), dtype=dtype)
+        elif a.shape[:-1] != self.tail.shape[:-1]:
+            raise ValueError, 'arr does not match the shape of the updates'
+        data = np.concatenate((self.tail, a), -1)
+        n = a.shape[-1]
+        if data.shape[-1] > self.lookback:
+            y = self.func(data, self.window, axis=-1, **self.kwargs)
+            y = y[..., data.shape[-1] - n:]
+            # Positions without the full history that their window needs
+            nwarm = min(max(self.lookback - self.count, 0), n)
+            y[..., :nwarm] = np.nan
+        else:
+            y = np.empty(a.shape)
+            y.fill(np.nan)
+        if self.lookback > 0:
+            self.tail = data[..., -self.lookback:].copy()
+        self.count += n
+        return np.rollaxis(y, arr.ndim - 1, axis)
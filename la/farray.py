@@ -1,11 +1,601 @@
 "Functions that work with numpy arrays."
 
+import warnings
+
 import numpy as np
 
-from la.external.scipy import nanmedian, rankdata, nanstd, nanmean
+from la.external.scipy import nanstd as _scipy_nanstd
+from la.external.scipy import nanmean as _scipy_nanmean
 from la.missing import nans, ismissing
 
 
+# NaN reduce functions -----------------------------------------------------
+
+try:
+    # The c versions are faster...
+    from la.cfarray import (nansum as _nansum, nanmean as _nanmean,
+                            nanvar as _nanvar, nanstd as _nanstd,
+                            nanmin as _nanmin, nanmax as _nanmax,
+                            nandescribe as _nandescribe)
+    from la.cfarray import (mov_mean as _mov_mean, mov_std as _mov_std,
+                            mov_min as _mov_min, mov_max as _mov_max,
+                            mov_median as _mov_median)
+    from la.cfarray import movingrank as _movingrank
+    from la.cfarray import windowstart as _windowstart
+    from la.cfarray import push as _push
+    from la.cfarray import (ewma as _ewma, ewmstd as _ewmstd,
+                            ewmcorr as _ewmcorr)
+except ImportError:
+    # ...but perhaps they did not compile when you built the la package? So
+    # we'll use the python versions. If you are unsure which version you are
+    # using, the doc string will tell you.
+    def _nansum(arr, axis=None):
+        "Slower python version of nansum for float32 and float64 arrays."
+        return np.nansum(arr, axis)
+    def _nanmean(arr, axis=None):
+        "Slower python version of nanmean for float32 and float64 arrays."
+        return _scipy_nanmean(arr, axis)
+    def _nanvar(arr, axis=None, ddof=0):
+        "Slower python version of nanvar for float32 and float64 arrays."
+        y = _scipy_nanstd(arr, axis, bias=ddof==0)
+        return y * y
+    def _nanstd(arr, axis=None, ddof=0):
+        "Slower python version of nanstd for float32 and float64 arrays."
+        return _scipy_nanstd(arr, axis, bias=ddof==0)
+    def _nanmin(arr, axis=None):
+        "Slower python version of nanmin for float32 and float64 arrays."
+        return np.nanmin(arr, axis)
+    def _nanmax(arr, axis=None):
+        "Slower python version of nanmax for float32 and float64 arrays."
+        return np.nanmax(arr, axis)
+    def _nandescribe(arr, axis=None):
+        "Slower python version of nandescribe for float32 and float64 arrays."
+        if axis is None:
+            arr = arr.ravel()
+            axis = 0
+        if axis < 0:
+            axis += arr.ndim
+        n = arr.shape[axis]
+        count = (~np.isnan(arr)).sum(axis)
+        y = np.empty((6,) + count.shape)
+        y[0] = count
+        if arr.size == 0:
+            y[1:] = np.nan
+        else:
+            y[1] = _scipy_nanmean(arr, axis)
+            y[2] = _scipy_nanstd(arr, axis, bias=True)
+            y[3] = np.nanmin(arr, axis)
+            y[4] = np.nanmax(arr, axis)
+            y[5] = (n - count) / float(n)
+        return np.rollaxis(y, 0, axis + 1)
+    def _mov_mean(arr, window, axis=-1, min_count=1):
+        "Slower python version of mov_mean for float32 and float64 arrays."
+        return _mov_python(arr, window, axis, min_count, _scipy_nanmean)
+    def _mov_std(arr, window, axis=-1, min_count=1):
+        "Slower python version of mov_std for float32 and float64 arrays."
+        return _mov_python(arr, window, axis, min_count, _scipy_nanstd,
+                           bias=True)
+    def _mov_min(arr, window, axis=-1, min_count=1):
+        "Slower python version of mov_min for float32 and float64 arrays."
+        return _mov_python(arr, window, axis, min_count, np.nanmin)
+    def _mov_max(arr, window, axis=-1, min_count=1):
+        "Slower python version of mov_max for float32 and float64 arrays."
+        return _mov_python(arr, window, axis, min_count, np.nanmax)
+    def _mov_median(arr, window, axis=-1, min_count=1):
+        "Slower python version of mov_median for float32 and float64 arrays."
+        return _mov_python(arr, window, axis, min_count, nanmedian)
+    def _windowstart(window, n):
+        "Slower python version of the start and largest size of windows."
+        if np.ndim(window) == 0:
+            window = int(window)
+            if window < 1:
+                raise ValueError, 'window must be at least 1'
+            if window > n:
+                raise ValueError, 'Window is too big.'
+            return np.arange(1 - window, n + 1 - window), window
+        start = np.asarray(window, dtype=np.intp)
+        if start.shape != (n,):
+            raise ValueError, 'window must have one start per position'
+        position = np.arange(n)
+        first = np.maximum(start, 0)
+        if (start > position).any():
+            raise ValueError, 'window must not start after its position'
+        if (first[1:] < first[:-1]).any():
+            raise ValueError, 'window start must not decrease'
+        if n == 0:
+            return start, 1
+        return start, int((position - first).max()) + 1
+    def _mov_python(arr, window, axis, min_count, func, **kwargs):
+        "Moving window func(window, axis=-1, **kwargs), one window at a time."
+        start, size = _windowstart(window, arr.shape[axis])
+        if min_count < 1 or min_count > size:
+            raise ValueError, 'min_count must be between 1 and window'
+        y = np.empty(arr.shape, dtype=arr.dtype)
+        y.fill(np.nan)
+        a = np.rollaxis(arr, axis, arr.ndim)
+        out = np.rollaxis(y, axis, arr.ndim)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            for j in xrange(a.shape[-1]):
+                if start[j] < 0:
+                    continue
+                w = a[..., start[j]:j + 1]
+                count = (~np.isnan(w)).sum(-1)
+                out[..., j] = np.where(count >= min_count,
+                                       func(w, axis=-1, **kwargs), np.nan)
+        return y
+
+    def _movingrank(arr, window, axis=-1, decay=0.0):
+        "Slower python version of movingrank for float32 and float64 arrays."
+        if np.ndim(window) == 0:
+            if window > arr.shape[axis]:
+                raise ValueError, 'Window is too big.'
+            if window < 2:
+                raise ValueError, 'Window is too small.'
+        start, size = _windowstart(window, arr.shape[axis])
+        y = np.empty(arr.shape)
+        y.fill(np.nan)
+        a = np.rollaxis(arr, axis, arr.ndim)
+        out = np.rollaxis(y, axis, arr.ndim)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            for j in xrange(a.shape[-1]):
+                if start[j] < 0:
+                    continue
+                w = a[..., start[j]:j + 1]
+                out[..., j] = lastrank(w, axis=-1, decay=decay)
+        return y
+
+    def _push(arr, n, axis=-1, backward=False, gap=False):
+        "Slower python version of push for float32 and float64 arrays."
+        a = np.rollaxis(arr, axis, arr.ndim)
+        if backward:
+            a = a[..., ::-1]
+        ncol = a.shape[-1]
+        fin = np.isfinite(a)
+        j = np.arange(ncol)
+        # Position of the most recent non-missing value (-1: none)
+        last = np.maximum.accumulate(np.where(fin, j, -1), axis=-1)
+        if gap:
+            # Position of the next non-missing value (ncol: none)
+            nxt = np.where(fin, j, ncol)[..., ::-1]
+            nxt = np.minimum.accumulate(nxt, axis=-1)[..., ::-1]
+            fill = (last >= 0) & (nxt < ncol) & (nxt - last - 1 <= n)
+        else:
+            fill = (last >= 0) & (j - last <= n)
+        fill &= ~fin
+        index = list(np.ix_(*[np.arange(d) for d in a.shape]))[:-1]
+        value = a[tuple(index + [np.maximum(last, 0)])]
+        a[~fin] = np.nan
+        a[fill] = value[fill]
+        return arr
+
+    def _ewma(arr, halflife, axis=-1, state=None):
+        "Slower python version of ewma for float32 and float64 arrays."
+        return _ewm_python(arr, arr, halflife, axis, state, 'mean')
+    def _ewmstd(arr, halflife, axis=-1, state=None):
+        "Slower python version of ewmstd for float32 and float64 arrays."
+        return _ewm_python(arr, arr, halflife, axis, state, 'std')
+    def _ewmcorr(arr1, arr2, halflife, axis=-1, state=None):
+        "Slower python version of ewmcorr for float32 and float64 arrays."
+        return _ewm_python(arr1, arr2, halflife, axis, state, 'corr')
+    def _ewm_python(arr1, arr2, halflife, axis, state, stat):
+        "Exponentially weighted `stat`, one step along axis at a time."
+        if not halflife > 0:
+            raise ValueError, 'halflife must be greater than zero.'
+        if arr2.shape != arr1.shape:
+            raise ValueError, 'arr1 and arr2 must have the same shape'
+        if axis < 0:
+            axis += arr1.ndim
+        y = np.empty(arr1.shape, dtype=arr1.dtype)
+        out = np.rollaxis(y, axis, y.ndim)
+        a1 = np.rollaxis(arr1, axis, arr1.ndim)
+        a2 = np.rollaxis(arr2, axis, arr2.ndim)
+        if state is None:
+            st = np.zeros(a1.shape[:-1] + (6,))
+        else:
+            st = np.rollaxis(np.asarray(state, dtype=np.float64), axis,
+                             arr1.ndim)
+            if st.shape != a1.shape[:-1] + (6,):
+                raise ValueError, 'state does not match the shape of the array'
+        w, mean1, mean2 = st[..., 0], st[..., 1], st[..., 2]
+        m11, m22, m12 = st[..., 3] * w, st[..., 4] * w, st[..., 5] * w
+        alpha = 0.5 ** (1.0 / halflife)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            for j in xrange(a1.shape[-1]):
+                x1 = a1[..., j]
+                x2 = a2[..., j]
+                ok = (x1 == x1) & (x2 == x2)
+                w = alpha * w + ok
+                m11, m22, m12 = alpha * m11, alpha * m22, alpha * m12
+                d1 = np.where(ok, x1 - mean1, 0)
+                d2 = np.where(ok, x2 - mean2, 0)
+                mean1 = mean1 + d1 / np.where(ok, w, 1)
+                mean2 = mean2 + d2 / np.where(ok, w, 1)
+                m11 = m11 + np.where(ok, d1 * (x1 - mean1), 0)
+                m22 = m22 + np.where(ok, d2 * (x2 - mean2), 0)
+                m12 = m12 + np.where(ok, d1 * (x2 - mean2), 0)
+                if stat == 'mean':
+                    out[..., j] = mean1
+                elif stat == 'std':
+                    out[..., j] = np.sqrt(np.maximum(m11, 0) / w)
+                else:
+                    valid = (m11 > 0) & (m22 > 0)
+                    out[..., j] = np.where(valid, m12 / np.sqrt(m11 * m22),
+                                           np.nan)
+                out[..., j][w == 0] = np.nan
+            st = np.array([w, mean1, mean2, m11 / w, m22 / w, m12 / w])
+            st[3:, w == 0] = 0
+        return y, np.rollaxis(st, 0, axis + 1)
+
+def _isfloat(arr):
+    "True if `arr` is a float32 or float64 array."
+    return arr.dtype == np.float64 or arr.dtype == np.float32
+
+def nansum(arr, axis=None):
+    """
+    Sum along the specified axis, ignoring NaNs.
+    
+    Float32 and float64 arrays are summed in a single pass without making a
+    copy of the array (if la's C extension is available). Other dtypes are
+    passed to np.nansum.
+    
+    Parameters
+    ----------
+    arr : array_like
+        Input array.
+    axis : {int, None}, optional
+        The axis along which to sum. The default (None) is to sum the
+        flattened array.
+
+    Returns
+    -------
+    y : {ndarray, scalar}
+        The sum. The sum of an all-NaN slice is zero.
+
+    Examples
+    --------
+    >>> arr = np.array([[1, np.nan], [2, 3]])
+    >>> nansum(arr, axis=0)
+    array([ 3.,  3.])
+ 
+    """
+    arr = np.asarray(arr)
+    if _isfloat(arr):
+        return _nansum(arr, axis)
+    return np.nansum(arr, axis)
+
+def nanmean(arr, axis=0):
+    """
+    Mean along the specified axis, ignoring NaNs.
+    
+    Float32 and float64 arrays are reduced in a single pass without making a
+    copy of the array (if la's C extension is available).
+    
+    Parameters
+    ----------
+    arr : array_like
+        Input array.
+    axis : {int, None}, optional
+        The axis along which to take the mean. The default is 0. If `axis`
+        is None the mean of the flattened array is returned.
+
+    Returns
+    -------
+    y : {ndarray, scalar}
+        The mean. The mean of an all-NaN slice is NaN.
+
+    Examples
+    --------
+    >>> arr = np.array([[1, np.nan], [2, 3]])
+    >>> nanmean(arr, axis=0)
+    array([ 1.5,  3. ])
+ 
+    """
+    arr = np.asarray(arr)
+    if _isfloat(arr):
+        return _nanmean(arr, axis)
+    return _scipy_nanmean(arr, axis)
+
+def nanvar(arr, axis=0, bias=True):
+    """
+    Variance along the specified axis, ignoring NaNs.
+    
+    Float32 and float64 arrays are reduced in a single pass (Welford's
+    algorithm) without making a copy of the array (if la's C extension is
+    available).
+    
+    Parameters
+    ----------
+    arr : array_like
+        Input array.
+    axis : {int, None}, optional
+        The axis along which to take the variance. The default is 0. If
+        `axis` is None the variance of the flattened array is returned.
+    bias : bool, optional
+        If True (default) the variance is normalized by N, the number of
+        non-NaN elements; if False by N - 1.
+
+    Returns
+    -------
+    y : {ndarray, scalar}
+        The variance. The variance of an all-NaN slice is NaN.
+
+    Examples
+    --------
+    >>> arr = np.array([[1, np.nan], [2, 3]])
+    >>> nanvar(arr, axis=0)
+    array([ 0.25,  0.  ])
+ 
+    """
+    arr = np.asarray(arr)
+    if _isfloat(arr):
+        return _nanvar(arr, axis, ddof=0 if bias else 1)
+    y = _scipy_nanstd(arr, axis, bias)
+    return y * y
+
+def nanstd(arr, axis=0, bias=True):
+    """
+    Standard deviation along the specified axis, ignoring NaNs.
+    
+    Float32 and float64 arrays are reduced in a single pass (Welford's
+    algorithm) without making a copy of the array (if la's C extension is
+    available).
+    
+    Parameters
+    ----------
+    arr : array_like
+        Input array.
+    axis : {int, None}, optional
+        The axis along which to take the standard deviation. The default is
+        0. If `axis` is None the standard deviation of the flattened array is
+        returned.
+    bias : bool, optional
+        If True (default) the variance is normalized by N, the number of
+        non-NaN elements; if False by N - 1.
+
+    Returns
+    -------
+    y : {ndarray, scalar}
+        The standard deviation. The standard deviation of an all-NaN slice
+        is NaN.
+
+    Examples
+    --------
+    >>> arr = np.array([[1, np.nan], [2, 4]])
+    >>> nanstd(arr, axis=0)
+    array([ 0.5,  0. ])
+ 
+    """
+    arr = np.asarray(arr)
+    if _isfloat(arr):
+        return _nanstd(arr, axis, ddof=0 if bias else 1)
+    return _scipy_nanstd(arr, axis, bias)
+
+def nanmin(arr, axis=None):
+    """
+    Minimum along the specified axis, ignoring NaNs.
+    
+    Float32 and float64 arrays are reduced in a single pass without making a
+    copy of the array (if la's C extension is available). Other dtypes are
+    passed to np.nanmin.
+    
+    Parameters
+    ----------
+    arr : array_like
+        Input array.
+    axis : {int, None}, optional
+        The axis along which to find the minimum. The default (None) is to
+        find the minimum of the flattened array.
+
+    Returns
+    -------
+    y : {ndarray, scalar}
+        The minimum. The minimum of an all-NaN slice is NaN.
+
+    Examples
+    --------
+    >>> arr = np.array([[1, np.nan], [2, 3]])
+    >>> nanmin(arr, axis=0)
+    array([ 1.,  3.])
+ 
+    """
+    arr = np.asarray(arr)
+    if _isfloat(arr):
+        return _nanmin(arr, axis)
+    return np.nanmin(arr, axis)
+
+def nanmax(arr, axis=None):
+    """
+    Maximum along the specified axis, ignoring NaNs.
+    
+    Float32 and float64 arrays are reduced in a single pass without making a
+    copy of the array (if la's C extension is available). Other dtypes are
+    passed to np.nanmax.
+    
+    Parameters
+    ----------
+    arr : array_like
+        Input array.
+    axis : {int, None}, optional
+        The axis along which to find the maximum. The default (None) is to
+        find the maximum of the flattened array.
+
+    Returns
+    -------
+    y : {ndarray, scalar}
+        The maximum. The maximum of an all-NaN slice is NaN.
+
+    Examples
+    --------
+    >>> arr = np.array([[1, np.nan], [2, 3]])
+    >>> nanmax(arr, axis=0)
+    array([ 2.,  3.])
+ 
+    """
+    arr = np.asarray(arr)
+    if _isfloat(arr):
+        return _nanmax(arr, axis)
+    return np.nanmax(arr, axis)
+
+def nandescribe(arr, axis=None):
+    """
+    Count, mean, std, min, max and fraction missing along the specified axis.
+    
+    For float32 and float64 arrays all six statistics are computed in a
+    single pass (Welford's algorithm for the mean and standard deviation)
+    without making a copy of the array (if la's C extension is available).
+    Other dtypes are first converted to float64.
+    
+    Parameters
+    ----------
+    arr : array_like
+        Input array.
+    axis : {int, None}, optional
+        The axis along which to compute the statistics. The default (None) is
+        to describe the flattened array.
+
+    Returns
+    -------
+    y : ndarray
+        A float64 array in which `axis` is replaced by an axis of length 6
+        holding, in order, the number of non-NaN elements, the mean, the
+        standard deviation (normalized by N), the minimum, the maximum, and
+        the fraction of elements that are NaN. If `axis` is None, `y` is 1d.
+
+    Examples
+    --------
+    >>> arr = np.array([[1, np.nan], [3, 4]])
+    >>> nandescribe(arr, axis=0)
+    array([[ 2. ,  1. ],
+           [ 2. ,  4. ],
+           [ 1. ,  0. ],
+           [ 1. ,  4. ],
+           [ 3. ,  4. ],
+           [ 0. ,  0.5]])
+ 
+    """
+    arr = np.asarray(arr)
+    if not _isfloat(arr):
+        arr = arr.astype(np.float64)
+    return _nandescribe(arr, axis)
+
+def nanmedian(arr, axis=0):
+    """
+    Median along the specified axis, ignoring NaNs.
+    
+    Same as nanquantile(arr, 0.5, axis).
+    
+    Parameters
+    ----------
+    arr : array_like
+        Input array.
+    axis : {int, None}, optional
+        The axis along which to take the median. The default is 0. If `axis`
+        is None the median of the flattened array is returned.
+
+    Returns
+    -------
+    y : {ndarray, scalar}
+        The median. The median of an all-NaN slice is NaN.
+
+    Examples
+    --------
+    >>> arr = np.array([[1, np.nan], [2, 3], [4, 5]])
+    >>> nanmedian(arr, axis=0)
+    array([ 2.,  4.])
+ 
+    """
+    return nanquantile(arr, 0.5, axis)
+
+def nanquantile(arr, q, axis=None):
+    """
+    Quantile along the specified axis, ignoring NaNs.
+    
+    The quantile is linearly interpolated between the two nearest order
+    statistics of the non-NaN elements of each slice (the same as the
+    default method of np.percentile). All slices are handled at once: the
+    NaNs are partitioned (or, if the slices have many different counts of
+    NaNs, sorted) to the end of each slice and the order statistics are
+    picked out by the count of non-NaN elements of each slice.
+    
+    Parameters
+    ----------
+    arr : array_like
+        Input array.
+    q : float
+        The quantile, between 0 and 1. For example, 0.5 is the median.
+    axis : {int, None}, optional
+        The axis along which to find the quantile. The default (None) is to
+        find the quantile of the flattened array.
+
+    Returns
+    -------
+    y : {ndarray, scalar}
+        The quantile. Float32 input gives float32 output; all other input
+        gives float64. The quantile of an all-NaN slice is NaN.
+        
+    Raises
+    ------
+    ValueError
+        If `q` is not between 0 and 1.
+
+    Examples
+    --------
+    >>> arr = np.array([[1, np.nan], [2, 3], [4, 5]])
+    >>> nanquantile(arr, 0.25, axis=0)
+    array([ 1.5,  3.5])
+    >>> nanquantile(arr, 1)
+    5.0
+ 
+    """
+    if not 0 <= q <= 1:
+        raise ValueError, '`q` must be between 0 and 1.'
+    arr = np.asarray(arr)
+    if not _isfloat(arr):
+        arr = arr.astype(np.float64)
+    if axis is None:
+        arr = arr.ravel()
+        axis = 0
+    if arr.ndim == 0:
+        return arr[()]
+    # Move the quantile axis last and make the array 2d, one row per slice
+    a = np.rollaxis(arr, axis, arr.ndim)
+    shape = a.shape[:-1]
+    n = a.shape[-1]
+    a = a.reshape(int(np.prod(shape)), n)
+    count = n - np.isnan(a).sum(1)
+    pos = q * (count - 1)
+    lo = np.floor(pos).astype(np.intp)
+    hi = np.minimum(lo + 1, count - 1)
+    frac = pos - lo
+    empty = count == 0
+    lo[empty] = 0
+    hi[empty] = 0
+    if n == 0:
+        y = np.empty(len(a), dtype=a.dtype)
+        y.fill(np.nan)
+    else:
+        # NaNs sort (and partition) to the end of each row
+        kth = np.union1d(lo, hi)
+        if len(kth) <= 8:
+            a = np.partition(a, kth, axis=-1)
+        else:
+            a = np.sort(a, axis=-1)
+        rows = np.arange(len(a))
+        y = a[rows, lo]
+        idx = frac > 0
+        if idx.any():
+            ylo = y[idx]
+            y[idx] = ylo + (a[rows[idx], hi[idx]] - ylo) * frac[idx]
+        y[empty] = np.nan
+    y = y.reshape(shape)
+    if y.ndim == 0:
+        return y[()]
+    return y
+
+
 # Group functions ----------------------------------------------------------
 
 def group_ranking(x, groups, norm='-1,1', ties=True, axis=0):
@@ -43,24 +633,11 @@ def group_ranking(x, groups, norm='-1,1', ties=True, axis=0):
     
     For '0,N-1' normalization, note that N is the number of element in the
     group even in there are NaNs.
+
+    All groups are ranked at once by one sort (see `group_agg`).
     
     """
-  
-    # Find set of unique groups
-    ugroups = unique_group(groups)
-    
-    # Convert groups to a numpy array
-    groups = np.asarray(groups)
-  
-    # Loop through unique groups and normalize
-    xnorm = np.nan * np.zeros(x.shape)
-    for group in ugroups:
-        idx = groups == group
-        idxall = [slice(None)] * x.ndim
-        idxall[axis] = idx
-        xnorm[idxall] = ranking(x[idxall], axis=axis, norm=norm, ties=ties) 
-           
-    return xnorm
+    return group_agg(x, groups, 'rank', axis, norm=norm, ties=ties)
 
 def group_mean(x, groups, axis=0):
     """
@@ -82,25 +659,7 @@ def group_mean(x, groups, axis=0):
         replaced by the group mean along the given axis.
 
     """
-
-    # Find set of unique groups
-    ugroups = unique_group(groups)
-    
-    # Convert groups to a numpy array
-    groups = np.asarray(groups)    
-  
-    # Loop through unique groups and normalize
-    xmean = np.nan * np.zeros(x.shape)    
-    for group in ugroups:
-        idx = groups == group
-        idxall = [slice(None)] * x.ndim
-        idxall[axis] = idx
-        if idx.sum() > 0:
-            norm = 1.0 * (~np.isnan(x[idxall])).sum(axis)
-            ns = np.nansum(x[idxall], axis=axis) / norm
-            xmean[idxall] = np.expand_dims(ns, axis)
-            
-    return xmean
+    return group_agg(x, groups, 'mean', axis)
 
 def group_median(x, groups, axis=0):
     """
@@ -121,25 +680,288 @@ def group_median(x, groups, axis=0):
         The group median of the data along axis 0.
 
     """
+    return group_agg(x, groups, 'median', axis)
+
+def group_agg(x, groups, func, axis=0, **kwargs):
+    """
+    Statistic of each group along an axis, given to each member of the group.
+
+    The group labels are converted once to integer codes and the members of
+    the groups sorted once so that each group is a contiguous segment; the
+    statistics of all the segments are then computed together (np.reduceat,
+    and for the median and ranking one lexsort by segment and value) instead
+    of with a mask of the whole array for each group.
+
+    Parameters
+    ----------
+    x : ndarray
+        Input data.
+    groups : list
+        List of group membership of each element along `axis`. Elements
+        whose group is None (or NaN) belong to no group; their output is
+        NaN.
+    func : {'mean', 'median', 'std', 'rank', function}
+        The statistic, ignoring NaNs: the group mean, median, or standard
+        deviation (the `ddof` keyword argument is 0 by default), or the
+        ranking within the group (keyword arguments `norm` and `ties` as in
+        `ranking`). A function func(arr, axis) is called on the members of
+        each group in turn (along `axis` of `arr`); it returns the statistic
+        of each slice along `axis`, or an array of the shape of `arr`.
+    axis : int, optional
+        The axis along which the groups are formed. The default is axis 0.
+    **kwargs
+        Keyword arguments of the statistic.
+
+    Returns
+    -------
+    y : ndarray
+        A float64 array with the shape of `x` where each element is replaced
+        by the statistic of its group along `axis`.
+
+    Examples
+    --------
+    >>> x = np.array([1.0, 2.0, 3.0, 6.0])
+    >>> group_agg(x, ['a', 'b', 'a', None], 'mean')
+    array([  2.,   2.,   2.,  NaN])
+
+    """
+    return _group_agg(x, _group_plan(groups), func, axis, **kwargs)
+
+def _group_codes(groups):
+    """
+    Integer code of the group of each element and the sorted unique groups.
+
+    The code is the position of the group in the unique groups, -1 for None
+    and NaN (no group).
+
+    """
+    n = len(groups)
+    if isinstance(groups, np.ndarray):
+        types = set([groups.dtype])
+    else:
+        types = set(map(type, groups))
+    if len(types) == 1 and (isinstance(groups, np.ndarray) or
+                            types.pop() in (int, long, float, str, unicode)):
+        # Numpy typed groups: sort once
+        g = np.asarray(groups)
+        valid = g == g
+        ugroups, inverse = np.unique(g[valid], return_inverse=True)
+        codes = np.empty(n, dtype=np.intp)
+        codes.fill(-1)
+        codes[valid] = inverse
+        return codes, ugroups.tolist()
+    ugroups = [group for group in unique_group(groups) if group == group]
+    index = dict(zip(ugroups, range(len(ugroups))))
+    codes = np.fromiter((index.get(group, -1) for group in groups), np.intp,
+                        n)
+    return codes, ugroups
+
+def _group_plan(groups):
+    """
+    Codes, unique groups, and the sorted members of the groups.
+
+    Returns (codes, ugroups, order, starts, sizes): `order` holds the
+    positions of the elements that belong to a group, sorted by group (in
+    their order within a group), and the members of group k are
+    order[starts[k]:starts[k] + sizes[k]].
+
+    """
+    codes, ugroups = _group_codes(groups)
+    member = (codes >= 0).nonzero()[0]
+    order = member[codes[member].argsort(kind='mergesort')]
+    sizes = np.bincount(codes[member], minlength=len(ugroups))
+    starts = sizes.cumsum() - sizes
+    return codes, ugroups, order, starts, sizes
+
+def _group_agg(x, plan, func, axis, **kwargs):
+    "group_agg given the plan (_group_plan) of the groups."
+    codes, ugroups, order, starts, sizes = plan
+    x = np.asarray(x)
+    if len(codes) != x.shape[axis]:
+        raise ValueError, 'groups must have one element per element of axis'
+    # Groups along the first axis; each column is then one set of groups
+    a = np.rollaxis(x, axis, 0)
+    n = a.shape[0]
+    m = int(np.prod(a.shape[1:]))
+    # Members of the groups, one contiguous segment per group
+    xs = a.reshape(n, m)[order]
+    if xs.dtype != np.float64:
+        xs = xs.astype(np.float64)
+    seg = codes[order]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if func == 'rank' or callable(func):
+            if func == 'rank':
+                ys = _group_rank(xs, starts, sizes, seg, **kwargs)
+            else:
+                ys = np.empty(xs.shape)
+                for start, size in zip(starts, sizes):
+                    block = xs[start:start + size]
+                    ys[start:start + size] = func(block, axis=0, **kwargs)
+            y = np.empty((n, m))
+            y.fill(np.nan)
+            y[order] = ys
+        else:
+            if func == 'mean' or func == 'std':
+                stat = _group_meanstd(xs, starts, sizes, func == 'std',
+                                      **kwargs)
+            elif func == 'median':
+                stat = _group_median(xs, starts, sizes, seg)
+            else:
+                msg = "func must be 'mean', 'median', 'std', 'rank', or a "
+                raise ValueError, msg + 'function'
+            # Code -1 (no group) takes the last row, NaN
+            stat = np.concatenate((stat, np.nan * np.ones((1, m))))
+            y = stat[codes]
+    y = y.reshape(a.shape)
+    return np.rollaxis(y, 0, axis + 1)
+
+def _group_count(xs, starts):
+    "Number of non-NaN elements in each segment of `xs`, and the non-NaNs."
+    good = ~np.isnan(xs)
+    return np.add.reduceat(good.view(np.int8), starts, dtype=np.intp), good
+
+def _group_meanstd(xs, starts, sizes, std, ddof=0):
+    "Group mean or std of the segments of `xs`."
+    stat = np.empty((len(sizes), xs.shape[1]))
+    for g0, g1 in _group_batches(sizes, xs.shape[1]):
+        r0 = starts[g0]
+        r1 = starts[g1 - 1] + sizes[g1 - 1]
+        block = xs[r0:r1]
+        lstarts = starts[g0:g1] - r0
+        count, good = _group_count(block, lstarts)
+        mean = np.add.reduceat(np.where(good, block, 0), lstarts) / count
+        if std:
+            lseg = np.repeat(np.arange(g1 - g0), sizes[g0:g1])
+            dev = np.where(good, block - mean[lseg], 0)
+            dof = count - ddof
+            ss = np.add.reduceat(dev * dev, lstarts)
+            stat[g0:g1] = np.sqrt(np.where(dof > 0, ss / dof, np.nan))
+        else:
+            stat[g0:g1] = mean
+    return stat
+
+def _group_batches(sizes, m):
+    """
+    Ranges (g0, g1) of consecutive groups with about 2**15 elements each.
+
+    The segments of the groups g0 to g1 - 1 are processed together, so that
+    the temporary arrays stay small for few large groups and the Python
+    overhead stays small for many small groups.
+
+    """
+    if len(sizes) == 0:
+        return []
+    cum = sizes.cumsum()
+    batch = (cum - 1) // max(2**15 // max(m, 1), 1)
+    edges = (batch[1:] != batch[:-1]).nonzero()[0] + 1
+    edges = [0] + edges.tolist() + [len(sizes)]
+    return zip(edges[:-1], edges[1:])
+
+def _group_sort(block, lseg):
+    """
+    Positions that sort each column of `block` by segment, then by value.
+
+    All the segments are sorted by one lexsort along the first axis; within
+    a segment NaNs sort last and equal values keep their order.
+
+    """
+    keys = np.broadcast_to(lseg[:, None], block.shape)
+    return np.lexsort((block, keys), axis=0)
+
+def _group_median(xs, starts, sizes, seg):
+    """
+    Group median of the segments of `xs`.
+
+    The segments are sorted along the first axis (_group_sort); the median
+    is then the middle element, or the mean of the middle two, of the
+    non-NaN elements of each column of a segment. A batch of one group is
+    passed to nanmedian.
+
+    """
+    median = np.empty((len(sizes), xs.shape[1]))
+    cols = np.arange(xs.shape[1])
+    for g0, g1 in _group_batches(sizes, xs.shape[1]):
+        r0 = starts[g0]
+        r1 = starts[g1 - 1] + sizes[g1 - 1]
+        if g1 - g0 == 1:
+            # One large group: partition instead of sort
+            median[g0] = nanmedian(xs[r0:r1], axis=0)
+            continue
+        block = xs[r0:r1]
+        s = block[_group_sort(block, seg[r0:r1]), cols]
+        lstarts = (starts[g0:g1] - r0)[:, None]
+        count = _group_count(s, lstarts[:, 0])[0]
+        lo = np.maximum(lstarts + (count - 1) // 2, 0)
+        hi = np.where(count > 0, lstarts + count // 2, lo)
+        med = (s[lo, cols] + s[hi, cols]) / 2.0
+        med[count == 0] = np.nan
+        median[g0:g1] = med
+    return median
+
+def _group_rank(xs, starts, sizes, seg, norm='-1,1', ties=True):
+    """
+    Ranking within each segment of `xs`, normalized as by `ranking`.
+
+    The segments are sorted along the first axis (_group_sort); tied
+    elements are runs of equal sorted values within a segment, whose ranks
+    are averaged as by _averank. A batch of one group is passed to ranking.
+
+    """
+    if norm not in ('-1,1', '0,N-1', 'gaussian'):
+        msg = "norm must be '-1,1', '0,N-1', or 'gaussian'."
+        raise ValueError(msg)
+    if norm == 'gaussian':
+        try:
+            from scipy.special import ndtri
+        except ImportError:
+            raise ImportError, 'SciPy required for gaussian normalization.'
+    rank = np.empty(xs.shape)
+    m = xs.shape[1]
+    cols = np.arange(m)
+    for g0, g1 in _group_batches(sizes, m):
+        r0 = starts[g0]
+        r1 = starts[g1 - 1] + sizes[g1 - 1]
+        block = xs[r0:r1]
+        if g1 - g0 == 1:
+            rank[r0:r1] = ranking(block, axis=0, norm=norm, ties=ties)
+            continue
+        n = r1 - r0
+        lstarts = starts[g0:g1] - r0
+        lseg = seg[r0:r1] - g0
+        order = _group_sort(block, lseg)
+        s = block[order, cols]
+        count = _group_count(block, lstarts)[0]
+        k = np.arange(n)[:, None]
+        if ties:
+            first = np.empty((n, m), dtype=np.bool_)
+            first[:1] = True
+            first[1:] = s[1:] != s[:-1]
+            first[lstarts] = True
+            last = np.empty((n, m), dtype=np.bool_)
+            last[-1:] = True
+            last[:-1] = first[1:]
+            lo = np.maximum.accumulate(np.where(first, k, 0), 0)
+            hi = np.minimum.accumulate(np.where(last, k, n - 1)[::-1], 0)
+            r = (lo + hi[::-1]) / 2.0 - lstarts[lseg][:, None]
+        else:
+            r = np.repeat(k - lstarts[lseg][:, None], m, 1).astype(float)
+        cnt = count[lseg]
+        size = sizes[g0:g1][lseg][:, None]
+        if norm == '-1,1':
+            r = 2.0 * r / (cnt - 1) - 1
+            middle = 0.0
+        else:
+            r *= 1.0 * (size - 1) / (cnt - 1)
+            if norm == '0,N-1':
+                middle = (size + 1.0) / 2.0 - 1.0
+            else:
+                r = ndtri((r + 1.0) / (size + 1.0))
+                middle = 0.0
+        r = np.where(cnt == 1, middle, r)
+        r[np.isnan(s)] = np.nan
+        rank[r0 + order, cols] = r
+    return rank
 
-    # Find set of unique groups
-    ugroups = unique_group(groups)
-    
-    # Convert groups to a numpy array
-    groups = np.asarray(groups)    
-  
-    # Loop through unique groups and normalize
-    xmedian = np.nan * np.zeros(x.shape)
-    for group in ugroups:
-        idx = groups == group
-        idxall = [slice(None)] * x.ndim
-        idxall[axis] = idx
-        if idx.sum() > 0:
-            ns = nanmedian(x[idxall], axis=axis)
-            xmedian[idxall] = np.expand_dims(ns, axis)
-            
-    return xmedian
-    
 def unique_group(groups):
     """Find unique groups in list not including None."""    
     ugroups = set(groups)
@@ -191,8 +1013,10 @@ def mov_sum(arr, window, skip=0, axis=-1, norm=False):
     ----------
     arr : ndarray
         Input array.
-    window : int
-        The number of elements in the moving window.
+    window : {int, ndarray}
+        The number of elements in the moving window, or the position of the
+        first element of the window of each position along `axis`, -1 for
+        an incomplete window (see la.flabel.windowstart).
     skip : int, optional
         By default (skip=0) the movingsum at element *i* is the sum over the
         slice of elements from *i + 1 - window* to *i + 1* (so the last element
@@ -225,40 +1049,504 @@ def mov_sum(arr, window, skip=0, axis=-1, norm=False):
     array([ NaN,   3.,   4.,   8.,   9.])    
     
     """
-    if window < 1:  
-        raise ValueError, 'window must be at least 1'
-    if window > arr.shape[axis]:
-        raise ValueError, 'Window is too big.'      
+    arr = np.asarray(arr)
+    start, size = _windowstart(window, arr.shape[axis])
     if skip > arr.shape[axis]:
         raise IndexError, 'Your skip is too large.'
     m = ismissing(arr) 
     arr = 1.0 * arr
     arr[m] = 0
-    csx = arr.cumsum(axis)
-    index1 = [slice(None)] * arr.ndim 
-    index1[axis] = slice(window - 1, None)
-    index2 = [slice(None)] * arr.ndim 
-    index2[axis] = slice(None, -window) 
-    msx = csx[index1]
-    index3 = [slice(None)] * arr.ndim
-    index3[axis] = slice(1, None)
-    msx[index3] = msx[index3] - csx[index2] 
-    csm = (~m).cumsum(axis)     
-    msm = csm[index1]
-    msm[index3] = msm[index3] - csm[index2]  
+    # Sums of the windows are differences of the cumsums; with the window
+    # axis last, window j is from start[j] (or 0 if negative) to j + 1
+    a = np.rollaxis(arr, axis, arr.ndim)
+    good = np.rollaxis(~m, axis, arr.ndim)
+    first = np.maximum(start, 0)
+    zero = np.zeros(a.shape[:-1] + (1,), dtype=a.dtype)
+    csx = np.concatenate((zero, a.cumsum(-1)), -1)
+    csm = np.concatenate((zero.astype(int), good.cumsum(-1)), -1)
+    msx = csx[..., 1:] - csx[..., first]
+    msm = csm[..., 1:] - csm[..., first]
     if norm:
-        ms = 1.0 * window * msx / msm
+        length = np.arange(1, a.shape[-1] + 1) - first
+        ms = 1.0 * length * msx / msm
     else:
         ms = msx
         ms[msm == 0] = np.nan
-    initshape = list(arr.shape)  
-    initshape[axis] = skip + window - 1
-    #Note: skip could be included in starting window
-    cutslice = [slice(None)] * arr.ndim   
-    cutslice[axis] = slice(None, -skip or None, None)
-    pad = np.nan * np.zeros(initshape)
-    ms = np.concatenate((pad, ms[cutslice]), axis) 
-    return ms
+    ms = ms.astype(np.float64)
+    ms[..., start < 0] = np.nan
+    if skip > 0:
+        ms[..., skip:] = ms[..., :-skip].copy()
+        ms[..., :skip] = np.nan
+    return np.rollaxis(ms, arr.ndim - 1, axis % arr.ndim)
+
+def mov_mean(arr, window, axis=-1, min_count=1):
+    """
+    Moving window mean along the specified axis, ignoring NaNs.
+    
+    For float32 and float64 arrays the mean is updated, not
+    recomputed, as the window moves (if la's C extension is available), so
+    the cost does not depend on the window size.
+    
+    Parameters
+    ----------
+    arr : array_like
+        Input array.
+    window : {int, ndarray}
+        The number of elements in the moving window, or the position of the
+        first element of the window of each position along `axis`, -1 for
+        an incomplete window (see la.flabel.windowstart).
+    axis : int, optional
+        The axis over which the window moves. By default the window moves
+        over the last axis (-1).
+    min_count : int, optional
+        The minimum number of non-NaN elements in a window for the mean
+        to be computed; windows with fewer non-NaN elements give NaN. The
+        default is 1.
+
+    Returns
+    -------
+    y : ndarray
+        The moving mean of the input array along the specified axis. The
+        first `window` - 1 elements along `axis` are NaN. Float32 input
+        gives float32 output; all other input gives float64.
+
+    Raises
+    ------
+    ValueError
+        If `window` is less than 1 or greater than the length of `axis`, or
+        if `min_count` is not between 1 and `window`.
+
+    Examples
+    --------
+    >>> arr = np.array([1, 2, np.nan, 4, 6])
+    >>> mov_mean(arr, 2)
+    array([ NaN,  1.5,  2. ,  4. ,  5. ])
+    >>> mov_mean(arr, 2, min_count=2)
+    array([ NaN,  1.5,  NaN,  NaN,  5. ])
+    
+    """
+    arr = np.asarray(arr)
+    if not _isfloat(arr):
+        arr = arr.astype(np.float64)
+    return _mov_mean(arr, window, axis, min_count)
+
+def mov_std(arr, window, axis=-1, min_count=1):
+    """
+    Moving window standard deviation along the specified axis, ignoring NaNs.
+    
+    The standard deviation is normalized by the number of non-NaN
+    elements in the window. For float32 and float64 arrays it is updated,
+    not recomputed, as the window moves (Welford's algorithm, if la's C
+    extension is available), so the cost does not depend on the window size.
+    
+    Parameters
+    ----------
+    arr : array_like
+        Input array.
+    window : {int, ndarray}
+        The number of elements in the moving window, or the position of the
+        first element of the window of each position along `axis`, -1 for
+        an incomplete window (see la.flabel.windowstart).
+    axis : int, optional
+        The axis over which the window moves. By default the window moves
+        over the last axis (-1).
+    min_count : int, optional
+        The minimum number of non-NaN elements in a window for the standard
+        deviation to be computed; windows with fewer non-NaN elements give
+        NaN. The default is 1.
+
+    Returns
+    -------
+    y : ndarray
+        The moving standard deviation of the input array along the
+        specified axis. The first `window` - 1 elements along `axis` are
+        NaN. Float32 input gives float32 output; all other input gives
+        float64.
+
+    Raises
+    ------
+    ValueError
+        If `window` is less than 1 or greater than the length of `axis`, or
+        if `min_count` is not between 1 and `window`.
+
+    Examples
+    --------
+    >>> arr = np.array([1, 2, np.nan, 4, 6])
+    >>> mov_std(arr, 2)
+    array([ NaN,  0.5,  0. ,  0. ,  1. ])
+    >>> mov_std(arr, 2, min_count=2)
+    array([ NaN,  0.5,  NaN,  NaN,  1. ])
+    
+    """
+    arr = np.asarray(arr)
+    if not _isfloat(arr):
+        arr = arr.astype(np.float64)
+    return _mov_std(arr, window, axis, min_count)
+
+def mov_min(arr, window, axis=-1, min_count=1):
+    """
+    Moving window minimum along the specified axis, ignoring NaNs.
+    
+    For float32 and float64 arrays the candidate minimums are kept in a
+    monotonic deque (if la's C extension is available), so each element is
+    added and removed once whatever the window size.
+    
+    Parameters
+    ----------
+    arr : array_like
+        Input array.
+    window : {int, ndarray}
+        The number of elements in the moving window, or the position of the
+        first element of the window of each position along `axis`, -1 for
+        an incomplete window (see la.flabel.windowstart).
+    axis : int, optional
+        The axis over which the window moves. By default the window moves
+        over the last axis (-1).
+    min_count : int, optional
+        The minimum number of non-NaN elements in a window for the minimum
+        to be computed; windows with fewer non-NaN elements give NaN. The
+        default is 1.
+
+    Returns
+    -------
+    y : ndarray
+        The moving minimum of the input array along the specified axis. The
+        first `window` - 1 elements along `axis` are NaN. Float32 input
+        gives float32 output; all other input gives float64.
+
+    Raises
+    ------
+    ValueError
+        If `window` is less than 1 or greater than the length of `axis`, or
+        if `min_count` is not between 1 and `window`.
+
+    Examples
+    --------
+    >>> arr = np.array([1, 2, np.nan, 4, 6])
+    >>> mov_min(arr, 2)
+    array([ NaN,   1.,   2.,   4.,   4.])
+    >>> mov_min(arr, 2, min_count=2)
+    array([ NaN,   1.,  NaN,  NaN,   4.])
+    
+    """
+    arr = np.asarray(arr)
+    if not _isfloat(arr):
+        arr = arr.astype(np.float64)
+    return _mov_min(arr, window, axis, min_count)
+
+def mov_max(arr, window, axis=-1, min_count=1):
+    """
+    Moving window maximum along the specified axis, ignoring NaNs.
+    
+    For float32 and float64 arrays the candidate maximums are kept in a
+    monotonic deque (if la's C extension is available), so each element is
+    added and removed once whatever the window size.
+    
+    Parameters
+    ----------
+    arr : array_like
+        Input array.
+    window : {int, ndarray}
+        The number of elements in the moving window, or the position of the
+        first element of the window of each position along `axis`, -1 for
+        an incomplete window (see la.flabel.windowstart).
+    axis : int, optional
+        The axis over which the window moves. By default the window moves
+        over the last axis (-1).
+    min_count : int, optional
+        The minimum number of non-NaN elements in a window for the maximum
+        to be computed; windows with fewer non-NaN elements give NaN. The
+        default is 1.
+
+    Returns
+    -------
+    y : ndarray
+        The moving maximum of the input array along the specified axis. The
+        first `window` - 1 elements along `axis` are NaN. Float32 input
+        gives float32 output; all other input gives float64.
+
+    Raises
+    ------
+    ValueError
+        If `window` is less than 1 or greater than the length of `axis`, or
+        if `min_count` is not between 1 and `window`.
+
+    Examples
+    --------
+    >>> arr = np.array([1, 2, np.nan, 4, 6])
+    >>> mov_max(arr, 2)
+    array([ NaN,   2.,   2.,   4.,   6.])
+    >>> mov_max(arr, 2, min_count=2)
+    array([ NaN,   2.,  NaN,  NaN,   6.])
+    
+    """
+    arr = np.asarray(arr)
+    if not _isfloat(arr):
+        arr = arr.astype(np.float64)
+    return _mov_max(arr, window, axis, min_count)
+
+def mov_median(arr, window, axis=-1, min_count=1):
+    """
+    Moving window median along the specified axis, ignoring NaNs.
+    
+    For float32 and float64 arrays the non-NaN elements of the window are
+    kept in a max-heap of the smaller half and a min-heap of the larger half
+    (if la's C extension is available), so each step costs O(log window).
+    
+    Parameters
+    ----------
+    arr : array_like
+        Input array.
+    window : {int, ndarray}
+        The number of elements in the moving window, or the position of the
+        first element of the window of each position along `axis`, -1 for
+        an incomplete window (see la.flabel.windowstart).
+    axis : int, optional
+        The axis over which the window moves. By default the window moves
+        over the last axis (-1).
+    min_count : int, optional
+        The minimum number of non-NaN elements in a window for the median
+        to be computed; windows with fewer non-NaN elements give NaN. The
+        default is 1.
+
+    Returns
+    -------
+    y : ndarray
+        The moving median of the input array along the specified axis. The
+        first `window` - 1 elements along `axis` are NaN. Float32 input
+        gives float32 output; all other input gives float64.
+
+    Raises
+    ------
+    ValueError
+        If `window` is less than 1 or greater than the length of `axis`, or
+        if `min_count` is not between 1 and `window`.
+
+    Examples
+    --------
+    >>> arr = np.array([1, 2, np.nan, 4, 6])
+    >>> mov_median(arr, 2)
+    array([ NaN,  1.5,  2. ,  4. ,  5. ])
+    >>> mov_median(arr, 2, min_count=2)
+    array([ NaN,  1.5,  NaN,  NaN,  5. ])
+    
+    """
+    arr = np.asarray(arr)
+    if not _isfloat(arr):
+        arr = arr.astype(np.float64)
+    return _mov_median(arr, window, axis, min_count)
+
+def mov_zscore(arr, window, axis=-1, min_count=1):
+    """
+    Moving window z-score along the specified axis, ignoring NaNs.
+
+    The z-score of each element is its deviation from the mean of the
+    window that ends at it, divided by the standard deviation (ddof=0) of
+    that window: (arr - mov_mean) / mov_std.
+    
+    Parameters
+    ----------
+    arr : array_like
+        Input array.
+    window : {int, ndarray}
+        The number of elements in the moving window, or the position of the
+        first element of the window of each position along `axis`, -1 for
+        an incomplete window (see la.flabel.windowstart).
+    axis : int, optional
+        The axis over which the window moves. By default the window moves
+        over the last axis (-1).
+    min_count : int, optional
+        The minimum number of non-NaN elements in a window; windows with
+        fewer non-NaN elements give NaN. The default is 1.
+
+    Returns
+    -------
+    y : ndarray
+        The moving z-score. The first `window` - 1 elements along `axis`,
+        NaN elements, and elements whose window has a standard deviation of
+        zero are NaN. Float32 input gives float32 output; all other input
+        gives float64.
+
+    Examples
+    --------
+    >>> arr = np.array([1, 2, np.nan, 4, 6])
+    >>> mov_zscore(arr, 2)
+    array([ NaN,   1.,  NaN,  NaN,   1.])
+    
+    """
+    arr = np.asarray(arr)
+    if not _isfloat(arr):
+        arr = arr.astype(np.float64)
+    y = _mov_std(arr, window, axis, min_count)
+    zero = y == 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        y = (arr - _mov_mean(arr, window, axis, min_count)) / y
+    y[zero] = np.nan
+    return y
+
+def ewma(arr, halflife, axis=-1, state=None, return_state=False):
+    """
+    Exponentially weighted moving average along the specified axis, ignoring
+    NaNs.
+
+    At each step along `axis` the weights of the earlier elements are
+    multiplied by 0.5 ** (1 / `halflife`) and the new element, unless it is
+    NaN, gets a weight of 1. A NaN therefore leaves the average unchanged
+    but ages the earlier elements. The average is updated recursively, one
+    O(1) step per element, by a C loop if la's C extension is available.
+    
+    Parameters
+    ----------
+    arr : array_like
+        Input array.
+    halflife : float
+        The number of steps after which the weight of an element is halved;
+        must be greater than zero.
+    axis : int, optional
+        The axis along which the average moves. By default the last axis
+        (-1).
+    state : {None, ndarray}, optional
+        The state returned by an earlier call (of ewma, ewmstd, or ewmcorr
+        with `arr2` equal to `arr1`) with ``return_state=True``. The average
+        then continues from the end of the earlier data, as if the earlier
+        data and `arr` were concatenated along `axis`. None (default)
+        starts without earlier data.
+    return_state : bool, optional
+        Also return the state at the end of `axis`. The default is False.
+
+    Returns
+    -------
+    y : ndarray
+        The moving average. Elements before the first non-NaN element along
+        `axis` are NaN. Float32 input gives float32 output; all other input
+        gives float64.
+    state : ndarray
+        Only if `return_state` is True. A float64 array of the shape of
+        `arr` except that `axis` has length 6: the total weight, the
+        weighted means of the data (twice), the weighted variances of the
+        data (twice), and the weighted covariance.
+
+    Examples
+    --------
+    >>> arr = np.array([1.0, np.nan, 3.0, 4.0])
+    >>> ewma(arr, 1)
+    array([ 1.        ,  1.        ,  2.6       ,  3.46153846])
+    >>> y, state = ewma(arr[:2], 1, return_state=True)
+    >>> ewma(arr[2:], 1, state=state)
+    array([ 2.6       ,  3.46153846])
+    
+    """
+    arr = np.asarray(arr)
+    if not _isfloat(arr):
+        arr = arr.astype(np.float64)
+    y, state = _ewma(arr, halflife, axis, state)
+    if return_state:
+        return y, state
+    return y
+
+def ewmstd(arr, halflife, axis=-1, state=None, return_state=False):
+    """
+    Exponentially weighted moving standard deviation along the specified
+    axis, ignoring NaNs.
+
+    The elements are weighted as in `ewma`; the standard deviation is the
+    square root of the weighted mean of the squared deviations from the
+    weighted mean (there is no bias correction). The weighted variance is
+    updated recursively with the weighted version of Welford's algorithm.
+    
+    Parameters
+    ----------
+    arr : array_like
+        Input array.
+    halflife : float
+        The number of steps after which the weight of an element is halved;
+        must be greater than zero.
+    axis : int, optional
+        The axis along which the window moves. By default the last axis
+        (-1).
+    state : {None, ndarray}, optional
+        The state returned by an earlier call with ``return_state=True``
+        (see `ewma`). None (default) starts without earlier data.
+    return_state : bool, optional
+        Also return the state at the end of `axis`. The default is False.
+
+    Returns
+    -------
+    y : ndarray
+        The moving standard deviation. Elements before the first non-NaN
+        element along `axis` are NaN. Float32 input gives float32 output;
+        all other input gives float64.
+    state : ndarray
+        Only if `return_state` is True; see `ewma`.
+
+    Examples
+    --------
+    >>> arr = np.array([1.0, np.nan, 3.0, 4.0])
+    >>> ewmstd(arr, 1)
+    array([ 0.        ,  0.        ,  0.8       ,  0.84265009])
+    
+    """
+    arr = np.asarray(arr)
+    if not _isfloat(arr):
+        arr = arr.astype(np.float64)
+    y, state = _ewmstd(arr, halflife, axis, state)
+    if return_state:
+        return y, state
+    return y
+
+def ewmcorr(arr1, arr2, halflife, axis=-1, state=None, return_state=False):
+    """
+    Exponentially weighted moving correlation of two arrays along the
+    specified axis, ignoring pairs that contain a NaN.
+
+    The pairs of elements are weighted as in `ewma`; a step at which either
+    array is NaN ages the earlier pairs but adds nothing. The weighted
+    covariance and variances are updated recursively.
+    
+    Parameters
+    ----------
+    arr1 : array_like
+        Input array.
+    arr2 : array_like
+        Input array of the same shape as `arr1`.
+    halflife : float
+        The number of steps after which the weight of a pair is halved; must
+        be greater than zero.
+    axis : int, optional
+        The axis along which the window moves. By default the last axis
+        (-1).
+    state : {None, ndarray}, optional
+        The state returned by an earlier call with ``return_state=True``
+        (see `ewma`). None (default) starts without earlier data.
+    return_state : bool, optional
+        Also return the state at the end of `axis`. The default is False.
+
+    Returns
+    -------
+    y : ndarray
+        The moving correlation. It is NaN until both arrays have varied.
+        Float32 input gives float32 output; all other input gives float64.
+    state : ndarray
+        Only if `return_state` is True; see `ewma`.
+
+    Examples
+    --------
+    >>> arr1 = np.array([1.0, 2.0, 3.0, 4.0])
+    >>> arr2 = np.array([2.0, 1.0, 4.0, 3.0])
+    >>> ewmcorr(arr1, arr2, 1)
+    array([        NaN, -1.        ,  0.78555332,  0.48453608])
+    
+    """
+    arr1 = np.asarray(arr1)
+    arr2 = np.asarray(arr2)
+    dtype = np.result_type(arr1, arr2)
+    if dtype != np.float32:
+        dtype = np.float64
+    y, state = _ewmcorr(arr1.astype(dtype), arr2.astype(dtype), halflife,
+                        axis, state)
+    if return_state:
+        return y, state
+    return y
 
 def movingsum_forward(x, window, skip=0, axis=-1, norm=False):
     """Movingsum in the forward direction skipping skip dates."""
@@ -267,26 +1555,60 @@ def movingsum_forward(x, window, skip=0, axis=-1, norm=False):
     msf = movingsum(x[flip_index], window, skip=skip, axis=axis, norm=norm)
     return msf[flip_index]
 
-def movingrank(x, window, axis=-1):
-    """Moving rank (normalized to -1 and 1) of a given window along axis.
-
-    Normalized for missing (NaN) data.
-    A data point with NaN data is returned as NaN
-    If a window is all NaNs except last, this is returned as NaN
-    """
-    if window > x.shape[axis]:
-        raise ValueError, 'Window is too big.'
-    if window < 2:
-        raise ValueError, 'Window is too small.'
-    nt = x.shape[axis]
-    mr = np.nan * np.zeros(x.shape)        
-    for i in xrange(window-1, nt): 
-        index1 = [slice(None)] * x.ndim 
-        index1[axis] = i
-        index2 = [slice(None)] * x.ndim 
-        index2[axis] = slice(i-window+1, i+1, None)
-        mr[index1] = np.squeeze(lastrank(x[index2], axis=axis))
-    return mr
+def movingrank(x, window, axis=-1, decay=0.0):
+    """
+    Moving rank (normalized to -1 and 1) of a given window along axis.
+
+    The rank of each element is its `lastrank` within the window that ends
+    at it: ties are averaged, the rank is normalized for missing (NaN)
+    data, an element that is NaN is returned as NaN, and so is an element
+    whose window is all NaNs except that element.
+
+    With la's C extension the window is not re-ranked at each step: the
+    ranks of the elements of the window are kept in a binary indexed tree,
+    so each step costs O(log n), where n is the length of `axis`, instead
+    of O(window).
+
+    Parameters
+    ----------
+    x : array_like
+        Input array.
+    window : {int, ndarray}
+        The number of elements in the moving window, at least 2, or the
+        position of the first element of the window of each position along
+        `axis`, -1 for an incomplete window (see la.flabel.windowstart).
+    axis : int, optional
+        The axis over which the window moves. By default the window moves
+        over the last axis (-1).
+    decay : scalar, optional
+        Exponential decay strength of the ranking within each window (see
+        `lastrank`). Cannot be negative. The default (decay=0) is no decay.
+
+    Returns
+    -------
+    y : ndarray
+        The moving rank as a float64 array. The first `window` - 1 elements
+        along `axis` are NaN.
+
+    Raises
+    ------
+    ValueError
+        If `window` is less than 2 or greater than the length of `axis`, or
+        if `decay` is negative.
+
+    Examples
+    --------
+    >>> x = np.array([1, 3, 2, np.nan, 4, 4])
+    >>> movingrank(x, 3)
+    array([ NaN,  NaN,   0.,  NaN,   1.,   0.])
+    
+    """
+    x = np.asarray(x)
+    if not _isfloat(x):
+        x = x.astype(np.float64)
+    if decay < 0:
+        raise ValueError, 'decay must be greater than or equal to zero.'
+    return _movingrank(x, window, axis, decay)
    
 def lastrank(x, axis=-1, decay=0.0):
     """
@@ -442,6 +1764,9 @@ def ranking(x, axis=0, norm='-1,1', ties=True):
     For '0,N-1' normalization, note that N is x.shape[axis] even in there are
     NaNs. That ensures that when ranking along the columns of a 2d array, for
     example, the output will have the same min and max along all columns.
+
+    With `ties` all the 1d slices along `axis` are ranked at once by one
+    argsort; tied elements are found as runs of equal sorted values.
     
     """
     ax = axis
@@ -457,21 +1782,13 @@ def ranking(x, axis=0, norm='-1,1', ties=True):
         if masknan.any():
             x = x.copy()
             x[masknan] = np.inf
-        idxraw = x.argsort(ax).argsort(ax)
+        idxraw = x.argsort(ax, kind='mergesort').argsort(ax)
         idx = idxraw.astype(float)
         idx[masknan] = np.nan
         idx[maskinf] -= adj[maskinf]
     else:
-        rank1d = rankdata # Note: stats.rankdata starts ranks at 1
-        idx = np.nan * np.ones(x.shape)
-        itshape = list(x.shape)
-        itshape.pop(ax)
-        for ij in np.ndindex(*itshape):
-            ijslice = list(ij[:ax]) + [slice(None)] + list(ij[ax:])
-            x1d = x[ijslice].astype(float)
-            mask1d = ~np.isnan(x1d)
-            x1d[mask1d] = rank1d(x1d[mask1d]) - 1
-            idx[ijslice] = x1d
+        idx = _averank(x, ax)
+        idx[masknan] = np.nan
     if norm == '-1,1':
         idx /= (countnotnan - 1)
         idx *= 2
@@ -494,28 +1811,104 @@ def ranking(x, axis=0, norm='-1,1', ties=True):
     idx[(countnotnan==1)*(~masknan)] = middle
     return idx
 
-def push(x, n, axis=-1):
-    "Fill missing values (NaN) with most recent non-missing values if recent."
-    if axis != -1 or axis != x.ndim-1:
-        x = np.rollaxis(x, axis, x.ndim)
-    y = np.array(x) 
-    if y.ndim == 1:
-        y = y[None, :]
-    fidx = np.isfinite(y)
-    recent = np.nan * np.ones(y.shape[:-1])  
-    count = np.nan * np.ones(y.shape[:-1])          
-    for i in xrange(y.shape[-1]):
-        idx = (i - count) > n
-        recent[idx] = np.nan
-        idx = ~fidx[...,i]
-        y[idx, i] = recent[idx]
-        idx = fidx[...,i]
-        count[idx] = i
-        recent[idx] = y[idx, i]
-    if axis != -1 or axis != x.ndim-1:
-        y = np.rollaxis(y, x.ndim-1, axis)
-    if x.ndim == 1:
-        return y[0]
+def _averank(x, axis):
+    """
+    Zero-based ranks along `axis` with ties averaged; NaNs rank last.
+
+    All the 1d slices are ranked at once: one argsort along the axis, then
+    runs of equal sorted values are found by comparing neighbors, and each
+    element gets the mean of the first and last sorted position of its run.
+
+    """
+    a = np.rollaxis(np.asarray(x, dtype=float), axis, x.ndim)
+    n = a.shape[-1]
+    m = int(np.prod(a.shape[:-1]))
+    a = a.reshape(m, n)
+    rank = np.empty((m, n))
+    if n > 0:
+        order = a.argsort(1, kind='mergesort')
+        rows = np.arange(m)[:, None]
+        s = a[rows, order]
+        # Sorted positions where a run of equal values starts (ends)
+        k = np.arange(n)
+        first = np.ones((m, n), dtype=np.bool_)
+        first[:, 1:] = s[:, 1:] != s[:, :-1]
+        last = np.ones((m, n), dtype=np.bool_)
+        last[:, :-1] = first[:, 1:]
+        start = np.maximum.accumulate(np.where(first, k, 0), 1)
+        end = np.minimum.accumulate(np.where(last, k, n - 1)[:, ::-1], 1)
+        rank[rows, order] = (start + end[:, ::-1]) / 2.0
+    rank = rank.reshape(x.shape[:axis] + x.shape[axis + 1:] + (n,))
+    return np.rollaxis(rank, x.ndim - 1, axis)
+
+def push(x, n, axis=-1, backward=False, gap=False, inplace=False):
+    """
+    Fill missing values (NaN) with most recent non-missing values if recent.
+
+    A missing value is filled with the most recent non-missing value along
+    `axis` if that value is at most `n` elements before it. Inf and -Inf
+    count as missing values. Missing values that are not filled are NaN in
+    the output.
+
+    For float32 and float64 arrays the filling is done by a C loop (if la's
+    C extension is available) that walks each slice along `axis` in place,
+    without making the axis the last axis of a copy.
+
+    Parameters
+    ----------
+    x : array_like
+        Input array.
+    n : {int, float}
+        The largest number of elements from the most recent non-missing
+        value to a missing value that is filled. With `gap`, the largest
+        number of consecutive missing values that are filled. Use np.inf
+        for no limit.
+    axis : int, optional
+        The axis along which to fill. By default (axis=-1) the last axis.
+    backward : bool, optional
+        If True, fill with the next (instead of the most recent) non-missing
+        value: the filling proceeds from the end of the axis. The default is
+        False.
+    gap : bool, optional
+        If True, fill a run of consecutive missing values only if it has at
+        most `n` elements and there are non-missing values on both sides of
+        it; missing values at the start and the end of the axis are not
+        filled. The default (False) fills the first `n` elements of every
+        run that follows a non-missing value.
+    inplace : bool, optional
+        If True, fill the input array, which must be an ndarray, in place.
+        The default is False.
+
+    Returns
+    -------
+    y : ndarray
+        The filled array; the input array if `inplace` is True.
+
+    Examples
+    --------
+    >>> x = np.array([1.0, np.nan, np.nan, 4.0, np.nan, np.nan, np.nan])
+    >>> push(x, 2)
+    array([  1.,   1.,   1.,   4.,   4.,   4.,  NaN])
+    >>> push(x, 2, gap=True)
+    array([  1.,   1.,   1.,   4.,  NaN,  NaN,  NaN])
+    >>> push(x, 1, backward=True)
+    array([  1.,  NaN,   4.,   4.,  NaN,  NaN,  NaN])
+    
+    """
+    if inplace:
+        if not isinstance(x, np.ndarray):
+            raise TypeError, 'x must be an ndarray to push in place'
+        y = x
+    else:
+        y = np.array(x)
+    if y.dtype.kind in ('i', 'u', 'b'):
+        # Nothing is missing
+        return y
+    if y.ndim == 0:
+        raise ValueError, 'x must be at least 1d'
+    if _isfloat(y):
+        return _push(y, n, axis, backward, gap)
+    y[...] = _push(y.astype(np.float64), n, axis, backward, gap)
     return y
 
 def _quantileraw1d(xi, q):
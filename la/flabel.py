@@ -1,17 +1,21 @@
 "label (list of lists) functions"
 
-from itertools import izip
+import datetime
+from itertools import izip, imap
+from collections import OrderedDict
+from operator import itemgetter
+from bisect import bisect_right
 
 import numpy as np
 
 try:
     # The c version is faster...
-    from la.cflabel import listmap
+    from la.cflabel import listmap as _listmap
 except ImportError:
     # ...but perhaps it did not compile when you built the la package? So
     # we'll use the python version. If you are unsure which version you are
     # using, the doc string will tell you.
-    def listmap(list1, list2, ignore_unmappable=False):
+    def _listmap(list1, list2, ignore_unmappable=False):
         """
         Indices that map one list onto another list.
         
@@ -83,12 +87,12 @@ except ImportError:
 
 try:
     # The c version is faster...
-    from la.cflabel import listmap_fill
+    from la.cflabel import listmap_fill as _listmap_fill
 except ImportError:
     # ...but perhaps it did not compile when you built the la package? So
     # we'll use the python version. If you are unsure which version you are
     # using, the doc string will tell you.
-    def listmap_fill(list1, list2, fill=0):
+    def _listmap_fill(list1, list2, fill=0):
         """
         Indices that map one list onto another and indices of unmappable elements.
         
@@ -163,6 +167,1420 @@ except ImportError:
                 index_missing.append(i)    
         return index, index_missing
 
+try:
+    # The c version is faster...
+    from la.cflabel import maparray
+except ImportError:
+    # ...but perhaps it did not compile when you built the la package? So
+    # we'll use the python version. If you are unsure which version you are
+    # using, the doc string will tell you.
+    def maparray(keys1, keys2):
+        """
+        Indices that map one int64 array onto another and a bool found mask.
+        
+        The array version of listmap for int (and date ordinal) labels.
+        
+        Parameters
+        ----------
+        keys1 : array_like
+            The 1d int64 array to map from.
+        keys2 : array_like
+            The 1d int64 array to map to.
+        
+        Returns
+        -------
+        idx : ndarray
+            An intp array such that keys1[idx[found]] is keys2[found].
+            Elements of `keys2` that are not in `keys1` are given the index
+            value 0. If `keys1` contains duplicates, the last occurrence is
+            used (as with listmap).
+        found : ndarray
+            A bool array that is True where the element of `keys2` is in
+            `keys1`.
+            
+        Notes
+        -----
+        This is the slower python version of the function (a stable sort
+        of `keys1` and a binary search); there is a faster C version (a hash
+        table of int64 keys) that setup.py will automatically try to compile
+        at build (setup.py) time of the la package.
+        
+        Examples
+        --------
+        >>> idx, found = maparray([1, 2, 3], [3, 1, 4])
+        >>> idx
+        array([2, 0, 0])
+        >>> found
+        array([ True,  True, False], dtype=bool)
+        
+        """
+        keys1 = np.asarray(keys1, dtype=np.int64)
+        keys2 = np.asarray(keys2, dtype=np.int64)
+        if keys1.size == 0:
+            return (np.zeros(keys2.size, dtype=np.intp),
+                    np.zeros(keys2.size, dtype=np.bool_))
+        order = keys1.argsort(kind='mergesort')
+        sorted1 = keys1[order]
+        pos = np.searchsorted(sorted1, keys2, side='right') - 1
+        found = pos >= 0
+        pos[~found] = 0
+        found &= sorted1[pos] == keys2
+        idx = order[pos]
+        idx[~found] = 0
+        return idx, found
+
+try:
+    # The c version is faster...
+    from la.cflabel import uniquearray
+except ImportError:
+    # ...but perhaps it did not compile when you built the la package? So
+    # we'll use the python version. If you are unsure which version you are
+    # using, the doc string will tell you.
+    def uniquearray(keys):
+        """
+        True if the elements of an int64 array are unique; False otherwise.
+        
+        Parameters
+        ----------
+        keys : array_like
+            The 1d int64 array (for example int labels or date ordinals).
+        
+        Returns
+        -------
+        unique : bool
+            True if there are no duplicates in `keys`.
+            
+        Notes
+        -----
+        This is the slower python version of the function (a sort and a
+        comparison of neighbors); there is a faster C version (a hash table
+        of int64 keys) that setup.py will automatically try to compile at
+        build (setup.py) time of the la package.
+        
+        Examples
+        --------
+        >>> uniquearray([3, 1, 2])
+        True
+        >>> uniquearray([3, 1, 3])
+        False
+        
+        """
+        keys = np.sort(np.asarray(keys, dtype=np.int64))
+        return not (keys[1:] == keys[:-1]).any()
+
+def isunique(label):
+    """
+    True if the elements of a label list are unique; False otherwise.
+    
+    A Typedlabel of ints or dates is checked with uniquearray, one of str
+    or unicode with a sort; the result is remembered by the Typedlabel
+    until it is changed. A list is checked with a frozenset.
+    
+    """
+    if type(label) is Typedlabel:
+        return label.isunique()
+    return len(frozenset(label)) == len(label)
+
+def listmap(list1, list2, ignore_unmappable=False):
+    """
+    Indices that map one list onto another list.
+    
+    Parameters
+    ----------
+    list1 : {list, Typedlabel}
+        The list to map from.
+    list2 : {list, Typedlabel}
+        The list to map to.
+    ignore_unmappable : bool, optional
+        If False (default) an element in `list2` that is not in `list1`
+        will raise a KeyError. If True the unmappable elements will be
+        ignored.
+    
+    Returns
+    -------
+    idx : list
+        If `ignore_unmappable` is False then returns a list of indices
+        `idx` such that [list1[i] for i in idx] is `list2`. If
+        `ignore_unmappable` is True then [list1[i] for i in idx] will not
+        give `list2` if there are items in `list2` that are not in
+        `list1`.
+        
+    See Also
+    --------
+    la.flabel.listmap_fill: Indices that map one list onto another and
+                            indices of unmappable elements.
+    la.flabel.maparray: Array version of listmap for int keys.
+    
+    Notes
+    -----
+    When both lists are Typedlabels of int or datetime.date elements the
+    mapping is done by maparray on the typed arrays. Otherwise a dict of the
+    elements of `list1` is used (C version, if it compiled, or python
+    version).
+    
+    Examples
+    --------
+    >>> list1 = [1, 2, 3]
+    >>> list2 = [3, 1, 2]
+    >>> listmap(list1, list2)
+    [2, 0, 1]
+    
+    """
+    keys = _intkeys(list1, list2)
+    if keys is None:
+        return _listmap(_aslist(list1), _aslist(list2), ignore_unmappable)
+    idx, found = maparray(*keys)
+    if ignore_unmappable:
+        return idx[found].tolist()
+    if not found.all():
+        raise KeyError, list2[int((~found).nonzero()[0][0])]
+    return idx.tolist()
+
+def listmap_fill(list1, list2, fill=0):
+    """
+    Indices that map one list onto another and indices of unmappable elements.
+    
+    Similar to listmap() but additionaly returns a second index that gives the
+    index values of the unmappable elements. The unmappable items are filled
+    in the first index retuned with `fill`.
+    
+    Parameters
+    ----------
+    list1 : {list, Typedlabel}
+        The list to map from.
+    list2 : {list, Typedlabel}
+        The list to map to.
+    fill : fill value, optional
+        Any element that cannot be mapped is given the index value `fill` in
+        the frist of two index lists returned.
+    
+    Returns
+    -------
+    index : list
+        An index such that [list1[i] for i in idx] is `list2`. If there are
+        items in `list2` that are not in `list1` then the correponding index
+        value is `fill`.
+    index_missing : list
+        The index values (relative to `list1`) of the elements in `list2` that
+        are not in `list1`.
+        
+    See Also
+    --------
+    la.flabel.listmap: Indices that map one list onto another list.
+    la.flabel.maparray: Array version of listmap for int keys.
+    
+    Notes
+    -----
+    When both lists are Typedlabels of int or datetime.date elements the
+    mapping is done by maparray on the typed arrays. Otherwise a dict of the
+    elements of `list1` is used (C version, if it compiled, or python
+    version).
+    
+    Examples
+    --------
+    >>> listmap_fill([1, 2, 3], [1, 2, 3, 4])
+    ([0, 1, 2, 0], [3])
+    
+    """
+    keys = _intkeys(list1, list2)
+    if keys is None:
+        return _listmap_fill(_aslist(list1), _aslist(list2), fill)
+    idx, found = maparray(*keys)
+    missing = ~found
+    idx[missing] = fill
+    return idx.tolist(), missing.nonzero()[0].tolist()
+    
+def _intkeys(list1, list2):
+    """
+    int64 arrays of two Typedlabels of the same int or date type, or None.
+    
+    Lists of Python objects are not converted; converting a list to an array
+    costs more than the dict lookups that it would save.
+    
+    """
+    if type(list1) is not Typedlabel or type(list2) is not Typedlabel:
+        return None
+    kind = list1.x.dtype.kind
+    if kind not in ('i', 'M') or list2.x.dtype.kind != kind:
+        return None
+    return list1.x.view(np.int64), list2.x.view(np.int64)
+    
+def _aslist(label):
+    "A list of the elements of a label list or Typedlabel."
+    if type(label) is Typedlabel:
+        return label.tolist()
+    return label
+
+# Join (align) two label lists -----------------------------------------------
+
+def listjoin(list1, list2, join='inner', frozen=False):
+    """
+    Join two label lists and return the index maps that align them.
+    
+    Parameters
+    ----------
+    list1 : {list, Typedlabel}
+        The first (left) label list.
+    list2 : {list, Typedlabel}
+        The second (right) label list.
+    join : {'inner', 'outer', 'left', 'right'}, optional
+        The join method. 'inner' (default) gives the sorted intersection of
+        the two lists, 'outer' the sorted union, 'left' gives `list1` and
+        'right' gives `list2`.
+    frozen : bool, optional
+        True if neither list is changed in place while it is in use (the
+        label lists of larrys that are not exposed to the user, see
+        larry._frozenlabel). The join is then cached by the identity of the
+        two lists instead of their contents, which saves hashing them.
+        The default is False.
+        
+    Returns
+    -------
+    list3 : {list, Typedlabel}
+        The joined label list. Always a new list. It is a Typedlabel if the
+        labels it is made from ('left': `list1`, 'right': `list2`, 'inner'
+        and 'outer': both lists) are Typedlabels.
+    idx1 : {None, slice, list, ndarray}
+        Index that maps `list1` onto `list3`. None means no mapping is needed
+        (`list3` equals `list1`) and a slice means `list3` is a contiguous
+        block of `list1` (so taking along the axis can return a view). For
+        elements of `list3` that are not in `list1` the index value is 0.
+    idx1_miss : {list, ndarray}
+        Positions in `list3` of the elements that are not in `list1`.
+    idx2 : {None, slice, list, ndarray}
+        Same as `idx1` but for `list2`.
+    idx2_miss : {list, ndarray}
+        Same as `idx1_miss` but for `list2`.
+        
+    See Also
+    --------
+    la.flabel.takeaxis: Apply an index returned by listjoin to an array.    
+        
+    Notes
+    -----
+    When both lists are Typedlabels, or both contain only unique int, float,
+    str, unicode, or datetime.date elements of one type, the join is done
+    with a vectorized merge (np.searchsorted) on typed arrays. Lists that
+    are already sorted are merged without hashing or sorting; unsorted
+    lists are argsorted first. Otherwise set operations, a sort, and
+    listmap are used.
+    
+    Joins are cached in `la.flabel.joincache`, a bounded LRU cache keyed by
+    the contents (or, if `frozen`, the identity) of the two lists and the
+    join method, so aligning the same pair of labels again only costs a
+    hash of the labels, or nothing. The returned indices may be shared with
+    the cache and must not be modified.
+    
+    Examples
+    --------
+    >>> list3, idx1, idx1_miss, idx2, idx2_miss = listjoin([1, 2, 3], [2, 3, 4])
+    >>> list3
+    [2, 3]
+    >>> idx1
+    slice(1, 3, None)
+    >>> idx2
+    slice(0, 2, None)
+    
+    """
+    if join not in ('inner', 'outer', 'left', 'right'):
+        raise ValueError, 'join type not recognized'
+    if frozen:
+        plan = joincache.join(list1, list2, join, frozen=True)
+    elif list1 == list2:
+        return labelcopy(list1), None, [], None, []
+    else:
+        plan = joincache.join(list1, list2, join)
+    list3 = plan[0]
+    if type(list3) is Typedlabel:
+        # The joined label is known to be unique if the labels it is made
+        # from are
+        if join == 'left':
+            src = (list1,)
+        elif join == 'right':
+            src = (list2,)
+        else:
+            src = (list1, list2)
+        if all([z._unique is z.x for z in src]):
+            list3._unique = list3.x
+    return plan
+    
+def _listjoin(list1, list2, join):
+    "listjoin without the cache."
+    keys1 = _labelkeys(list1)
+    if keys1 is not None:
+        keys2 = _labelkeys(list2)
+        if (keys2 is not None) and (keys1[0] is keys2[0]):
+            plan = _sortjoin(keys1[1], keys2[1], join)
+            if plan is not None:
+                v3 = plan[0]
+                if join == 'left':
+                    typed = type(list1) is Typedlabel
+                elif join == 'right':
+                    typed = type(list2) is Typedlabel
+                else:
+                    typed = (type(list1) is Typedlabel and
+                             type(list2) is Typedlabel)
+                if typed:
+                    if (v3 is keys1[1]) or (v3 is keys2[1]):
+                        v3 = v3.copy()
+                    list3 = Typedlabel(v3)
+                else:
+                    list3 = v3.tolist()
+                return (list3,) + plan[1:]
+    if type(list1) is Typedlabel:
+        list1 = list1.tolist()
+    if type(list2) is Typedlabel:
+        list2 = list2.tolist()
+    return _hashjoin(list1, list2, join)
+
+class Joincache(object):
+    """
+    Bounded LRU cache of label joins (alignment plans).
+    
+    An alignment plan is the output of listjoin: the joined label list and
+    the take and missing indices of both input lists. Plans are keyed by the
+    join method and by the contents of the two label lists (the elements
+    and their types, or the bytes of a Typedlabel, so equal lists built at
+    different times share a plan) or, for lists that are not changed in
+    place (`frozen`), by the identity of the lists, which costs no hashing
+    of the lists. The cache keeps a reference to the lists of the identity
+    keys, so their ids are not reused while the plan is cached.
+    
+    Parameters
+    ----------
+    maxsize : int, optional
+        Maximum number of plans to keep. The least recently used plan is
+        dropped when the cache is full. A `maxsize` of 0 disables caching.
+        The default is 32.
+        
+    Attributes
+    ----------
+    hits : int
+        Number of joins served from the cache.
+    misses : int
+        Number of joins that were computed (and cached if hashable).
+        
+    Examples
+    --------
+    >>> from la.flabel import joincache
+    >>> joincache.clear()
+    >>> x = larry([1, 2, 3], [['a', 'b', 'c']])
+    >>> y = larry([1, 2, 3], [['b', 'c', 'd']])
+    >>> z = x + y
+    >>> z = x * y
+    >>> joincache.hits, joincache.misses
+    (1, 1)
+    
+    """
+    
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.clear()
+        
+    def __len__(self):
+        return len(self.plans)
+        
+    def clear(self):
+        "Remove all plans and reset the hit and miss counters."
+        self.plans = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        
+    def info(self):
+        "Dictionary of hits, misses, size (number of plans), and maxsize."
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self.plans), 'maxsize': self.maxsize}
+        
+    def join(self, list1, list2, join, frozen=False):
+        """
+        Same as listjoin(list1, list2, join) but served from the cache.
+        
+        If `frozen` the plan is keyed by the identity of the lists, and
+        equal lists are joined here (listjoin checks them before the cache
+        otherwise).
+        
+        """
+        if self.maxsize <= 0:
+            self.misses += 1
+            if frozen and list1 == list2:
+                return labelcopy(list1), None, [], None, []
+            return _listjoin(list1, list2, join)
+        if frozen:
+            key = (join, id(list1), id(list2))
+        else:
+            key = (join, _labelkey(list1), _labelkey(list2))
+        try:
+            entry = self.plans.pop(key)
+        except KeyError:
+            self.misses += 1
+            plan = _planjoin(list1, list2, join, frozen)
+            for idx in plan[1:]:
+                if type(idx) is np.ndarray:
+                    idx.flags.writeable = False
+            while len(self.plans) >= self.maxsize:
+                self.plans.popitem(last=False)
+            # Keep the lists of an identity key alive so ids are not reused
+            entry = ((list1, list2) if frozen else None, plan)
+        except TypeError:
+            # Unhashable label elements: join without the cache
+            self.misses += 1
+            return _listjoin(list1, list2, join)
+        else:
+            self.hits += 1
+        self.plans[key] = entry
+        list3, idx1, idx1_miss, idx2, idx2_miss = entry[1]
+        return labelcopy(list3), idx1, idx1_miss, idx2, idx2_miss
+
+joincache = Joincache()
+
+def _planjoin(list1, list2, join, frozen):
+    "_listjoin, and, if `frozen`, the plan of equal lists (no mapping)."
+    if frozen and list1 == list2:
+        return list1, None, [], None, []
+    return _listjoin(list1, list2, join)
+
+def _labelkey(label):
+    "Hashable fingerprint of a label list."
+    if type(label) is Typedlabel:
+        return label.x.dtype.str, label.x.tostring()
+    # 1, 1.0 and True are equal (and hash alike) but are different labels
+    return tuple(map(type, label)), tuple(label)
+
+def _hashjoin(list1, list2, join):
+    "listjoin for unsorted (or untyped) lists: set operations and listmap."
+    if join == 'inner':
+        list3 = list(set(list1) & set(list2))
+        list3.sort()
+        return list3, listmap(list1, list3), [], listmap(list2, list3), []
+    elif join == 'outer':
+        list3 = list(set(list1) | set(list2))
+        list3.sort()
+        idx1, idx1_miss = listmap_fill(list1, list3, fill=0)
+        idx2, idx2_miss = listmap_fill(list2, list3, fill=0)
+        return list3, idx1, idx1_miss, idx2, idx2_miss
+    elif join == 'left':
+        list3 = list(list1)
+        idx2, idx2_miss = listmap_fill(list2, list3, fill=0)
+        return list3, None, [], idx2, idx2_miss
+    else:
+        list3 = list(list2)
+        idx1, idx1_miss = listmap_fill(list1, list3, fill=0)
+        return list3, idx1, idx1_miss, None, []
+
+_keytypes = (int, long, float, str, unicode)
+
+def _labelkeys(lst):
+    """
+    Typed array of the elements of a homogeneous label list.
+    
+    Returns a tuple (type, keys), where `type` is the type of the label
+    elements and `keys` is a 1d array of the elements (datetime64[D] for
+    datetime.date labels). The array of a Typedlabel is used as is. Returns
+    None if the list is empty, mixed-type, or of an unsupported type.
+    
+    """
+    if type(lst) is Typedlabel:
+        if len(lst) == 0:
+            return None
+        return _typedkinds[lst.x.dtype.kind], lst.x
+    n = len(lst)
+    if n == 0:
+        return None
+    typ = type(lst[0])
+    if typ not in _keytypes and typ is not datetime.date:
+        return None
+    if n > 1 and len(set(map(type, lst))) != 1:
+        return None
+    if typ is datetime.date:
+        keys = _datearray(lst)
+    else:
+        keys = np.array(lst)
+        if keys.dtype == object or keys.ndim != 1:
+            return None
+    return typ, keys
+    
+def _datearray(dates):
+    "datetime64[D] array of a list of datetime.date (faster than np.array)."
+    ordinals = np.fromiter(imap(datetime.date.toordinal, dates), np.int64,
+                           len(dates))
+    ordinals -= _ordinal1970
+    return ordinals.view('M8[D]')
+
+_ordinal1970 = datetime.date(1970, 1, 1).toordinal()
+    
+def _isincreasing(keys):
+    "True if the 1d array `keys` is strictly increasing."
+    return (keys.size < 2) or bool((keys[1:] > keys[:-1]).all())
+    
+def _sortjoin(k1, k2, join):
+    """
+    listjoin of two typed arrays; the joined label is returned as an array.
+    
+    Arrays that are not sorted are argsorted, merged, and the index maps are
+    taken through the sort order. Left and right joins of unsorted int and
+    date arrays are mapped with maparray instead. Returns None if an array
+    that must be sorted contains duplicates (or NaNs).
+    
+    """
+    if join == 'right':
+        plan = _sortjoin(k2, k1, 'left')
+        if plan is None:
+            return None
+        v3, idx2, idx2_miss, idx1, idx1_miss = plan
+        return v3, idx1, idx1_miss, idx2, idx2_miss
+    elif join == 'left':
+        if _isincreasing(k2):
+            idx2, found = _searchsorted(k2, k1)
+            if found.all() and _isincreasing(k1):
+                return k1, None, [], _asslice(idx2), []
+        elif k1.dtype.kind in ('i', 'M') and k2.dtype.kind == k1.dtype.kind:
+            idx2, found = maparray(k2.view(np.int64), k1.view(np.int64))
+        else:
+            o2 = k2.argsort(kind='mergesort')
+            s2 = k2[o2]
+            if not _isincreasing(s2):
+                return None
+            idx2, found = _searchsorted(s2, k1)
+            idx2 = o2[np.minimum(idx2, k2.size - 1)]
+        if found.all():
+            return k1, None, [], idx2, []
+        idx2[~found] = 0
+        return k1, None, [], idx2, (~found).nonzero()[0]
+    o1 = None
+    if not _isincreasing(k1):
+        o1 = k1.argsort(kind='mergesort')
+        k1 = k1[o1]
+        if not _isincreasing(k1):
+            return None
+    o2 = None
+    if not _isincreasing(k2):
+        o2 = k2.argsort(kind='mergesort')
+        k2 = k2[o2]
+        if not _isincreasing(k2):
+            return None
+    v3, idx1, idx1_miss, idx2, idx2_miss = _mergejoin(k1, k2, join)
+    idx1 = _unsort(idx1, idx1_miss, o1)
+    idx2 = _unsort(idx2, idx2_miss, o2)
+    return v3, idx1, idx1_miss, idx2, idx2_miss
+    
+def _unsort(idx, idx_miss, order):
+    "Map an index into a sorted array back to the unsorted array."
+    if order is None:
+        return idx
+    if idx is None:
+        return order
+    idx = order[idx]
+    if len(idx_miss) > 0:
+        idx[idx_miss] = 0
+    return idx
+    
+def _mergejoin(k1, k2, join):
+    "Inner or outer join of two strictly increasing arrays via searchsorted."
+    n1 = k1.size
+    n2 = k2.size
+    pos, found = _searchsorted(k1, k2)
+    if join == 'inner':
+        idx1 = pos[found]
+        idx2 = found.nonzero()[0]
+        if idx2.size == n2:
+            idx2 = None
+            v3 = k2
+        else:
+            v3 = k2[idx2]
+            idx2 = _asslice(idx2)
+        if idx1.size == n1:
+            idx1 = None
+        else:
+            idx1 = _asslice(idx1)
+        return v3, idx1, [], idx2, []
+    # Outer join: insert the elements of k2 that are not in k1
+    notfound = ~found
+    ins = pos[notfound]
+    m = ins.size
+    if m == 0:
+        idx2 = np.zeros(n1, dtype=np.intp)
+        idx2[pos] = np.arange(n2)
+        miss2 = np.ones(n1, dtype=np.bool_)
+        miss2[pos] = False
+        return k1, None, [], idx2, miss2.nonzero()[0]
+    if k1.dtype != k2.dtype:
+        # Such as str labels of different widths, '|S1' and '|S2'
+        k1 = k1.astype(np.promote_types(k1.dtype, k2.dtype))
+    v3 = np.insert(k1, ins, k2[notfound])
+    n3 = n1 + m
+    r1 = np.arange(n1)
+    p1 = r1 + np.searchsorted(ins, r1, side='right')
+    p2 = np.empty(n2, dtype=np.intp)
+    p2[notfound] = ins + np.arange(m)
+    p2[found] = p1[pos[found]]
+    idx1 = np.zeros(n3, dtype=np.intp)
+    idx1[p1] = r1
+    miss1 = np.ones(n3, dtype=np.bool_)
+    miss1[p1] = False
+    idx2 = np.zeros(n3, dtype=np.intp)
+    idx2[p2] = np.arange(n2)
+    miss2 = np.ones(n3, dtype=np.bool_)
+    miss2[p2] = False
+    return v3, idx1, miss1.nonzero()[0], idx2, miss2.nonzero()[0]
+    
+def _searchsorted(k1, k2):
+    "Positions of k2 in sorted k1 and a bool array marking exact matches."
+    pos = np.searchsorted(k1, k2)
+    if k1.size == 0:
+        return pos, np.zeros(k2.size, dtype=np.bool_)
+    found = k1[np.minimum(pos, k1.size - 1)] == k2
+    return pos, found
+
+def _asslice(idx):
+    "Convert an increasing integer index to a slice if it is contiguous."
+    n = idx.size
+    if n > 0 and idx[-1] - idx[0] == n - 1:
+        return slice(int(idx[0]), int(idx[-1]) + 1)
+    return idx
+
+def asofjoin(list1, list2, direction='backward', tolerance=None):
+    """
+    As-of join of two label lists: match each element of `list1` to the
+    nearest element of `list2`.
+    
+    The joined label is `list1`. Each element of `list1` is matched to the
+    last element of `list2` that is less than or equal to it ('backward'),
+    to the first element that is greater than or equal to it ('forward'),
+    or to the closest element ('nearest'). An exact match is always used
+    when there is one. This is the join used to align irregularly spaced
+    labels, such as tick times, to a reference label.
+    
+    Parameters
+    ----------
+    list1 : {list, Typedlabel}
+        The label list to match (the joined label).
+    list2 : {list, Typedlabel}
+        The label list to match against. Its elements must be unique and
+        comparable to those of `list1`; it need not be sorted.
+    direction : {'backward', 'forward', 'nearest'}, optional
+        Which element of `list2` to match. The default is 'backward'. Ties
+        of 'nearest' go to the smaller (earlier) element.
+    tolerance : {None, scalar, datetime.timedelta}, optional
+        Maximum distance between matched elements. Elements of `list1` with
+        no element of `list2` within `tolerance` are unmatched. By default
+        (None) there is no maximum. For datetime.date labels give a
+        datetime.timedelta (or a number of days).
+        
+    Returns
+    -------
+    list3 : {list, Typedlabel}
+        A copy of `list1`.
+    idx1 : None
+        `list3` equals `list1`, so no mapping is needed.
+    idx1_miss : list
+        Always empty.
+    idx2 : {slice, ndarray}
+        Index that maps `list2` onto `list3`. For unmatched elements of
+        `list3` the index value is 0.
+    idx2_miss : {list, ndarray}
+        Positions in `list3` of the unmatched elements.
+        
+    See Also
+    --------
+    la.flabel.listjoin: Join two label lists and return the index maps
+                        that align them.
+        
+    Notes
+    -----
+    The elements of `list2` are sorted (unless already sorted) and every
+    element of `list1` is located with a single vectorized binary search
+    (np.searchsorted), so the join is O(n log m) for lists of length n and
+    m. Lists of mixed or unsupported element types are searched with the
+    bisect module instead.
+    
+    Examples
+    --------
+    >>> list3, idx1, idx1_miss, idx2, idx2_miss = asofjoin([1, 5, 9], [2, 4, 6])
+    >>> idx2
+    array([0, 1, 2])
+    >>> idx2_miss
+    array([0])
+    >>> ign, ign, ign, idx2, idx2_miss = asofjoin([1, 5, 9], [2, 4, 6],
+    ...                                           direction='forward')
+    >>> idx2
+    array([0, 2, 0])
+    >>> idx2_miss
+    array([2])
+    
+    """
+    if direction not in ('backward', 'forward', 'nearest'):
+        raise ValueError, 'direction not recognized'
+    if tolerance is not None and tolerance < type(tolerance)():
+        raise ValueError, '`tolerance` must be non-negative'
+    n2 = len(list2)
+    keys1 = _labelkeys(list1)
+    keys2 = _labelkeys(list2)
+    if len(list1) == 0:
+        idx2, idx2_miss = np.zeros(0, dtype=np.intp), []
+    elif n2 == 0:
+        idx2 = np.zeros(len(list1), dtype=np.intp)
+        idx2_miss = np.arange(len(list1))
+    elif (keys1 is None or keys2 is None or (keys1[0] is not keys2[0] and
+          (keys1[0], keys2[0]) not in _asofnumeric)):
+        idx2, idx2_miss = _asofbisect(list1, list2, direction, tolerance)
+    else:
+        idx2, idx2_miss = _asofsearch(keys1[1], keys2[1], direction,
+                                      tolerance)
+    if len(idx2_miss) == 0 and _isincreasing(idx2):
+        idx2 = _asslice(idx2)
+    return labelcopy(list1), None, [], idx2, idx2_miss
+    
+_asofnumeric = set([(int, float), (float, int)])
+    
+def _asofsearch(k1, k2, direction, tolerance):
+    "asofjoin of two typed arrays of the same kind with np.searchsorted."
+    order = None
+    if not _isincreasing(k2):
+        order = k2.argsort(kind='mergesort')
+        k2 = k2[order]
+        if not _isincreasing(k2):
+            raise ValueError, 'Elements of `list2` must be unique.'
+    if direction == 'backward':
+        pos = np.searchsorted(k2, k1, side='right') - 1
+        found = pos >= 0
+    elif direction == 'forward':
+        pos = np.searchsorted(k2, k1, side='left')
+        found = pos < k2.size
+    else:
+        if k1.dtype.kind in 'SU':
+            raise TypeError, "'nearest' is not defined for str labels"
+        pos = np.searchsorted(k2, k1, side='right') - 1
+        after = np.minimum(pos + 1, k2.size - 1)
+        before = np.maximum(pos, 0)
+        dist1 = k1 - k2[before]
+        dist2 = k2[after] - k1
+        pos = np.where((pos < 0) | (dist2 < dist1), after, before)
+        found = np.ones(k1.size, dtype=np.bool_)
+    pos = np.clip(pos, 0, k2.size - 1)
+    if tolerance is not None:
+        if k1.dtype.kind in 'SU':
+            raise TypeError, '`tolerance` is not defined for str labels'
+        if k1.dtype.kind == 'M':
+            if isinstance(tolerance, datetime.timedelta):
+                tolerance = tolerance.days
+            tolerance = np.timedelta64(int(tolerance), 'D')
+        dist = k1 - k2[pos]
+        found &= (dist <= tolerance) & (-dist <= tolerance)
+    if order is not None:
+        pos = order[pos]
+    if found.all():
+        return pos, []
+    pos[~found] = 0
+    return pos, (~found).nonzero()[0]
+    
+def _asofbisect(list1, list2, direction, tolerance):
+    "asofjoin of untyped label lists with the bisect module."
+    order = sorted(xrange(len(list2)), key=list2.__getitem__)
+    s2 = [list2[i] for i in order]
+    n2 = len(s2)
+    idx2 = np.zeros(len(list1), dtype=np.intp)
+    miss = []
+    for i, name in enumerate(list1):
+        j = bisect_right(s2, name) - 1
+        if direction == 'forward':
+            if j < 0 or s2[j] != name:
+                j += 1
+        elif direction == 'nearest':
+            if j < 0 or (j + 1 < n2 and s2[j + 1] - name < name - s2[j]):
+                j += 1
+        if j < 0 or j >= n2:
+            miss.append(i)
+        elif tolerance is not None and abs(name - s2[j]) > tolerance:
+            miss.append(i)
+        else:
+            idx2[i] = order[j]
+    return idx2, miss
+
+def windowstart(label, window):
+    """
+    First position of the moving window of each label, for a window that
+    spans a length of time over date or datetime labels.
+
+    The window of label t holds the labels in (t - window, t]. Its output
+    is NaN (the start is -1) if the window reaches back past the first
+    label, that is, if it could hold a label earlier than the first one;
+    so for daily labels without gaps a window of n days is the same as a
+    window of n elements. The labels may be irregularly spaced, so the
+    number of elements in a window varies.
+
+    Parameters
+    ----------
+    label : {list, Typedlabel}
+        A label list of datetime.date or datetime.datetime elements; it
+        must be increasing.
+    window : {datetime.timedelta, numpy.timedelta64}
+        The length of time spanned by the window; must be positive.
+
+    Returns
+    -------
+    start : ndarray
+        The position in `label` of the first element of the window of each
+        label, -1 for an incomplete window. It can be given as the `window`
+        of the moving window functions of la.farray.
+
+    Notes
+    -----
+    All the window starts are found with one vectorized binary search
+    (np.searchsorted) of the labels.
+
+    Examples
+    --------
+    >>> from datetime import date, timedelta
+    >>> dates = [date(2010, 1, d) for d in (1, 2, 4, 5, 8)]
+    >>> windowstart(dates, timedelta(3))
+    array([-1, -1,  1,  2,  4])
+
+    """
+    if isinstance(window, datetime.timedelta):
+        window = np.timedelta64(window)
+    elif not isinstance(window, np.timedelta64):
+        raise TypeError, '`window` must be a datetime.timedelta'
+    window = window.astype('m8[us]')
+    if window <= np.timedelta64(0, 'us'):
+        raise ValueError, '`window` must be positive'
+    if type(label) is Typedlabel:
+        keys = label.x
+    elif len(label) == 0:
+        return np.zeros(0, dtype=np.intp)
+    else:
+        types = set(map(type, label))
+        if types == set([datetime.date]):
+            keys = _datearray(label)
+        elif types == set([datetime.datetime]):
+            keys = np.array(label, dtype='M8[us]')
+        else:
+            keys = np.zeros(0)
+    if keys.dtype.kind != 'M':
+        raise TypeError, 'A time `window` needs date or datetime labels.'
+    if keys.size == 0:
+        return np.zeros(0, dtype=np.intp)
+    # Resolution of the labels: the window of t reaches back past the first
+    # label if a label one step before the first one would be in it
+    step = np.timedelta64(1, np.datetime_data(keys.dtype)[0])
+    keys = keys.astype('M8[us]')
+    if not _isincreasing(keys):
+        raise ValueError, 'Labels must be increasing.'
+    lo = keys - window
+    start = np.searchsorted(keys, lo, side='right')
+    start[lo < keys[0] - step] = -1
+    return start
+
+def takeaxis(arr, idx, axis):
+    """
+    Take elements along `axis` using an index returned by listjoin.
+    
+    Parameters
+    ----------
+    arr : ndarray
+        Input array.
+    idx : {None, slice, list, ndarray}
+        Index as returned by listjoin. None returns `arr` itself; a slice
+        returns a view; an integer index returns a copy.
+    axis : int
+        The axis along which to take elements.
+        
+    Returns
+    -------
+    out : ndarray
+        The selected elements.
+    isview : bool
+        True if `out` is `arr` or a view of it; False if `out` is a copy.
+    
+    """
+    if idx is None:
+        return arr, True
+    if type(idx) is slice:
+        index = [slice(None)] * arr.ndim
+        index[axis] = idx
+        return arr[tuple(index)], True
+    return arr.take(idx, axis), False
+
+# Label index ----------------------------------------------------------------
+
+class Labelindex(object):
+    """
+    Hashed index of a label list for fast label-to-position lookups.
+    
+    A Labelindex maps each element of a label list to its position along the
+    axis. Looking up a label element is O(1) instead of the O(n) linear scan
+    of `list.index`.
+    
+    The index keeps a reference to the label list it was built from. Every
+    lookup is verified against that list (label[idx] == name), so label
+    elements that were moved, or a list whose length changed, are detected
+    and the index is rebuilt. A name that is not in the index of a list of
+    unchanged length is a miss (ValueError) without a rebuild; call
+    `rebuild` after writing new elements into the list in place.
+    
+    Parameters
+    ----------
+    label : list
+        The label list (label elements must be hashable and unique) to index.
+        
+    Examples
+    --------
+    >>> idx = Labelindex(['a', 'b', 'c'])
+    >>> idx.index('c')
+    2
+    >>> idx.indices(['c', 'a'])
+    [2, 0]
+    
+    """
+    
+    def __init__(self, label):
+        self.label = label
+        self.rebuild()
+        
+    def rebuild(self):
+        "Rebuild the index from the (possibly modified) label list."
+        label = self.label
+        self.n = len(label)
+        # Insert in reverse so that, as with list.index, the first occurrence
+        # of a (non-unique) label element wins
+        self.map = dict(izip(reversed(label), xrange(self.n - 1, -1, -1)))
+
+    def isvalid(self, label):
+        "True if the index was built from `label` (and its length is intact)."
+        return (label is self.label) and (len(label) == self.n)
+
+    def index(self, name):
+        """
+        Index of label element `name`; raises ValueError if not found.
+        
+        Drop-in replacement for `list.index`.
+        
+        """
+        try:
+            idx = self.map[name]
+        except KeyError:
+            if len(self.label) == self.n:
+                raise ValueError, '%s is not in label' % repr(name)
+        except TypeError:
+            raise ValueError, '%s is not in label' % repr(name)
+        else:
+            try:
+                if self.label[idx] == name:
+                    return idx
+            except IndexError:
+                pass
+        # Stale index (label changed in place): rebuild and retry
+        self.rebuild()
+        try:
+            return self.map[name]
+        except (KeyError, TypeError):
+            raise ValueError, '%s is not in label' % repr(name)
+            
+    def indices(self, names):
+        """
+        Indices of a sequence of label elements; raises ValueError on a miss.
+        
+        The lookup is done in a single C-level pass over `names` (map over the
+        hash table) followed by a single C-level verification pass.
+        
+        """
+        names = list(names)
+        if len(names) == 0:
+            return []
+        try:
+            idx = map(self.map.__getitem__, names)
+        except KeyError:
+            if len(self.label) == self.n:
+                raise ValueError, 'Could not map label to index value.'
+        except TypeError:
+            raise ValueError, 'Could not map label to index value.'
+        else:
+            try:
+                if self._verify(idx, names):
+                    return idx
+            except IndexError:
+                pass
+        # Stale index (label changed in place): rebuild and retry
+        self.rebuild()
+        try:
+            return map(self.map.__getitem__, names)
+        except (KeyError, TypeError):
+            raise ValueError, 'Could not map label to index value.'
+            
+    def _verify(self, idx, names):
+        "Check that label[idx] is names; cheap guard against stale index."
+        if len(idx) == 1:
+            return self.label[idx[0]] == names[0]
+        return list(itemgetter(*idx)(self.label)) == names                
+
+# Typed label ----------------------------------------------------------------
+
+_typedkinds = {'i': int, 'M': datetime.date, 'S': str, 'U': unicode}
+
+class Typedlabel(object):
+    """
+    Label list of one axis stored as a typed 1d Numpy array.
+    
+    A Typedlabel stores int labels as int64, datetime.date labels as
+    datetime64[D], and str and unicode labels as fixed-width bytes and
+    unicode. That takes 5 to 10 times less memory than a list of Python
+    objects, and label operations on larrys (indexing, take, alignment,
+    sortaxis, union, intersection) run as vectorized array operations.
+    
+    A Typedlabel has the list API: elements are returned as Python objects
+    (int, datetime.date, str, unicode), it compares equal to a list with the
+    same elements, and it can be used in place of a list in the label of a
+    larry. In addition, like an array, it can be indexed with a sequence of
+    integers or with a bool array, which returns a Typedlabel.
+    
+    Parameters
+    ----------
+    label : {list, ndarray, Typedlabel}
+        The label elements. All elements of a list must be int (or long),
+        all datetime.date, all str, or all unicode. An array of dtype int,
+        datetime64, bytes, or unicode is used without a copy (unless it must
+        be cast to int64 or datetime64[D]).
+    unique : bool, optional
+        Set to True if the elements are known to be unique, which skips the
+        uniqueness check when the label is used in a larry. Default is
+        False.
+        
+    Raises
+    ------
+    TypeError
+        If `label` cannot be stored as a typed array.
+        
+    Notes
+    -----
+    Elements are only compared with values of the same type, so, for
+    example, 1.0 is not found in a Typedlabel of ints. Methods that change
+    the length of the label, such as append and insert, copy the array.
+    
+    Whether the elements are unique is remembered once checked (or given)
+    and is carried over to slices, copies, and sorted labels, as well as
+    to joined labels (la.flabel.listjoin); any change to the label, or to
+    the array `x`, drops it.
+        
+    Examples
+    --------
+    >>> import datetime
+    >>> lab = Typedlabel([datetime.date(2010, 1, 1), datetime.date(2010, 1, 4)])
+    >>> lab[1]
+    datetime.date(2010, 1, 4)
+    >>> lab == [datetime.date(2010, 1, 1), datetime.date(2010, 1, 4)]
+    True
+    >>> lab.x
+    array(['2010-01-01', '2010-01-04'], dtype='datetime64[D]')
+    >>> y = larry([1, 2], [lab])
+    
+    """
+    
+    def __init__(self, label, unique=False):
+        self.x = _typedarray(label)
+        # The array x when its elements are known to be unique
+        self._unique = self.x if unique else None
+        
+    # List API ---------------------------------------------------------------
+        
+    def __len__(self):
+        return self.x.shape[0]
+        
+    def __iter__(self):
+        return iter(self.x.tolist())
+        
+    def __reversed__(self):
+        return iter(self.x[::-1].tolist())
+        
+    def __getitem__(self, index):
+        if isinstance(index, (int, long, np.integer)):
+            return self.x[index].item()
+        unique = self._unique is self.x
+        if type(index) is slice:
+            return Typedlabel(self.x[index].copy(), unique)
+        index = np.asarray(index)
+        if index.size == 0:
+            index = index.astype(np.intp)
+        unique = unique and index.dtype.type == np.bool_
+        return Typedlabel(self.x[index], unique)
+        
+    def __setitem__(self, index, value):
+        if type(index) is slice:
+            label = self.tolist()
+            label[index] = value
+            self.x = _typedarray(label, self.x.dtype)
+        else:
+            value = self._scalar(value)
+            self.x[index] = value
+            self._unique = None
+            
+    def __delitem__(self, index):
+        if isinstance(index, (int, long, np.integer)):
+            n = len(self)
+            if (index >= n) or (index < -n):
+                raise IndexError, 'list assignment index out of range'
+        self.x = np.delete(self.x, index)
+        
+    def __contains__(self, value):
+        try:
+            value = self._scalar(value)
+        except TypeError:
+            return False
+        return bool((self.x == value).any())
+        
+    def __eq__(self, other):
+        if type(other) is Typedlabel:
+            if self.x.dtype.kind != other.x.dtype.kind:
+                return False
+            if self.x.shape != other.x.shape:
+                return False
+            return bool((self.x == other.x).all())
+        if type(other) is list:
+            return self.tolist() == other
+        return False
+        
+    def __ne__(self, other):
+        return not self.__eq__(other)
+        
+    __hash__ = None
+        
+    def __add__(self, other):
+        label = self.copy()
+        label.extend(other)
+        return label
+        
+    def __radd__(self, other):
+        label = Typedlabel(other)
+        label.extend(self)
+        return label
+        
+    def __repr__(self):
+        return 'Typedlabel(%s)' % repr(self.tolist())
+        
+    def __copy__(self):
+        return self.copy()
+        
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    def append(self, value):
+        "Append `value` to the end of the label."
+        self.insert(len(self), value)
+        
+    def extend(self, label):
+        "Extend the label with the elements of a list or Typedlabel."
+        if type(label) is not Typedlabel:
+            label = list(label)
+            if len(label) == 0:
+                return
+            label = Typedlabel(label)
+        if len(label) == 0:
+            return
+        if label.x.dtype.kind != self.x.dtype.kind:
+            if len(self) > 0:
+                raise TypeError, 'Elements of a Typedlabel must be of one type'
+            self.x = label.x.copy()
+        else:
+            self.x = np.concatenate((self.x, label.x))
+        
+    def insert(self, index, value):
+        "Insert `value` before position `index`."
+        if len(self) == 0:
+            self.x = _typedarray([value])
+            return
+        value = self._scalar(value)
+        n = len(self)
+        if index < 0:
+            index = max(0, n + index)
+        index = min(index, n)
+        self.x = np.insert(self.x, index, value)
+        
+    def pop(self, index=-1):
+        "Remove and return the element at `index` (default last)."
+        if len(self) == 0:
+            raise IndexError, 'pop from empty list'
+        value = self[index]
+        del self[index]
+        return value
+        
+    def remove(self, value):
+        "Remove the first occurrence of `value`."
+        del self[self.index(value)]
+        
+    def index(self, value):
+        "Index of the first occurrence of `value`; ValueError if not found."
+        try:
+            idx = np.flatnonzero(self.x == self._scalar(value))
+        except TypeError:
+            idx = []
+        if len(idx) == 0:
+            raise ValueError, '%s is not in list' % repr(value)
+        return int(idx[0])
+        
+    def count(self, value):
+        "Number of occurrences of `value`."
+        try:
+            return int((self.x == self._scalar(value)).sum())
+        except TypeError:
+            return 0
+        
+    def reverse(self):
+        "Reverse the label in place."
+        unique = self._unique is self.x
+        self.x = self.x[::-1].copy()
+        if unique:
+            self._unique = self.x
+        
+    def sort(self, cmp=None, key=None, reverse=False):
+        "Sort the label in place."
+        unique = self._unique is self.x
+        if (cmp is not None) or (key is not None):
+            label = self.tolist()
+            label.sort(cmp, key, reverse)
+            self.x = _typedarray(label, self.x.dtype)
+        else:
+            self.x = np.sort(self.x, kind='mergesort')
+            if reverse:
+                self.x = self.x[::-1].copy()
+        if unique:
+            self._unique = self.x
+                
+    # Typed methods ----------------------------------------------------------
+            
+    def tolist(self):
+        "The label as a list of Python objects."
+        return self.x.tolist()
+
+    def copy(self):
+        "A copy of the label."
+        return Typedlabel(self.x.copy(), self._unique is self.x)
+        
+    def isunique(self):
+        "True if the label elements are unique; False otherwise."
+        if self._unique is not self.x:
+            x = self.x
+            if x.dtype.kind in ('i', 'M'):
+                unique = uniquearray(x.view(np.int64))
+            else:
+                x = np.sort(x)
+                unique = not (x[1:] == x[:-1]).any()
+            if not unique:
+                return False
+            self._unique = self.x
+        return True
+        
+    def argsort(self):
+        "Indices that sort the label (stable sort)."
+        return self.x.argsort(kind='mergesort')
+        
+    def mask(self, op, value):
+        """
+        Bool array marking the elements that satisfy: element `op` `value`.
+        
+        `op` can be '==', '>', '<', '>=', '<=', '!=', 'in', 'not in'. For
+        'in' and 'not in' `value` is a sequence.
+        
+        """
+        if op in ('in', 'not in'):
+            value = _typedarray(list(value))
+            mask = np.in1d(self.x, value)
+            if op == 'not in':
+                mask = ~mask
+            return mask
+        try:
+            func = _ops[op]
+        except KeyError:
+            raise ValueError, 'Unknown op'
+        return func(self.x, self._scalar(value))
+        
+    @property
+    def nbytes(self):
+        "Number of bytes used by the label elements."
+        return self.x.nbytes
+        
+    def _scalar(self, value):
+        "Convert `value` for use with the array; TypeError if wrong type."
+        kind = self.x.dtype.kind
+        typ = _typedkinds[kind]
+        if kind == 'i':
+            if not isinstance(value, (int, long, np.integer)):
+                raise TypeError, 'Typedlabel elements are ints'
+            if type(value) is bool:
+                raise TypeError, 'Typedlabel elements are ints'
+        elif type(value) is not typ:
+            raise TypeError, 'Typedlabel elements are of type %s' % typ
+        if kind == 'M':
+            return np.datetime64(value, 'D')
+        if kind in ('S', 'U'):
+            # Widen the fixed-width array so that `value` is not truncated
+            width = self.x.dtype.itemsize // np.dtype(kind + '1').itemsize
+            if len(value) > width:
+                self.x = self.x.astype('%s%d' % (kind, len(value)))
+        return value
+
+_ops = {'==': np.equal, '!=': np.not_equal, '>': np.greater,
+        '<': np.less, '>=': np.greater_equal, '<=': np.less_equal}
+
+def _typedarray(label, dtype=None):
+    """
+    Typed 1d array of label elements; raise TypeError if not possible.
+    
+    `dtype`, if given, is used for an empty `label`.
+    
+    """
+    if type(label) is Typedlabel:
+        return label.x.copy()
+    if type(label) is np.ndarray:
+        if label.ndim != 1:
+            raise TypeError, 'label array must be 1d'
+        kind = label.dtype.kind
+        if kind in ('i', 'u'):
+            return label.astype(np.int64, copy=False)
+        elif kind == 'M':
+            return label.astype('M8[D]', copy=False)
+        elif kind in ('S', 'U'):
+            return label
+        raise TypeError, 'label array must be int, datetime, or string'
+    label = list(label)
+    if len(label) == 0:
+        if dtype is None:
+            dtype = np.int64
+        return np.zeros(0, dtype=dtype)
+    types = set(map(type, label))
+    if types <= set([int, long]):
+        try:
+            return np.array(label, dtype=np.int64)
+        except OverflowError:
+            raise TypeError, 'int label elements must fit in int64'
+    if len(types) != 1:
+        msg = 'Elements of a Typedlabel must be of the same type.'
+        raise TypeError, msg
+    typ = types.pop()
+    if typ is datetime.date:
+        return _datearray(label)
+    elif typ in (str, unicode):
+        return np.array(label)
+    msg = 'Typedlabel elements must be int, datetime.date, str, or unicode.'
+    raise TypeError, msg
+    
+def labelcopy(label):
+    "Copy of a label list (a list or a Typedlabel) of the same type."
+    if type(label) is Typedlabel:
+        return label.copy()
+    return list(label)
+    
+def labeltake(label, index):
+    """
+    Elements of a label list at the positions in `index`.
+    
+    `index` is a sequence of integers or a bool array. A Typedlabel returns
+    a Typedlabel (a vectorized take); a list returns a list.
+    
+    """
+    if type(label) is Typedlabel:
+        return label[index]
+    if type(index) is np.ndarray and index.dtype.type == np.bool_:
+        index = index.nonzero()[0]
+    return [label[i] for i in index]
+
 def flattenlabel(label, order='C'):
     """
     Flatten label in row-major order 'C' (default) or column-major order 'F'.
@@ -1,16 +1,20 @@
 "Functions that operate on larrys."
 
+from itertools import izip, imap, repeat
+
 import numpy as np
 
 from la.deflarry import larry
-from la.flabel import flattenlabel, listmap, listmap_fill
+from la.flabel import (flattenlabel, listjoin, asofjoin, takeaxis,
+                       Typedlabel, labelcopy, maparray)
 from la.farray import covMissing
 from la.missing import missing_marker, ismissing
 
 
 # Alignment -----------------------------------------------------------------
 
-def align(lar1, lar2, join='inner', cast=True):    
+def align(lar1, lar2, join='inner', cast=True, direction='backward',
+          tolerance=None):
     """
     Align two larrys using one of five join methods.
     
@@ -22,13 +26,15 @@ def align(lar1, lar2, join='inner', cast=True):
     lar2 : larry
         One of the input larrys. Must have the same number of dimensions as
         `lar1`.
-    join : {'inner', 'outer', 'left', 'right', list}, optional
+    join : {'inner', 'outer', 'left', 'right', 'asof', list}, optional
         The join method used to align the two larrys. The default join method
-        along each axis is 'inner', i.e., the intersection of the labels. If
-        `join` is a list of strings then the length of the list should be the 
-        same as the number of dimensions of the two larrys. The first element
-        in the list is the join method for axis=0, the second element is the
-        join method for axis=1, and so on.
+        along each axis is 'inner', i.e., the intersection of the labels. An
+        'asof' join keeps the label of `lar1` and matches each of its
+        elements to the nearest label element of `lar2`; see `direction`.
+        If `join` is a list of strings then the length of the list should be
+        the same as the number of dimensions of the two larrys. The first
+        element in the list is the join method for axis=0, the second element
+        is the join method for axis=1, and so on.
     cast : bool, optional
         Only float, str, and object dtypes have missing value markers (la.nan,
         '', and None, respectively). Other dtypes, such as int and bool, do
@@ -38,6 +44,16 @@ def align(lar1, lar2, join='inner', cast=True):
         TypeError will be raised for int and bool dtype input if the join
         introduces new rows, columns, etc. An inner join will never introduce
         new rows, columns, etc.
+    direction : {'backward', 'forward', 'nearest'}, optional
+        Only used along axes with an 'asof' join. Each label element of `lar1`
+        is matched to the last label element of `lar2` that is less than or
+        equal to it ('backward', default), to the first that is greater than
+        or equal to it ('forward'), or to the closest ('nearest').
+    tolerance : {None, scalar, datetime.timedelta}, optional
+        Only used along axes with an 'asof' join. The maximum distance between
+        matched label elements. Elements of `lar1` with no match within
+        `tolerance` get missing values in the aligned `lar2`. The default
+        (None) is no maximum.
         
     Returns
     -------
@@ -86,21 +102,37 @@ def align(lar1, lar2, join='inner', cast=True):
         1
         2
     x
-    array([1, 2, 3])                              
+    array([1, 2, 3])
+    
+    An as-of join matches each label element of lar1 to the nearest earlier
+    label element of lar2:
+    
+    >>> lar1 = larry([1, 2, 3], [[10, 20, 30]])
+    >>> lar2 = larry([4, 5], [[15, 28]])
+    >>> lar3, lar4 = la.align(lar1, lar2, join='asof')
+    >>> lar4
+    label_0
+        10
+        20
+        30
+    x
+    array([ NaN,   4.,   5.])
 
     """
     x1, x2, label, x1isview, x2isview = align_raw(lar1, lar2, join=join,
-                                                   cast=cast)
+                                                   cast=cast,
+                                                   direction=direction,
+                                                   tolerance=tolerance)
     if x1isview:    
         x1 = x1.copy()
-    lar3 = larry(x1, label, integrity=False)        
-    label = [list(lab) for lab in label]
+    lar3 = larry._trusted(x1, label, shared=True)
     if x2isview:    
         x2 = x2.copy()
-    lar4 = larry(x2, label, integrity=False)    
+    lar4 = larry._trusted(x2, list(label), shared=True)
     return lar3, lar4
 
-def align_raw(lar1, lar2, join='inner', cast=True):    
+def align_raw(lar1, lar2, join='inner', cast=True, direction='backward',
+              tolerance=None):
     """
     Align two larrys but return Numpy arrays and label instead of larrys.
     
@@ -117,13 +149,15 @@ def align_raw(lar1, lar2, join='inner', cast=True):
     lar2 : larry
         One of the input larrys. Must have the same number of dimensions as
         `lar1`.
-    join : {'inner', 'outer', 'left', 'right', list}, optional
+    join : {'inner', 'outer', 'left', 'right', 'asof', list}, optional
         The join method used to align the two larrys. The default join method
-        along each axis is 'inner', i.e., the intersection of the labels. If
-        `join` is a list of strings then the length of the list should be the 
-        same as the number of dimensions of the two larrys. The first element
-        in the list is the join method for axis=0, the second element is the
-        join method for axis=1, and so on.
+        along each axis is 'inner', i.e., the intersection of the labels. An
+        'asof' join keeps the label of `lar1` and matches each of its
+        elements to the nearest label element of `lar2`; see `direction`.
+        If `join` is a list of strings then the length of the list should be
+        the same as the number of dimensions of the two larrys. The first
+        element in the list is the join method for axis=0, the second element
+        is the join method for axis=1, and so on.
     cast : bool, optional
         Only float, str, and object dtypes have missing value markers (la.nan,
         '', and None, respectively). Other dtypes, such as int and bool, do
@@ -133,6 +167,16 @@ def align_raw(lar1, lar2, join='inner', cast=True):
         TypeError will be raised for int and bool dtype input if the join
         introduces new rows, columns, etc. An inner join will never introduce
         new rows, columns, etc.
+    direction : {'backward', 'forward', 'nearest'}, optional
+        Only used along axes with an 'asof' join. Each label element of `lar1`
+        is matched to the last label element of `lar2` that is less than or
+        equal to it ('backward', default), to the first that is greater than
+        or equal to it ('forward'), or to the closest ('nearest').
+    tolerance : {None, scalar, datetime.timedelta}, optional
+        Only used along axes with an 'asof' join. The maximum distance between
+        matched label elements. Elements of `lar1` with no match within
+        `tolerance` get missing values in the aligned `lar2`. The default
+        (None) is no maximum.
         
     Returns
     -------
@@ -143,13 +187,9 @@ def align_raw(lar1, lar2, join='inner', cast=True):
     label : list of lists
         The label of the joined larrys.
     x1isview : bool
-        True if x1 is a view of lar1.x; False otherwise. A view of lar1.x is
-        retuned if the labels of `lar1` and `lar2` are the same along all
-        axes; otherwise a copy is returned.
+        True if x1 is a view of lar1.x; False otherwise. See Notes.
     x2isview : bool           
-        True if x2 is a view of lar2.x; False otherwise.  A view of lar2.x is
-        retuned if the labels of `lar1` and `lar2` are the same along all
-        axes; otherwise a copy is returned.
+        True if x2 is a view of lar2.x; False otherwise. See Notes.
         
     See Also
     --------
@@ -158,8 +198,15 @@ def align_raw(lar1, lar2, join='inner', cast=True):
     Notes
     -----
     The returned Numpy arrays are views of the corresponding input larrys if
-    the labels of the two input larrys are the same along all axes. If the
-    labels are not the same along any axis then a copy is returned.     
+    the labels of the two input larrys are the same along all axes. A view is
+    also returned if, along every axis, the joined label is a contiguous
+    block of the input label (for example, a date range that is a subset of
+    a longer date range). Otherwise a copy is returned.
+    
+    Sorted labels (such as dates) are aligned with a vectorized merge
+    instead of set operations and a sort; see la.flabel.listjoin.
+    The as-of join is done with a binary search (np.searchsorted) of the
+    sorted label of `lar2`; see la.flabel.asofjoin.
        
     Examples
     --------
@@ -237,107 +284,47 @@ def align_raw(lar1, lar2, join='inner', cast=True):
     label = []
     x1 = lar1.x
     x2 = lar2.x
-    label1 = lar1.label
-    label2 = lar2.label
+    label1 = lar1._frozenlabel()
+    label2 = lar2._frozenlabel()
     x1isview = True
     x2isview = True
     
     # Loop: align one axis at a time 
     msg = "`fill` type not compatible with larry dtype"     
-    for ax in range(ndim):    
-        list1 = label1[ax]
-        list2 = label2[ax]
-        joinax = join[ax]        
-        if joinax == 'inner':
-            if list1 == list2:
-                list3 = list(list1)
-            else:
-                list3 = list(set(list1) & (set(list2)))
-                list3.sort()
-                idx1 = listmap(list1, list3)
-                idx2 = listmap(list2, list3)
-                x1 = x1.take(idx1, ax)
-                x2 = x2.take(idx2, ax)
-                x1isview = False
-                x2isview = False   
-        elif joinax == 'outer':
-            if list1 == list2:
-                list3 = list(list1)
-            else:                 
-                list3 = list(set(list1) | (set(list2)))
-                list3.sort()
-                idx1, idx1_miss = listmap_fill(list1, list3, fill=0)
-                idx2, idx2_miss = listmap_fill(list2, list3, fill=0)
-                x1 = x1.take(idx1, ax)
-                x2 = x2.take(idx2, ax) 
-                if len(idx1_miss) > 0:
-                    if miss1 == undefined:
-                        miss1 = missing_marker(lar1)
-                    if miss1 == NotImplemented:
-                        if cast:
-                            x1 = x1.astype(float)
-                            miss1 = missing_marker(x1)   
-                        else:                         
-                            raise TypeError, msg
-                    index1 = [slice(None)] * ndim
-                    index1[ax] = idx1_miss      
-                    x1[index1] = miss1                                        
-                if len(idx2_miss) > 0:
-                    if miss2 == undefined:
-                        miss2 = missing_marker(lar2)
-                    if miss2 == NotImplemented:
-                        if cast:
-                            x2 = x2.astype(float)
-                            miss2 = missing_marker(x2)   
-                        else:
-                            raise TypeError, msg
-                    index2 = [slice(None)] * ndim
-                    index2[ax] = idx2_miss                             
-                    x2[index2] = miss2
-                x1isview = False
-                x2isview = False                     
-        elif joinax == 'left':
-            list3 = list(list1)
-            if list1 != list2:
-                idx2, idx2_miss = listmap_fill(list2, list3, fill=0)
-                x2 = x2.take(idx2, ax) 
-                if len(idx2_miss) > 0:
-                    if miss2 == undefined:
-                        miss2 = missing_marker(lar2)
-                    if miss2 == NotImplemented:
-                        if miss2 is None:
-                            miss2 = missing_marker(lar2)
-                        if miss2 is None:
-                            miss2 = missing_marker(lar2)
-                        if cast:
-                            x2 = x2.astype(float)
-                            miss2 = missing_marker(x2)   
-                        else:
-                            raise TypeError, msg
-                    index2 = [slice(None)] * ndim
-                    index2[ax] = idx2_miss        
-                    x2[index2] = miss2
-                x2isview = False                    
-        elif joinax == 'right':
-            list3 = list(list2)
-            if list1 != list2:            
-                idx1, idx1_miss = listmap_fill(list1, list3, fill=0)
-                x1 = x1.take(idx1, ax) 
-                if len(idx1_miss) > 0:
-                    if miss1 == undefined:
-                        miss1 = missing_marker(lar1)
-                    if miss1 == NotImplemented:
-                        if cast:
-                            x1 = x1.astype(float)
-                            miss1 = missing_marker(x1)   
-                        else:
-                            raise TypeError, msg
-                    index1 = [slice(None)] * ndim
-                    index1[ax] = idx1_miss                            
-                    x1[index1] = miss1 
-                x1isview = False                                 
+    for ax in range(ndim):
+        if join[ax] == 'asof':
+            plan = asofjoin(label1[ax], label2[ax], direction, tolerance)
         else:
-            raise ValueError, 'join type not recognized'  
+            plan = listjoin(label1[ax], label2[ax], join[ax], frozen=True)
+        list3, idx1, idx1_miss, idx2, idx2_miss = plan
+        x1, isview = takeaxis(x1, idx1, ax)
+        x1isview = x1isview and isview
+        x2, isview = takeaxis(x2, idx2, ax)
+        x2isview = x2isview and isview
+        if len(idx1_miss) > 0:
+            if miss1 == undefined:
+                miss1 = missing_marker(lar1)
+            if miss1 == NotImplemented:
+                if cast:
+                    x1 = x1.astype(float)
+                    miss1 = missing_marker(x1)   
+                else:
+                    raise TypeError, msg
+            index1 = [slice(None)] * ndim
+            index1[ax] = idx1_miss                            
+            x1[index1] = miss1 
+        if len(idx2_miss) > 0:
+            if miss2 == undefined:
+                miss2 = missing_marker(lar2)
+            if miss2 == NotImplemented:
+                if cast:
+                    x2 = x2.astype(float)
+                    miss2 = missing_marker(x2)   
+                else:
+                    raise TypeError, msg
+            index2 = [slice(None)] * ndim
+            index2[ax] = idx2_miss        
+            x2[index2] = miss2
         label.append(list3)
     
     return x1, x2, label, x1isview, x2isview
@@ -355,8 +342,10 @@ def union(axis, *args):
         
     Returns
     -------
-    out : list
-        A list containing the union of the labels.
+    out : {list, Typedlabel}
+        A list containing the union of the labels. If the labels of all
+        larrys are Typedlabels (of the same type) then the union is computed
+        with array operations and a Typedlabel is returned.
         
     See Also
     --------
@@ -373,15 +362,7 @@ def union(axis, *args):
     ['c', 'd', 'f']
     
     """
-    rc = frozenset([])
-    for arg in args:
-        if isinstance(arg, larry):
-            rc = frozenset(arg.label[axis]) | rc
-        else:
-            raise TypeError, 'One or more input is not a larry'
-    rc = list(rc)
-    rc.sort()
-    return rc
+    return _setjoin(_labels(axis, args), 'outer')
 
 def intersection(axis, *args):
     """
@@ -396,8 +377,11 @@ def intersection(axis, *args):
         
     Returns
     -------
-    out : list
-        A sorted list containing the intersection of the labels.
+    out : {list, Typedlabel}
+        A sorted list containing the intersection of the labels. If the
+        labels of all larrys are Typedlabels (of the same type) then the
+        intersection is computed with array operations and a Typedlabel is
+        returned.
         
     See Also
     --------
@@ -414,21 +398,491 @@ def intersection(axis, *args):
     ['d']
     
     """
-    rc = frozenset(args[0].label[axis])
-    for i in xrange(1, len(args)):
-        arg = args[i]
-        if isinstance(arg, larry):
-            rc = frozenset(arg.label[axis]) & rc
-        else:
+    return _setjoin(_labels(axis, args), 'inner')
+    
+def _labels(axis, args):
+    "Labels along `axis` of the larrys `args`; TypeError if not larrys."
+    labels = []
+    for arg in args:
+        if not isinstance(arg, larry):
             raise TypeError, 'One or more input is not a larry'
+        labels.append(arg._label[axis])
+    return labels
+    
+def _setjoin(labels, join):
+    """
+    Sorted union ('outer') or intersection ('inner') of label lists.
+    
+    If all labels are Typedlabels of one type the join is done with array
+    operations and a Typedlabel is returned.
+    
+    """
+    kinds = set([type(lab) is Typedlabel and lab.x.dtype.kind
+                 for lab in labels])
+    if len(kinds) == 1 and False not in kinds:
+        arrays = [lab.x for lab in labels]
+        if join == 'outer':
+            func = np.union1d
+        else:
+            func = np.intersect1d
+        x = reduce(func, arrays[1:], np.unique(arrays[0]))
+        return Typedlabel(x, unique=True)
+    if len(labels) == 0:
+        return []
+    if join == 'outer':
+        rc = frozenset().union(*labels)
+    else:
+        rc = frozenset(labels[0]).intersection(*labels[1:])
     rc = list(rc)
     rc.sort()
-    return rc    
+    return rc
+
+# N-way alignment -----------------------------------------------------------
+
+def align_many(larrys, join='inner', cast=True):
+    """
+    Align a sequence of larrys using one of four join methods.
+    
+    The joined label along each axis is computed once from the labels of
+    all the larrys and each larry is then taken (indexed) once along each
+    axis. Aligning N larrys this way is faster than aligning them two at a
+    time with N - 1 calls to la.align().
+    
+    Parameters
+    ----------
+    larrys : sequence of larrys
+        The larrys to align. All must have the same number of dimensions.
+    join : {'inner', 'outer', 'left', 'right', list}, optional
+        The join method used to align the larrys. The default join method
+        along each axis is 'inner', i.e., the intersection of the labels of
+        all the larrys; 'outer' is the union, 'left' is the label of the
+        first larry and 'right' the label of the last larry. If `join` is a
+        list of strings then the length of the list should be the same as
+        the number of dimensions of the larrys. The first element in the
+        list is the join method for axis=0, the second element is the join
+        method for axis=1, and so on.
+    cast : bool, optional
+        Only float, str, and object dtypes have missing value markers (la.nan,
+        '', and None, respectively). Other dtypes, such as int and bool, do
+        not have missing value markers. If `cast` is set to True (default)
+        then int and bool dtypes, for example, will be cast to float if any
+        new rows, columns, etc are created. If cast is set to False, then a
+        TypeError will be raised for int and bool dtype input if the join
+        introduces new rows, columns, etc. An inner join will never introduce
+        new rows, columns, etc.
+        
+    Returns
+    -------
+    out : list
+        A list of larrys, copies of the aligned versions of the input
+        larrys, in the order of the input.
+        
+    See Also
+    --------
+    la.align_many_raw: Same as align_many but returns Numpy arrays and label.
+    la.reduce_many: Sum, mean, etc. of a sequence of larrys.
+    la.align: Align two larrys using one of five join methods.
+    
+    Examples
+    --------
+    >>> y1 = larry([1, 2], [['a', 'b']])
+    >>> y2 = larry([3, 4], [['b', 'c']])
+    >>> y3 = larry([5, 6], [['c', 'b']])
+    >>> z1, z2, z3 = la.align_many([y1, y2, y3])
+    >>> z3
+    label_0
+        b
+    x
+    array([6])
+    >>> z1, z2, z3 = la.align_many([y1, y2, y3], join='outer')
+    >>> z1
+    label_0
+        a
+        b
+        c
+    x
+    array([  1.,   2.,  NaN])
+    
+    """
+    xs, label, isviews = align_many_raw(larrys, join=join, cast=cast)
+    out = []
+    for x, isview in izip(xs, isviews):
+        if isview:
+            x = x.copy()
+        out.append(larry._trusted(x, list(label), shared=True))
+    return out
+
+def align_many_raw(larrys, join='inner', cast=True):
+    """
+    Align a sequence of larrys but return Numpy arrays and label.
+    
+    This function is the same as la.align_many() except that instead of
+    returning a list of larrys, the components of the larrys are returned:
+    a list of Numpy arrays, the (common) label, and a list of flags for
+    whether the arrays are views of the data arrays of the input larrys.
+    
+    Parameters
+    ----------
+    larrys : sequence of larrys
+        The larrys to align. All must have the same number of dimensions.
+    join : {'inner', 'outer', 'left', 'right', list}, optional
+        The join method used to align the larrys. See la.align_many().
+    cast : bool, optional
+        Whether to cast dtypes that have no missing value marker (int and
+        bool, for example) to float if the join introduces missing values.
+        See la.align_many().
+        
+    Returns
+    -------
+    xs : list
+        A list of Numpy arrays, the aligned data of the input larrys.
+    label : list
+        The label of the aligned arrays.
+    isviews : list
+        A list of bools. True if the corresponding array in `xs` is a view
+        of the data of the input larry, False if it is a copy.
+        
+    See Also
+    --------
+    la.align_many: Align a sequence of larrys using one of four join
+                   methods.
+    
+    Examples
+    --------
+    >>> y1 = larry([1, 2], [['a', 'b']])
+    >>> y2 = larry([3, 4], [['b', 'c']])
+    >>> xs, label, isviews = la.align_many_raw([y1, y2], join='outer')
+    >>> xs
+    [array([  1.,   2.,  NaN]), array([ NaN,   3.,   4.])]
+    >>> label
+    [['a', 'b', 'c']]
+    >>> isviews
+    [False, False]
+    
+    """
+    larrys = _checkmany(larrys)
+    join = _joinlist(join, larrys[0].ndim)
+    label = []
+    for ax in xrange(larrys[0].ndim):
+        labels = [lar._label[ax] for lar in larrys]
+        label.append(_joinmany(labels, join[ax]))
+    xs, isviews = _alignto(larrys, label, cast)
+    return xs, label, isviews
+    
+def reduce_many(larrys, op='sum', join='inner', skip_missing=False):
+    """
+    Sum, mean, product, minimum, or maximum of a sequence of larrys.
+    
+    The larrys are aligned with the given join method and reduced element
+    by element into one larry. The joined label is computed once and the
+    data of each larry is accumulated directly into the output, so, unlike
+    a chain of binary operations (y1 + y2 + y3 + ...), no intermediate
+    larrys are created.
+    
+    Parameters
+    ----------
+    larrys : sequence of larrys
+        The larrys to reduce. All must have the same number of dimensions and
+        a numeric (or bool) dtype.
+    op : {'sum', 'mean', 'prod', 'min', 'max'}, optional
+        The reduction. The default is 'sum'.
+    join : {'inner', 'outer', 'left', 'right', list}, optional
+        The join method used to align the larrys. The default join method
+        along each axis is 'inner'. See la.align_many().
+    skip_missing : bool, optional
+        If False (default) an element of the output is missing (NaN) if it is
+        missing in, or not part of, any of the input larrys, as with a chain
+        of binary operations. If True, missing elements are skipped (for
+        example, the mean is taken over the larrys that have the element)
+        and an element is only missing in the output if it is missing in all
+        the input larrys.
+        
+    Returns
+    -------
+    out : larry
+        The reduced larry.
+        
+    See Also
+    --------
+    la.align_many: Align a sequence of larrys using one of four join
+                   methods.
+    la.binaryop: Binary operation on two larrys using given function and
+                 join method.
+    
+    Examples
+    --------
+    >>> y1 = larry([1.0, 2.0], [['a', 'b']])
+    >>> y2 = larry([3.0, 4.0], [['b', 'c']])
+    >>> y3 = larry([5.0, 6.0], [['c', 'b']])
+    >>> la.reduce_many([y1, y2, y3])
+    label_0
+        b
+    x
+    array([ 11.])
+    >>> la.reduce_many([y1, y2, y3], op='mean', join='outer')
+    label_0
+        a
+        b
+        c
+    x
+    array([        NaN,  3.66666667,         NaN])
+    >>> la.reduce_many([y1, y2, y3], op='mean', join='outer',
+    ...                skip_missing=True)
+    label_0
+        a
+        b
+        c
+    x
+    array([ 1.        ,  3.66666667,  4.5       ])
+    
+    """
+    if op not in _reducers:
+        raise ValueError, 'Unknown op'
+    ufunc, identity = _reducers[op]
+    larrys = _checkmany(larrys)
+    n = len(larrys)
+    ndim = larrys[0].ndim
+    join = _joinlist(join, ndim)
+    label = []
+    for ax in xrange(ndim):
+        labels = [lar._label[ax] for lar in larrys]
+        label.append(_joinmany(labels, join[ax]))
+    shape = tuple([len(lab) for lab in label])
+    
+    # Index plan: map each larry (src) into the output (dst)
+    plans = []
+    covered = True
+    positions = [_Positions(lab) for lab in label]
+    for lar in larrys:
+        src = []
+        dst = []
+        for ax in xrange(ndim):
+            idx1, idx2 = positions[ax].map(lar._label[ax])
+            src.append(idx1)
+            dst.append(idx2)
+            if type(idx2) is slice:
+                covered = covered and (idx2 == slice(None))
+            else:
+                covered = covered and (len(idx2) == shape[ax])
+        src = _outerindex(src, lar.shape)
+        dst = _outerindex(dst, shape)
+        plans.append((src, dst, _isslices(dst)))
+        
+    # Output dtype and initial value
+    dtype = np.result_type(*[lar.dtype for lar in larrys])
+    if dtype.kind not in 'biuf':
+        raise TypeError, 'larrys must have a numeric (or bool) dtype'
+    if (op == 'mean') or not covered:
+        dtype = np.result_type(dtype, float)
+    elif (dtype.kind == 'b') and (op in ('sum', 'prod')):
+        dtype = np.dtype(int)
+    if identity is None:
+        identity = _extreme(op, dtype)
+    out = np.empty(shape, dtype=dtype)
+    out.fill(identity)
+    if skip_missing or not covered:
+        count = np.zeros(shape, dtype=np.int_)
+    
+    # Accumulate
+    for lar, (src, dst, isview) in izip(larrys, plans):
+        x = lar.x[src]
+        if skip_missing:
+            miss = ismissing(x)
+            if miss.any():
+                x = np.where(miss, identity, x)
+            count[dst] += ~miss
+        elif not covered:
+            count[dst] += 1
+        if isview:
+            o = out[dst]
+            ufunc(o, x, out=o)
+        else:
+            out[dst] = ufunc(out[dst], x)
+            
+    # Missing values and mean
+    if skip_missing:
+        if op == 'mean':
+            out /= np.maximum(count, 1)
+        if dtype.kind == 'f':
+            out[count == 0] = np.nan
+    else:
+        if not covered:
+            out[count < n] = np.nan
+        if op == 'mean':
+            out /= n
+    return larry._trusted(out, label)
+
+_reducers = {'sum': (np.add, 0),
+             'mean': (np.add, 0),
+             'prod': (np.multiply, 1),
+             'min': (np.minimum, None),
+             'max': (np.maximum, None)}
+
+def _extreme(op, dtype):
+    "Initial value of a min (largest value) or max (smallest) of dtype."
+    if dtype.kind == 'f':
+        big, small = np.inf, -np.inf
+    elif dtype.kind == 'b':
+        big, small = True, False
+    else:
+        info = np.iinfo(dtype)
+        big, small = info.max, info.min
+    if op == 'min':
+        return big
+    return small
+
+def _checkmany(larrys):
+    "List of the larrys; error if empty, not larrys, or unequal ndim."
+    larrys = list(larrys)
+    if len(larrys) == 0:
+        raise ValueError, 'At least one larry is needed'
+    for lar in larrys:
+        if not isinstance(lar, larry):
+            raise TypeError, 'One or more input is not a larry'
+    ndim = larrys[0].ndim
+    for lar in larrys:
+        if lar.ndim != ndim:
+            msg = "All larrys must have the same number of dimensions."
+            raise ValueError, msg
+    return larrys
+    
+def _joinlist(join, ndim):
+    "Join method for each axis."
+    typejoin = type(join)
+    if typejoin is str:
+        join = [join] * ndim
+    elif typejoin is list:
+        if len(join) != ndim:
+            msg = "Length of `join` list equal number of dimension of larrys."
+            raise ValueError, msg
+    else:
+        raise TypeError, "`join` must be a string or a list."
+    return join
+
+def _joinmany(labels, join):
+    "Joined label (a new list) of the label lists along one axis."
+    if join == 'left':
+        return labelcopy(labels[0])
+    elif join == 'right':
+        return labelcopy(labels[-1])
+    elif join not in ('inner', 'outer'):
+        raise ValueError, 'join type not recognized'
+    first = labels[0]
+    for lab in labels[1:]:
+        if lab != first:
+            return _setjoin(labels, join)
+    return labelcopy(first)
+    
+def _alignto(larrys, label, cast):
+    "Data of the larrys aligned to `label` and whether they are views."
+    msg = "`fill` type not compatible with larry dtype"
+    xs = []
+    isviews = []
+    for lar in larrys:
+        x = lar.x
+        isview = True
+        missing = []
+        for ax, lab in enumerate(label):
+            ign, idx, idx_miss, ign, ign = listjoin(lar._label[ax], lab,
+                                                    'right')
+            x, v = takeaxis(x, idx, ax)
+            isview = isview and v
+            if len(idx_miss) > 0:
+                missing.append((ax, idx_miss))
+        if len(missing) > 0:
+            miss = missing_marker(x)
+            if miss == NotImplemented:
+                if cast:
+                    x = x.astype(float)
+                    miss = missing_marker(x)
+                else:
+                    raise TypeError, msg
+            for ax, idx_miss in missing:
+                index = [slice(None)] * x.ndim
+                index[ax] = idx_miss
+                x[index] = miss
+        xs.append(x)
+        isviews.append(isview)
+    return xs, isviews
+    
+def _outerindex(idxs, shape):
+    """
+    Index that takes idxs[i] along axis i of an array of the given shape.
+    
+    A tuple of slices (a view) if all indices are None (all) or slices; an
+    open mesh (np.ix_) if more than one index is an array.
+    
+    """
+    idxs = [slice(None) if idx is None else idx for idx in idxs]
+    nfancy = len([idx for idx in idxs if type(idx) is not slice])
+    if nfancy == 0:
+        return tuple(idxs)
+    elif nfancy == 1:
+        # One array among slices: no broadcasting so no mesh is needed
+        return tuple([idx if type(idx) is slice else
+                      np.asarray(idx, dtype=np.intp) for idx in idxs])
+    idxs = [np.arange(n)[idx] if type(idx) is slice else
+            np.asarray(idx, dtype=np.intp) for idx, n in izip(idxs, shape)]
+    return np.ix_(*idxs)
+    
+class _Positions(object):
+    "Positions of label elements in a (joined) label list."
+    
+    def __init__(self, label):
+        self.n = len(label)
+        self.keys = None
+        self.pos = None
+        if type(label) is Typedlabel and label.x.dtype.kind in ('i', 'M'):
+            self.kind = label.x.dtype.kind
+            self.keys = label.x.view(np.int64)
+        else:
+            self.pos = dict(izip(label, xrange(self.n)))
+            
+    def map(self, label):
+        """
+        Index maps (idx1, idx2) such that label[idx1] is joined[idx2].
+        
+        Elements of `label` that are not in the joined label are left out.
+        An index that selects all elements in order is slice(None).
+        
+        """
+        n = len(label)
+        if (self.keys is not None and type(label) is Typedlabel and
+            label.x.dtype.kind == self.kind):
+            idx, found = maparray(self.keys, label.x.view(np.int64))
+            if not found.all():
+                idx = idx[found]
+                return found.nonzero()[0], self._slice(idx)
+            return slice(None), self._slice(idx)
+        if self.pos is None:
+            self.pos = dict(izip(self.keys.view(_kinds[self.kind]).tolist(),
+                                 xrange(self.n)))
+        idx = np.fromiter(imap(self.pos.get, label, repeat(-1, n)),
+                          dtype=np.intp, count=n)
+        found = idx >= 0
+        if not found.all():
+            idx = idx[found]
+            return found.nonzero()[0], self._slice(idx)
+        return slice(None), self._slice(idx)
+            
+    def _slice(self, idx):
+        "slice(None) if `idx` takes all elements of the label in order."
+        if (idx.size == self.n) and (idx.size == 0 or 
+                                     (idx == np.arange(self.n)).all()):
+            return slice(None)
+        return idx
+
+_kinds = {'i': np.int64, 'M': 'M8[D]'}
+
+def _isslices(index):
+    "True if all elements of the index are slices (so it gives a view)."
+    return all([type(idx) is slice for idx in index])
 
 # Binary-- -----------------------------------------------------------------
 
 def binaryop(func, lar1, lar2, join='inner', cast=True, missone='ignore',
-             misstwo='ignore', **kwargs):
+             misstwo='ignore', direction='backward', tolerance=None,
+             out=None, **kwargs):
     """
     Binary operation on two larrys using given function and join method.
     
@@ -444,11 +898,13 @@ def binaryop(func, lar1, lar2, join='inner', cast=True, missone='ignore',
     lar2 : larry
         The larry on the right-hand side of the binary operation. Must have
         the same number of dimensions as `lar1`.
-    join : {'inner', 'outer', 'left', 'right', list}, optional
+    join : {'inner', 'outer', 'left', 'right', 'asof', list}, optional
         The method used to join the two larrys. The default join method along
-        all axes is 'inner', i.e., the intersection of the labels. If `join`
-        is a list of strings then the length of the list should be the number
-        of dimensions of the two larrys. The first element in the list is the
+        all axes is 'inner', i.e., the intersection of the labels. An 'asof'
+        join keeps the label of `lar1` and matches each of its elements to
+        the nearest label element of `lar2`; see `direction`. If `join` is a
+        list of strings then the length of the list should be the number of
+        dimensions of the two larrys. The first element in the list is the
         join method for axis=0, the second element is the join method for
         axis=1, and so on.
     cast : bool, optional
@@ -472,9 +928,24 @@ def binaryop(func, lar1, lar2, join='inner', cast=True, missone='ignore',
         If, however, `misstwo` is set to something other than 'ignore', such
         as 0, then all elements that are missing in both larrys are replaced
         by `misstwo`.  
+    direction : {'backward', 'forward', 'nearest'}, optional
+        Only used along axes with an 'asof' join. Each label element of `lar1`
+        is matched to the last label element of `lar2` that is less than or
+        equal to it ('backward', default), to the first that is greater than
+        or equal to it ('forward'), or to the closest ('nearest').
+    tolerance : {None, scalar, datetime.timedelta}, optional
+        Only used along axes with an 'asof' join. The maximum distance between
+        matched label elements. Elements of `lar1` with no match within
+        `tolerance` get missing values in the aligned `lar2`. The default
+        (None) is no maximum.
+    out : ndarray, optional
+        Array in which to place the data of the result. It must have the
+        shape of the aligned larrys. The returned larry uses `out` as its
+        data array. By default (None) a new array is allocated.
     **kwargs : Keyword arguments, optional
         Keyword arguments to pass to `func`. The keyword arguments passed to
-        `func` cannot have the following keys: join, cast, missone, misstwo.
+        `func` cannot have the following keys: join, cast, missone, misstwo,
+        direction, tolerance, out.
         
     Returns
     -------
@@ -484,6 +955,13 @@ def binaryop(func, lar1, lar2, join='inner', cast=True, missone='ignore',
     See Also
     --------
     la.align: Align two larrys using one of five join methods.  
+    
+    Notes
+    -----
+    If `func` is a Numpy ufunc, the replacement of missing values and `func`
+    are applied together one block of rows at a time (see
+    la.flarry.CHUNKSIZE), so that the missing value masks are block-sized
+    temporaries and the result is written straight to the output array.
         
     Examples
     --------
@@ -538,32 +1016,83 @@ def binaryop(func, lar1, lar2, join='inner', cast=True, missone='ignore',
     """
     
     # Align
-    x1, x2, label, ign1, ign2 = align_raw(lar1, lar2, join=join, cast=cast)
+    x1, x2, label, x1isview, x2isview = align_raw(lar1, lar2, join=join,
+                                                   cast=cast,
+                                                   direction=direction,
+                                                   tolerance=tolerance)
     
     # Replacing missing values is slow, so only do if requested
-    if missone != 'ignore' or misstwo != 'ignore':
-        miss1 = ismissing(x1)
-        miss2 = ismissing(x2)
-    if missone != 'ignore':    
-        missone1 = miss1 & ~miss2
-        if missone1.any():
-            x1[missone1] = missone
-        missone2 = miss2 & ~miss1    
-        if missone2.any():
-            x2[missone2] = missone
-    if misstwo != 'ignore':            
-        misstwo12 = miss1 & miss2    
-        if misstwo12.any():
-            x1[misstwo12] = misstwo
-            x2[misstwo12] = misstwo           
-            
-    # Binary function
-    x = func(x1, x2, **kwargs)
+    fill = (missone != 'ignore') or (misstwo != 'ignore')
+    if out is not None and out.shape != x1.shape:
+        raise ValueError, '`out` must have the shape of the aligned larrys'
+    if type(func) is np.ufunc and (fill or out is not None):
+        # Fill and func in one pass, one block of rows at a time
+        if out is None:
+            dtype = func(x1[:0], x2[:0], **kwargs).dtype
+            out = np.empty(x1.shape, dtype=dtype)
+        if fill:
+            for start, stop in _rowblocks(x1.shape):
+                a, b = _fillmissing(x1[start:stop], x2[start:stop], missone,
+                                    misstwo, x1isview, x2isview)
+                func(a, b, out=out[start:stop], **kwargs)
+        else:
+            func(x1, x2, out=out, **kwargs)
+        x = out
+    else:
+        if fill:
+            x1, x2 = _fillmissing(x1, x2, missone, misstwo, x1isview,
+                                  x2isview)
+        x = func(x1, x2, **kwargs)
+        if out is not None:
+            out[...] = x
+            x = out
     
     return larry(x, label, integrity=False)
+
+def _fillmissing(x1, x2, missone, misstwo, copy1, copy2):
+    """
+    Replace missing values as binaryop does; x1 (x2) is copied before it is
+    changed if `copy1` (`copy2`) is True, so the data of the input larrys is
+    never filled.
+    """
+    miss1 = ismissing(x1)
+    miss2 = ismissing(x2)
+    fills = []
+    if missone != 'ignore':
+        fills.append((miss1 & ~miss2, miss2 & ~miss1, missone))
+    if misstwo != 'ignore':
+        both = miss1 & miss2
+        fills.append((both, both, misstwo))
+    for mask1, mask2, value in fills:
+        if mask1.any():
+            if copy1:
+                x1 = x1.copy()
+                copy1 = False
+            np.copyto(x1, value, casting='unsafe', where=mask1)
+        if mask2.any():
+            if copy2:
+                x2 = x2.copy()
+                copy2 = False
+            np.copyto(x2, value, casting='unsafe', where=mask2)
+    return x1, x2
+
+# Number of elements processed at a time by the blocked loops of binaryop
+# and la.evaluate: 2**15 float64 elements (256 kB) per temporary array
+CHUNKSIZE = 32768
+
+def _rowblocks(shape, chunksize=None):
+    "(start, stop) of blocks of rows (axis 0) of about `chunksize` elements."
+    if chunksize is None:
+        chunksize = CHUNKSIZE
+    if chunksize < 1:
+        raise ValueError, '`chunksize` must be at least 1'
+    n = shape[0]
+    rowsize = max(int(np.prod(shape[1:])), 1)
+    step = max(1, chunksize // rowsize)
+    return [(i, min(i + step, n)) for i in xrange(0, n, step)]
     
 def add(lar1, lar2, join='inner', cast=True, missone='ignore',
-        misstwo='ignore'):
+        misstwo='ignore', out=None):
     """
     Sum of two larrys using given join and fill methods. 
     
@@ -603,6 +1132,10 @@ def add(lar1, lar2, join='inner', cast=True, missone='ignore',
         If, however, `misstwo` is set to something other than 'ignore', such
         as 0, then all elements that are missing in both larrys are replaced
         by `misstwo`.
+    out : ndarray, optional
+        Array in which to place the data of the result. It must have the
+        shape of the aligned larrys. The returned larry uses `out` as its
+        data array. By default (None) a new array is allocated.
                
     Returns
     -------
@@ -680,10 +1213,10 @@ def add(lar1, lar2, join='inner', cast=True, missone='ignore',
 
     """    
     return binaryop(np.add, lar1, lar2, join=join, cast=cast, missone=missone,
-                    misstwo=misstwo)
+                    misstwo=misstwo, out=out)
 
 def subtract(lar1, lar2, join='inner', cast=True, missone='ignore',
-             misstwo='ignore'):
+             misstwo='ignore', out=None):
     """
     Difference of two larrys using given join and fill methods. 
     
@@ -723,6 +1256,10 @@ def subtract(lar1, lar2, join='inner', cast=True, missone='ignore',
         If, however, `misstwo` is set to something other than 'ignore', such
         as 0, then all elements that are missing in both larrys are replaced
         by `misstwo`.
+    out : ndarray, optional
+        Array in which to place the data of the result. It must have the
+        shape of the aligned larrys. The returned larry uses `out` as its
+        data array. By default (None) a new array is allocated.
                
     Returns
     -------
@@ -800,10 +1337,10 @@ def subtract(lar1, lar2, join='inner', cast=True, missone='ignore',
 
     """    
     return binaryop(np.subtract, lar1, lar2, join=join, cast=cast,
-                    missone=missone, misstwo=misstwo)
+                    missone=missone, misstwo=misstwo, out=out)
                     
 def multiply(lar1, lar2, join='inner', cast=True, missone='ignore',
-             misstwo='ignore'):
+             misstwo='ignore', out=None):
     """
     Multiply two larrys element-wise using given join and fill methods.
     
@@ -843,6 +1380,10 @@ def multiply(lar1, lar2, join='inner', cast=True, missone='ignore',
         If, however, `misstwo` is set to something other than 'ignore', such
         as 0, then all elements that are missing in both larrys are replaced
         by `misstwo`.
+    out : ndarray, optional
+        Array in which to place the data of the result. It must have the
+        shape of the aligned larrys. The returned larry uses `out` as its
+        data array. By default (None) a new array is allocated.
                
     Returns
     -------
@@ -920,10 +1461,10 @@ def multiply(lar1, lar2, join='inner', cast=True, missone='ignore',
 
     """    
     return binaryop(np.multiply, lar1, lar2, join=join, cast=cast,
-                    missone=missone, misstwo=misstwo)                    
+                    missone=missone, misstwo=misstwo, out=out)
 
 def divide(lar1, lar2, join='inner', cast=True, missone='ignore',
-           misstwo='ignore'):
+           misstwo='ignore', out=None):
     """
     Divide two larrys element-wise using given join and fill methods.
     
@@ -963,6 +1504,10 @@ def divide(lar1, lar2, join='inner', cast=True, missone='ignore',
         If, however, `misstwo` is set to something other than 'ignore', such
         as 0, then all elements that are missing in both larrys are replaced
         by `misstwo`.
+    out : ndarray, optional
+        Array in which to place the data of the result. It must have the
+        shape of the aligned larrys. The returned larry uses `out` as its
+        data array. By default (None) a new array is allocated.
                
     Returns
     -------
@@ -1040,7 +1585,7 @@ def divide(lar1, lar2, join='inner', cast=True, missone='ignore',
 
     """    
     return binaryop(np.divide, lar1, lar2, join=join, cast=cast,
-                    missone=missone, misstwo=misstwo)
+                    missone=missone, misstwo=misstwo, out=out)
 
 # Misc ----------------------------------------------------------------------
 
@@ -1165,18 +1710,15 @@ def stack(mode, **kwargs):
         logic = intersection
     else:    
         raise ValueError, 'mode must be union or intersection'   
-    row = logic(0, *kwargs.values())
-    col = logic(1, *kwargs.values())
-    x = np.zeros((len(kwargs), len(row), len(col)))
-    zlabel = []
-    for i, key in enumerate(kwargs):
-        y = kwargs[key]
-        y = y.morph(row, 0)
-        y = y.morph(col, 1)
-        x[i] = y.x
-        zlabel.append(key)
-    label = [zlabel, row, col]
-    return larry(x, label) 
+    zlabel = kwargs.keys()
+    larrys = [kwargs[key] for key in zlabel]
+    row = logic(0, *larrys)
+    col = logic(1, *larrys)
+    xs, ign = _alignto(larrys, [row, col], True)
+    x = np.zeros((len(zlabel), len(row), len(col)))
+    for i, xi in enumerate(xs):
+        x[i] = xi
+    return larry._trusted(x, [zlabel, row, col])
     
 def panel(lar):
     """
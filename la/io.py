@@ -9,6 +9,7 @@ from la.external.prettytable import indent
 from la.util.misc import randstring
 
 from la import larry
+from la.flabel import Typedlabel
 
         
 class IO(object):
@@ -317,8 +318,13 @@ class lara(object):
         """
         self.x = group['x']
         self.label = _load_label(group, len(self.x.shape))
+        self._lindex = {}
     
     # Grab these methods from larry    
+    label = larry.label
+    _frozenlabel = larry._frozenlabel.im_func
+    _sharelabel = larry._sharelabel.im_func
+    _getlindex = larry._getlindex.im_func
     __getitem__ = larry.__getitem__.im_func
     __setitem__ = larry.__setitem__.im_func    
     maxlabel = larry.maxlabel.im_func
@@ -406,7 +412,7 @@ def save(file, lar, key):
     fkey.attrs['larry'] = True
     fkey['x'] = lar.x
     for i in range(lar.ndim):
-        fkey[str(i)], isdate = _list2array(lar.label[i])
+        fkey[str(i)], isdate = _list2array(lar._label[i])
         fkey[str(i)].attrs['isdate'] = isdate
     
     # Close if file is a filename   
@@ -607,6 +613,11 @@ def _load_label(group, ndim):
 
 def _list2array(x):
     "Convert list to array if elements are of the same type, raise otherwise."
+    if type(x) == Typedlabel:
+        # Already an array; dates are archived as ordinals
+        if x.x.dtype.kind == 'M':
+            return x.x.astype(np.int64) + _ordinal1970, True
+        return x.x, False
     if type(x) != list:
         raise TypeError, 'x must be a list'
     type0 = type(x[0])
@@ -620,6 +631,8 @@ def _list2array(x):
         isdate = True    
     return np.asarray(x), isdate                 
     
+_ordinal1970 = datetime.date(1970, 1, 1).toordinal()
+    
 def _openfile(file):
     """
     Open an archive if input is a path.
@@ -0,0 +1,1375 @@
+"Cython versions of la/farray.py functions"
+
+import numpy as np
+cimport cython
+from libc.math cimport sqrt, exp, NAN, INFINITY
+
+from la.util.threads import threadpool
+
+ctypedef fused floating:
+    float
+    double
+
+cdef enum:
+    SUM, MEAN, VAR, STD, MIN, MAX, DESCRIBE, MEDIAN, CORR
+
+class AxisError(ValueError, IndexError):
+    """
+    Axis out of range.
+
+    Numpy raises ValueError or IndexError (depending on the function) for an
+    axis that is out of range, so this exception is both.
+
+    """
+    pass
+
+def nansum(arr, axis=None):
+    """
+    Sum of array elements along given axis ignoring NaNs.
+
+    The sum is computed in one pass over the data without copying the
+    array. The elements are accumulated in double precision.
+
+    Parameters
+    ----------
+    arr : ndarray
+        Input array; must be float32 or float64.
+    axis : {int, None}, optional
+        Axis along which the sum is computed. By default (None) the sum of
+        the flattened array is returned.
+
+    Returns
+    -------
+    y : {ndarray, scalar}
+        The sum, with the dtype of `arr`. The sum of an all-NaN (or empty)
+        slice is zero.
+
+    """
+    return _reduce(arr, axis, SUM, 0)
+
+def nanmean(arr, axis=None):
+    """
+    Mean of array elements along given axis ignoring NaNs.
+
+    The mean is computed in one pass over the data without copying the
+    array.
+
+    Parameters
+    ----------
+    arr : ndarray
+        Input array; must be float32 or float64.
+    axis : {int, None}, optional
+        Axis along which the mean is computed. By default (None) the mean of
+        the flattened array is returned.
+
+    Returns
+    -------
+    y : {ndarray, scalar}
+        The mean (float64). The mean of an all-NaN slice is NaN.
+
+    """
+    return _reduce(arr, axis, MEAN, 0)
+
+def nanvar(arr, axis=None, int ddof=0):
+    """
+    Variance of array elements along given axis ignoring NaNs.
+
+    The variance is computed in one pass over the data (Welford's
+    algorithm) without copying the array.
+
+    Parameters
+    ----------
+    arr : ndarray
+        Input array; must be float32 or float64.
+    axis : {int, None}, optional
+        Axis along which the variance is computed. By default (None) the
+        variance of the flattened array is returned.
+    ddof : int, optional
+        The divisor is N - ddof, where N is the number of non-NaN elements.
+        By default `ddof` is zero.
+
+    Returns
+    -------
+    y : {ndarray, scalar}
+        The variance (float64). NaN where N is not greater than `ddof`.
+
+    """
+    return _reduce(arr, axis, VAR, ddof)
+
+def nanstd(arr, axis=None, int ddof=0):
+    """
+    Standard deviation of array elements along given axis ignoring NaNs.
+
+    The standard deviation is computed in one pass over the data
+    (Welford's algorithm) without copying the array.
+
+    Parameters
+    ----------
+    arr : ndarray
+        Input array; must be float32 or float64.
+    axis : {int, None}, optional
+        Axis along which the standard deviation is computed. By default
+        (None) the standard deviation of the flattened array is returned.
+    ddof : int, optional
+        The divisor is N - ddof, where N is the number of non-NaN elements.
+        By default `ddof` is zero.
+
+    Returns
+    -------
+    y : {ndarray, scalar}
+        The standard deviation (float64). NaN where N is not greater than
+        `ddof`.
+
+    """
+    return _reduce(arr, axis, STD, ddof)
+
+def nanmin(arr, axis=None):
+    """
+    Minimum of array elements along given axis ignoring NaNs.
+
+    Parameters
+    ----------
+    arr : ndarray
+        Input array; must be float32 or float64.
+    axis : {int, None}, optional
+        Axis along which the minimum is computed. By default (None) the
+        minimum of the flattened array is returned.
+
+    Returns
+    -------
+    y : {ndarray, scalar}
+        The minimum, with the dtype of `arr`. The minimum of an all-NaN
+        slice is NaN.
+
+    """
+    return _reduce(arr, axis, MIN, 0)
+
+def nanmax(arr, axis=None):
+    """
+    Maximum of array elements along given axis ignoring NaNs.
+
+    Parameters
+    ----------
+    arr : ndarray
+        Input array; must be float32 or float64.
+    axis : {int, None}, optional
+        Axis along which the maximum is computed. By default (None) the
+        maximum of the flattened array is returned.
+
+    Returns
+    -------
+    y : {ndarray, scalar}
+        The maximum, with the dtype of `arr`. The maximum of an all-NaN
+        slice is NaN.
+
+    """
+    return _reduce(arr, axis, MAX, 0)
+
+def nandescribe(arr, axis=None):
+    """
+    Count, mean, std, min, max and fraction missing along given axis.
+
+    All six statistics are computed in one pass over the data (Welford's
+    algorithm for the mean and standard deviation) without copying the
+    array.
+
+    Parameters
+    ----------
+    arr : ndarray
+        Input array; must be float32 or float64.
+    axis : {int, None}, optional
+        Axis along which the statistics are computed. By default (None) the
+        statistics of the flattened array are returned.
+
+    Returns
+    -------
+    y : ndarray
+        A float64 array in which `axis` is replaced by an axis of length 6
+        holding, in order, the number of non-NaN elements, the mean, the
+        standard deviation (normalized by N), the minimum, the maximum, and
+        the fraction of elements that are NaN. If `axis` is None, `y` is 1d.
+
+    """
+    out = _reduce(arr, axis, DESCRIBE, 0)
+    if axis is None or out.ndim == 1:
+        return out
+    if axis < 0:
+        axis += out.ndim
+    # Put the stat axis where the reduced axis was
+    return np.rollaxis(out, 0, axis + 1)
+
+def _reduce(arr, axis, int op, int ddof):
+    "Reduce `arr` along `axis` (None: all axes) with the given reduction."
+    arr = np.asarray(arr)
+    dtype = arr.dtype
+    if dtype != np.float64 and dtype != np.float32:
+        raise TypeError, 'Only float32 and float64 arrays are supported.'
+    if axis is None or arr.ndim == 0:
+        # ravel returns a view if arr is contiguous (in any order)
+        a = arr.ravel(order='K')
+        shape = ()
+    else:
+        ndim = arr.ndim
+        if axis < -ndim or axis >= ndim:
+            raise AxisError, 'axis out of range'
+        if axis < 0:
+            axis += ndim
+        # Move the reduction axis last; each row is then one reduction
+        a = np.rollaxis(arr, axis, ndim)
+        shape = a.shape[:-1]
+    nstat = 6 if op == DESCRIBE else 1
+    m = int(np.prod(shape))
+    out = np.empty((nstat, m))
+    if a.ndim == 1:
+        _reduce2d(a[None, :], out, op, ddof)
+    else:
+        # Reduce all rows at once if the leading axes can be merged without
+        # a copy; otherwise one 2d slice at a time
+        a2 = a.view()
+        try:
+            a2.shape = (m, a.shape[-1])
+        except AttributeError:
+            out2 = out.reshape((nstat,) + shape)
+            for index in np.ndindex(*shape[:-1]):
+                _reduce2d(a[index], out2[(slice(None),) + index], op, ddof)
+        else:
+            _reduce2d(a2, out, op, ddof)
+    out = out.reshape((nstat,) + shape)
+    if op != DESCRIBE:
+        out = out[0]
+    if op == SUM or op == MIN or op == MAX:
+        if dtype != out.dtype:
+            out = out.astype(dtype)
+    if out.ndim == 0:
+        return out[()]
+    return out
+
+def _reduce2d(a, out, int op, int ddof):
+    """
+    Reduce each row of the 2d array `a` and store the results in `out`.
+
+    `out` has one row per statistic (six for DESCRIBE, otherwise one) and
+    one column per row of `a`. Large arrays are split into one block per
+    thread (see la.util.threads): blocks of rows if there are at least as
+    many rows as threads, otherwise blocks of columns whose partial results
+    are merged.
+
+    """
+    m, n = a.shape
+    if m >= threadpool.num_threads:
+        acc = _accumulators(m, op)
+        def block(start, stop):
+            part = [x[start:stop] for x in acc]
+            _accumulate(a[start:stop], part[0], part[1], part[2], part[3],
+                        part[4], op)
+        threadpool.map(block, threadpool.blocks(m, a.size))
+    else:
+        blocks = threadpool.blocks(n, a.size)
+        parts = dict((start, _accumulators(m, op)) for start, stop in blocks)
+        def block(start, stop):
+            part = parts[start]
+            _accumulate(a[:, start:stop], part[0], part[1], part[2], part[3],
+                        part[4], op)
+        threadpool.map(block, blocks)
+        acc = _merge([parts[start] for start, stop in blocks], op)
+    _finalize(acc[0], acc[1], acc[2], acc[3], acc[4], out, op, ddof, n)
+
+def _accumulators(Py_ssize_t m, int op):
+    "Count, sum (or mean), sum of squared deviations, min and max of m rows."
+    lo = np.empty(m)
+    lo.fill(np.inf)
+    hi = np.empty(m)
+    hi.fill(-np.inf)
+    return [np.zeros(m, dtype=np.intp), np.zeros(m), np.zeros(m), lo, hi]
+
+def _merge(parts, int op):
+    "Merge the accumulators of blocks of columns of the same rows."
+    if len(parts) == 1:
+        return parts[0]
+    cnt, s, s2, lo, hi = [np.array(x) for x in zip(*parts)]
+    count = cnt.sum(0).astype(np.intp)
+    if op == SUM or op == MEAN:
+        s = s.sum(0)
+        s2 = s2[0]
+    else:
+        # Each block holds the mean (s) and the sum of squared deviations
+        # from its mean (s2) of its elements
+        mean = (cnt * s).sum(0) / np.maximum(count, 1)
+        s2 = (s2 + cnt * (s - mean) ** 2).sum(0)
+        s = mean
+    return [count, s, s2, lo.min(0), hi.max(0)]
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def _accumulate(const floating[:, :] a, Py_ssize_t[:] cnt, double[:] s,
+                double[:] s2, double[:] lo, double[:] hi, int op):
+    """
+    Add the elements of each row of the 2d array `a` to the accumulators.
+
+    The array is traversed in memory order: along rows if the rows are
+    contiguous (or nearly so), otherwise down the columns, with one set of
+    accumulators per row. The GIL is released while the array is traversed.
+
+    """
+    cdef Py_ssize_t m = a.shape[0], n = a.shape[1]
+    cdef Py_ssize_t p, q, k, n_outer, n_inner, k_outer, k_inner
+    cdef Py_ssize_t s_outer, s_inner
+    cdef double x, delta
+    cdef char *base
+    if m == 0 or n == 0:
+        return
+    base = <char *> &a[0, 0]
+    if m == 1 or abs(a.strides[1]) <= abs(a.strides[0]):
+        n_outer, n_inner = m, n
+        s_outer, s_inner = a.strides[0], a.strides[1]
+        k_outer, k_inner = 1, 0
+    else:
+        n_outer, n_inner = n, m
+        s_outer, s_inner = a.strides[1], a.strides[0]
+        k_outer, k_inner = 0, 1
+    with nogil:
+        if op == SUM or op == MEAN:
+            for p in range(n_outer):
+                for q in range(n_inner):
+                    x = (<floating *>(base + p * s_outer + q * s_inner))[0]
+                    if x == x:
+                        k = p * k_outer + q * k_inner
+                        s[k] += x
+                        cnt[k] += 1
+        elif op == VAR or op == STD:
+            # Welford's algorithm: running mean (s) and sum of squared
+            # deviations from the mean (s2)
+            for p in range(n_outer):
+                for q in range(n_inner):
+                    x = (<floating *>(base + p * s_outer + q * s_inner))[0]
+                    if x == x:
+                        k = p * k_outer + q * k_inner
+                        cnt[k] += 1
+                        delta = x - s[k]
+                        s[k] += delta / cnt[k]
+                        s2[k] += delta * (x - s[k])
+        elif op == MIN:
+            for p in range(n_outer):
+                for q in range(n_inner):
+                    x = (<floating *>(base + p * s_outer + q * s_inner))[0]
+                    k = p * k_outer + q * k_inner
+                    if x <= lo[k]:
+                        lo[k] = x
+                        cnt[k] = 1
+        elif op == MAX:
+            for p in range(n_outer):
+                for q in range(n_inner):
+                    x = (<floating *>(base + p * s_outer + q * s_inner))[0]
+                    k = p * k_outer + q * k_inner
+                    if x >= hi[k]:
+                        hi[k] = x
+                        cnt[k] = 1
+        else:
+            for p in range(n_outer):
+                for q in range(n_inner):
+                    x = (<floating *>(base + p * s_outer + q * s_inner))[0]
+                    if x == x:
+                        k = p * k_outer + q * k_inner
+                        cnt[k] += 1
+                        delta = x - s[k]
+                        s[k] += delta / cnt[k]
+                        s2[k] += delta * (x - s[k])
+                        if x < lo[k]:
+                            lo[k] = x
+                        if x > hi[k]:
+                            hi[k] = x
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def _finalize(Py_ssize_t[:] cnt, double[:] s, double[:] s2, double[:] lo,
+              double[:] hi, double[:, :] out, int op, int ddof,
+              Py_ssize_t n):
+    "Store the statistics of rows of length `n` from their accumulators."
+    cdef Py_ssize_t i, m = cnt.shape[0]
+    with nogil:
+        for i in range(m):
+            if op == DESCRIBE:
+                out[0, i] = cnt[i]
+                if cnt[i] == 0:
+                    out[1, i] = NAN
+                    out[2, i] = NAN
+                    out[3, i] = NAN
+                    out[4, i] = NAN
+                else:
+                    out[1, i] = s[i]
+                    out[2, i] = sqrt(s2[i] / cnt[i])
+                    out[3, i] = lo[i]
+                    out[4, i] = hi[i]
+                if n == 0:
+                    out[5, i] = NAN
+                else:
+                    out[5, i] = (<double> (n - cnt[i])) / n
+            elif op == SUM:
+                out[0, i] = s[i]
+            elif cnt[i] == 0:
+                out[0, i] = NAN
+            elif op == MEAN:
+                out[0, i] = s[i] / cnt[i]
+            elif op == VAR or op == STD:
+                if cnt[i] <= ddof:
+                    out[0, i] = NAN
+                elif op == VAR:
+                    out[0, i] = s2[i] / (cnt[i] - ddof)
+                else:
+                    out[0, i] = sqrt(s2[i] / (cnt[i] - ddof))
+            elif op == MIN:
+                out[0, i] = lo[i]
+            else:
+                out[0, i] = hi[i]
+
+# Moving window functions ---------------------------------------------------
+
+def mov_mean(arr, window, axis=-1, Py_ssize_t min_count=1):
+    """
+    Moving window mean along the given axis ignoring NaNs.
+
+    The mean of each window is updated, not recomputed, as the window moves
+    (Welford's algorithm), so the cost does not depend on the window size.
+
+    Parameters
+    ----------
+    arr : ndarray
+        Input array; must be float32 or float64.
+    window : {int, ndarray}
+        The number of elements in the moving window, or the position of the
+        first element of the window of each position along `axis` (see
+        `windowstart`).
+    axis : int, optional
+        The axis along which the window moves. The default is the last axis.
+    min_count : int, optional
+        The minimum number of non-NaN elements in a window; windows with
+        fewer give NaN. The default is 1.
+
+    Returns
+    -------
+    y : ndarray
+        The moving mean, with the dtype of `arr`. The first `window` - 1
+        elements along `axis` are NaN.
+
+    """
+    return _move(arr, window, axis, min_count, MEAN)
+
+def mov_std(arr, window, axis=-1, Py_ssize_t min_count=1):
+    """
+    Moving window standard deviation along the given axis ignoring NaNs.
+
+    The variance of each window is updated, not recomputed, as the window
+    moves (Welford's algorithm), so the cost does not depend on the window
+    size. The standard deviation is normalized by the number of non-NaN
+    elements in the window.
+
+    Parameters
+    ----------
+    arr : ndarray
+        Input array; must be float32 or float64.
+    window : {int, ndarray}
+        The number of elements in the moving window, or the position of the
+        first element of the window of each position along `axis` (see
+        `windowstart`).
+    axis : int, optional
+        The axis along which the window moves. The default is the last axis.
+    min_count : int, optional
+        The minimum number of non-NaN elements in a window; windows with
+        fewer give NaN. The default is 1.
+
+    Returns
+    -------
+    y : ndarray
+        The moving standard deviation, with the dtype of `arr`. The first
+        `window` - 1 elements along `axis` are NaN.
+
+    """
+    return _move(arr, window, axis, min_count, STD)
+
+def mov_min(arr, window, axis=-1, Py_ssize_t min_count=1):
+    """
+    Moving window minimum along the given axis ignoring NaNs.
+
+    The positions of the candidate minimums are kept in a monotonic deque,
+    so each element is added and removed once: O(n) for any window size.
+
+    Parameters
+    ----------
+    arr : ndarray
+        Input array; must be float32 or float64.
+    window : {int, ndarray}
+        The number of elements in the moving window, or the position of the
+        first element of the window of each position along `axis` (see
+        `windowstart`).
+    axis : int, optional
+        The axis along which the window moves. The default is the last axis.
+    min_count : int, optional
+        The minimum number of non-NaN elements in a window; windows with
+        fewer give NaN. The default is 1.
+
+    Returns
+    -------
+    y : ndarray
+        The moving minimum, with the dtype of `arr`. The first `window` - 1
+        elements along `axis` are NaN.
+
+    """
+    return _move(arr, window, axis, min_count, MIN)
+
+def mov_max(arr, window, axis=-1, Py_ssize_t min_count=1):
+    """
+    Moving window maximum along the given axis ignoring NaNs.
+
+    The positions of the candidate maximums are kept in a monotonic deque,
+    so each element is added and removed once: O(n) for any window size.
+
+    Parameters
+    ----------
+    arr : ndarray
+        Input array; must be float32 or float64.
+    window : {int, ndarray}
+        The number of elements in the moving window, or the position of the
+        first element of the window of each position along `axis` (see
+        `windowstart`).
+    axis : int, optional
+        The axis along which the window moves. The default is the last axis.
+    min_count : int, optional
+        The minimum number of non-NaN elements in a window; windows with
+        fewer give NaN. The default is 1.
+
+    Returns
+    -------
+    y : ndarray
+        The moving maximum, with the dtype of `arr`. The first `window` - 1
+        elements along `axis` are NaN.
+
+    """
+    return _move(arr, window, axis, min_count, MAX)
+
+def mov_median(arr, window, axis=-1, Py_ssize_t min_count=1):
+    """
+    Moving window median along the given axis ignoring NaNs.
+
+    The non-NaN elements of the window are kept in two heaps, a max-heap of
+    the smaller half and a min-heap of the larger half, so each step costs
+    O(log window).
+
+    Parameters
+    ----------
+    arr : ndarray
+        Input array; must be float32 or float64.
+    window : {int, ndarray}
+        The number of elements in the moving window, or the position of the
+        first element of the window of each position along `axis` (see
+        `windowstart`).
+    axis : int, optional
+        The axis along which the window moves. The default is the last axis.
+    min_count : int, optional
+        The minimum number of non-NaN elements in a window; windows with
+        fewer give NaN. The default is 1.
+
+    Returns
+    -------
+    y : ndarray
+        The moving median, with the dtype of `arr`. The first `window` - 1
+        elements along `axis` are NaN.
+
+    """
+    return _move(arr, window, axis, min_count, MEDIAN)
+
+def windowstart(window, Py_ssize_t n):
+    """
+    Position of the first element of the moving window of each position.
+
+    Parameters
+    ----------
+    window : {int, array_like}
+        The number of elements in the moving window, or the position of the
+        first element of the window of each of the `n` positions, negative
+        for a window that starts before the first element (whose output is
+        NaN). The windows must not move back: their first elements (with
+        negative values taken as 0) may not decrease. la.flabel.windowstart
+        computes the windows of a time span over date labels.
+    n : int
+        The number of positions.
+
+    Returns
+    -------
+    start : ndarray
+        The position of the first element of the window of each position as
+        an intp array; negative where the window is incomplete.
+    size : int
+        The number of elements of the largest window.
+
+    """
+    if np.ndim(window) == 0:
+        window = int(window)
+        if window < 1:
+            raise ValueError, 'window must be at least 1'
+        if window > n:
+            raise ValueError, 'Window is too big.'
+        return np.arange(1 - window, n + 1 - window, dtype=np.intp), window
+    start = np.asarray(window, dtype=np.intp)
+    if start.shape != (n,):
+        raise ValueError, 'window must have one start per position'
+    position = np.arange(n, dtype=np.intp)
+    first = np.maximum(start, 0)
+    if (start > position).any():
+        raise ValueError, 'window must not start after its position'
+    if (first[1:] < first[:-1]).any():
+        raise ValueError, 'window start must not decrease'
+    if n == 0:
+        return start, 1
+    return start, int((position - first).max()) + 1
+
+def _move(arr, window, axis, Py_ssize_t min_count, int op):
+    "Moving window statistic of `arr` along `axis`."
+    arr = np.asarray(arr)
+    dtype = arr.dtype
+    if dtype != np.float64 and dtype != np.float32:
+        raise TypeError, 'Only float32 and float64 arrays are supported.'
+    ndim = arr.ndim
+    if ndim == 0:
+        raise ValueError, 'arr must be at least 1d'
+    if axis < -ndim or axis >= ndim:
+        raise AxisError, 'axis out of range'
+    if axis < 0:
+        axis += ndim
+    start, size = windowstart(window, arr.shape[axis])
+    if min_count < 1 or min_count > size:
+        raise ValueError, 'min_count must be between 1 and window'
+    y = np.empty(arr.shape, dtype=dtype)
+    # Move the window axis last; each row is then one moving window
+    a = np.rollaxis(arr, axis, ndim)
+    out = np.rollaxis(y, axis, ndim)
+    if ndim == 1:
+        _move2drows(a[None, :], out[None, :], start, size, min_count, op)
+    else:
+        shape = a.shape[:-1]
+        m = int(np.prod(shape))
+        a2 = a.view()
+        out2 = out.view()
+        try:
+            a2.shape = (m, a.shape[-1])
+            out2.shape = (m, a.shape[-1])
+        except AttributeError:
+            for index in np.ndindex(*shape[:-1]):
+                _move2drows(a[index], out[index], start, size, min_count,
+                            op)
+        else:
+            _move2drows(a2, out2, start, size, min_count, op)
+    return y
+
+def _move2drows(a, out, start, Py_ssize_t size, Py_ssize_t min_count, int op):
+    "Moving window along the rows of the 2d `a`; blocks of rows per thread."
+    def block(i, stop):
+        _move2d(a[i:stop], out[i:stop], start, size, min_count, op)
+    threadpool.map(block, threadpool.blocks(a.shape[0], a.size))
+
+def _move2d(const floating[:, :] a, floating[:, :] out,
+            const Py_ssize_t[:] start, Py_ssize_t size, Py_ssize_t min_count,
+            int op):
+    """
+    Moving window statistic along each row of the 2d array `a`.
+
+    The window of position j starts at position start[j] (negative:
+    incomplete window); `size` is the number of elements of the largest
+    window. The rows are done one at a time; the GIL is released.
+
+    """
+    cdef Py_ssize_t i, m = a.shape[0]
+    cdef Mheap heap
+    deque = np.empty(size, dtype=np.intp)
+    cdef Py_ssize_t[:] dq = deque
+    # Buffers of the double heap (mov_median)
+    value = np.empty(size)
+    where = np.empty(size, dtype=np.intc)
+    position = np.empty(size, dtype=np.intp)
+    small = np.empty(size, dtype=np.intp)
+    large = np.empty(size, dtype=np.intp)
+    cdef double[:] value_ = value
+    cdef int[:] where_ = where
+    cdef Py_ssize_t[:] position_ = position, small_ = small, large_ = large
+    heap.val = &value_[0]
+    heap.where = &where_[0]
+    heap.pos = &position_[0]
+    heap.small = &small_[0]
+    heap.large = &large_[0]
+    with nogil:
+        for i in range(m):
+            if op == MEAN or op == STD:
+                _move_welford(a, out, i, start, min_count, op == STD)
+            elif op == MIN or op == MAX:
+                _move_deque(a, out, i, start, size, min_count, op == MAX, dq)
+            else:
+                _move_median(a, out, i, start, size, min_count, &heap)
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef void _move_welford(const floating[:, :] a, floating[:, :] out,
+                        Py_ssize_t i, const Py_ssize_t[:] start,
+                        Py_ssize_t min_count, bint std) nogil:
+    """
+    Moving mean or std of row `i` by adding and removing elements.
+
+    The mean is a running sum divided by the count; the std is updated
+    with Welford's algorithm.
+
+    """
+    cdef Py_ssize_t j, lo = 0, n = a.shape[1], count = 0
+    cdef double x, asum = 0, mean = 0, m2 = 0, delta
+    for j in range(n):
+        x = a[i, j]
+        if x == x:
+            count += 1
+            if std:
+                delta = x - mean
+                mean += delta / count
+                m2 += delta * (x - mean)
+            else:
+                asum += x
+        while lo < start[j]:
+            x = a[i, lo]
+            lo += 1
+            if x == x:
+                count -= 1
+                if count == 0:
+                    asum = 0
+                    mean = 0
+                    m2 = 0
+                elif std:
+                    delta = x - mean
+                    mean -= delta / count
+                    m2 -= delta * (x - mean)
+                    if count == 1:
+                        # Drop the round-off error
+                        m2 = 0
+                else:
+                    asum -= x
+        if start[j] < 0 or count < min_count:
+            out[i, j] = NAN
+        elif std:
+            out[i, j] = sqrt(m2 / count) if m2 > 0 else 0
+        else:
+            out[i, j] = asum / count
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _move_deque(const floating[:, :] a, floating[:, :] out,
+                      Py_ssize_t i, const Py_ssize_t[:] start,
+                      Py_ssize_t cap, Py_ssize_t min_count, bint domax,
+                      Py_ssize_t[:] dq) nogil:
+    """
+    Moving min or max of row `i` with a monotonic deque of positions.
+
+    The deque is a ring buffer (`dq` of capacity `cap`, `head`, `size`) of
+    the positions of the elements of the window that can still become the
+    min (max): their values increase (decrease) from the front, which is
+    the min (max).
+
+    """
+    cdef Py_ssize_t j, lo = 0, n = a.shape[1], head = 0, size = 0, count = 0, k
+    cdef double x, xback
+    for j in range(n):
+        while lo < start[j]:
+            x = a[i, lo]
+            lo += 1
+            if x == x:
+                count -= 1
+        while size > 0 and dq[head] < lo:
+            head += 1
+            if head == cap:
+                head = 0
+            size -= 1
+        x = a[i, j]
+        if x == x:
+            count += 1
+            while size > 0:
+                k = head + size - 1
+                if k >= cap:
+                    k -= cap
+                xback = a[i, dq[k]]
+                if (domax and xback <= x) or (not domax and xback >= x):
+                    size -= 1
+                else:
+                    break
+            k = head + size
+            if k >= cap:
+                k -= cap
+            dq[k] = j
+            size += 1
+        if start[j] < 0 or count < min_count:
+            out[i, j] = NAN
+        else:
+            out[i, j] = a[i, dq[head]]
+
+cdef struct Mheap:
+    # Double heap of the non-NaN elements of a window. The element in slot
+    # s (position j of the row is slot j % cap) has value val[s]; it is
+    # in heap where[s] (0: small, 1: large, -1: neither) at position pos[s].
+    # small is a max-heap of the smaller half of the elements, large a
+    # min-heap of the larger half; small has as many elements as large, or
+    # one more.
+    double *val
+    int *where
+    Py_ssize_t *pos
+    Py_ssize_t *small
+    Py_ssize_t *large
+    Py_ssize_t nsmall
+    Py_ssize_t nlarge
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef void _move_median(const floating[:, :] a, floating[:, :] out,
+                       Py_ssize_t i, const Py_ssize_t[:] start, Py_ssize_t cap,
+                       Py_ssize_t min_count, Mheap *h) nogil:
+    "Moving median of row `i` with a double heap of capacity `cap`."
+    cdef Py_ssize_t j, s, lo = 0, n = a.shape[1], count
+    cdef double x
+    h.nsmall = 0
+    h.nlarge = 0
+    for s in range(cap):
+        h.where[s] = -1
+    for j in range(n):
+        while lo < start[j]:
+            s = lo % cap
+            lo += 1
+            if h.where[s] >= 0:
+                _heap_remove(h, s)
+                _heap_balance(h)
+        # Slot of position j
+        s = j % cap
+        x = a[i, j]
+        if x == x:
+            h.val[s] = x
+            if h.nsmall == 0 or x <= h.val[h.small[0]]:
+                _heap_push(h, 0, s)
+            else:
+                _heap_push(h, 1, s)
+            _heap_balance(h)
+        count = h.nsmall + h.nlarge
+        if start[j] < 0 or count < min_count:
+            out[i, j] = NAN
+        elif count % 2 == 1:
+            out[i, j] = h.val[h.small[0]]
+        else:
+            out[i, j] = (h.val[h.small[0]] + h.val[h.large[0]]) / 2.0
+
+cdef inline Py_ssize_t *_heap_array(Mheap *h, int k) nogil:
+    if k == 0:
+        return h.small
+    return h.large
+
+cdef inline Py_ssize_t _heap_size(Mheap *h, int k) nogil:
+    if k == 0:
+        return h.nsmall
+    return h.nlarge
+
+cdef inline bint _heap_above(Mheap *h, int k, Py_ssize_t s1,
+                             Py_ssize_t s2) nogil:
+    "True if slot s1 belongs above slot s2 in heap k."
+    if k == 0:
+        return h.val[s1] > h.val[s2]
+    return h.val[s1] < h.val[s2]
+
+cdef inline void _heap_place(Mheap *h, int k, Py_ssize_t p,
+                             Py_ssize_t s) nogil:
+    _heap_array(h, k)[p] = s
+    h.pos[s] = p
+    h.where[s] = k
+
+cdef void _heap_siftup(Mheap *h, int k, Py_ssize_t p) nogil:
+    cdef Py_ssize_t *heap = _heap_array(h, k)
+    cdef Py_ssize_t s = heap[p], parent
+    while p > 0:
+        parent = (p - 1) // 2
+        if not _heap_above(h, k, s, heap[parent]):
+            break
+        _heap_place(h, k, p, heap[parent])
+        p = parent
+    _heap_place(h, k, p, s)
+
+cdef void _heap_siftdown(Mheap *h, int k, Py_ssize_t p) nogil:
+    cdef Py_ssize_t *heap = _heap_array(h, k)
+    cdef Py_ssize_t size = _heap_size(h, k), s = heap[p], child
+    while True:
+        child = 2 * p + 1
+        if child >= size:
+            break
+        if child + 1 < size and _heap_above(h, k, heap[child + 1],
+                                            heap[child]):
+            child += 1
+        if not _heap_above(h, k, heap[child], s):
+            break
+        _heap_place(h, k, p, heap[child])
+        p = child
+    _heap_place(h, k, p, s)
+
+cdef void _heap_push(Mheap *h, int k, Py_ssize_t s) nogil:
+    cdef Py_ssize_t p
+    if k == 0:
+        p = h.nsmall
+        h.nsmall += 1
+    else:
+        p = h.nlarge
+        h.nlarge += 1
+    _heap_place(h, k, p, s)
+    _heap_siftup(h, k, p)
+
+cdef void _heap_remove(Mheap *h, Py_ssize_t s) nogil:
+    "Remove slot s from its heap."
+    cdef int k = h.where[s]
+    cdef Py_ssize_t *heap = _heap_array(h, k)
+    cdef Py_ssize_t p = h.pos[s], last, t
+    if k == 0:
+        h.nsmall -= 1
+        last = h.nsmall
+    else:
+        h.nlarge -= 1
+        last = h.nlarge
+    h.where[s] = -1
+    if p != last:
+        t = heap[last]
+        _heap_place(h, k, p, t)
+        _heap_siftup(h, k, p)
+        _heap_siftdown(h, k, h.pos[t])
+
+cdef void _heap_balance(Mheap *h) nogil:
+    "Move the top of one heap to the other until the sizes are balanced."
+    cdef Py_ssize_t s
+    if h.nsmall > h.nlarge + 1:
+        s = h.small[0]
+        _heap_remove(h, s)
+        _heap_push(h, 1, s)
+    elif h.nlarge > h.nsmall:
+        s = h.large[0]
+        _heap_remove(h, s)
+        _heap_push(h, 0, s)
+
+# Moving rank ---------------------------------------------------------------
+
+def movingrank(arr, window, axis=-1, double decay=0):
+    """
+    Moving rank (normalized to -1 and 1) of the last element of each window.
+
+    Each window gives the same result as `la.farray.lastrank` of the
+    window: ties are averaged, NaNs are ignored, and a window whose last
+    element is NaN gives NaN.
+
+    The elements of a row are first replaced by their dense ranks (equal
+    values share a rank) using an argsort of the row. The (weighted) number
+    of elements of the window with each rank is then kept in a Fenwick tree,
+    so each step costs O(log n), where n is the length of the row, instead
+    of O(window).
+
+    Parameters
+    ----------
+    arr : ndarray
+        Input array; must be float32 or float64.
+    window : {int, ndarray}
+        The number of elements in the moving window, at least 2, or the
+        position of the first element of the window of each position along
+        `axis` (see `windowstart`).
+    axis : int, optional
+        The axis along which the window moves. The default is the last axis.
+    decay : float, optional
+        Exponential decay strength (see `la.farray.lastrank`). The default
+        (0) is no decay.
+
+    Returns
+    -------
+    y : ndarray
+        The moving rank as a float64 array. The first `window` - 1 elements
+        along `axis` are NaN.
+
+    """
+    arr = np.asarray(arr)
+    if arr.dtype != np.float64 and arr.dtype != np.float32:
+        raise TypeError, 'Only float32 and float64 arrays are supported.'
+    ndim = arr.ndim
+    if ndim == 0:
+        raise ValueError, 'arr must be at least 1d'
+    if axis < -ndim or axis >= ndim:
+        raise AxisError, 'axis out of range'
+    if axis < 0:
+        axis += ndim
+    if np.ndim(window) == 0:
+        if window > arr.shape[axis]:
+            raise ValueError, 'Window is too big.'
+        if window < 2:
+            raise ValueError, 'Window is too small.'
+    start, size = windowstart(window, arr.shape[axis])
+    if decay < 0:
+        raise ValueError, 'decay must be greater than or equal to zero.'
+    y = np.empty(arr.shape)
+    # Move the window axis last and make the array 2d; each row is then one
+    # moving window
+    a = np.rollaxis(arr, axis, ndim)
+    n = a.shape[-1]
+    a2 = a.reshape(-1, n)
+    out = np.empty(a2.shape)
+    def block(i, stop):
+        idx = a2[i:stop].argsort(axis=1)
+        _movingrank2d(a2[i:stop], idx, out[i:stop], start, decay)
+    threadpool.map(block, threadpool.blocks(a2.shape[0], a2.size))
+    np.rollaxis(y, axis, ndim)[...] = out.reshape(a.shape)
+    return y
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def _movingrank2d(const floating[:, :] a, const Py_ssize_t[:, :] idx,
+                  double[:, :] out, const Py_ssize_t[:] start, double decay):
+    """
+    Moving rank along each row of the 2d array `a` given its argsort `idx`.
+
+    The window of position j starts at position start[j] (negative:
+    incomplete window).
+
+    With decay the element at position t of the window that ends at
+    position j has weight exp(-decay * (j - t)). Only the ratios of the
+    weights matter, so the tree holds exp(decay * (t - base)); when those
+    grow large, the tree is rescaled and `base` moved up to j. The oldest
+    element of a window has the smallest weight, so removing it does not
+    lose precision. The GIL is released.
+
+    """
+    cdef Py_ssize_t i, j, t, k, m = a.shape[0], n = a.shape[1]
+    cdef Py_ssize_t nfinite, nneginf, base, lo
+    cdef double x, w, wsum, g, e, scale
+    tree = np.empty(n + 1)
+    dense = np.empty(n, dtype=np.intp)
+    cdef double[:] bit = tree
+    cdef Py_ssize_t[:] rank = dense
+    with nogil:
+        for i in range(m):
+            # Dense rank of each element; NaNs get ranks of their own
+            if n > 0:
+                rank[idx[i, 0]] = 0
+            for k in range(1, n):
+                rank[idx[i, k]] = rank[idx[i, k - 1]]
+                if a[i, idx[i, k]] != a[i, idx[i, k - 1]]:
+                    rank[idx[i, k]] += 1
+            for k in range(n + 1):
+                bit[k] = 0
+            nfinite = 0
+            nneginf = 0
+            wsum = 0
+            base = 0
+            lo = 0
+            w = 1
+            for j in range(n):
+                if decay > 0 and decay * (j - base) > 300:
+                    scale = exp(-decay * (j - base))
+                    for k in range(n + 1):
+                        bit[k] *= scale
+                    wsum *= scale
+                    base = j
+                while lo < start[j]:
+                    t = lo
+                    lo += 1
+                    x = a[i, t]
+                    if x == x:
+                        if decay > 0:
+                            w = exp(decay * (t - base))
+                        _bit_add(bit, rank[t] + 1, -w)
+                        if x - x == 0:
+                            nfinite -= 1
+                            wsum -= w
+                        elif x < 0:
+                            nneginf -= 1
+                x = a[i, j]
+                if decay > 0:
+                    w = exp(decay * (j - base))
+                if x == x:
+                    _bit_add(bit, rank[j] + 1, w)
+                    if x - x == 0:
+                        nfinite += 1
+                        wsum += w
+                    elif x < 0:
+                        nneginf += 1
+                if start[j] < 0 or x - x != 0:
+                    out[i, j] = NAN
+                    continue
+                if nfinite == 1:
+                    # lastrank divides by zero; the tree may hold round-off
+                    # so use the counts: only -inf elements rank below x
+                    out[i, j] = INFINITY if nneginf > 0 else NAN
+                    continue
+                # g: weight of the smaller elements; e: of the equal ones
+                g = _bit_sum(bit, rank[j])
+                e = _bit_sum(bit, rank[j] + 1) - g
+                out[i, j] = 2.0 * ((g + g + e - w) / 2.0 / (wsum - w) - 0.5)
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline void _bit_add(double[:] bit, Py_ssize_t k, double w) nogil:
+    "Add `w` to position `k` (1-based) of the Fenwick tree `bit`."
+    cdef Py_ssize_t n = bit.shape[0]
+    while k < n:
+        bit[k] += w
+        k += k & -k
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef inline double _bit_sum(double[:] bit, Py_ssize_t k) nogil:
+    "Sum of positions 1 through `k` of the Fenwick tree `bit`."
+    cdef double s = 0
+    while k > 0:
+        s += bit[k]
+        k -= k & -k
+    return s
+
+# Push ----------------------------------------------------------------------
+
+def push(arr, double n, axis=-1, bint backward=False, bint gap=False):
+    """
+    Fill missing values of `arr` in place with the preceding non-missing
+    value.
+
+    Missing values are NaN, Inf and -Inf. A missing value is filled if the
+    most recent non-missing value along `axis` is at most `n` elements
+    before it; with `gap` a run of missing values is filled only if it has
+    at most `n` elements and is bounded by non-missing values on both
+    sides. With `backward` the filling proceeds from the end of the axis
+    (the next non-missing value is used). Missing values that are not
+    filled are set to NaN.
+
+    Parameters
+    ----------
+    arr : ndarray
+        Input array; must be float32 or float64. It is modified in place.
+    n : float
+        The maximum distance (or, with `gap`, gap length) that is filled.
+    axis : int, optional
+        The axis along which to fill. The default is the last axis.
+    backward : bool, optional
+        Fill from the end of the axis. The default is False.
+    gap : bool, optional
+        Fill only the bounded gaps of at most `n` missing values. The
+        default is False.
+
+    Returns
+    -------
+    arr : ndarray
+        The input array, filled in place.
+
+    """
+    if arr.dtype != np.float64 and arr.dtype != np.float32:
+        raise TypeError, 'Only float32 and float64 arrays are supported.'
+    ndim = arr.ndim
+    if ndim == 0:
+        raise ValueError, 'arr must be at least 1d'
+    if axis < -ndim or axis >= ndim:
+        raise AxisError, 'axis out of range'
+    if axis < 0:
+        axis += ndim
+    # A view with the fill axis last; the rows are filled through it
+    a = np.rollaxis(arr, axis, ndim)
+    if ndim == 1:
+        _push2drows(a[None, :], n, backward, gap)
+    else:
+        shape = a.shape[:-1]
+        a2 = a.view()
+        try:
+            a2.shape = (int(np.prod(shape)), a.shape[-1])
+        except AttributeError:
+            for index in np.ndindex(*shape[:-1]):
+                _push2drows(a[index], n, backward, gap)
+        else:
+            _push2drows(a2, n, backward, gap)
+    return arr
+
+def _push2drows(a, double n, bint backward, bint gap):
+    "Fill the rows of the 2d `a` in place; blocks of rows per thread."
+    def block(start, stop):
+        _push2d(a[start:stop], n, backward, gap)
+    threadpool.map(block, threadpool.blocks(a.shape[0], a.size))
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def _push2d(floating[:, :] a, double n, bint backward, bint gap):
+    """
+    Fill the missing values of each row of the 2d array `a` in place.
+
+    Position j of the fill order is element j of the row or, with
+    `backward`, element j from the end. The GIL is released.
+
+    """
+    cdef Py_ssize_t i, j, k, jj, m = a.shape[0], ncol = a.shape[1], last
+    cdef floating x, value = 0
+    with nogil:
+        for i in range(m):
+            last = -1
+            for j in range(ncol):
+                jj = ncol - 1 - j if backward else j
+                x = a[i, jj]
+                if x - x == 0:
+                    if gap and last >= 0 and j - last - 1 <= n:
+                        for k in range(last + 1, j):
+                            if backward:
+                                a[i, ncol - 1 - k] = value
+                            else:
+                                a[i, k] = value
+                    last = j
+                    value = x
+                elif not gap and last >= 0 and j - last <= n:
+                    a[i, jj] = value
+                else:
+                    a[i, jj] = NAN
+
+# Exponentially weighted moving statistics ----------------------------------
+
+def ewma(arr, double halflife, axis=-1, state=None):
+    """
+    Exponentially weighted moving average along the given axis ignoring
+    NaNs.
+
+    See `_ewm` for the parameters. Returns the moving average, with the
+    dtype of `arr`, and the state at the end of `axis`.
+
+    """
+    return _ewm(arr, arr, halflife, axis, state, MEAN)
+
+def ewmstd(arr, double halflife, axis=-1, state=None):
+    """
+    Exponentially weighted moving standard deviation along the given axis
+    ignoring NaNs.
+
+    See `_ewm` for the parameters. Returns the moving standard deviation,
+    with the dtype of `arr`, and the state at the end of `axis`.
+
+    """
+    return _ewm(arr, arr, halflife, axis, state, STD)
+
+def ewmcorr(arr1, arr2, double halflife, axis=-1, state=None):
+    """
+    Exponentially weighted moving correlation of `arr1` and `arr2` along the
+    given axis ignoring pairs with a NaN.
+
+    See `_ewm` for the parameters. Returns the moving correlation, with the
+    dtype of `arr1`, and the state at the end of `axis`.
+
+    """
+    return _ewm(arr1, arr2, halflife, axis, state, CORR)
+
+def _ewm(arr1, arr2, double halflife, axis, state, int op):
+    """
+    Exponentially weighted moving statistic of `arr1` (and `arr2`).
+
+    Each step along `axis` multiplies the weights of the earlier elements by
+    0.5 ** (1 / `halflife`) and, unless it is NaN, gives the element at the
+    step a weight of 1. The weighted mean, variance and covariance are
+    updated with the weighted version of Welford's algorithm, so each step
+    costs O(1). Positions before the first non-NaN element are NaN.
+
+    `arr1` and `arr2` must be float32 or float64 arrays of the same shape
+    and dtype. `state` is None (no earlier data) or the state returned by an
+    earlier call: a float64 array of the shape of `arr1` with `axis` of
+    length 6 (weight, mean of arr1, mean of arr2, variance of arr1,
+    variance of arr2, covariance). With the state of the previous block of
+    a longer axis the statistic continues as if the blocks were one array.
+
+    """
+    arr1 = np.asarray(arr1)
+    arr2 = np.asarray(arr2)
+    dtype = arr1.dtype
+    if dtype != np.float64 and dtype != np.float32:
+        raise TypeError, 'Only float32 and float64 arrays are supported.'
+    if arr2.dtype != dtype or arr2.shape != arr1.shape:
+        raise ValueError, 'arr1 and arr2 must have the same shape and dtype'
+    ndim = arr1.ndim
+    if ndim == 0:
+        raise ValueError, 'arr must be at least 1d'
+    if axis < -ndim or axis >= ndim:
+        raise AxisError, 'axis out of range'
+    if axis < 0:
+        axis += ndim
+    if not halflife > 0:
+        raise ValueError, 'halflife must be greater than zero.'
+    y = np.empty(arr1.shape, dtype=dtype)
+    a1 = np.rollaxis(arr1, axis, ndim)
+    n = a1.shape[-1]
+    shape = a1.shape[:-1] + (6,)
+    if state is None:
+        st = np.zeros(shape)
+    else:
+        state = np.asarray(state)
+        if np.rollaxis(state, axis, ndim).shape != shape:
+            raise ValueError, 'state does not match the shape of the array'
+        st = np.array(np.rollaxis(state, axis, ndim), dtype=np.float64,
+                      order='C')
+    m = int(np.prod(shape[:-1]))
+    a1 = a1.reshape(m, n)
+    a2 = np.rollaxis(arr2, axis, ndim).reshape(m, n)
+    st = st.reshape(m, 6)
+    out = np.empty(a1.shape, dtype=dtype)
+    alpha = 0.5 ** (1.0 / halflife)
+    def block(start, stop):
+        _ewm2d(a1[start:stop], a2[start:stop], out[start:stop],
+               st[start:stop], alpha, op)
+    threadpool.map(block, threadpool.blocks(a1.shape[0], a1.size))
+    np.rollaxis(y, axis, ndim)[...] = out.reshape(y.shape[:axis] +
+                                                   y.shape[axis + 1:] + (n,))
+    return y, np.rollaxis(st.reshape(shape), ndim - 1, axis)
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+def _ewm2d(const floating[:, :] a1, const floating[:, :] a2,
+           floating[:, :] out, double[:, :] state, double alpha, int op):
+    """
+    Exponentially weighted statistic along each row of the 2d `a1` (`a2`).
+
+    All the statistics of the state are updated, whatever `op`, so that the
+    state of one statistic can be used to continue another; for ewma and
+    ewmstd `a2` is `a1`. `state` is updated in place. The GIL is released.
+
+    """
+    cdef Py_ssize_t i, j, m = a1.shape[0], n = a1.shape[1]
+    cdef double w, mean1, mean2, m11, m22, m12, x1, x2, d1, d2
+    with nogil:
+        for i in range(m):
+            w = state[i, 0]
+            mean1 = state[i, 1]
+            mean2 = state[i, 2]
+            m11 = state[i, 3] * w
+            m22 = state[i, 4] * w
+            m12 = state[i, 5] * w
+            for j in range(n):
+                w *= alpha
+                m11 *= alpha
+                m22 *= alpha
+                m12 *= alpha
+                x1 = a1[i, j]
+                x2 = a2[i, j]
+                if x1 == x1 and x2 == x2:
+                    w += 1
+                    d1 = x1 - mean1
+                    d2 = x2 - mean2
+                    mean1 += d1 / w
+                    mean2 += d2 / w
+                    m11 += d1 * (x1 - mean1)
+                    m22 += d2 * (x2 - mean2)
+                    m12 += d1 * (x2 - mean2)
+                if w == 0:
+                    out[i, j] = NAN
+                elif op == MEAN:
+                    out[i, j] = mean1
+                elif op == STD:
+                    out[i, j] = sqrt(m11 / w) if m11 > 0 else 0
+                elif m11 > 0 and m22 > 0:
+                    out[i, j] = m12 / sqrt(m11 * m22)
+                else:
+                    out[i, j] = NAN
+            state[i, 0] = w
+            state[i, 1] = mean1
+            state[i, 2] = mean2
+            if w > 0:
+                state[i, 3] = m11 / w
+                state[i, 4] = m22 / w
+                state[i, 5] = m12 / w
@@ -1,6 +1,9 @@
 "Cython versions of la/flabel.py functions"
 
-def listmap(list list1, list list2, bool ignore_unmappable=False):
+import numpy as np
+cimport cython
+
+def listmap(list list1, list list2, bint ignore_unmappable=False):
     """
     Indices that map one list onto another list.
     
@@ -152,3 +155,152 @@ def listmap_fill(list list1, list list2, int fill=0):
             index_missing.append(i)
     return index, index_missing
     
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def maparray(keys1, keys2):
+    """
+    Indices that map one int64 array onto another and a bool found mask.
+    
+    The array version of listmap for int (and date ordinal) labels. The keys
+    of `keys1` are inserted into an open-addressing (linear probing) hash
+    table of int64 keys; the elements of `keys2` are then looked up in the
+    table. No Python objects are created.
+    
+    Parameters
+    ----------
+    keys1 : array_like
+        The 1d int64 array to map from.
+    keys2 : array_like
+        The 1d int64 array to map to.
+    
+    Returns
+    -------
+    idx : ndarray
+        An intp array such that keys1[idx[found]] is keys2[found]. Elements
+        of `keys2` that are not in `keys1` are given the index value 0. If
+        `keys1` contains duplicates, the last occurrence is used (as with
+        listmap).
+    found : ndarray
+        A bool array that is True where the element of `keys2` is in
+        `keys1`.
+        
+    Notes
+    -----
+    This is the C version of the function.
+    
+    Examples
+    --------
+    >>> idx, found = maparray([1, 2, 3], [3, 1, 4])
+    >>> idx
+    array([2, 0, 0])
+    >>> found
+    array([ True,  True, False], dtype=bool)
+    
+    """
+    cdef long long[:] k1 = np.ascontiguousarray(keys1, dtype=np.int64)
+    cdef long long[:] k2 = np.ascontiguousarray(keys2, dtype=np.int64)
+    cdef Py_ssize_t i, p, n1 = k1.shape[0], n2 = k2.shape[0]
+    cdef Py_ssize_t size = 8
+    cdef unsigned long long h, mask
+    cdef long long key
+    while size < 2 * n1:
+        size *= 2
+    mask = size - 1
+    table = np.empty(size, dtype=np.intp)
+    table.fill(-1)
+    idx = np.zeros(n2, dtype=np.intp)
+    found = np.zeros(n2, dtype=np.uint8)
+    cdef Py_ssize_t[:] t = table
+    cdef Py_ssize_t[:] ix = idx
+    cdef unsigned char[:] f = found
+    with nogil:
+        for i in range(n1):
+            key = k1[i]
+            h = _hash(key) & mask
+            while True:
+                p = t[h]
+                if p == -1 or k1[p] == key:
+                    # Insert or, for duplicates, the last occurrence wins
+                    t[h] = i
+                    break
+                h = (h + 1) & mask
+        for i in range(n2):
+            key = k2[i]
+            h = _hash(key) & mask
+            while True:
+                p = t[h]
+                if p == -1:
+                    break
+                if k1[p] == key:
+                    ix[i] = p
+                    f[i] = 1
+                    break
+                h = (h + 1) & mask
+    return idx, found.view(np.bool_)
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def uniquearray(keys):
+    """
+    True if the elements of an int64 array are unique; False otherwise.
+    
+    The keys are inserted into an open-addressing (linear probing) hash
+    table of int64 keys; the insertion stops at the first duplicate.
+    
+    Parameters
+    ----------
+    keys : array_like
+        The 1d int64 array (for example int labels or date ordinals).
+    
+    Returns
+    -------
+    unique : bool
+        True if there are no duplicates in `keys`.
+        
+    Notes
+    -----
+    This is the C version of the function.
+    
+    Examples
+    --------
+    >>> uniquearray([3, 1, 2])
+    True
+    >>> uniquearray([3, 1, 3])
+    False
+    
+    """
+    cdef long long[:] k = np.ascontiguousarray(keys, dtype=np.int64)
+    cdef Py_ssize_t i, p, n = k.shape[0]
+    cdef Py_ssize_t size = 8
+    cdef unsigned long long h, mask
+    cdef long long key
+    cdef bint unique = True
+    while size < 2 * n:
+        size *= 2
+    mask = size - 1
+    table = np.empty(size, dtype=np.intp)
+    table.fill(-1)
+    cdef Py_ssize_t[:] t = table
+    with nogil:
+        for i in range(n):
+            key = k[i]
+            h = _hash(key) & mask
+            while True:
+                p = t[h]
+                if p == -1:
+                    t[h] = i
+                    break
+                if k[p] == key:
+                    unique = False
+                    break
+                h = (h + 1) & mask
+            if not unique:
+                break
+    return unique
+
+cdef inline unsigned long long _hash(long long key) nogil:
+    "Fibonacci hashing with the high bits folded into the low bits."
+    cdef unsigned long long h = <unsigned long long>key
+    h *= 11400714819323198485ULL
+    return h ^ (h >> 32)
@@ -1,11 +1,11 @@
 """
-Use to convert cflabel.pyx to a C file.
+Use to convert cflabel.pyx and cfarray.pyx to C files.
 
 This setup.py is NOT used to install the la package. The la setup.py file is
 la/setup.py
 
 The C files are distributed with larry, so this file is only useful if you
-modify cflabel.pyx.
+modify cflabel.pyx or cfarray.pyx.
 
 To convert from cython to C:
 
@@ -18,7 +18,8 @@ from distutils.core import setup
 from distutils.extension import Extension
 from Cython.Distutils import build_ext
 
-ext_modules = [Extension("cflabel", ["cflabel.pyx"])]
+ext_modules = [Extension("cflabel", ["cflabel.pyx"]),
+               Extension("cfarray", ["cfarray.pyx"])]
 
 setup(
   name = 'cflabel',
@@ -1,5 +1,6 @@
 "Unit tests of larry."
 
+import pickle
 import datetime
 import unittest
 
@@ -12,6 +13,7 @@ import la
 from la import larry
 from la.util.testing import printfail, noreference
 from la.util.testing import assert_larry_equal as ale
+from la.flabel import joincache
 
 
 class Test_init(unittest.TestCase):
@@ -60,6 +62,42 @@ class Test_init(unittest.TestCase):
         self.assert_(self.label == p.label,
                      printfail(self.label, p.label, 'label'))
 
+    def test_init_unique(self):
+        "larry.__init__unique"
+        typed = la.Typedlabel
+        for label in ([[0, 0], [0, 1]], [typed([1, 1]), [0, 1]]):
+            self.assertRaises(ValueError, larry, self.array, label)
+        label = [typed([1, 0]), typed(['a', 'b'])]
+        p = larry(self.array, label)
+        for lab in label:
+            self.assert_(lab._unique is lab.x, 'uniqueness not remembered')
+        self.assertRaises(ValueError, p.__getitem__, [0, 0])
+        self.assertRaises(ValueError, p.__getitem__, np.array([1, 1]))
+        self.assertRaises(ValueError, p.__getitem__, (slice(None), [0, 0]))
+        self.assertRaises(ValueError, p.take, [1, 1], 1)
+        self.assertRaises(ValueError, p.morph, [0, 0], 0)
+        
+    def test_init_trusted(self):
+        "larry._trusted"
+        label = [['a', 'b'], [0, 1]]
+        p = larry._trusted(self.array, label)
+        ale(p, larry(self.array, label), 'larry._trusted', original=None)
+        self.assert_(p.x is self.array, 'x was copied')
+        self.assert_(p.label is label, 'label was copied')
+        
+    def test_init_slots(self):
+        "larry.__slots__"
+        p = larry(self.array)
+        self.assert_(not hasattr(p, '__dict__'), 'larry has a __dict__')
+        self.assertRaises(AttributeError, setattr, p, 'attr', 1)
+
+    def test_init_pickle(self):
+        "larry.__getstate__"
+        p = larry(self.array, [['a', 'b'], [0, 1]]).log()
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            msg = 'pickle protocol %d' % protocol
+            ale(pickle.loads(pickle.dumps(p, protocol)), p, msg, original=p)
+
     
 class Test_unary(unittest.TestCase):
     "Test unary functions of larry class"
@@ -1197,6 +1235,103 @@ class Test_binary(unittest.TestCase):
         self.assert_(noreference(p, self.l2), 'Reference found')
         self.assert_(noreference(p, self.l3), 'Reference found')
 
+    def test___iadd___1(self):
+        "larry.__iadd___1"
+        p = self.l1.copy()
+        x = p.x
+        p += self.l3
+        desired = larry(self.x1 + self.x3)
+        ale(p, desired, 'larry += larry', original=self.l3)
+        self.assert_(p.x is x, 'data array was reallocated')
+        p += 1
+        ale(p, desired + 1, 'larry += scalar')
+        self.assert_(p.x is x, 'data array was reallocated')
+        p += self.x1
+        ale(p, desired + 1 + self.x1, 'larry += array')
+        self.assert_(p.x is x, 'data array was reallocated')
+
+    def test___iadd___2(self):
+        "larry.__iadd___2"
+        p = self.l1.copy()
+        x = p.x
+        p += self.l2
+        desired = la.add(self.l1, self.l2, join='left')
+        ale(p, desired, 'larry += unaligned larry', original=self.l2)
+        self.assert_(p.x is x, 'data array was reallocated')
+        p = larry([1, 2, 3], [['a', 'b', 'c']])
+        p += larry([1, 2], [['c', 'a']])
+        desired = larry([3.0, nan, 4.0], [['a', 'b', 'c']])
+        ale(p, desired, 'int larry += unaligned larry')
+        p = larry([1, 2])
+        p += 0.5
+        ale(p, larry([1.5, 2.5]), 'int larry += float')
+        self.failUnlessRaises(TypeError, p.__iadd__, datetime.date(2007, 1, 1))
+        self.failUnlessRaises(IndexError, p.__iadd__, self.l2)
+
+    def test___isub___1(self):
+        "larry.__isub___1"
+        p = self.l1.copy()
+        x = p.x
+        p -= self.l3
+        ale(p, self.l1 - self.l3, 'larry -= larry', original=self.l3)
+        self.assert_(p.x is x, 'data array was reallocated')
+        p = self.l3.copy()
+        p -= self.l2
+        desired = la.subtract(self.l3, self.l2, join='left')
+        ale(p, desired, 'larry -= unaligned larry', original=self.l2)
+
+    def test___imul___1(self):
+        "larry.__imul___1"
+        p = self.l1.copy()
+        x = p.x
+        p *= self.l3
+        ale(p, self.l1 * self.l3, 'larry *= larry', original=self.l3)
+        self.assert_(p.x is x, 'data array was reallocated')
+        p = self.l3.copy()
+        p *= self.l2
+        desired = la.multiply(self.l3, self.l2, join='left')
+        ale(p, desired, 'larry *= unaligned larry', original=self.l2)
+
+    def test___idiv___1(self):
+        "larry.__idiv___1"
+        p = self.l3.copy()
+        x = p.x
+        p /= self.l3
+        ale(p, self.l3 / self.l3, 'larry /= larry', original=self.l3)
+        self.assert_(p.x is x, 'data array was reallocated')
+        p = self.l3.copy()
+        p /= self.l2
+        desired = la.divide(self.l3, self.l2, join='left')
+        ale(p, desired, 'larry /= unaligned larry', original=self.l2)
+
+    def test___itruediv___1(self):
+        "larry.__itruediv___1"
+        p = larry([1.0, 2.0, 3.0])
+        x = p.x
+        p.__itruediv__(larry([2.0, 4.0, 8.0]))
+        ale(p, larry([0.5, 0.5, 0.375]), 'larry /= larry')
+        self.assert_(p.x is x, 'data array was reallocated')
+        p = larry([1, 2])
+        p.__itruediv__(2)
+        ale(p, larry([0.5, 1.0]), 'int larry /= int')
+
+    def test___iadd___3(self):
+        "larry.__iadd___3"
+        y = larry([1.0, 2.0, 3.0])
+        v = y[1:]
+        v += 1
+        ale(v, larry([3.0, 4.0], [[1, 2]]), 'view += scalar')
+        ale(y, larry([1.0, 2.0, 3.0]), 'view += scalar changed larry')
+        v = y[1:]
+        y *= 2
+        ale(v, larry([2.0, 3.0], [[1, 2]]), 'larry *= scalar changed view')
+        x = np.arange(6.0).reshape(2, 3)
+        y = larry(x)
+        y += 1
+        self.assert_(y.x is x, 'data array was reallocated')
+        assert_equal(x, np.arange(1.0, 7.0).reshape(2, 3),
+                     'data array not written in place')
+
 
 class Test_reduce(unittest.TestCase):
     "Test reducing functions of the larry class"
@@ -1431,6 +1566,22 @@ class Test_reduce(unittest.TestCase):
         msg = printfail(t, p, '')
         self.assert_(p == t, msg)
 
+    def test_nanquantile_1(self):
+        "larry.nanquantile_1"
+        assert_almost_equal(self.l3.nanquantile(0.5), self.l3.median())
+        assert_almost_equal(self.l2.nanquantile(0.25), 1.5)
+        t = larry([1.0, 0.5, 0.5])
+        p = self.l3.nanquantile(0.25, axis=1)
+        ale(p, t, 'larry.nanquantile_1', original=self.l3)
+        t = larry([1.0, 1.0, 2.25])
+        p = self.l3.nanquantile(0.75, axis=0)
+        ale(p, t, 'larry.nanquantile_1', original=self.l3)
+
+    def test_nanquantile_2(self):
+        "larry.nanquantile_2"
+        self.failUnlessRaises(ValueError, self.l.nanquantile, 0.5, 3)
+        self.failUnlessRaises(ValueError, self.l.nanquantile, 2, 0)
+
     def test_std_1(self):
         "larry.std_1"
         t = 0.0
@@ -1597,6 +1748,31 @@ class Test_reduce(unittest.TestCase):
         msg = printfail(t, p, '')
         self.assert_(p == t, msg)
         
+    def test_describe_1(self):
+        "larry.describe_1"
+        stats = ['count', 'mean', 'std', 'min', 'max', 'missing']
+        x = np.array([[3.0, 2.0],
+                      [1.0, 1.0],
+                      [0.0, 0.0],
+                      [1.0, 1.0],
+                      [1.0, 1.0],
+                      [0.0, 1/3.]])
+        t = larry(x, [stats, [0, 1]])
+        p = self.l.describe(0)
+        ale(p, t, 'larry.describe_1', original=self.l)
+
+    def test_describe_2(self):
+        "larry.describe_2"
+        stats = ['count', 'mean', 'std', 'min', 'max', 'missing']
+        x = np.array([3.0, 2.0, np.sqrt(2/3.), 1.0, 3.0, 0.0])
+        t = larry(x, [stats])
+        ale(self.l2.describe(), t, 'larry.describe_2', original=self.l2)
+        p = self.l3.describe(-1)
+        self.assert_(p.label[0] == self.l3.label[0], 'larry.describe_2')
+        self.assert_(p.label[1] == stats, 'larry.describe_2')
+        assert_almost_equal(p.x[:, 5], [2/3., 0, 0])
+        self.failUnlessRaises(ValueError, self.l.describe, [0, 1])
+
     def test_lastrank_1(self):
         "larry.lastrank_1"
         t = np.array([ nan,  1.0, -1.0])            
@@ -2514,6 +2690,28 @@ class Test_label(unittest.TestCase):
         axis = 0
         p = self.l2.labelindex(3, axis)
         self.assert_(t == p, printfail(t, p, 'label'))
+
+    def test_labelindex_5(self):
+        "larry.labelindex_5"
+        y = larry([1, 2, 3], [['a', 'b', 'c']])
+        self.assert_(y.labelindex('c', 0) == 2, 'wrong index')
+        y.label[0] = ['c', 'b', 'a']
+        p = y.labelindex('c', 0)
+        self.assert_(p == 0, 'cached index not rebuilt on new label')
+        y.label[0][1] = 'z'
+        p = y.labelindex('z', 0)
+        self.assert_(p == 1, 'cached index not rebuilt on in-place change')
+        self.failUnlessRaises(IndexError, y.labelindex, 'b', 0)
+
+    def test_labelindex_6(self):
+        "larry.labelindex_6"
+        y = larry([1, 2, 3], [[10, 20, 30]])
+        self.assert_(y.labelindex(25, 0, exact=False) == 1, 'wrong index')
+        self.assert_(y.labelindex(30, 0, exact=False) == 2, 'wrong index')
+        self.assert_(y.labelindex(99, 0, exact=False) == 2, 'wrong index')
+        self.failUnlessRaises(IndexError, y.labelindex, 5, 0, False)
+        y = larry([1, 2, 3], [[30, 10, 20]])
+        self.assert_(y.labelindex(25, 0, exact=False) == 2, 'wrong index')
         
     def test_maplabel_1(self):
         "label.maplabel_1"
@@ -2741,6 +2939,31 @@ class Test_calc(unittest.TestCase):
         self.assert_(label == p.label, printfail(label, p.label, 'label'))
         self.assert_(noreference(p, self.l4), 'Reference found')
 
+    def test_push_4(self):
+        "larry.push_4"
+        d = larry([[ 1.0, 1.0, 2.0, 3.0, 4.0],
+                   [ 1.0, 2.0, 2.0, nan, nan],
+                   [ 2.0, 2.0, nan, nan, nan],
+                   [ 3.0, 3.0, 3.0, 3.0, nan]])
+        p = self.l4.push(1, backward=True)
+        ale(p, d, 'push_4', original=self.l4)
+
+    def test_push_5(self):
+        "larry.push_5"
+        d = larry([[ nan, 1.0, 2.0, 3.0, 4.0],
+                   [ 1.0, 1.0, 2.0, nan, nan],
+                   [ 2.0, 2.0, nan, nan, nan],
+                   [ 3.0, 3.0, 3.0, 3.0, nan]])
+        p = self.l4.push(2, gap=True)
+        ale(p, d, 'push_5', original=self.l4)
+
+    def test_push_6(self):
+        "larry.push_6"
+        d = self.l4.push(1)
+        p = self.l4.copy()
+        self.assert_(p.push(1, inplace=True) is None, 'push_6 returned')
+        ale(p, d, 'push_6')
+
 
     def test_mov_sum_1(self):
         "larry.mov_sum_1"
@@ -2882,6 +3105,100 @@ class Test_calc(unittest.TestCase):
         msg = "Inf is not a missing value" 
         assert_equal(larry([np.inf]).mov_sum(1)[0], np.inf, msg) 
 
+    def test_mov_mean_1(self):
+        "larry.mov_mean_1"
+        t = larry([[nan, 2.0, 2.0, 1.0],
+                   [nan, nan, nan, 1.0],
+                   [nan, 1.0, 1.0, 1.0]])
+        p = self.l2.mov_mean(2)
+        ale(p, t, 'larry.mov_mean_1', original=self.l2)
+
+    def test_mov_std_1(self):
+        "larry.mov_std_1"
+        t = larry([[nan, nan, 0.0, 0.5],
+                   [nan, nan, nan, 0.0],
+                   [nan, nan, 0.0, 0.0]])
+        p = self.l2.mov_std(3)
+        ale(p, t, 'larry.mov_std_1', original=self.l2)
+
+    def test_mov_min_1(self):
+        "larry.mov_min_1"
+        p = self.l2.mov_min(1)
+        ale(p, self.l2, 'larry.mov_min_1', original=self.l2)
+
+    def test_mov_max_1(self):
+        "larry.mov_max_1"
+        t = larry([[nan, nan, nan, nan],
+                   [2.0, 2.0, nan, 1.0],
+                   [1.0, 1.0, nan, 1.0]])
+        p = self.l2.mov_max(2, axis=0)
+        ale(p, t, 'larry.mov_max_1', original=self.l2)
+
+    def test_mov_median_1(self):
+        "larry.mov_median_1"
+        t = larry([[nan, nan, 2.0, 1.5],
+                   [nan, nan, nan, nan],
+                   [nan, nan, 1.0, 1.0]])
+        p = self.l2.mov_median(3, min_count=2)
+        ale(p, t, 'larry.mov_median_1', original=self.l2)
+        self.failUnlessRaises(ValueError, self.l2.mov_median, 5)
+
+    def test_mov_mean_2(self):
+        "larry.mov_mean_2"
+        d = datetime.date
+        dates = [d(2010, 1, 1), d(2010, 1, 2), d(2010, 1, 4), d(2010, 1, 5),
+                 d(2010, 1, 8)]
+        lar = larry([[1.0, 2.0, 3.0, nan, 5.0],
+                     [2.0, 4.0, 6.0, 8.0, 10.0]], [['a', 'b'], dates])
+        t = larry([[nan, nan, 2.5, 3.0, 5.0],
+                   [nan, nan, 5.0, 7.0, 10.0]], [['a', 'b'], dates])
+        p = lar.mov_mean(datetime.timedelta(3))
+        ale(p, t, 'larry.mov_mean_2', original=lar)
+        p = lar.T.mov_mean(np.timedelta64(3, 'D'), axis=0)
+        ale(p, t.T, 'larry.mov_mean_2', original=lar.T)
+        t = larry([[nan, nan, 5.0, 3.0, 5.0],
+                   [nan, nan, 10.0, 14.0, 10.0]], [['a', 'b'], dates])
+        p = lar.mov_sum(datetime.timedelta(3))
+        ale(p, t, 'larry.mov_mean_2', original=lar)
+        t = larry([[nan, nan, 1.0, nan, nan],
+                   [nan, nan, 1.0, 1.0, nan]], [['a', 'b'], dates])
+        p = lar.movingrank(datetime.timedelta(3))
+        ale(p, t, 'larry.mov_mean_2', original=lar)
+        self.failUnlessRaises(TypeError, self.l2.mov_mean,
+                              datetime.timedelta(3))
+        self.failUnlessRaises(ValueError, self.l2.mov_median, 2, -1, 3)
+
+    def test_ewma_1(self):
+        "larry.ewma_1"
+        t = larry([[2.0, 2.0, 2.0, 14.0 / 11],
+                   [nan, nan, nan, 1.0],
+                   [1.0, 1.0, 1.0, 1.0]])
+        p = self.l2.ewma(1)
+        ale(p, t, 'larry.ewma_1', original=self.l2)
+        self.failUnlessRaises(ValueError, self.l2.ewma, 0)
+
+    def test_ewmstd_1(self):
+        "larry.ewmstd_1"
+        t = larry([[0.0, 0.0, 0.0, np.sqrt(24.0) / 11],
+                   [nan, nan, nan, 0.0],
+                   [0.0, 0.0, 0.0, 0.0]])
+        p = self.l2.ewmstd(1)
+        ale(p, t, 'larry.ewmstd_1', original=self.l2)
+
+    def test_ewmcorr_1(self):
+        "larry.ewmcorr_1"
+        t = self.l1.ewmcorr(self.l2, 2)
+        p1, state = self.l1[:, :2].ewmcorr(self.l2[:, :2], 2,
+                                            return_state=True)
+        self.assert_(state.label[1] == ['weight', 'mean', 'mean2', 'var',
+                                        'var2', 'cov'], 'state label')
+        # The rows of the state are aligned to the larrys
+        state = state[::-1]
+        p2 = self.l1[:, 2:].ewmcorr(self.l2[:, 2:], 2, state=state)
+        ale(p1, t[:, :2], 'larry.ewmcorr_1 (first)')
+        ale(p2, t[:, 2:], 'larry.ewmcorr_1 (second)')
+        self.failUnlessRaises(TypeError, self.l1.ewmcorr, self.x2, 2)
+
     def test_movingsum_forward_1(self):
         "larry.movingsum_forward_1"    
         t = np.array([[2.0, 12.0, 6.0, 8.0, nan],
@@ -3169,6 +3486,31 @@ class Test_calc(unittest.TestCase):
         self.assert_((abs(t - p.x) < self.tol).all(), msg)
         self.assert_(label == p.label, printfail(label, p.label, 'label'))
         self.assert_(noreference(p, self.l7), 'Reference found') 
+
+    def test_groupby_1(self):
+        "larry.groupby_1"
+        lar = larry([[1.0, 2.0, 3.0, 6.0],
+                     [4.0, nan, 2.0, 1.0]], [['r', 's'], ['a', 'b', 'c', 'd']])
+        group = larry(['y', 'x', 'y', 'x', 'z'], [['d', 'c', 'b', 'a', 'e']])
+        g = lar.groupby(group, axis=1)
+        self.assert_(g.groups == ['x', 'y'], 'groups')
+        t = larry([[2.0, 4.0, 2.0, 4.0],
+                   [3.0, 1.0, 3.0, 1.0]], lar.label)
+        ale(g.agg('mean'), t, 'larry.groupby_1', original=lar)
+        ale(lar.group_mean(group, axis=1), t, 'larry.groupby_1',
+            original=lar)
+        t = larry([[1.0, 2.0, 1.0, 2.0],
+                   [1.0, 0.0, 1.0, 0.0]], lar.label)
+        ale(g.agg('std'), t, 'larry.groupby_1', original=lar)
+        t = larry([[-1.0, -1.0, 1.0, 1.0],
+                   [1.0, nan, -1.0, 0.0]], lar.label)
+        ale(g.agg('rank'), t, 'larry.groupby_1', original=lar)
+        ale(lar.group_ranking(group, axis=1), t, 'larry.groupby_1',
+            original=lar)
+        t = larry([[3.0, 6.0, 3.0, 6.0],
+                   [4.0, 1.0, 4.0, 1.0]], lar.label)
+        ale(g.agg(np.nanmax), t, 'larry.groupby_1', original=lar)
+        self.failUnlessRaises(ValueError, g.agg, 'sum')
         
     def test_quantile_1(self):
         "larry.quantile_1"    
@@ -3425,6 +3767,25 @@ class Test_alignment(unittest.TestCase):
         desired = la.larry([nan, 1.0], [[10, 0]])
         ale(actual, desired, "int morph unmappable", original=original)
 
+    def test_morph_10(self):
+        "larry.morph_10"
+        d = datetime.date
+        original = la.larry([1, 2], [[d(2011,1,1), d(2011,1,4)]])
+        label = [d(2010,12,31), d(2011,1,3), d(2011,1,4), d(2011,1,9)]
+        actual = original.morph(label, axis=0, join='asof')
+        desired = la.larry([nan, 1, 2, 2], [label])
+        ale(actual, desired, "asof morph", original=original)
+        actual = original.morph(label, axis=0, join='asof',
+                                direction='forward')
+        desired = la.larry([1, 2, 2, nan], [label])
+        ale(actual, desired, "asof forward morph", original=original)
+        actual = original.morph(label, axis=0, join='asof',
+                                direction='nearest',
+                                tolerance=datetime.timedelta(1))
+        desired = la.larry([1, 2, 2, nan], [label])
+        ale(actual, desired, "asof nearest morph", original=original)
+        self.failUnlessRaises(ValueError, original.morph, label, 0, 'inner')
+
     def test_morph_10(self):
         "larry.morph_10"
         original = la.larry([True, False])
@@ -4069,7 +4430,165 @@ class Test_vacuum(unittest.TestCase):
         assert_almost_equal(larv.x, larr.x)
         assert_(larv.label == larr.label)
  
-           
+class Test_typedlabel(unittest.TestCase):
+    "Test larrys with typed (Typedlabel) labels"
+    
+    def setUp(self):
+        d = datetime.date
+        dates = [d(2010, 1, 4), d(2010, 1, 1), d(2010, 1, 5), d(2010, 1, 2)]
+        self.x = np.arange(8.0).reshape(4, 2)
+        self.label = [dates, ['b', 'a']]
+        self.y = larry(self.x, [la.Typedlabel(z) for z in self.label])
+        self.z = larry(self.x, [list(z) for z in self.label])
+        
+    def check(self, typed, untyped, msg):
+        ale(typed, untyped, msg, original=None)
+        for lab in typed.label:
+            self.assert_(type(lab) is la.Typedlabel, msg + ' lost typed label')
+            
+    def test_typedlabel_1(self):
+        "typedlabel_1"
+        y, z = self.y, self.z
+        self.check(y[1:3], z[1:3], 'slice')
+        self.check(y[[0, 2]], z[[0, 2]], 'list index')
+        idx = np.array([True, False, True, True])
+        self.check(y[idx], z[idx], 'bool index')
+        self.check(y[:, [1, 0]], z[:, [1, 0]], 'tuple index')
+        self.check(y.take([2, 0], 0), z.take([2, 0], 0), 'take')
+        self.check(y.sortaxis(), z.sortaxis(), 'sortaxis')
+        self.check(y.sortaxis(reverse=True), z.sortaxis(reverse=True),
+                   'sortaxis reverse')
+        self.check(y.copy(), z.copy(), 'copy')
+        
+    def test_typedlabel_2(self):
+        "typedlabel_2"
+        y, z = self.y, self.z
+        y2 = y[[3, 1, 0]]
+        z2 = z[[3, 1, 0]]
+        self.check(y + y2, z + z2, 'add')
+        for join in ('inner', 'outer', 'left', 'right'):
+            ya, yb = la.align(y, y2, join)
+            za, zb = la.align(z, z2, join)
+            self.check(ya, za, 'align ' + join)
+            self.check(yb, zb, 'align ' + join)
+        self.check(y2.merge(y, update=True), z2.merge(z, update=True),
+                   'merge')
+        label = la.Typedlabel(['a', 'c'])
+        ale(y.morph(label, 1), z.morph(['a', 'c'], 1), 'morph', original=None)
+        
+    def test_typedlabel_3(self):
+        "typedlabel_3"
+        y, z = self.y, self.z
+        y2 = y[[3, 1, 0]]
+        z2 = z[[3, 1, 0]]
+        u = la.union(0, y, y2)
+        self.assert_(type(u) is la.Typedlabel, 'union not typed')
+        self.assert_(u == la.union(0, z, z2), 'union')
+        i = la.intersection(0, y, y2)
+        self.assert_(type(i) is la.Typedlabel, 'intersection not typed')
+        self.assert_(i == la.intersection(0, z, z2), 'intersection')
+        d = self.label[0][0]
+        for op in ('==', '>', '<', '>=', '<=', '!='):
+            ale(y.keep_label(op, d, 0), z.keep_label(op, d, 0), op,
+                original=None)
+        ale(y.keep_label('in', ['a'], 1), z.keep_label('in', ['a'], 1),
+            'in', original=None)
+        self.assert_(y.labelindex(d, 0) == 0, 'labelindex')
+        
+    def test_typedlabel_4(self):
+        "typedlabel_4"
+        label = [la.Typedlabel(['a', 'a'])]
+        self.failUnlessRaises(ValueError, larry, [1, 2], label)
+
+class Test_copyonwrite(unittest.TestCase):
+    "Test that larrys share labels copy-on-write"
+    
+    def setUp(self):
+        self.x = np.arange(6.0).reshape(3, 2)
+        
+    def test_copyonwrite_1(self):
+        "copyonwrite_1"
+        y = larry(self.x)
+        z = y.log()
+        self.assert_(z._label[0] is y._label[0], 'label not shared')
+        z.label[0][0] = 'a'
+        msg = 'changing label of output changed label of input'
+        self.assert_(y.label[0][0] == 0, msg)
+        self.assert_(z.label[0][0] == 'a', 'label change lost')
+        
+    def test_copyonwrite_2(self):
+        "copyonwrite_2"
+        y = larry(self.x)
+        funcs = [lambda y: y + 1, lambda y: y + y, lambda y: y[1:],
+                 lambda y: y[:, 0], lambda y: y.sum(0), lambda y: y.copy(),
+                 lambda y: y.T, lambda y: y.take([2, 0], 0),
+                 lambda y: y.morph([2, 1, 0], 0), lambda y: y.demean(0),
+                 lambda y: y.insertaxis(0, 'new')]
+        for i, func in enumerate(funcs):
+            z = func(y)
+            z.label[-1].append('a')
+            msg = 'func %d: changing output label changed input label' % i
+            self.assert_(y.label == [range(3), range(2)], msg)
+            y = larry(self.x)
+        
+    def test_copyonwrite_3(self):
+        "copyonwrite_3"
+        label = [['a', 'b', 'c'], ['d', 'e']]
+        y = larry(self.x, label)
+        z = y.exp()
+        self.assert_(z._label[0] is not label[0], 'user label shared')
+        label[0][0] = 'z'
+        self.assert_(z.label[0][0] == 'a', 'changing input changed output')
+        y.label[0][0] = 'z'
+        self.assert_(y.label[0][0] == 'z', 'label change lost')
+        self.assert_(z.label[0][0] == 'a', 'changing input changed output')
+        y.label[1].reverse()
+        self.assert_(z.label[1] == ['d', 'e'], 'changing input changed output')
+
+    def test_copyonwrite_5(self):
+        "copyonwrite_5"
+        y = larry(self.x, [['a', 'b', 'c'], ['d', 'e']])
+        y.label
+        z1 = y.log()
+        z2 = y + 1
+        z3 = y.movingrank(2, axis=0)
+        self.assert_(z1._label[0] is z2._label[0], 'label not shared')
+        self.assert_(z1._label[0] is z3._label[0], 'label not shared')
+        z2.label[0][0] = 'z'
+        self.assert_(z1.label[0][0] == 'a', 'changing output changed output')
+        self.assert_(y.label[0][0] == 'a', 'changing output changed input')
+        y.shufflelabel(axis=1)
+        self.assert_(z1.label[1] == ['d', 'e'], 'shufflelabel changed output')
+        self.assert_(pickle.loads(pickle.dumps(y)).label == y.label, 'pickle')
+
+    def test_copyonwrite_6(self):
+        "copyonwrite_6"
+        y1 = larry([1.0, 2.0, 3.0], [['a', 'b', 'c']])
+        y2 = larry([1.0, 2.0], [['c', 'b']])
+        joincache.clear()
+        ale(y1 + y2, larry([4.0, 4.0], [['b', 'c']]), 'y1 + y2')
+        ale(y1 * y2, larry([4.0, 3.0], [['b', 'c']]), 'y1 * y2')
+        self.assert_(joincache.hits == 1, 'join not cached')
+        y1.label[0][0] = 'd'
+        ale(y1 + y2, larry([4.0, 4.0], [['b', 'c']]), 'label change')
+        y2.label[0][0] = 'a'
+        ale(y1 + y2, larry([4.0], [['b']]), 'label change')
+        y3 = y1.copy()
+        y3.shufflelabel()
+        assert_equal((y1 + y2).label, [['b']], 'shufflelabel')
+
+    def test_copyonwrite_4(self):
+        "copyonwrite_4"
+        y = larry(self.x)
+        y2 = y + 1
+        y3 = y2 * 2
+        y3.label[0].reverse()
+        self.assert_(y2.label[0] == range(3), 'shared label changed')
+        ale(y3.morph(range(3), 0), larry(2 * (self.x[::-1] + 1)),
+            'morph after label change', original=None)
+        y2.shufflelabel(axis=0)
+        self.assert_(y.label[0] == range(3), 'shufflelabel changed input')
+
 def suite():
     s = []
     u = unittest.TestLoader().loadTestsFromTestCase
@@ -4084,6 +4603,8 @@ def suite():
     s.append(u(Test_calc))
     s.append(u(Test_alignment))
     s.append(u(Test_properties_01))      
+    s.append(u(Test_typedlabel))
+    s.append(u(Test_copyonwrite))
     return unittest.TestSuite(s)
 
 def run():   
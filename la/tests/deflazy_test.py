@@ -0,0 +1,51 @@
+"Unit tests of lazy larry expressions."
+
+import unittest
+
+import numpy as np
+nan = np.nan
+
+from la import larry, lazy, evaluate
+from la.util.testing import assert_larry_equal as ale
+
+
+class Test_lazy(unittest.TestCase):
+    "Test lazy larry expressions"
+
+    def test_lazy_1(self):
+        "lazy test #1"
+        y1 = larry([1.0, 2.0, 3.0, 4.0])
+        y2 = larry([4.0, 3.0, 1.0], [[3, 1, 2]])
+        y3 = larry([1.0, 4.0, 9.0, 16.0])
+        desired = (y1 - y2) / y3.sqrt() + y1.log() * 2 - abs(-y2)
+        expr = ((lazy(y1) - y2) / lazy(y3).sqrt() + lazy(y1).log() * 2 -
+                abs(-lazy(y2)))
+        msg = 'lazy expression failed with chunksize=%s'
+        for chunksize in (None, 1, 2, 100):
+            actual = evaluate(expr, chunksize)
+            ale(actual, desired, msg % chunksize, original=y1)
+            ale(actual, desired, msg % chunksize, original=y2)
+
+    def test_lazy_2(self):
+        "lazy test #2"
+        y1 = larry([[1, 2], [3, 4], [5, 6]], [['a', 'b', 'c'], [1, 2]])
+        y2 = larry([[2, 2], [1, 1]], [['c', 'a'], [2, 1]])
+        msg = 'lazy expression failed'
+        ale((2 - lazy(y1) * y2).evaluate(), 2 - y1 * y2, msg, original=y1)
+        ale((y1 - lazy(y2)).evaluate(), y1 - y2, msg, original=y1)
+        ale(evaluate(y1 > lazy(y2)), y1 > y2, msg, original=y1)
+        ale(evaluate((lazy(y1) > 2) & ~(lazy(y2) > 1)), (y1 > 2) & ~(y2 > 1),
+            msg, original=y1)
+        ale(evaluate(lazy(y1).power(2).clip(2, 20)), y1.power(2).clip(2, 20),
+            msg, original=y1)
+        self.assert_(evaluate(y1) is y1, 'larry was not returned as is')
+
+    def test_lazy_3(self):
+        "lazy test #3"
+        y1 = larry([1.0, 2.0])
+        y2 = larry([[1.0, 2.0]])
+        self.assertRaises(TypeError, lazy, [1, 2])
+        self.assertRaises(TypeError, lazy(y1).__add__, [1, 2])
+        self.assertRaises(TypeError, evaluate, ~lazy(y1))
+        self.assertRaises(IndexError, evaluate, lazy(y1) + y2)
+        self.assertRaises(ValueError, lazy(y1).evaluate, 0)
@@ -0,0 +1,75 @@
+"Unit tests of the moving window state."
+
+import unittest
+
+import numpy as np
+from numpy.testing import assert_almost_equal as aae
+nan = np.nan
+
+from la import Movingwindow
+from la.farray import (mov_sum, mov_mean, mov_std, mov_min, mov_max,
+                       mov_median, mov_zscore, movingrank)
+
+
+class Test_movingwindow(unittest.TestCase):
+    "Test Movingwindow"
+
+    def setUp(self):
+        rs = np.random.RandomState([1, 2, 3])
+        self.x = rs.randn(4, 20)
+        self.x[rs.rand(*self.x.shape) < 0.2] = nan
+        self.x[:, 3] = nan
+
+    def check(self, func, window, **kwargs):
+        desired = func(self.x, window, axis=-1, **kwargs)
+        msg = '%s, window=%d, %s' % (func.__name__, window, str(kwargs))
+        for blocks in ([1] * 20, [3, 1, 5, 11], [20], [0, 7, 0, 13]):
+            for axis, arr in ((-1, self.x), (0, self.x.T)):
+                mw = Movingwindow(func, window, axis=axis, **kwargs)
+                actual = []
+                start = 0
+                for n in blocks:
+                    index = [slice(None)] * 2
+                    index[axis] = slice(start, start + n)
+                    y = mw.update(arr[tuple(index)])
+                    self.assertEqual(y.shape, arr[tuple(index)].shape, msg)
+                    actual.append(y)
+                    start += n
+                actual = np.concatenate(actual, axis)
+                if axis == 0:
+                    actual = actual.T
+                aae(actual, desired, err_msg=msg)
+
+    def test_movingwindow_1(self):
+        "Movingwindow #1"
+        for window in (1, 3, 6):
+            for func in (mov_mean, mov_std, mov_min, mov_max, mov_median,
+                         mov_zscore):
+                self.check(func, window)
+                self.check(func, window, min_count=min(2, window))
+            self.check(mov_sum, window)
+            self.check(mov_sum, window, skip=2, norm=True)
+            if window > 1:
+                self.check(movingrank, window)
+                self.check(movingrank, window, decay=0.5)
+
+    def test_movingwindow_2(self):
+        "Movingwindow #2"
+        mw = Movingwindow('mov_max', 2)
+        aae(mw.update([1.0, 3.0]), [nan, 3])
+        aae(mw.update([2.0]), [3])
+        mw.reset()
+        aae(mw.update([2.0]), [nan])
+        self.assertRaises(ValueError, mw.update, [[1.0], [2.0]])
+        self.assertRaises(ValueError, Movingwindow, 'mov_foo', 2)
+        self.assertRaises(ValueError, Movingwindow, mov_mean, 0)
+
+def suite():
+    unit = unittest.TestLoader().loadTestsFromTestCase
+    s = []
+    s.append(unit(Test_movingwindow))
+    return unittest.TestSuite(s)
+
+def run():
+    suite = testsuite()
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -1,6 +1,7 @@
 "Unit tests of array functions."
 
 import unittest
+import warnings
 
 import numpy as np
 from numpy.testing import assert_almost_equal
@@ -8,9 +9,14 @@ aae = assert_almost_equal
 nan = np.nan
 
 from la.util.testing import printfail
-from la.farray import group_ranking, group_mean, group_median
-from la.farray import (mov_sum, movingrank, movingsum_forward, ranking, 
+from la.external.scipy import rankdata
+from la.farray import group_ranking, group_mean, group_median, group_agg
+from la.farray import (mov_sum, mov_mean, mov_std, mov_min, mov_max,
+                       mov_median, movingrank, movingsum_forward, ranking, 
+                       mov_zscore, push, ewma, ewmstd, ewmcorr,
                        geometric_mean, unique_group, correlation, lastrank)
+from la.farray import (nansum, nanmean, nanvar, nanstd, nanmin, nanmax,
+                       nandescribe, nanmedian, nanquantile)
 
 # Sector functions ----------------------------------------------------------
 
@@ -154,6 +160,80 @@ class Test_group_median(unittest.TestCase):
         assert_almost_equal(actual, desired)
 
 
+class Test_group_agg(unittest.TestCase):
+    "Test farray.group_agg"
+
+    def test_group_agg_1(self):
+        "farray.group_agg #1"
+        rs = np.random.RandomState([1, 2, 3])
+        for ngroups, n in [(3, 40), (30, 40), (2, 9000)]:
+            x = rs.randint(0, 5, (n, 4)).astype(float)
+            x[rs.rand(*x.shape) < 0.2] = nan
+            groups = list(rs.randint(0, ngroups, n))
+            groups[0] = None
+            funcs = [('mean', np.mean), ('median', np.median),
+                     ('std', np.std), (np.nanmax, np.max)]
+            for func, desired in funcs:
+                # One group at a time
+                d = np.empty(x.shape)
+                d.fill(nan)
+                for group in set(groups) - set([None]):
+                    idx = np.array([g == group for g in groups])
+                    for j in range(x.shape[1]):
+                        w = x[idx, j]
+                        w = w[~np.isnan(w)]
+                        if w.size > 0:
+                            d[idx, j] = desired(w)
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore', RuntimeWarning)
+                    actual = group_agg(x, groups, func)
+                    msg = 'group_agg failed on %s' % str(func)
+                    assert_almost_equal(actual, d, err_msg=msg)
+                    actual = group_agg(x.T, groups, func, axis=1)
+                    assert_almost_equal(actual, d.T, err_msg=msg)
+
+    def test_group_agg_2(self):
+        "farray.group_agg #2"
+        x = np.array([[3.0, 1.0, 1.0, 2.0, nan],
+                      [1.0, 1.0, 1.0, 1.0, 1.0]])
+        groups = [1.0, nan, 1.0, 1.0, 1.0]
+        desired = np.array([[ 3.0, nan, 0.0, 1.5, nan],
+                            [ 0.0, nan, 1.0, 2.0, 3.0]])
+        actual = group_agg(x, groups, 'rank', axis=1, norm='0,N-1',
+                           ties=False)
+        assert_almost_equal(actual, desired)
+        desired[1] = 1.5
+        desired[1, 1] = nan
+        actual = group_agg(x, groups, 'rank', axis=1, norm='0,N-1')
+        assert_almost_equal(actual, desired)
+        desired = np.array([[2.0, nan, 0.0, 1.0, nan],
+                            [0.0, nan, 0.0, 0.0, 0.0]])
+        actual = group_agg(x, groups, lambda a, axis: a - np.nanmin(a, axis),
+                           axis=1)
+        assert_almost_equal(actual, desired)
+        self.assertRaises(ValueError, group_agg, x, groups, 'sum', 1)
+        self.assertRaises(ValueError, group_agg, x, groups, 'mean', 0)
+
+    def test_group_agg_3(self):
+        "farray.group_agg #3"
+        rs = np.random.RandomState([3, 2, 1])
+        x = rs.randint(0, 4, (60, 3)).astype(float)
+        x[rs.rand(*x.shape) < 0.2] = nan
+        groups = rs.randint(0, 20, 60)
+        for ties in (True, False):
+            for norm in ('-1,1', '0,N-1'):
+                desired = np.empty(x.shape)
+                for group in np.unique(groups):
+                    idx = groups == group
+                    desired[idx] = ranking(x[idx], norm=norm, ties=ties)
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore', RuntimeWarning)
+                    actual = group_agg(x, groups, 'rank', norm=norm,
+                                       ties=ties)
+                msg = 'group_agg rank failed (ties=%s, norm=%s)'
+                assert_almost_equal(actual, desired, err_msg=msg % (ties, norm))
+
+
 class Test_sector_oth(unittest.TestCase):
     "Test farray.group_mean"
         
@@ -428,6 +508,30 @@ class Test_ranking(unittest.TestCase):
         desired = np.array([-1.0, nan, 0.0, 1.0])        
         actual = ranking(x, axis=0, ties=False)
         assert_almost_equal(actual, desired)
+
+    def test_ranking_27(self):
+        "farray.ranking_27"
+        rs = np.random.RandomState([1, 2, 3])
+        x = rs.randint(0, 4, (3, 4, 6)).astype(float)
+        x[rs.rand(*x.shape) < 0.2] = nan
+        x[0, 0, 0] = np.inf
+        for axis in range(x.ndim):
+            # Ranks of each 1d slice with ties averaged by rankdata
+            desired = np.empty(x.shape)
+            desired.fill(nan)
+            a = np.rollaxis(x, axis, x.ndim)
+            d = np.rollaxis(desired, axis, x.ndim)
+            for index in np.ndindex(*a.shape[:-1]):
+                mask = ~np.isnan(a[index])
+                count = mask.sum()
+                if count > 1:
+                    r = rankdata(a[index][mask]) - 1
+                    d[index + (mask,)] = 2.0 * r / (count - 1) - 1
+                elif count == 1:
+                    d[index + (mask,)] = 0
+            actual = ranking(x, axis=axis)
+            msg = 'farray.ranking failed on axis=%d' % axis
+            assert_almost_equal(actual, desired, err_msg=msg)
         
         
 class Test_geometric_mean(unittest.TestCase):
@@ -548,6 +652,124 @@ class Test_mov_sum(unittest.TestCase):
         actual = mov_sum(self.x2, self.window)
         assert_almost_equal(actual, desired) 
 
+    def test_mov_sum_8(self):
+        "farray.mov_sum #8"
+        start = np.array([-1, 0, 0, 2, 4])
+        desired = np.array([[nan,  1.0,  7.0, 6.0, 8.0],
+                            [nan,  6.0, 14.0, 8.0,-1.0]])
+        actual = mov_sum(self.x, start)
+        assert_almost_equal(actual, desired)
+        desired = np.array([[nan,  2.0, 10.5, 6.0, 8.0],
+                            [nan,  6.0, 14.0, 8.0,-1.0]])
+        actual = mov_sum(self.x.T, start, axis=0, norm=True)
+        assert_almost_equal(actual, desired.T)
+
+class Test_mov(unittest.TestCase):
+    "Test farray.mov_mean, mov_std, mov_min, mov_max, mov_median"
+
+    def check(self, func, desired):
+        rs = np.random.RandomState([1, 2, 3])
+        for i in range(20):
+            x = rs.randn(3, 12)
+            if i % 2:
+                # Ties
+                x = x.round()
+            x[rs.rand(*x.shape) < 0.1 * (i % 6)] = nan
+            for dtype in (np.float64, np.float32):
+                a = x.astype(dtype)
+                for axis, arr in [(-1, a), (0, a.T), (1, np.asfortranarray(a))]:
+                    window = rs.randint(1, 4)
+                    min_count = rs.randint(1, window + 1)
+                    actual = func(arr, window, axis, min_count)
+                    if axis == 0:
+                        actual = actual.T
+                    d = np.empty(x.shape)
+                    d.fill(nan)
+                    for j in range(window - 1, x.shape[1]):
+                        w = a[:, j + 1 - window:j + 1].astype(np.float64)
+                        count = (~np.isnan(w)).sum(1)
+                        for k in range(x.shape[0]):
+                            if count[k] >= min_count:
+                                d[k, j] = desired(w[k][~np.isnan(w[k])])
+                    msg = '%s failed on %s array (axis=%d, window=%d)'
+                    msg = msg % (func.__name__, str(dtype), axis, window)
+                    np.testing.assert_allclose(actual, d, 1e-5, 1e-5,
+                                               err_msg=msg)
+                    self.assert_(actual.dtype == dtype, msg)
+
+    def test_mov_mean_1(self):
+        "farray.mov_mean #1"
+        self.check(mov_mean, np.mean)
+
+    def test_mov_std_1(self):
+        "farray.mov_std #1"
+        self.check(mov_std, np.std)
+
+    def test_mov_min_1(self):
+        "farray.mov_min #1"
+        self.check(mov_min, np.min)
+
+    def test_mov_max_1(self):
+        "farray.mov_max #1"
+        self.check(mov_max, np.max)
+
+    def test_mov_median_1(self):
+        "farray.mov_median #1"
+        self.check(mov_median, np.median)
+
+    def test_mov_zscore_1(self):
+        "farray.mov_zscore #1"
+        x = np.array([[1.0, 2.0, nan, 4.0, 6.0, 6.0],
+                      [1.0, 1.0, 1.0, 3.0, nan, 5.0]])
+        desired = np.array([[nan, nan, nan, 1.0, 1.0, np.sqrt(0.5)],
+                            [nan, nan, nan, np.sqrt(2), nan, 1.0]])
+        aae(mov_zscore(x, 3, min_count=2), desired)
+        aae(mov_zscore(x.T, 3, axis=0, min_count=2), desired.T)
+
+    def test_mov_3(self):
+        "farray.mov_mean, ... #3"
+        # Windows of varying size, as from irregularly spaced date labels
+        rs = np.random.RandomState([1, 2, 3])
+        x = rs.randn(3, 30)
+        x[rs.rand(*x.shape) < 0.3] = nan
+        start = np.array([-1, -1, -1, -1, 1, 2, 4, 4, 6, 8, 9, 9, 9, 10, 10,
+                          10, 10, 11, 12, 13, 18, 19, 20, 20, 23, 24, 24, 25,
+                          26, 26])
+        funcs = [(mov_mean, np.mean), (mov_std, np.std), (mov_min, np.min),
+                 (mov_max, np.max), (mov_median, np.median),
+                 (mov_sum, np.sum)]
+        for func, desired in funcs:
+            d = np.empty(x.shape)
+            d.fill(nan)
+            for j in range(x.shape[1]):
+                for k in range(x.shape[0]):
+                    w = x[k, max(start[j], 0):j + 1]
+                    if start[j] >= 0 and (~np.isnan(w)).any():
+                        d[k, j] = desired(w[~np.isnan(w)])
+            msg = '%s failed with an array window' % func.__name__
+            for a in (x, x.astype(np.float32)):
+                np.testing.assert_allclose(func(a, start), d, 1e-5, 1e-5,
+                                           err_msg=msg)
+                np.testing.assert_allclose(func(a.T, start, axis=0), d.T,
+                                           1e-5, 1e-5, err_msg=msg)
+        for window in ([-1, 0, 3], [-1, 1, 0], [0, 1]):
+            self.assertRaises(ValueError, mov_mean, x[:, :3], window)
+
+    def test_mov_2(self):
+        "farray.mov_mean, ... #2"
+        x = np.array([1.0, 2.0, 3.0])
+        for func in (mov_mean, mov_std, mov_min, mov_max, mov_median):
+            self.assertRaises(ValueError, func, x, 0)
+            self.assertRaises(ValueError, func, x, 4)
+            self.assertRaises(ValueError, func, x, 2, -1, 0)
+            self.assertRaises(ValueError, func, x, 2, -1, 3)
+        x = np.arange(200.0) % 7
+        aae(mov_median(x, 50)[-1], np.median(x[-50:]))
+        aae(mov_max(x, 50)[49:], 6)
+        x = np.array([1, 5, 3])
+        aae(mov_mean(x, 2), [nan, 3, 4])
+        self.assert_(mov_min(x, 2).dtype == np.float64, 'int input dtype')
+
 class Test_movingsum_forward(unittest.TestCase):
     "Test farray.movingsum_forward"
  
@@ -639,7 +861,197 @@ class Test_movingrank(unittest.TestCase):
                            [nan, -1.0]])
         actual = movingrank(self.x2, self.window)
         assert_almost_equal(actual, desired)
+
+    def test_movingrank_5(self):
+        "farray.movingrank #5"
+        rs = np.random.RandomState([1, 2, 3])
+        for shape in [(20,), (3, 16), (2, 3, 9)]:
+            x = rs.randint(0, 4, shape).astype(float)
+            x[rs.rand(*shape) < 0.3] = nan
+            for axis in range(x.ndim):
+                for window in (2, 3, 7):
+                    if window > x.shape[axis]:
+                        continue
+                    for decay in (0, 0.5, 20):
+                        desired = lastrank_loop(x, window, axis, decay)
+                        for dtype in (np.float64, np.float32):
+                            actual = movingrank(x.astype(dtype), window,
+                                                axis, decay)
+                            msg = 'shape=%s, axis=%d, window=%d, decay=%s'
+                            msg = msg % (str(shape), axis, window, decay)
+                            assert_almost_equal(actual, desired,
+                                                err_msg=msg)
+
+    def test_movingrank_6(self):
+        "farray.movingrank #6"
+        x = np.array([3, 1, 2, 2, 5])
+        desired = np.array([nan, nan, 0.0, 0.5, 1.0])
+        actual = movingrank(x, 3)
+        assert_almost_equal(actual, desired)
+        self.assertRaises(ValueError, movingrank, x, 1)
+        self.assertRaises(ValueError, movingrank, x, 6)
+        self.assertRaises(ValueError, movingrank, x, 2, decay=-1)
+
+    def test_movingrank_7(self):
+        "farray.movingrank #7"
+        x = np.array([[1.0, 3.0, 2.0, nan, 5.0, 4.0],
+                      [2.0, 2.0, 1.0, 3.0, 1.0, 2.0]])
+        start = np.array([-1, 0, 0, 1, 3, 5])
+        desired = np.empty(x.shape)
+        desired.fill(nan)
+        for j in range(1, x.shape[1]):
+            desired[:, j] = lastrank(x[:, start[j]:j + 1], decay=0.5)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            aae(movingrank(x, start, decay=0.5), desired)
+            aae(movingrank(x.T, start, axis=0, decay=0.5), desired.T)
+
+def lastrank_loop(x, window, axis, decay):
+    "movingrank computed with lastrank, one window at a time."
+    y = np.nan * np.zeros(x.shape)
+    a = np.rollaxis(x, axis, x.ndim)
+    out = np.rollaxis(y, axis, x.ndim)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        for j in xrange(window - 1, a.shape[-1]):
+            w = a[..., j + 1 - window:j + 1]
+            out[..., j] = lastrank(w, axis=-1, decay=decay)
+    return y
         
+class Test_push(unittest.TestCase):
+    "Test farray.push"
+
+    def setUp(self):
+        self.x = np.array([1.0, nan, nan, 4.0, np.inf, nan, nan, 2.0, nan])
+
+    def test_push_1(self):
+        "farray.push #1"
+        rs = np.random.RandomState([1, 2, 3])
+        for shape in [(20,), (3, 16), (2, 3, 9)]:
+            x = rs.randn(*shape)
+            x[rs.rand(*shape) < 0.5] = nan
+            for axis in range(x.ndim):
+                for n in (0, 1, 3, np.inf):
+                    desired = push_loop(x, n, axis)
+                    for dtype in (np.float64, np.float32):
+                        actual = push(x.astype(dtype), n, axis)
+                        msg = 'shape=%s, axis=%d, n=%s'
+                        msg = msg % (str(shape), axis, n)
+                        aae(actual, desired, err_msg=msg)
+                        self.assertEqual(actual.dtype, dtype, msg)
+                    xf = np.asfortranarray(x)
+                    actual = push(xf, n, axis, inplace=True)
+                    self.assert_(actual is xf, 'push inplace')
+                    aae(xf, desired, err_msg=msg)
+
+    def test_push_2(self):
+        "farray.push #2"
+        aae(push(self.x, 1), [1, 1, nan, 4, 4, nan, nan, 2, 2])
+        aae(push(self.x, 1, backward=True), [1, nan, 4, 4, nan, nan, 2, 2,
+                                             nan])
+        aae(push(self.x, 2, gap=True), [1, 1, 1, 4, nan, nan, nan, 2, nan])
+        aae(push(self.x, 3, gap=True), [1, 1, 1, 4, 4, 4, 4, 2, nan])
+        aae(push(self.x, 2, gap=True, backward=True),
+            [1, 4, 4, 4, nan, nan, nan, 2, nan])
+        aae(push(self.x[None, :], 0, axis=0),
+            [np.where(np.isfinite(self.x), self.x, nan)])
+        aae(push(np.array([1, 2]), 1), [1, 2])
+
+def push_loop(x, n, axis):
+    "push computed one element at a time."
+    y = np.rollaxis(np.array(x), axis, x.ndim)
+    for index in np.ndindex(*y.shape[:-1]):
+        last = None
+        for j in range(y.shape[-1]):
+            if np.isfinite(y[index][j]):
+                last = j
+            elif last is not None and j - last <= n:
+                y[index][j] = y[index][last]
+            else:
+                y[index][j] = nan
+    return np.rollaxis(y, x.ndim - 1, axis)
+
+class Test_ewm(unittest.TestCase):
+    "Test farray.ewma, ewmstd, ewmcorr"
+
+    def setUp(self):
+        rs = np.random.RandomState([1, 2, 3])
+        self.x1 = rs.randn(2, 3, 12)
+        self.x2 = rs.randn(2, 3, 12)
+        self.x1[rs.rand(*self.x1.shape) < 0.3] = nan
+        self.x2[rs.rand(*self.x2.shape) < 0.2] = nan
+
+    def check(self, func, stat, narg):
+        args = (self.x1, self.x2)[:narg]
+        for axis in range(3):
+            for halflife in (0.5, 3, 100):
+                actual = func(*args + (halflife, axis))
+                desired = np.apply_along_axis(ewm_loop, axis,
+                                              np.concatenate(args, axis),
+                                              halflife, stat)
+                msg = '%s, axis=%d, halflife=%s' % (stat, axis, halflife)
+                aae(actual, desired, err_msg=msg)
+                # Continue from the state of the first half of the axis
+                index1 = [slice(None)] * 3
+                index1[axis] = slice(None, 5)
+                index2 = [slice(None)] * 3
+                index2[axis] = slice(5, None)
+                first = [a[tuple(index1)] for a in args]
+                second = [a[tuple(index2)] for a in args]
+                y, state = func(*first + [halflife, axis],
+                                return_state=True)
+                y = func(*second + [halflife, axis], state=state)
+                aae(y, actual[index2], err_msg=msg + ' (state)')
+                y = func(*[a.astype(np.float32) for a in args] +
+                         [halflife, axis])
+                self.assertEqual(y.dtype, np.float32, msg)
+                aae(y, actual, decimal=4, err_msg=msg + ' (float32)')
+
+    def test_ewma_1(self):
+        "farray.ewma #1"
+        self.check(ewma, 'mean', 1)
+        self.assertRaises(ValueError, ewma, self.x1, 0)
+        aae(ewma([1, 2], 1), [1, 5.0 / 3])
+
+    def test_ewmstd_1(self):
+        "farray.ewmstd #1"
+        self.check(ewmstd, 'std', 1)
+
+    def test_ewmcorr_1(self):
+        "farray.ewmcorr #1"
+        self.check(ewmcorr, 'corr', 2)
+        self.assertRaises(ValueError, ewmcorr, self.x1, self.x2[0], 2)
+
+def ewm_loop(x, halflife, stat):
+    """
+    Exponentially weighted `stat` of the first and (for corr) second half of
+    `x` computed with the weights of each step.
+    """
+    x1, x2 = x[:x.size // 2], x[x.size // 2:]
+    if stat != 'corr':
+        x1, x2 = x, x
+    y = np.empty(x1.size)
+    for j in range(x1.size):
+        w = 0.5 ** ((j - np.arange(j + 1)) / float(halflife))
+        ok = ~np.isnan(x1[:j + 1]) & ~np.isnan(x2[:j + 1])
+        w, a1, a2 = w[ok] / w[ok].sum(), x1[:j + 1][ok], x2[:j + 1][ok]
+        if w.size == 0:
+            y[j] = nan
+            continue
+        d1 = a1 - (w * a1).sum()
+        d2 = a2 - (w * a2).sum()
+        var1 = (w * d1 * d1).sum()
+        var2 = (w * d2 * d2).sum()
+        if stat == 'mean':
+            y[j] = (w * a1).sum()
+        elif stat == 'std':
+            y[j] = np.sqrt(var1)
+        elif var1 > 1e-20 and var2 > 1e-20:
+            y[j] = (w * d1 * d2).sum() / np.sqrt(var1 * var2)
+        else:
+            y[j] = nan
+    return y
+
 class Test_correlation(unittest.TestCase):
     "Test farray.correlation"
     
@@ -788,6 +1200,127 @@ class Test_lastrank(unittest.TestCase):
         s = lastrank(np.array([]))
         aae(s, np.nan, err_msg="size 0 lastrank fail")
 
+# NaN reduce functions ------------------------------------------------------
+
+class Test_nanreduce(unittest.TestCase):
+    "Test the single-pass NaN reduce functions"
+
+    def setUp(self):
+        rs = np.random.RandomState([1, 2, 3])
+        self.arrs = []
+        for density in (0, 0.1, 0.5, 0.9, 1):
+            x = rs.randn(4, 5, 6)
+            x[rs.rand(*x.shape) < density] = nan
+            self.arrs.append(x)
+            self.arrs.append(x.T)
+            self.arrs.append(x[::2, :, 1:5])
+        x = rs.randn(5, 6)
+        x[:, 0] = nan
+        x[1, :] = nan
+        self.arrs.append(x)
+
+    def check(self, func, desired, **kwargs):
+        for x in self.arrs:
+            for dtype in (np.float64, np.float32):
+                a = x.astype(dtype)
+                for axis in [None] + range(-1, a.ndim):
+                    actual = func(a, axis=axis, **kwargs)
+                    d = desired(a.astype(np.float64), axis)
+                    msg = '%s failed on %s array (axis=%s)'
+                    msg = msg % (func.__name__, str(dtype), str(axis))
+                    if dtype == np.float32:
+                        np.testing.assert_allclose(actual, d, 1e-5, 1e-5,
+                                                   err_msg=msg)
+                    else:
+                        np.testing.assert_allclose(actual, d, 1e-12, 1e-12,
+                                                   err_msg=msg)
+                    if np.isscalar(actual):
+                        self.assert_(axis is None or a.ndim == 1, msg)
+                    else:
+                        self.assert_(axis is not None, msg)
+
+    def test_nansum_1(self):
+        "farray.nansum #1"
+        self.check(nansum, np.nansum)
+
+    def test_nanmean_1(self):
+        "farray.nanmean #1"
+        self.check(nanmean, np.nanmean)
+
+    def test_nanvar_1(self):
+        "farray.nanvar #1"
+        self.check(nanvar, np.nanvar)
+        desired = lambda a, axis: np.nanvar(a, axis, ddof=1)
+        self.check(nanvar, desired, bias=False)
+
+    def test_nanstd_1(self):
+        "farray.nanstd #1"
+        self.check(nanstd, np.nanstd)
+        desired = lambda a, axis: np.nanstd(a, axis, ddof=1)
+        self.check(nanstd, desired, bias=False)
+
+    def test_nanmin_1(self):
+        "farray.nanmin #1"
+        self.check(nanmin, np.nanmin)
+
+    def test_nanmax_1(self):
+        "farray.nanmax #1"
+        self.check(nanmax, np.nanmax)
+
+    def test_nanreduce_2(self):
+        "farray nan reduce functions #2"
+        x = np.array([[1, 2], [3, 5]])
+        aae(nansum(x, axis=0), [4, 7])
+        aae(nanmean(x, axis=1), [1.5, 4])
+        aae(nanstd(x, axis=0), [1, 1.5])
+        aae(nanvar(x, axis=None), 2.1875)
+        aae(nanmin(x), 1)
+        aae(nanmax(x, axis=1), [2, 5])
+        x = np.array([1, 2, nan], dtype=np.float32)
+        self.assert_(nansum(x).dtype == np.float32, 'nansum dtype')
+        self.assert_(nanmax(x, axis=0).dtype == np.float32, 'nanmax dtype')
+        self.assertRaises(ValueError, nansum, x, 1)
+        self.assertRaises(IndexError, nanmean, x, -2)
+
+    def test_nandescribe_1(self):
+        "farray.nandescribe #1"
+        funcs = [lambda a, axis: (~np.isnan(a)).sum(axis),
+                 np.nanmean, np.nanstd, np.nanmin, np.nanmax,
+                 lambda a, axis: np.isnan(a).mean(axis)]
+        for i, func in enumerate(funcs):
+            def stat(a, axis=None):
+                y = nandescribe(a, axis)
+                if axis is None:
+                    return y[i]
+                return np.rollaxis(y, axis if axis >= 0 else a.ndim + axis)[i]
+            stat.__name__ = 'nandescribe (stat %d)' % i
+            self.check(stat, func)
+        aae(nandescribe([1, 2, 3, 4]), [4, 2.5, np.sqrt(1.25), 1, 4, 0])
+        y = nandescribe(np.zeros((0, 2)), axis=0)
+        aae(y[:, 0], [0, nan, nan, nan, nan, nan])
+
+    def test_nanmedian_1(self):
+        "farray.nanmedian #1"
+        self.check(nanmedian, np.nanmedian)
+
+    def test_nanquantile_1(self):
+        "farray.nanquantile #1"
+        for q in (0, 0.1, 0.25, 0.5, 0.9, 1):
+            desired = lambda a, axis: np.nanpercentile(a, 100 * q, axis)
+            self.check(nanquantile, desired, q=q)
+
+    def test_nanquantile_2(self):
+        "farray.nanquantile #2"
+        x = np.array([[1, nan, 3], [2, 4, nan], [nan, nan, nan]])
+        aae(nanquantile(x, 0.5, axis=1), [2, 3, nan])
+        aae(nanquantile(x, 0.75, axis=0), [1.75, 4, 3])
+        aae(nanquantile(x, 0.25), 1.75)
+        aae(nanquantile(np.arange(5), 0.3), 1.2)
+        x = np.array([1, 2, nan], dtype=np.float32)
+        self.assert_(nanquantile(x, 0.5).dtype == np.float32, 'dtype')
+        self.assertRaises(ValueError, nanquantile, x, 1.5)
+        self.assertRaises(ValueError, nanquantile, x, -0.1)
+
 # Unit tests ---------------------------------------------------------------- 
     
 def suite():
@@ -799,15 +1332,22 @@ def suite():
     s.append(unit(Test_group_ranking))
     s.append(unit(Test_group_mean)) 
     s.append(unit(Test_group_median)) 
+    s.append(unit(Test_group_agg))
     
     # Normalize functions
     s.append(unit(Test_ranking))    
     s.append(unit(Test_geometric_mean))
     s.append(unit(Test_movingsum))
     s.append(unit(Test_movingsum_forward))
+    s.append(unit(Test_mov))
     s.append(unit(Test_movingrank))
     s.append(unit(Test_lastrank))
+    s.append(unit(Test_push))
+    s.append(unit(Test_ewm))
     
+    # NaN reduce functions
+    s.append(unit(Test_nanreduce))
+
     # Calc function
     s.append(unit(Test_correlation))              
          
@@ -1,9 +1,13 @@
 "flabel (list of lists) unit tests."
  
+import datetime
+
 import numpy as np
-from numpy.testing import assert_equal
+from numpy.testing import assert_, assert_equal, assert_raises
 
-from la.flabel import listmap, listmap_fill         
+from la.flabel import (listmap, listmap_fill, Labelindex, Joincache,
+                       listjoin, _hashjoin, takeaxis, Typedlabel, maparray,
+                       uniquearray, isunique, asofjoin, windowstart)
 
 # ---------------------------------------------------------------------------
 
@@ -70,3 +74,333 @@ def listmap_fill_unmappable_test():
     msg = "listmap_fill failed on list1=%s and list2=%s"
     yield assert_equal, idx, idx2, msg % (list1, list2)
     yield assert_equal, idx_unmappable, idx2_unmappable, msg % (list1, list2)
+
+# ---------------------------------------------------------------------------
+
+# Labelindex unit tests
+
+def labelindex_test():
+    "Labelindex test"
+    list1 = ['a', 2, 'c', 3.5, None]
+    msg = "Labelindex.index failed on label=%s and name=%s"
+    lindex = Labelindex(list1)
+    for name in list1:
+        yield assert_equal, lindex.index(name), list1.index(name), \
+              msg % (list1, name)
+    names = [3.5, 'a', None]
+    yield assert_equal, lindex.indices(names), map(list1.index, names), \
+          "Labelindex.indices failed"
+
+def labelindex_missing_test():
+    "Labelindex missing test"
+    lindex = Labelindex(['a', 'b'])
+    assert_raises(ValueError, lindex.index, 'c')
+    assert_raises(ValueError, lindex.index, ['unhashable'])
+    assert_raises(ValueError, lindex.indices, ['a', 'c'])
+
+def labelindex_inplace_test():
+    "Labelindex label changed in place test"
+    label = ['a', 'b', 'c']
+    lindex = Labelindex(label)
+    label[0], label[2] = label[2], label[0]
+    assert_equal(lindex.index('a'), 2)
+    assert_equal(lindex.indices(['c', 'a']), [0, 2])
+    label[1] = 'z'
+    assert_raises(ValueError, lindex.index, 'z')
+    assert_raises(ValueError, lindex.index, 'b')
+    assert_equal(lindex.index('z'), 1)
+    label.append('d')
+    assert_equal(lindex.indices(['d', 'z']), [3, 1])
+
+def _take(idx, n):
+    "Apply a listjoin index to range(n) and return a list."
+    return list(takeaxis(np.arange(n), idx, 0)[0])
+
+def listjoin_test():
+    "listjoin test"
+    msg = "listjoin failed on join=%s, list1=%s, list2=%s"
+    lists = [([1, 2, 3], [2, 3, 4]),
+             ([1, 2, 3], [1, 2, 3]),
+             (['a', 'b', 'dd'], ['b', 'c', 'dd']),
+             ([1.5, 2.5], [0.5, 2.5, 3.5]),
+             ([3, 1, 2], [2, 3, 4]),
+             ([1, 2, 3], ['b', 2, 3])]
+    for list1, list2 in lists:
+        for join in ('inner', 'outer', 'left', 'right'):
+            actual = listjoin(list1, list2, join)
+            desired = _hashjoin(list1, list2, join)
+            m = msg % (join, list1, list2)
+            yield assert_equal, actual[0], desired[0], m
+            for i, n in ((1, len(list1)), (3, len(list2))):
+                yield assert_equal, _take(actual[i], n), \
+                                    _take(desired[i], n), m
+                yield assert_equal, list(actual[i+1]), list(desired[i+1]), m
+
+def listjoin_sorted_test():
+    "listjoin test on sorted labels"
+    list1 = range(10)
+    list2 = range(5, 15)
+    list3, idx1, idx1_miss, idx2, idx2_miss = listjoin(list1, list2, 'inner')
+    assert_equal(list3, range(5, 10))
+    assert_equal(idx1, slice(5, 10))
+    assert_equal(idx2, slice(0, 5))
+    assert_raises(ValueError, listjoin, list1, list2, 'cross')
+
+def asofjoin_test():
+    "asofjoin test"
+    msg = "asofjoin failed on direction=%s, tolerance=%s, list2=%s"
+    list1 = [0, 3, 5, 9, 12]
+    desired = {('backward', None): [-1, 2, 5, 8, 8],
+               ('backward', 1): [-1, 2, 5, 8, -1],
+               ('forward', None): [2, 5, 5, -1, -1],
+               ('forward', 1): [-1, -1, 5, -1, -1],
+               ('nearest', None): [2, 2, 5, 8, 8],
+               ('nearest', 2): [2, 2, 5, 8, -1]}
+    d = datetime.date
+    for list2 in ([2, 5, 8], [8, 2, 5], Typedlabel([5, 8, 2]), [2.0, 5.0, 8.0],
+                  [2, 5.0, 8]):
+        for (direction, tolerance), values in desired.iteritems():
+            list3, idx1, idx1_miss, idx2, idx2_miss = asofjoin(list1, list2,
+                                                         direction, tolerance)
+            actual = list(np.asarray(list2)[_take(idx2, len(list2))])
+            for i in idx2_miss:
+                actual[i] = -1
+            m = msg % (direction, tolerance, list2)
+            yield assert_equal, actual, values, m
+            yield assert_equal, list3, list1, m
+            yield assert_equal, idx1, None, m
+        dates1 = [d(2011, 1, 1) + datetime.timedelta(i) for i in list1]
+        dates2 = [d(2011, 1, 1) + datetime.timedelta(int(i)) for i in list2]
+        for label2 in (dates2, Typedlabel(dates2)):
+            ign, ign, ign, idx2, idx2_miss = asofjoin(dates1, label2,
+                                            'backward', datetime.timedelta(1))
+            actual = list(np.asarray(list2)[_take(idx2, len(list2))])
+            for i in idx2_miss:
+                actual[i] = -1
+            yield assert_equal, actual, desired[('backward', 1)], 'dates'
+    assert_raises(ValueError, asofjoin, list1, [1, 2], 'sideways')
+    assert_raises(ValueError, asofjoin, list1, [1, 2], 'backward', -1)
+    assert_raises(ValueError, asofjoin, list1, Typedlabel([1, 1]))
+    assert_raises(TypeError, asofjoin, ['a'], ['b'], 'nearest')
+    list3, idx1, idx1_miss, idx2, idx2_miss = asofjoin([5, 8], [2, 5, 8])
+    assert_equal(idx2, slice(1, 3))
+
+def windowstart_test():
+    "windowstart test"
+    d = datetime.date
+    dates = [d(2010, 1, 1) + datetime.timedelta(i) for i in (0, 1, 3, 4, 7)]
+    desired = [-1, -1, 1, 2, 4]
+    for label in (dates, Typedlabel(dates)):
+        for window in (datetime.timedelta(3), np.timedelta64(72, 'h')):
+            yield assert_equal, windowstart(label, window), desired
+    times = [datetime.datetime.combine(i, datetime.time(9)) for i in dates]
+    actual = windowstart(times, datetime.timedelta(hours=73))
+    assert_equal(actual, [-1, -1, -1, 1, 3])
+    daily = [d(2010, 1, 1) + datetime.timedelta(i) for i in range(5)]
+    assert_equal(windowstart(daily, datetime.timedelta(2)), [-1, 0, 1, 2, 3])
+    assert_equal(windowstart([], datetime.timedelta(2)), [])
+    assert_raises(ValueError, windowstart, dates, datetime.timedelta(0))
+    assert_raises(ValueError, windowstart, dates[::-1], datetime.timedelta(1))
+    assert_raises(TypeError, windowstart, dates, 3)
+    assert_raises(TypeError, windowstart, [1, 2, 3], datetime.timedelta(1))
+    
+def takeaxis_test():
+    "takeaxis test"
+    arr = np.arange(12).reshape(3, 4)
+    out, isview = takeaxis(arr, slice(1, 3), 1)
+    assert_equal(isview, True)
+    assert_equal(out, arr[:, 1:3])
+    out, isview = takeaxis(arr, [2, 0], 0)
+    assert_equal(isview, False)
+    assert_equal(out, arr[[2, 0]])
+    out, isview = takeaxis(arr, None, 0)
+    assert_equal(out is arr, True)
+
+def joincache_test():
+    "Joincache test"
+    cache = Joincache(maxsize=2)
+    list1 = ['a', 'c', 'b']
+    list2 = ['b', 'd', 'c']
+    actual = cache.join(list1, list2, 'outer')
+    desired = _hashjoin(list1, list2, 'outer')
+    assert_equal(actual[0], desired[0])
+    assert_equal((cache.hits, cache.misses), (0, 1))
+    actual = cache.join(list(list1), list(list2), 'outer')
+    assert_equal(actual[0], desired[0])
+    assert_equal((cache.hits, cache.misses), (1, 1))
+    actual[0].append('z')
+    assert_equal(cache.join(list1, list2, 'outer')[0], desired[0])
+    cache.join(list1, list2, 'inner')
+    cache.join(list1, list2, 'left')
+    assert_equal(len(cache), 2)
+    cache.join(list1, list2, 'inner')
+    assert_equal((cache.hits, cache.misses), (3, 3))
+    cache.clear()
+    assert_equal(cache.info(), {'hits': 0, 'misses': 0, 'size': 0,
+                                'maxsize': 2})
+
+def joincache_frozen_test():
+    "Joincache test of frozen lists and unhashable labels"
+    cache = Joincache(maxsize=2)
+    list1 = ['a', 'c', 'b']
+    list2 = ['b', 'd', 'c']
+    desired = _hashjoin(list1, list2, 'outer')
+    actual = cache.join(list1, list2, 'outer', frozen=True)
+    assert_equal(actual[0], desired[0])
+    actual = cache.join(list1, list2, 'outer', frozen=True)
+    assert_equal(actual[0], desired[0])
+    assert_equal((cache.hits, cache.misses), (1, 1))
+    cache.join(list(list1), list2, 'outer', frozen=True)
+    assert_equal((cache.hits, cache.misses), (1, 2))
+    actual = cache.join(list1, list1, 'inner', frozen=True)
+    assert_equal(actual[1:], (None, [], None, []))
+    assert_(actual[0] == list1 and actual[0] is not list1, 'not a copy')
+    cache.clear()
+    assert_raises(TypeError, cache.join, [[1], [2]], [[2]], 'inner')
+    assert_equal((len(cache), cache.misses), (0, 1))
+
+def joincache_type_test():
+    "Joincache test of labels that are equal but of different types"
+    cache = Joincache(maxsize=2)
+    actual = cache.join([1, 2, 3], [2, 3, 4], 'inner')[0]
+    assert_equal([type(a) for a in actual], [int, int])
+    actual = cache.join([1.0, 2.0, 3.0], [2.0, 3.0, 4.0], 'inner')[0]
+    assert_equal(actual, [2.0, 3.0])
+    assert_equal([type(a) for a in actual], [float, float])
+    assert_equal((cache.hits, cache.misses), (0, 2))
+
+def typedlabel_test():
+    "Typedlabel list API test"
+    d = datetime.date
+    lists = [[3, 1, 2],
+             ['b', 'a', 'cc'],
+             [u'b', u'a', u'c'],
+             [d(2010, 1, 2), d(2010, 1, 1), d(2009, 12, 31)]]
+    msg = "Typedlabel %s failed on %s"
+    for desired in lists:
+        lab = Typedlabel(desired)
+        yield assert_equal, lab.tolist(), desired, msg % ('tolist', desired)
+        yield assert_equal, lab == desired, True, msg % ('==', desired)
+        yield assert_equal, list(lab), desired, msg % ('iter', desired)
+        yield assert_equal, lab[-1], desired[-1], msg % ('getitem', desired)
+        yield assert_equal, lab[1:], desired[1:], msg % ('slice', desired)
+        yield assert_equal, lab[[2, 0]] == [desired[2], desired[0]], True, \
+                                                   msg % ('take', desired)
+        yield assert_equal, lab.index(desired[1]), 1, msg % ('index', desired)
+        yield assert_equal, desired[0] in lab, True, msg % ('in', desired)
+        lab.sort()
+        yield assert_equal, lab, sorted(desired), msg % ('sort', desired)
+        lab.reverse()
+        yield assert_equal, lab, sorted(desired)[::-1], \
+                                                   msg % ('reverse', desired)
+        
+def typedlabel_mutate_test():
+    "Typedlabel mutation test"
+    lab = Typedlabel(['a', 'b'])
+    lab.append('ccc')
+    lab.insert(0, 'dddd')
+    lab[1] = 'eeeee'
+    assert_equal(lab, ['dddd', 'eeeee', 'b', 'ccc'])
+    assert_equal(lab.pop(), 'ccc')
+    lab.remove('b')
+    lab.extend(['f'])
+    assert_equal(lab, ['dddd', 'eeeee', 'f'])
+    assert_equal(lab.count('f'), 1)
+    assert_equal(1 in lab, False)
+    assert_raises(ValueError, lab.index, 1)
+    assert_raises(TypeError, lab.append, 1)
+    assert_raises(TypeError, Typedlabel, [1, 'a'])
+    assert_raises(TypeError, Typedlabel, [1.5])
+    
+def typedlabel_listjoin_test():
+    "listjoin test on Typedlabels"
+    msg = "listjoin failed on join=%s, list1=%s, list2=%s"
+    lists = [([1, 2, 3], [2, 3, 4]),
+             (['c', 'a', 'b'], ['bb', 'c', 'a']),
+             ([5, 1, 2], [2, 5])]
+    for list1, list2 in lists:
+        for join in ('inner', 'outer', 'left', 'right'):
+            actual = listjoin(Typedlabel(list1), Typedlabel(list2), join)
+            desired = _hashjoin(list1, list2, join)
+            m = msg % (join, list1, list2)
+            yield assert_equal, type(actual[0]), Typedlabel, m
+            yield assert_equal, actual[0], desired[0], m
+            for i, n in ((1, len(list1)), (3, len(list2))):
+                yield assert_equal, _take(actual[i], n), \
+                                    _take(desired[i], n), m
+                yield assert_equal, list(actual[i+1]), list(desired[i+1]), m
+
+def maparray_test():
+    "maparray test"
+    msg = "maparray failed on keys1=%s and keys2=%s"
+    keys = [([1, 2, 3], [3, 1, 2]),
+            ([1, 2, 3], [4, 3, -1, 1]),
+            ([], [1, 2]),
+            ([5, 5, 1], [5, 1]),
+            (range(-50, 1000, 7), range(2000, -100, -3))]
+    for keys1, keys2 in keys:
+        idx, found = maparray(keys1, keys2)
+        list1map = dict(zip(keys1, range(len(keys1))))
+        desired = [list1map.get(k, 0) for k in keys2]
+        yield assert_equal, idx, desired, msg % (keys1, keys2)
+        desired = [k in list1map for k in keys2]
+        yield assert_equal, found, desired, msg % (keys1, keys2)
+
+def uniquearray_test():
+    "uniquearray test"
+    msg = "uniquearray failed on keys=%s"
+    keys = [[], [1], [1, 1], [3, 1, 2], [3, 1, 3], range(-50, 1000, 7),
+            range(1000) + [999], [2**62, -2**62, 0]]
+    for k in keys:
+        desired = len(set(k)) == len(k)
+        yield assert_equal, uniquearray(k), desired, msg % k
+
+def isunique_test():
+    "isunique test"
+    d = datetime.date
+    labels = [[1, 2, 3], [1, 2, 1], ['a', 'b'], ['b', 'b'],
+              [d(2010, 1, 1), d(2010, 1, 2)], [d(2010, 1, 1), d(2010, 1, 1)]]
+    msg = "isunique failed on label=%s"
+    for label in labels:
+        desired = len(set(label)) == len(label)
+        yield assert_equal, isunique(label), desired, msg % label
+        actual = isunique(Typedlabel(label))
+        yield assert_equal, actual, desired, msg % label
+
+def typedlabel_unique_test():
+    "Typedlabel known-unique flag test"
+    lab = Typedlabel([3, 1, 2])
+    assert_equal(lab._unique is lab.x, False)
+    assert_equal(lab.isunique(), True)
+    assert_equal(lab._unique is lab.x, True)
+    for z in (lab[1:], lab.copy(), lab[np.array([True, False, True])]):
+        assert_equal(z._unique is z.x, True)
+    assert_equal(lab[[0, 0]]._unique is None, True)
+    lab[0] = 1
+    assert_equal(lab.isunique(), False)
+    lab = Typedlabel([1, 2, 3], unique=True)
+    lab.append(3)
+    assert_equal(lab.isunique(), False)
+    list1 = Typedlabel([1, 2, 3], unique=True)
+    list2 = Typedlabel([2, 3, 4], unique=True)
+    for join in ('inner', 'outer', 'left', 'right'):
+        list3 = listjoin(list1, list2, join)[0]
+        assert_equal(list3._unique is list3.x, True)
+    list3 = listjoin(list1, Typedlabel([2, 2]), 'right')[0]
+    assert_equal(list3._unique is list3.x, False)
+    
+def listmap_typed_test():
+    "listmap and listmap_fill test on Typedlabels"
+    d = datetime.date
+    lists = [([1, 2, 3], [3, 1, 2]),
+             ([d(2010, 1, 1), d(2010, 1, 2)], [d(2010, 1, 2), d(2010, 1, 1)])]
+    msg = "listmap failed on list1=%s and list2=%s"
+    for list1, list2 in lists:
+        actual = listmap(Typedlabel(list1), Typedlabel(list2))
+        desired = listmap(list1, list2)
+        yield assert_equal, actual, desired, msg % (list1, list2)
+    list1 = Typedlabel([1, 2, 3])
+    list2 = Typedlabel([3, 4, 1])
+    assert_equal(listmap_fill(list1, list2), ([2, 0, 0], [1]))
+    assert_equal(listmap(list1, list2, ignore_unmappable=True), [2, 0])
+    assert_raises(KeyError, listmap, list1, list2)
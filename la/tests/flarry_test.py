@@ -7,9 +7,11 @@ import numpy as np
 nan = np.nan
 from numpy.testing import assert_array_equal
 
+import la
 from la import larry
 from la import (union, intersection, panel, stack, cov, align, binaryop, add,
-                subtract, multiply, divide, unique)
+                subtract, multiply, divide, unique, align_many, align_many_raw,
+                reduce_many)
 from la.util.testing import assert_larry_equal as ale
 
 
@@ -336,6 +338,21 @@ class Test_align_1d(unittest.TestCase):
         ale(a1, d1, msg % 'left', original=y1)
         ale(a2, d2, msg % 'right', original=y2)
 
+    def test_1d21(self):
+        "align 1d test #21"
+        y1 = larry([1, 2, 3], [[10, 20, 30]])
+        y2 = larry([4, 5], [[15, 28]])
+        a1, a2 = align(y1, y2, join='asof')
+        d1 = larry([1, 2, 3], [[10, 20, 30]])
+        d2 = larry([nan, 4, 5], [[10, 20, 30]])
+        msg = "align 1d fail on %s larry"
+        ale(a1, d1, msg % 'left', original=y1)
+        ale(a2, d2, msg % 'right', original=y2)
+        a1, a2 = align(y1, y2, join='asof', direction='nearest', tolerance=2)
+        d2 = larry([nan, nan, 5], [[10, 20, 30]])
+        ale(a2, d2, msg % 'right', original=y2)
+        self.failUnlessRaises(TypeError, align, y1, y2, 'asof', False)
+
 class Test_align_2d(unittest.TestCase):
     "Test 2d alignment of larrys"   
 
@@ -645,6 +662,41 @@ class Test_binaryop(unittest.TestCase):
         ale(actual, desired, msg, original=y1)
         ale(actual, desired, msg, original=y2) 
 
+    def test_binaryop_23(self):
+        "binaryop test #23"
+        y1 = larry([[1, 2], [3, 4], [5, 6]], [[1, 4, 7], ['a', 'b']])
+        y2 = larry([[10, 20], [30, 40]], [[3, 5], ['b', 'a']])
+        actual = binaryop(np.add, y1, y2, join=['asof', 'inner'],
+                          direction='forward', missone=0)
+        desired = larry([[21.0, 12.0], [43.0, 34.0], [5.0, 6.0]],
+                        [[1, 4, 7], ['a', 'b']])
+        msg = "binaryop failed"
+        ale(actual, desired, msg, original=y1)
+        ale(actual, desired, msg, original=y2)
+
+    def test_binaryop_24(self):
+        "binaryop test #24"
+        y1 = larry([1,   2, nan, nan], [['a', 'b', 'c', 'd']])
+        y2 = larry([1, nan, 3, nan], [['a', 'b', 'c', 'd']])
+        desired = larry([2.0, 2.0, 3.0, -2.0], [['a', 'b', 'c', 'd']])
+        msg = "binaryop failed"
+        for chunksize in (1, 3, 100):
+            la.flarry.CHUNKSIZE = chunksize
+            try:
+                actual = binaryop(np.add, y1, y2, missone=0, misstwo=-1)
+            finally:
+                la.flarry.CHUNKSIZE = 32768
+            ale(actual, desired, msg, original=y1)
+            ale(actual, desired, msg, original=y2)
+        out = np.empty(4)
+        actual = binaryop(np.add, y1, y2, missone=0, misstwo=-1, out=out)
+        ale(actual, desired, msg, original=y1)
+        self.assert_(actual.x is out, 'out was not used')
+        out = np.empty(4)
+        actual = add(y1, y2, out=out)
+        self.assert_(actual.x is out, 'out was not used')
+        self.assertRaises(ValueError, add, y1, y2, out=np.empty(3))
+
 class Test_add(unittest.TestCase):
     "Test la.add()"   
 
@@ -917,3 +969,79 @@ class Test_divide(unittest.TestCase):
         ale(actual, desired, msg, original=y1)
         ale(actual, desired, msg, original=y2)
                     
+
+class Test_align_many(unittest.TestCase):
+    "Test la.align_many(), la.align_many_raw() and la.reduce_many()"
+    
+    def setUp(self):
+        self.y1 = larry([1.0, 2.0, nan], [['a', 'b', 'c']])
+        self.y2 = larry([3.0, 4.0], [['c', 'b']])
+        self.y3 = larry([5, 6, 7], [['b', 'd', 'c']])
+        
+    def test_align_many_01(self):
+        "align_many test #01"
+        y1, y2, y3 = self.y1, self.y2, self.y3
+        msg = "align_many failed with join='%s'"
+        for join in ('inner', 'outer', 'left', 'right'):
+            actual = align_many([y1, y2, y3], join=join)
+            a1, a2 = align(y1, y2, join=join)
+            if join == 'inner':
+                a1, a3 = align(a1, y3, join=join)
+                a2, a3 = align(a2, y3, join=join)
+                desired = [a1, a2, a3]
+            elif join == 'outer':
+                a1, a3 = align(a1, y3, join=join)
+                a2, a3 = align(a2, y3, join=join)
+                desired = [a1, a2, a3]
+            elif join == 'left':
+                a3 = y3.morph(y1.label[0], 0)
+                desired = [a1, a2, a3]
+            else:
+                desired = [y1.morph(y3.label[0], 0),
+                           y2.morph(y3.label[0], 0), y3]
+            for i in range(3):
+                ale(actual[i], desired[i], msg % join, original=y1)
+                
+    def test_align_many_02(self):
+        "align_many test #02"
+        y1 = larry([[1, 2], [3, 4]], [['a', 'b'], [1, 2]])
+        y2 = larry([[5, 6], [7, 8]], [['b', 'c'], [2, 1]])
+        xs, label, isviews = align_many_raw([y1, y2], join=['inner', 'left'])
+        self.assert_(label == [['b'], [1, 2]], 'wrong label')
+        assert_array_equal(xs[0], [[3, 4]])
+        assert_array_equal(xs[1], [[6, 5]])
+        xs, label, isviews = align_many_raw([y1, y1.copy()])
+        self.assert_(isviews == [True, True], 'copy instead of view')
+        self.assertRaises(TypeError, align_many, [y1, y2], 'outer', False)
+        self.assertRaises(ValueError, align_many, [y1, y1[0]])
+        self.assertRaises(ValueError, align_many, [])
+        
+    def test_reduce_many_01(self):
+        "reduce_many test #01"
+        y1, y2, y3 = self.y1, self.y2, self.y3
+        msg = "reduce_many failed with op='%s'"
+        actual = reduce_many([y1, y2, y3])
+        desired = y1 + y2 + y3
+        ale(actual, desired, msg % 'sum', original=y1)
+        actual = reduce_many([y1, y2, y3], op='mean', join='outer')
+        desired = larry([nan, 11 / 3.0, nan, nan], [['a', 'b', 'c', 'd']])
+        ale(actual, desired, msg % 'mean', original=y1)
+        actual = reduce_many([y1, y2, y3], op='mean', join='outer',
+                             skip_missing=True)
+        desired = larry([1.0, 11 / 3.0, 5.0, 6.0], [['a', 'b', 'c', 'd']])
+        ale(actual, desired, msg % 'mean', original=y1)
+        actual = reduce_many([y1, y2, y3], op='max', join='outer',
+                             skip_missing=True)
+        desired = larry([1.0, 5.0, 7.0, 6.0], [['a', 'b', 'c', 'd']])
+        ale(actual, desired, msg % 'max', original=y1)
+        
+    def test_reduce_many_02(self):
+        "reduce_many test #02"
+        y = larry([[1, 2], [3, 4]])
+        msg = "reduce_many failed with op='%s'"
+        for op, desired in (('sum', 3 * y), ('prod', y * y * y),
+                            ('min', y), ('max', y), ('mean', y.astype(float))):
+            actual = reduce_many([y, y, y], op=op)
+            ale(actual, desired, msg % op, original=y)
+        self.assertRaises(ValueError, reduce_many, [y], 'median')
+        self.assertRaises(TypeError, reduce_many, [larry(['a'])])
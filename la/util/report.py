@@ -9,12 +9,30 @@ def info():
     import la
 
     # Are you using the C or Python version of functions
-    from la.flabel import listmap, listmap_fill
+    from la.flabel import _listmap, _listmap_fill, maparray, uniquearray
     version = ('Slower Python version', 'Faster C version')
-    listmap = listmap.__module__.split('.')[-1] == 'cflabel'
-    listmap_fill = listmap_fill.__module__.split('.')[-1] == 'cflabel'
+    listmap = _listmap.__module__.split('.')[-1] == 'cflabel'
+    listmap_fill = _listmap_fill.__module__.split('.')[-1] == 'cflabel'
     listmap = version[listmap]
     listmap_fill = version[listmap_fill]
+    kernel = ('Slower Python version (sort and searchsorted)',
+              'Faster C version (int64 hash table)')
+    maparray = kernel[maparray.__module__.split('.')[-1] == 'cflabel']
+    kernel = ('Slower Python version (sort)',
+              'Faster C version (int64 hash table)')
+    uniquearray = kernel[uniquearray.__module__.split('.')[-1] == 'cflabel']
+    from la.farray import _nansum
+    reduce = version[_nansum.__module__.split('.')[-1] == 'cfarray']
+    
+    # Alignment plan cache
+    from la.flabel import joincache
+    cache = '%(size)d of %(maxsize)d plans, %(hits)d hits, %(misses)d misses'
+    cache = cache % joincache.info()
+    
+    # Thread pool
+    from la.util.threads import threadpool
+    threads = '%(num_threads)d (arrays of at least %(threshold)d elements)'
+    threads = threads % threadpool.info()
     
     # IO
     try:
@@ -29,5 +47,10 @@ def info():
     table.append(['la file', la.__file__])
     table.append(['HDF5 archiving', io])  
     table.append(['listmap', listmap])
-    table.append(['listmap_fill', listmap_fill])         
+    table.append(['listmap_fill', listmap_fill])
+    table.append(['maparray', maparray])
+    table.append(['uniquearray', uniquearray])
+    table.append(['nansum, nanmean, ...', reduce])
+    table.append(['join cache', cache])
+    table.append(['threads', threads])         
     print indent(table, hasHeader=False, delim='  ')          
@@ -0,0 +1,79 @@
+"Unit tests of the thread pool and of threaded larry computations"
+
+import numpy as np
+from numpy.testing import assert_equal, assert_raises, assert_
+
+import la
+from la.util.testing import assert_larry_equal
+from la.util.threads import threadpool
+
+
+def setup():
+    global num_threads, threshold
+    num_threads, threshold = threadpool.num_threads, threadpool.threshold
+    la.set_num_threads(4)
+
+def teardown():
+    la.set_num_threads(num_threads, threshold=threshold)
+
+def threaded(func, *args):
+    "func(*args) with blocks of arrays of at least 1 element run on threads."
+    la.set_num_threads(4, threshold=1)
+    try:
+        return func(*args)
+    finally:
+        la.set_num_threads(4, threshold=threshold)
+
+def blocks_test():
+    "threads.Threadpool.blocks"
+    pool = la.util.threads.Threadpool(3, threshold=10)
+    assert_equal(pool.blocks(7, 100), [(0, 2), (2, 4), (4, 7)])
+    assert_equal(pool.blocks(2, 100), [(0, 1), (1, 2)])
+    assert_equal(pool.blocks(7, 9), [(0, 7)])
+    assert_equal(pool.blocks(0, 100), [(0, 0)])
+    pool.set_num_threads(1)
+    assert_equal(pool.blocks(7, 100), [(0, 7)])
+    assert_raises(ValueError, pool.set_num_threads, 0)
+    pool.close()
+
+def set_num_threads_test():
+    "la.set_num_threads"
+    la.set_num_threads(3)
+    assert_equal(la.get_num_threads(), 3)
+    la.set_num_threads(None)
+    assert_(la.get_num_threads() >= 1, 'la.set_num_threads(None)')
+    la.set_num_threads(4)
+
+def reduce_test():
+    "threaded larry reductions"
+    rs = np.random.RandomState([1, 2, 3])
+    for shape in [(40, 3), (3, 40), (5, 6, 7), (50,), (0, 4)]:
+        x = rs.randn(*shape)
+        x[rs.rand(*shape) < 0.3] = np.nan
+        for lar in (la.larry(x), la.larry(x).T):
+            for method in ('sum', 'mean', 'std', 'var', 'min', 'max',
+                           'describe'):
+                for axis in [None] + range(lar.ndim):
+                    desired = getattr(lar, method)(axis)
+                    actual = threaded(getattr(lar, method), axis)
+                    msg = 'threaded larry.%s failed (shape=%s, axis=%s)'
+                    msg = msg % (method, str(lar.shape), str(axis))
+                    if isinstance(desired, la.larry):
+                        assert_larry_equal(actual, desired, msg)
+                    else:
+                        np.testing.assert_almost_equal(actual, desired,
+                                                       err_msg=msg)
+
+def elementwise_test():
+    "threaded larry.cumsum, log, exp, sqrt, clip"
+    rs = np.random.RandomState([1, 2, 3])
+    x = rs.rand(20, 6)
+    x[rs.rand(*x.shape) < 0.3] = np.nan
+    for lar in (la.larry(x), la.larry(x).T, la.larry(x[:, 0])):
+        for method, args in [('log', ()), ('exp', ()), ('sqrt', ()),
+                             ('clip', (0.2, 0.6)), ('cumsum', (0,)),
+                             ('cumsum', (-1,))]:
+            desired = getattr(lar, method)(*args)
+            actual = threaded(getattr(lar, method), *args)
+            msg = 'threaded larry.%s failed' % method
+            assert_larry_equal(actual, desired, msg, original=lar)
@@ -0,0 +1,158 @@
+"Thread pool used to split large array computations into blocks."
+
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
+
+
+class Threadpool(object):
+    """
+    Pool of worker threads that process blocks of large arrays.
+
+    The C reductions of la.farray (nansum, nanmean, nanvar, nanstd, nanmin,
+    nanmax, nandescribe), larry.cumsum, and the element-wise larry methods
+    log, exp, sqrt, and clip split arrays with at least `threshold` elements
+    into one block per thread. The blocks are processed by kernels that
+    release the GIL (C loops and Numpy ufuncs), so the threads run in
+    parallel. Smaller arrays, and all arrays when `num_threads` is 1, are
+    processed in the calling thread.
+
+    Parameters
+    ----------
+    num_threads : int, optional
+        Number of threads. The default is 1 (no threading).
+    threshold : int, optional
+        Arrays with fewer elements are not split. The default is 2**17
+        (1 MB of float64).
+
+    Examples
+    --------
+    >>> from la.util.threads import threadpool
+    >>> threadpool.set_num_threads(4)
+    >>> threadpool.blocks(10, 10**6)
+    [(0, 2), (2, 5), (5, 7), (7, 10)]
+    >>> threadpool.blocks(10, 100)
+    [(0, 10)]
+    >>> threadpool.set_num_threads(1)
+
+    """
+
+    def __init__(self, num_threads=1, threshold=2**17):
+        self.num_threads = 1
+        self.threshold = threshold
+        self.pool = None
+        self.set_num_threads(num_threads)
+
+    def set_num_threads(self, num_threads=None, threshold=None):
+        """
+        Set the number of threads (None: number of CPUs) and the threshold.
+
+        The previous pool, if any, is closed; a new pool is started the next
+        time it is needed.
+
+        """
+        if num_threads is None:
+            num_threads = cpu_count()
+        num_threads = int(num_threads)
+        if num_threads < 1:
+            raise ValueError, '`num_threads` must be at least 1'
+        if threshold is not None:
+            if threshold < 1:
+                raise ValueError, '`threshold` must be at least 1'
+            self.threshold = int(threshold)
+        if num_threads != self.num_threads:
+            self.close()
+            self.num_threads = num_threads
+
+    def close(self):
+        "Stop the worker threads."
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def info(self):
+        "Dictionary of num_threads and threshold."
+        return {'num_threads': self.num_threads, 'threshold': self.threshold}
+
+    def blocks(self, n, size):
+        """
+        Split range(n) into one (start, stop) block per thread.
+
+        `size` is the number of elements of the whole array; if it is less
+        than the threshold, or if there is only one thread, a single block
+        is returned.
+
+        """
+        k = min(self.num_threads, n)
+        if k < 2 or size < self.threshold:
+            return [(0, n)]
+        edges = [n * i // k for i in range(k + 1)]
+        return zip(edges[:-1], edges[1:])
+
+    def map(self, func, blocks):
+        "List of func(start, stop) for each block; blocks run in parallel."
+        if len(blocks) == 1:
+            return [func(*blocks[0])]
+        if self.pool is None:
+            self.pool = ThreadPool(self.num_threads)
+        return self.pool.map(lambda block: func(*block), blocks)
+
+threadpool = Threadpool()
+
+def set_num_threads(num_threads=None, threshold=None):
+    """
+    Set the number of threads used to process large arrays.
+
+    Reductions (larry.sum, mean, std, var, min, max, describe), larry.cumsum,
+    and the element-wise methods log, exp, sqrt, and clip split arrays that
+    have at least `threshold` elements into one block per thread.
+
+    Parameters
+    ----------
+    num_threads : {int, None}, optional
+        Number of threads. 1 turns threading off (the default when la is
+        imported); None uses one thread per CPU.
+    threshold : {int, None}, optional
+        Arrays with fewer elements are processed in the calling thread. None
+        (default) keeps the current threshold, initially 2**17 elements.
+
+    Returns
+    -------
+    None
+
+    Examples
+    --------
+    >>> la.set_num_threads(8)
+    >>> la.get_num_threads()
+    8
+    >>> la.set_num_threads(1)
+
+    """
+    threadpool.set_num_threads(num_threads, threshold)
+
+def get_num_threads():
+    "Number of threads used to process large arrays (see set_num_threads)."
+    return threadpool.num_threads
+
+def elementwise(func, arr, *args):
+    """
+    func(arr, *args) computed one block of rows per thread.
+
+    `func` must be a Numpy ufunc, or a function such as np.clip, that takes
+    an `out` keyword argument.
+
+    """
+    arr = np.asarray(arr)
+    if arr.ndim == 0:
+        return func(arr, *args)
+    blocks = threadpool.blocks(arr.shape[0], arr.size)
+    if len(blocks) == 1:
+        return func(arr, *args)
+    dtype = func(arr[:0], *args).dtype
+    out = np.empty(arr.shape, dtype=dtype)
+    def block(start, stop):
+        func(arr[start:stop], *args, out=out[start:stop])
+    threadpool.map(block, blocks)
+    return out
@@ -1,4 +1,6 @@
 
+import sys
+
 import numpy as np
 
 import la
@@ -23,19 +25,81 @@ def bench(verbose=True):
                     print '\t' + str(t)
     return la.larry.fromtuples(results)                
 
+def memory(verbose=True):
+    "Bytes per larry instance (not counting the data or the label)."
+    lar = la.larry([1.0, 2.0])
+    nbytes = sys.getsizeof(lar)
+    if hasattr(lar, '__dict__'):
+        nbytes += sys.getsizeof(lar.__dict__)
+    if verbose:
+        print 'larry instance: %d bytes' % nbytes
+    return nbytes
+
+def reduce_bench(shape=(1000, 1000), verbose=True):
+    """
+    Time la.farray's single-pass NaN reductions against numpy and scipy.
+
+    Each reduction is timed over all axes and along each axis at NaN
+    densities of 0, 0.1, 0.5 and 0.9. Returns a list of (function, density,
+    axis, new time, old time) tuples.
+    
+    """
+    funcs = [('nansum', 'np.nansum'),
+             ('nanmean', 'nanmean0'),
+             ('nanstd', 'nanstd0'),
+             ('nanmin', 'np.nanmin'),
+             ('nanmax', 'np.nanmax')]
+    setup = "import numpy as np; "
+    setup += "from la.farray import nansum, nanmean, nanstd, nanmin, nanmax; "
+    setup += "from la.external.scipy import nanmean as nanmean0; "
+    setup += "from la.external.scipy import nanstd as nanstd0; "
+    setup += "from bench import fnan; a = fnan(%s, %s)"
+    results = []
+    for density in (0, 0.1, 0.5, 0.9):
+        for new, old in funcs:
+            for axis in (None, 0, 1):
+                if axis is None and old in ('nanmean0', 'nanstd0'):
+                    stmt = '%s(a.ravel(), axis=0)'
+                else:
+                    stmt = '%%s(a, axis=%s)' % str(axis)
+                snew = autotimeit(stmt % new, setup % (str(shape), density))
+                sold = autotimeit(stmt % old, setup % (str(shape), density))
+                results.append((new, density, axis, snew, sold))
+                if verbose:
+                    msg = '%-8s nan=%-4s axis=%-5s %9.6f %9.6f  %5.1fx'
+                    print msg % (new, density, axis, snew, sold, sold / snew)
+    return results
+
+def fnan(shape, density):
+    arr = np.random.randn(*shape)
+    arr[np.random.rand(*shape) < density] = np.nan
+    return arr
+
 def fx(shape):
     lar = la.randn(*shape)
     lar.shufflelabel()
     return lar
     
+def fsorted(n, offset=0):
+    label = range(offset, offset + n)
+    return la.larry(np.random.randn(n), [label])
+    
 def suite():
 
     statements = {}
     setups = {}
     
-    setups['(1000,)'] = "from bench import fx; N = 1000; x = fx((N,)); y = fx((N,)); idx = range(N)[::-1]"
-    setups['(500,500)'] = "from bench import fx; N = 500; x = fx((N, N)); y = fx((N, N)); idx = range(N)[::-1]"
+    setups['(10,)'] = "import la; from bench import fx; N = 10; x = fx((N,)); y = fx((N,)); idx = range(N)[::-1]"
+    setups['(1000,)'] = "import la; from bench import fx; N = 1000; x = fx((N,)); y = fx((N,)); idx = range(N)[::-1]"
+    setups['(500,500)'] = "import la; from bench import fx; N = 500; x = fx((N, N)); y = fx((N, N)); idx = range(N)[::-1]"
+    setups['sorted (100000,)'] = "import la; from bench import fsorted; N = 100000; x = fsorted(N); y = fsorted(N, N // 2); idx = range(N)[::-1]"
 
+    # Construction
+    s = ['la.larry(x.x, x.label)',
+         'la.larry(x.x, x.label, integrity=False)',
+         'la.larry._trusted(x.x, x.label)']
+    statements['construction'] = s
+    
     # Unary
     s = ['x.log()',
          'x.exp()',
@@ -50,8 +114,31 @@ def suite():
     
     # Alignment      
     s = ['x.morph(idx, axis=0)',
-         'x.merge(y, update=True)']
+         'x.merge(y, update=True)',
+         "la.align(x, y, join='outer')"]
     statements['alignment'] = s 
     
+    # Reduce
+    s = ['x.sum()',
+         'x.mean(axis=0)',
+         'x.std(axis=1)',
+         'x.max(axis=0)',
+         'x.describe(axis=0)',
+         'x.median(axis=1)',
+         'x.demedian(axis=0)']
+    statements['reduce'] = s
+    
+    # Moving window
+    s = ['x.mov_sum(5)',
+         'x.mov_mean(5)',
+         'x.mov_std(5)',
+         'x.mov_max(5)',
+         'x.mov_median(5)',
+         'x.movingrank(5)',
+         'x.push(2)',
+         'x.ewma(5)',
+         'x.ewmcorr(y, 5)']
+    statements['moving window'] = s
+    
     return statements, setups
 
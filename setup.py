@@ -132,12 +132,13 @@ try:
           package_data=PACKAGE_DATA,
           requires=REQUIRES,
           zip_safe=False,
-          ext_modules = [Extension("la.cflabel", ["la/src/cflabel.c"])]          
+          ext_modules = [Extension("la.cflabel", ["la/src/cflabel.c"]),
+                         Extension("la.cfarray", ["la/src/cfarray.c"])]
          )
 except SystemExit:
     # Probably clistmap.c failed to compile, so use slower python version
-    msg = '\nLooks like cflabel.c failed to compile, so the slower python '
-    msg += 'version will be used instead.\n'  
+    msg = '\nLooks like cflabel.c or cfarray.c failed to compile, so the '
+    msg += 'slower python version will be used instead.\n'  
     print msg        
     setup(name=NAME,
           maintainer=MAINTAINER,